@@ -0,0 +1,314 @@
+"""
+Kaiser Permanente Lab Automation System
+Integration Client Lifecycle
+
+Starts the integration clients (Notion, Power BI, Teams, Epic Beaker,
+Qmatic, Bio-Rad Unity, HR Connect) concurrently, retrying each with
+exponential backoff and an optional health probe, so startup takes as
+long as the slowest client rather than the sum of all of them.
+
+Every client sits behind its own circuit breaker. Repeated failures open
+the breaker, which hides the client from callers (they see None, as for
+an unconfigured integration) until a cool-down passes; the client is then
+rebuilt and probed on its own while the others keep running.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+DISABLED = 'disabled'
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    Closed: calls go through. After `failure_threshold` failures in a row
+    it opens for `reset_timeout_seconds`; after that one trial (half-open)
+    decides whether it closes again or reopens with a doubled cool-down.
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout_seconds: float = 30.0,
+                 max_reset_timeout_seconds: float = 600.0, clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.base_reset_timeout = reset_timeout_seconds
+        self.max_reset_timeout = max_reset_timeout_seconds
+        self.reset_timeout = reset_timeout_seconds
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def allow(self) -> bool:
+        """Whether calls may go through right now"""
+        return self.state in (CLOSED, HALF_OPEN)
+
+    def ready_to_retry(self) -> bool:
+        """Whether an open breaker's cool-down has passed"""
+        return self.state == OPEN and self.clock() - self.opened_at >= self.reset_timeout
+
+    def half_open(self) -> None:
+        self.state = HALF_OPEN
+
+    def record_success(self) -> None:
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.last_error = None
+        self.reset_timeout = self.base_reset_timeout
+
+    def record_failure(self, error: Any = None) -> None:
+        self.failures += 1
+        if error is not None:
+            self.last_error = str(error)
+        if self.state == HALF_OPEN:
+            # Trial failed: stay away longer next time
+            self.reset_timeout = min(self.reset_timeout * 2, self.max_reset_timeout)
+            self.trip()
+        elif self.state == CLOSED and self.failures >= self.failure_threshold:
+            self.trip()
+
+    def trip(self) -> None:
+        """Open the breaker now"""
+        self.state = OPEN
+        self.opened_at = self.clock()
+
+
+@dataclass
+class ClientSpec:
+    """How to build and health-check one integration client"""
+    name: str
+    factory: Callable[[Any], Any]            # client class, called with its config
+    config_func: Callable[[], Any]
+    probe: Optional[Callable[[Any], Any]] = None  # client -> bool (or awaitable bool)
+    required: bool = False
+
+
+class ClientManager:
+    """
+    Builds integration clients concurrently and keeps each behind a
+    circuit breaker.
+
+    Client constructors are expected to be cheap; network work belongs in
+    the probe, which runs with a timeout (in a worker thread when it is a
+    plain function).
+    """
+
+    def __init__(self, specs: Iterable[ClientSpec], attempts: int = 3, base_delay_seconds: float = 1.0,
+                 max_delay_seconds: float = 30.0, probe_timeout_seconds: float = 10.0,
+                 failure_threshold: int = 3, reset_timeout_seconds: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic, rng: Optional[random.Random] = None,
+                 on_call: Optional[Callable[[str, float, bool], None]] = None):
+        """
+        Initialize the manager; nothing is built until start()
+
+        Args:
+            specs: Clients to manage
+            attempts: Build/probe attempts per start or recovery
+            base_delay_seconds: Backoff before the second attempt (doubles after)
+            max_delay_seconds: Backoff cap
+            probe_timeout_seconds: Time allowed for one health probe
+            failure_threshold: Consecutive failures that open a client's breaker
+            reset_timeout_seconds: Initial cool-down before an open client is rebuilt
+            clock: Monotonic time source (seconds)
+            rng: Random generator for backoff jitter
+            on_call: Called with (client name, seconds, failed) after each guard() block
+        """
+        self.specs: Dict[str, ClientSpec] = {spec.name: spec for spec in specs}
+        self.attempts = attempts
+        self.base_delay = base_delay_seconds
+        self.max_delay = max_delay_seconds
+        self.probe_timeout = probe_timeout_seconds
+        self.rng = rng or random.Random()
+        self.on_call = on_call
+        self.clients: Dict[str, Any] = {}
+        self.breakers: Dict[str, CircuitBreaker] = {
+            name: CircuitBreaker(failure_threshold, reset_timeout_seconds, clock=clock) for name in self.specs
+        }
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def get(self, name: str) -> Optional[Any]:
+        """The client, or None if it is disabled, unavailable or its breaker is open"""
+        if not self.breakers[name].allow():
+            return None
+        return self.clients.get(name)
+
+    def require(self, name: str) -> Optional[Any]:
+        """
+        The client, or None if its integration is disabled
+
+        Raises:
+            ConnectionError: The integration is enabled but its client is down
+        """
+        client = self.get(name)
+        if client is None and self.breakers[name].state != DISABLED:
+            breaker = self.breakers[name]
+            raise ConnectionError(f"{name} unavailable ({breaker.state}): {breaker.last_error or 'not started'}")
+        return client
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.base_delay * (2 ** attempt), self.max_delay)
+        return delay * self.rng.uniform(0.5, 1.0)
+
+    async def _probe(self, spec: ClientSpec, client: Any) -> bool:
+        if spec.probe is None:
+            return True
+        if asyncio.iscoroutinefunction(spec.probe):
+            call = spec.probe(client)
+        else:
+            call = asyncio.to_thread(spec.probe, client)
+        result = await asyncio.wait_for(call, timeout=self.probe_timeout)
+        return result is not False
+
+    async def _build(self, name: str) -> bool:
+        """Build and probe one client with retries; True once it is healthy"""
+        spec = self.specs[name]
+        breaker = self.breakers[name]
+        for attempt in range(self.attempts):
+            if attempt:
+                await asyncio.sleep(self._backoff(attempt - 1))
+            try:
+                config = spec.config_func()
+                if hasattr(config, "enabled") and not getattr(config, "enabled"):
+                    logger.info(f"{name} integration disabled; skipping client initialization")
+                    self.clients.pop(name, None)
+                    breaker.state = DISABLED
+                    return False
+
+                client = spec.factory(config)
+                if not await self._probe(spec, client):
+                    raise ConnectionError("health probe failed")
+                self.clients[name] = client
+                breaker.record_success()
+                logger.info(f"{name} client initialized (attempt {attempt + 1})")
+                return True
+            except asyncio.TimeoutError:
+                breaker.last_error = f"health probe timed out after {self.probe_timeout:.0f}s"
+                logger.warning(f"{name} client init failed (attempt {attempt + 1}): {breaker.last_error}")
+            except Exception as e:
+                breaker.last_error = str(e)
+                logger.warning(f"{name} client init failed (attempt {attempt + 1}): {e}")
+
+        level = logging.ERROR if spec.required else logging.WARNING
+        logger.log(level, f"{name} client could not be initialized after {self.attempts} attempts")
+        self.clients.pop(name, None)
+        if breaker.state == HALF_OPEN:
+            breaker.record_failure()
+        else:
+            breaker.trip()
+        return False
+
+    async def _restart(self, name: str) -> bool:
+        lock = self._locks.setdefault(name, asyncio.Lock())
+        async with lock:
+            return await self._build(name)
+
+    async def start(self, names: Optional[Iterable[str]] = None) -> Dict[str, bool]:
+        """
+        Build clients concurrently (all of them by default)
+
+        Returns:
+            Dictionary of client name to whether it is up
+        """
+        names = list(self.specs if names is None else names)
+        results = await asyncio.gather(*(self._restart(name) for name in names))
+        return dict(zip(names, results))
+
+    def record_success(self, name: str) -> None:
+        """Report a successful call through a client"""
+        breaker = self.breakers[name]
+        if breaker.state != DISABLED:
+            breaker.record_success()
+
+    def record_failure(self, name: str, error: Any = None) -> None:
+        """Report a failed call through a client; may open its breaker"""
+        breaker = self.breakers[name]
+        if breaker.state == DISABLED:
+            return
+        was_open = breaker.state == OPEN
+        breaker.record_failure(error)
+        if breaker.state == OPEN and not was_open:
+            logger.warning(f"{name} circuit opened after {breaker.failures} failures: {breaker.last_error}")
+
+    @asynccontextmanager
+    async def guard(self, name: str):
+        """Record the outcome of the calls made through a client in this block"""
+        started = time.perf_counter()
+        failed = False
+        try:
+            yield
+        except Exception as e:
+            failed = True
+            self.record_failure(name, e)
+            raise
+        else:
+            self.record_success(name)
+        finally:
+            if self.on_call is not None:
+                self.on_call(name, time.perf_counter() - started, failed)
+
+    async def recover(self) -> List[str]:
+        """
+        Rebuild, concurrently, the clients whose breaker cool-down has passed
+
+        Returns:
+            Names of the clients that came back
+        """
+        due = [name for name, breaker in self.breakers.items() if breaker.ready_to_retry()]
+        if not due:
+            return []
+        for name in due:
+            self.breakers[name].half_open()
+            # The old instance is broken; callers see None until the rebuild succeeds
+            self.clients.pop(name, None)
+        results = await self.start(due)
+        recovered = [name for name, ok in results.items() if ok]
+        if recovered:
+            logger.info(f"Reconnected clients: {', '.join(recovered)}")
+        return recovered
+
+    async def check_health(self) -> Dict[str, bool]:
+        """Probe every running client concurrently, tripping the breaker of any that fail"""
+        names = [name for name in self.clients if self.breakers[name].allow()]
+
+        async def check(name: str) -> bool:
+            try:
+                healthy = await self._probe(self.specs[name], self.clients[name])
+            except Exception as e:
+                healthy = False
+                self.breakers[name].last_error = str(e) or type(e).__name__
+            if not healthy:
+                logger.warning(f"{name} failed its health probe")
+                self.breakers[name].trip()
+            return healthy
+
+        results = await asyncio.gather(*(check(name) for name in names))
+        return dict(zip(names, results))
+
+    def status(self) -> Dict[str, Dict]:
+        """Breaker state, consecutive failures and last error per client"""
+        return {
+            name: {'state': breaker.state, 'failures': breaker.failures, 'last_error': breaker.last_error}
+            for name, breaker in self.breakers.items()
+        }
+
+    async def close(self) -> None:
+        """Close every client that has an async close()"""
+        for name, client in list(self.clients.items()):
+            close = getattr(client, 'close', None)
+            if close is not None and asyncio.iscoroutinefunction(close):
+                try:
+                    await close()
+                except Exception as e:
+                    logger.debug(f"Closing {name} client failed: {e}")
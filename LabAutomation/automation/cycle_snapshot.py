@@ -0,0 +1,133 @@
+"""
+Kaiser Permanente Lab Automation System
+Monitoring Cycle Snapshot
+
+Holds what one monitoring cycle collected from each source (Notion/Epic
+performance and incidents, Qmatic queues, Bio-Rad QC, equipment status),
+so analysis, dashboard updates and dashboard reads all work from a single
+fetch instead of going back to the sources.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CycleSnapshot:
+    """Source data collected once for a monitoring cycle"""
+    cycle_id: int
+    collected_at: datetime
+    performance: List[Any] = field(default_factory=list)
+    incidents: List[Any] = field(default_factory=list)
+    queue: Dict[str, Any] = field(default_factory=dict)
+    qc: Dict[str, Any] = field(default_factory=dict)
+    equipment: Dict[str, Any] = field(default_factory=dict)
+    errors: Dict[str, str] = field(default_factory=dict)
+    # When each source was last fetched; collected_at is the oldest of these
+    fetched_at: Dict[str, datetime] = field(default_factory=dict)
+
+    def age_seconds(self, now: Optional[datetime] = None) -> float:
+        """Seconds since the oldest data in the snapshot was collected"""
+        return ((now or datetime.now()) - self.collected_at).total_seconds()
+
+    def is_fresh(self, max_age_seconds: float, now: Optional[datetime] = None) -> bool:
+        """Whether the snapshot is young enough to be served instead of refetching"""
+        return self.age_seconds(now) <= max_age_seconds
+
+
+# Snapshot attribute -> value used when its source fails
+SOURCE_DEFAULTS: Dict[str, Callable[[], Any]] = {
+    'performance': list,
+    'incidents': list,
+    'queue': dict,
+    'qc': dict,
+    'equipment': dict,
+}
+
+
+class SnapshotCollector:
+    """
+    Collects CycleSnapshots from async source callables and remembers the
+    latest one. Concurrent refresh requests share a single fetch.
+    """
+
+    def __init__(self, sources: Dict[str, Callable[[], Awaitable[Any]]]):
+        """
+        Initialize the collector
+
+        Args:
+            sources: Snapshot attribute (see SOURCE_DEFAULTS) -> coroutine function fetching it
+        """
+        unknown = [name for name in sources if name not in SOURCE_DEFAULTS]
+        if unknown:
+            raise ValueError(f"Unknown snapshot source: {unknown[0]}")
+        self.sources = sources
+        self.latest: Optional[CycleSnapshot] = None
+        self._cycles = 0
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def collect(self) -> CycleSnapshot:
+        """Fetch every source concurrently into a new snapshot"""
+        names = list(self.sources)
+        results = await asyncio.gather(*(self.sources[name]() for name in names), return_exceptions=True)
+
+        self._cycles += 1
+        snapshot = CycleSnapshot(cycle_id=self._cycles, collected_at=datetime.now())
+        for name, result in zip(names, results):
+            if isinstance(result, Exception):
+                logger.error(f"Snapshot source {name} failed: {result}")
+                snapshot.errors[name] = str(result)
+                result = SOURCE_DEFAULTS[name]()
+            setattr(snapshot, name, result)
+
+        self.latest = snapshot
+        return snapshot
+
+    def publish(self, values: Dict[str, Any], errors: Optional[Dict[str, str]] = None,
+                fetched_at: Optional[Dict[str, datetime]] = None) -> CycleSnapshot:
+        """
+        Make a snapshot from data fetched elsewhere (e.g. by a polling scheduler)
+
+        The snapshot is dated by its oldest source, so a source polled often
+        does not make slower sources look fresh.
+
+        Args:
+            values: Snapshot attribute -> latest data; missing sources are empty
+            errors: Source -> last error message
+            fetched_at: Source -> when its data was fetched
+        """
+        fetched_at = {name: when for name, when in (fetched_at or {}).items() if name in values}
+        collected_at = min(fetched_at.values(), default=datetime.now())
+        self._cycles += 1
+        snapshot = CycleSnapshot(cycle_id=self._cycles, collected_at=collected_at,
+                                 errors=dict(errors or {}), fetched_at=fetched_at)
+        for name, default in SOURCE_DEFAULTS.items():
+            setattr(snapshot, name, values[name] if name in values else default())
+        self.latest = snapshot
+        return snapshot
+
+    def invalidate(self) -> None:
+        """Force the next get() to refetch, e.g. after writing to a source"""
+        self.latest = None
+
+    async def get(self, max_age_seconds: float) -> CycleSnapshot:
+        """
+        Latest snapshot if it is within the freshness bound, else a new one
+
+        Args:
+            max_age_seconds: Oldest acceptable snapshot age
+        """
+        if self.latest is not None and self.latest.is_fresh(max_age_seconds):
+            return self.latest
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            # Another caller may have refreshed while we waited
+            if self.latest is not None and self.latest.is_fresh(max_age_seconds):
+                return self.latest
+            return await self.collect()
@@ -0,0 +1,275 @@
+"""
+Kaiser Permanente Lab Automation System
+Monitoring Event Bus
+
+In-process publish/subscribe for monitoring events. Collectors publish
+typed events (queue snapshots, opened incidents, QC results, performance
+records) the moment their data lands; threshold checkers, dashboard
+pushers and Teams notifiers consume them from their own bounded queues.
+
+Publishing never waits on a consumer. Consumers that only care about
+current state subscribe with latest_only: when their queue is full the
+oldest queued event is dropped (and counted), so a queue of size 1
+always holds just the latest event. For every other consumer events that
+do not fit wait in a pending backlog, where an event replaces a pending
+one with the same coalesce key (e.g. the same staff member), so nothing
+is lost and the backlog stays bounded by the number of keys. Consumers
+that work on whole batches (e.g. threshold checks) can subscribe with a
+batch_size and receive everything queued so far as one list.
+"""
+
+import asyncio
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple, Type, Union
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE_SIZE = 256
+
+
+class Event:
+    """Base class of all bus events; subscribe to it to receive everything"""
+
+
+@dataclass(frozen=True)
+class QueueSnapshot(Event):
+    """Qmatic queue status as collected"""
+    data: Dict[str, Any]
+    occurred_at: datetime = field(default_factory=datetime.now)
+
+
+@dataclass(frozen=True)
+class IncidentOpened(Event):
+    """An open incident not seen in the previous collection"""
+    incident: Any
+    incident_id: str
+    occurred_at: datetime = field(default_factory=datetime.now)
+
+
+@dataclass(frozen=True)
+class QCResult(Event):
+    """Bio-Rad Unity QC status as collected"""
+    data: Dict[str, Any]
+    occurred_at: datetime = field(default_factory=datetime.now)
+
+
+@dataclass(frozen=True)
+class EquipmentStatus(Event):
+    """Instrument status from Epic Beaker and Bio-Rad"""
+    data: Dict[str, Any]
+    occurred_at: datetime = field(default_factory=datetime.now)
+
+
+@dataclass(frozen=True)
+class PerformanceRecord(Event):
+    """One staff member's current performance metrics"""
+    metrics: Any
+    occurred_at: datetime = field(default_factory=datetime.now)
+
+
+@dataclass(frozen=True)
+class SnapshotPublished(Event):
+    """A new monitoring snapshot combining the latest data of every source"""
+    snapshot: Any
+    occurred_at: datetime = field(default_factory=datetime.now)
+
+
+EventTypes = Union[Type[Event], Tuple[Type[Event], ...]]
+
+
+DropCallback = Callable[[str, str], None]
+
+
+class Subscription:
+    """One consumer: its event types, bounded queue, pending backlog, worker and counters"""
+
+    def __init__(self, name: str, event_types: Tuple[Type[Event], ...],
+                 handler: Callable[[Any], Awaitable[None]], maxsize: int, batch_size: int = 1,
+                 latest_only: bool = False, coalesce_key: Optional[Callable[[Event], Hashable]] = None,
+                 on_drop: Optional[DropCallback] = None):
+        self.name = name
+        self.event_types = event_types
+        self.handler = handler
+        self.batch_size = batch_size
+        self.latest_only = latest_only
+        self.coalesce_key = coalesce_key
+        self.on_drop = on_drop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        # Events waiting for queue space, in arrival order
+        self.pending: 'OrderedDict[Hashable, Event]' = OrderedDict()
+        self.task: Optional[asyncio.Task] = None
+        self.delivered = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.handled = 0
+        self.errors = 0
+
+    def _count_drop(self, reason: str) -> None:
+        if reason == 'oldest':
+            self.dropped += 1
+        else:
+            self.coalesced += 1
+        total = self.dropped + self.coalesced
+        if total == 1 or total % 100 == 0:
+            logger.warning(f"Subscriber {self.name} is falling behind; "
+                           f"{self.dropped} events dropped, {self.coalesced} coalesced")
+        if self.on_drop is not None:
+            self.on_drop(self.name, reason)
+
+    def offer(self, event: Event) -> None:
+        """Enqueue without waiting; a full queue drops the oldest event or backlogs this one"""
+        self.delivered += 1
+        if self.latest_only:
+            if self.queue.full():
+                self.queue.get_nowait()
+                self.queue.task_done()
+                self._count_drop('oldest')
+            self.queue.put_nowait(event)
+            return
+
+        if not self.pending and not self.queue.full():
+            self.queue.put_nowait(event)
+            return
+        # Behind events already waiting, so order is kept
+        key = self.coalesce_key(event) if self.coalesce_key else object()
+        if key in self.pending:
+            self._count_drop('coalesced')
+        self.pending[key] = event
+
+    def _refill(self) -> None:
+        """Move pending events into the queue as space frees up"""
+        while self.pending and not self.queue.full():
+            self.queue.put_nowait(self.pending.popitem(last=False)[1])
+
+    async def run(self) -> None:
+        while True:
+            events = [await self.queue.get()]
+            while len(events) < self.batch_size and not self.queue.empty():
+                events.append(self.queue.get_nowait())
+            try:
+                await self.handler(events if self.batch_size > 1 else events[0])
+                self.handled += len(events)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Subscriber {self.name} failed on {type(events[0]).__name__}: {e}")
+            finally:
+                # Refill before marking done so queue.join() also waits for the backlog
+                self._refill()
+                for _ in events:
+                    self.queue.task_done()
+
+
+class EventBus:
+    """
+    Typed publish/subscribe with one bounded queue and worker task per
+    subscriber. Events published before start() are queued.
+    """
+
+    def __init__(self, default_queue_size: int = DEFAULT_QUEUE_SIZE, on_drop: Optional[DropCallback] = None):
+        """
+        Initialize the bus
+
+        Args:
+            default_queue_size: Queue bound for subscribers that don't set one
+            on_drop: Called with (subscriber name, 'oldest' or 'coalesced') for
+                every event a subscriber loses, e.g. StageMetrics.record_dropped
+        """
+        self.default_queue_size = default_queue_size
+        self.on_drop = on_drop
+        self.subscriptions: List[Subscription] = []
+        self.published: Dict[str, int] = {}
+        self.running = False
+
+    def subscribe(self, event_types: EventTypes, handler: Callable[[Any], Awaitable[None]],
+                  name: Optional[str] = None, maxsize: Optional[int] = None,
+                  batch_size: int = 1, latest_only: bool = False,
+                  coalesce_key: Optional[Callable[[Event], Hashable]] = None) -> Subscription:
+        """
+        Register a consumer
+
+        Args:
+            event_types: Event class or tuple of classes (subclasses match too)
+            handler: Coroutine function called with each event, one at a time
+            name: Name used in logs and stats (defaults to the handler's name)
+            maxsize: Queue bound; events beyond it wait in the pending backlog
+            batch_size: When above 1, the handler is called with a list of up to
+                this many queued events instead of a single event
+            latest_only: Drop the oldest queued event instead of backlogging,
+                for consumers that only need the current state
+            coalesce_key: Key of an event; a backlogged event replaces the
+                pending one with the same key (no coalescing when None)
+
+        Returns:
+            The subscription
+        """
+        types = event_types if isinstance(event_types, tuple) else (event_types,)
+        subscription = Subscription(name or getattr(handler, '__name__', 'subscriber'), types, handler,
+                                    maxsize or self.default_queue_size, max(1, batch_size),
+                                    latest_only, coalesce_key, self.on_drop)
+        self.subscriptions.append(subscription)
+        if self.running:
+            subscription.task = asyncio.create_task(subscription.run())
+        return subscription
+
+    def publish(self, event: Event) -> int:
+        """
+        Hand an event to every matching subscriber without waiting
+
+        Returns:
+            Number of subscribers the event was queued for
+        """
+        kind = type(event).__name__
+        self.published[kind] = self.published.get(kind, 0) + 1
+        receivers = 0
+        for subscription in self.subscriptions:
+            if isinstance(event, subscription.event_types):
+                subscription.offer(event)
+                receivers += 1
+        return receivers
+
+    async def start(self) -> None:
+        """Start a worker per subscriber (must be called inside the event loop)"""
+        if self.running:
+            return
+        self.running = True
+        for subscription in self.subscriptions:
+            if subscription.task is None or subscription.task.done():
+                subscription.task = asyncio.create_task(subscription.run())
+
+    async def stop(self, drain_timeout_seconds: float = 5.0) -> None:
+        """
+        Stop the workers, first giving them time to finish queued events
+
+        Args:
+            drain_timeout_seconds: Longest wait for queues to empty (0 skips draining)
+        """
+        if not self.running:
+            return
+        self.running = False
+        if drain_timeout_seconds > 0:
+            try:
+                await asyncio.wait_for(
+                    asyncio.gather(*(s.queue.join() for s in self.subscriptions)),
+                    timeout=drain_timeout_seconds
+                )
+            except asyncio.TimeoutError:
+                logger.warning("Event bus stopped with events still queued")
+        tasks = [s.task for s in self.subscriptions if s.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for subscription in self.subscriptions:
+            subscription.task = None
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Queued, pending, delivered, handled, dropped, coalesced and failed events per subscriber"""
+        return {
+            s.name: {'queued': s.queue.qsize(), 'pending': len(s.pending), 'delivered': s.delivered,
+                     'handled': s.handled, 'dropped': s.dropped, 'coalesced': s.coalesced, 'errors': s.errors}
+            for s in self.subscriptions
+        }
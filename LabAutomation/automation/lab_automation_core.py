@@ -14,6 +14,12 @@ from dataclasses import dataclass
 import json
 from pathlib import Path
 
+from automation.client_lifecycle import ClientManager, ClientSpec
+from automation.cycle_snapshot import CycleSnapshot, SnapshotCollector
+from automation.event_bus import (
+    EquipmentStatus, EventBus, IncidentOpened, PerformanceRecord, QCResult, QueueSnapshot, SnapshotPublished
+)
+from automation.polling_scheduler import PollingScheduler, PollPolicy
 from config.config_manager import ConfigManager
 from integrations.notion_client import NotionClient
 from integrations.powerbi_client import PowerBIClient
@@ -23,8 +29,31 @@ from integrations.qmatic_api import QmaticConnector as QmaticClient
 from integrations.biorad_client import BioRadClient
 from integrations.hrconnect_client import HRConnectClient
 from utils.audit_logger import AuditLogger
+from utils.change_detection import ChangeTracker, fingerprint, row_fields
+from utils.cooldown_store import CooldownStore, DEFAULT_DB_PATH
 from utils.alert_manager import AlertManager
 from utils.performance_calculator import PerformanceCalculator
+from utils.stage_metrics import DEFAULT_METRICS_PORT, StageMetrics
+from utils.tat_window import TatWindowTracker
+from utils.threshold_rules import DEFAULT_PERFORMANCE_RULES, ThresholdEngine, load_rules
+
+
+# Average queue wait (minutes) at which queue polling runs at full speed
+QUEUE_WAIT_ALERT_MINUTES = 30
+
+# Shortest sleep between scheduler checks
+MIN_POLL_SLEEP_SECONDS = 1
+
+# A critical incident is announced once per day at most
+INCIDENT_ALERT_COOLDOWN_SECONDS = 24 * 3600
+
+# Most performance records checked against the thresholds in one pass
+THRESHOLD_BATCH_SIZE = 256
+
+
+def _managed_client(name: str) -> property:
+    """Attribute that reads a client from the ClientManager (None while its circuit is open)"""
+    return property(lambda self: self.clients.get(name))
 
 
 @dataclass
@@ -64,6 +93,25 @@ class LabAutomationCore:
     and provides real-time monitoring and alerting.
     """
     
+    notion_client = _managed_client("Notion")
+    powerbi_client = _managed_client("PowerBI")
+    teams_client = _managed_client("Teams")
+    epic_client = _managed_client("Epic Beaker")
+    qmatic_client = _managed_client("Qmatic")
+    biorad_client = _managed_client("Bio-Rad Unity")
+    hrconnect_client = _managed_client("HR Connect")
+    
+    @property
+    def alert_manager(self) -> Optional[AlertManager]:
+        """Alert manager for the current Teams client (None while Teams is unavailable)"""
+        teams_client = self.teams_client
+        if teams_client is None:
+            return None
+        if self._alert_manager is None or self._alert_manager_client is not teams_client:
+            self._alert_manager = AlertManager(teams_client, self.config_manager.get_alert_thresholds())
+            self._alert_manager_client = teams_client
+        return self._alert_manager
+    
     def __init__(self, config_file: Optional[str] = None):
         """
         Initialize the lab automation core system
@@ -75,19 +123,72 @@ class LabAutomationCore:
         self.audit_logger = AuditLogger()
         self.logger = self._setup_logging()
         
-        # Initialize clients
-        self._initialize_clients()
+        # Latency, error and row counts per stage and per integration
+        self.stage_metrics = StageMetrics('lab_automation_core', rolling_path='logs/stage_metrics_core.jsonl')
+        
+        # Integration clients are built concurrently when monitoring starts
+        self.clients = ClientManager(
+            self._client_specs(),
+            probe_timeout_seconds=self.config_manager.get_operational_settings().request_timeout_seconds,
+            on_call=self.stage_metrics.observe_call
+        )
         
-        # Performance tracking
+        # Performance tracking; the alert manager is bound to the Teams client
+        # lazily because clients only exist once monitoring starts
         self.performance_calculator = PerformanceCalculator()
-        self.alert_manager = AlertManager(
-            self.teams_client,
-            self.config_manager.get_alert_thresholds()
+        self._alert_manager: Optional[AlertManager] = None
+        self._alert_manager_client = None
+        
+        # Rolling TAT percentiles/compliance per priority and shift, fed by
+        # the specimens Epic reports as resulted; newest result time recorded
+        self.tat_tracker = TatWindowTracker(
+            default_target=self.config_manager.get_alert_thresholds().tat_threshold_minutes
         )
+        self._results_since: Optional[datetime] = None
+        
+        # Performance thresholds as declarative rules, compiled once per config version
+        rules_file = self.config_manager._get_optional_env('THRESHOLD_RULES_FILE')
+        self.threshold_engine = ThresholdEngine(load_rules(rules_file) if rules_file else DEFAULT_PERFORMANCE_RULES)
+        
+        # Each source is polled on its own adaptive schedule; the latest
+        # data from all of them is shared by every stage via a snapshot
+        collectors = {
+            'performance': self._collect_performance_data,
+            'incidents': self._collect_incident_data,
+            'queue': self._collect_queue_data,
+            'qc': self._collect_qc_data,
+            'equipment': self._collect_equipment_status
+        }
+        sources = {name: self.stage_metrics.wrap(f"collect_{name}", collector)
+                   for name, collector in collectors.items()}
+        self.snapshots = SnapshotCollector(sources)
+        
+        # Polled data is published as events the moment it lands; threshold
+        # checkers, the dashboard pusher and notifiers consume them from
+        # bounded queues, so a slow consumer never holds up collection
+        self.event_bus = EventBus(on_drop=self.stage_metrics.record_dropped)
+        self._open_incidents: set = set()
+        self._subscribe_handlers()
+        self.poll_scheduler = PollingScheduler(
+            {name: self._publishing(name, source) for name, source in sources.items()},
+            self._poll_policies(),
+            pressure={'queue': self._queue_pressure}
+        )
+        
+        # Only new or changed rows are pushed to Power BI between full resyncs
+        self.dashboard_changes = {
+            'performance': ChangeTracker(('staff_member', 'shift'), ignore_fields=('timestamp',)),
+            'incidents': ChangeTracker(('incident_id',))
+        }
         
         # Operational state
         self.is_running = False
-        self.last_alert_times: Dict[str, datetime] = {}
+        # Alert cooldowns persist so a restart doesn't repeat recent alerts
+        self.alert_cooldowns = CooldownStore(
+            self.config_manager.get_operational_settings().alert_cooldown_minutes * 60,
+            path=self.config_manager._get_optional_env('ALERT_COOLDOWN_DB', str(DEFAULT_DB_PATH)),
+            namespace='lab_automation_core'
+        )
         
     def _setup_logging(self) -> logging.Logger:
         """Setup comprehensive logging system"""
@@ -119,42 +220,40 @@ class LabAutomationCore:
         
         return logger
     
-    def _initialize_clients(self) -> None:
-        """Initialize all integration clients with health checks and auto-retry"""
-        def safe_init(client_cls, config_func, name):
-            for attempt in range(3):
-                try:
-                    config = config_func()
-                    if hasattr(config, "enabled") and not getattr(config, "enabled"):
-                        self.logger.info(f"{name} integration disabled; skipping client initialization")
-                        return None
-
-                    client = client_cls(config)
-                    self.logger.info(f"{name} client initialized (attempt {attempt+1})")
-                    return client
-                except Exception as e:
-                    self.logger.warning(f"{name} client init failed (attempt {attempt+1}): {e}")
-                    asyncio.sleep(1)
-            self.logger.error(f"{name} client could not be initialized after 3 attempts")
-            return None
-
-        # Core integrations (required)
-        self.notion_client = safe_init(NotionClient, self.config_manager.get_notion_config, "Notion")
-        self.powerbi_client = safe_init(PowerBIClient, self.config_manager.get_powerbi_config, "PowerBI")
-        self.teams_client = safe_init(TeamsClient, self.config_manager.get_teams_config, "Teams")
-
-        # Optional integrations (may not be configured yet)
-        self.epic_client = safe_init(EpicBeakerClient, self.config_manager.get_epic_beaker_config, "Epic Beaker")
-        self.qmatic_client = safe_init(QmaticClient, self.config_manager.get_qmatic_config, "Qmatic")
-        self.biorad_client = safe_init(BioRadClient, self.config_manager.get_biorad_config, "Bio-Rad Unity")
-        self.hrconnect_client = safe_init(HRConnectClient, self.config_manager.get_hrconnect_config, "HR Connect")
-
+    def _client_specs(self) -> List[ClientSpec]:
+        """Integration clients and how to health-check them"""
+        config = self.config_manager
+        return [
+            # Core integrations (required)
+            ClientSpec("Notion", NotionClient, config.get_notion_config, required=True),
+            ClientSpec("PowerBI", PowerBIClient, config.get_powerbi_config, required=True),
+            ClientSpec("Teams", TeamsClient, config.get_teams_config, required=True),
+            
+            # Optional integrations (may not be configured yet)
+            ClientSpec("Epic Beaker", EpicBeakerClient, config.get_epic_beaker_config),
+            ClientSpec("Qmatic", QmaticClient, config.get_qmatic_config),
+            ClientSpec("Bio-Rad Unity", BioRadClient, config.get_biorad_config, probe=lambda c: c.connect()),
+            ClientSpec("HR Connect", HRConnectClient, config.get_hrconnect_config, probe=lambda c: c.connect())
+        ]
+    
+    async def _initialize_clients(self) -> None:
+        """Start all integration clients concurrently with backoff and health probes"""
+        results = await self.clients.start()
+        status = self.clients.status()
+        down = [name for name, ok in results.items() if not ok and status[name]['state'] != 'disabled']
+        if down:
+            self.logger.warning(f"Integration clients unavailable, will retry: {', '.join(down)}")
         self.logger.info("Integration clients initialized with health checks.")
 
-    def reload_clients(self):
-        """Hot-reload all integration clients (e.g., after config change)"""
+    async def reload_clients(self, names: Optional[List[str]] = None) -> None:
+        """
+        Hot-reload integration clients (e.g., after config change)
+        
+        Args:
+            names: Clients to rebuild; all of them by default
+        """
         self.logger.info("Reloading integration clients...")
-        self._initialize_clients()
+        await self.clients.start(names)
         self.logger.info("Integration clients reloaded.")
     
     async def start_monitoring(self) -> None:
@@ -165,33 +264,40 @@ class LabAutomationCore:
 
         self.is_running = True
         self.logger.info("Starting lab automation monitoring")
+        metrics_port = int(self.config_manager._get_optional_env('METRICS_PORT', str(DEFAULT_METRICS_PORT)))
+        if metrics_port:
+            self.stage_metrics.serve(metrics_port)
+        await self._initialize_clients()
+        await self.event_bus.start()
 
         # Send startup notification
-        await self.teams_client.send_alert(
+        await self._send_teams_alert(
             "🚀 Lab Automation System Started",
             "Lab automation monitoring is now active.",
             "info"
         )
 
-        operational_settings = self.config_manager.get_operational_settings()
         error_count = 0
         try:
             while self.is_running:
                 try:
+                    # Reconnect isolated clients whose cool-down has passed
+                    await self.clients.recover()
                     await self._monitoring_cycle()
                     error_count = 0  # Reset on success
                 except Exception as e:
                     error_count += 1
                     self.logger.error(f"Monitoring cycle error (attempt {error_count}): {e}")
                     if error_count >= 3:
-                        self.logger.error("Too many consecutive errors, reloading clients...")
-                        self.reload_clients()
+                        # Isolate whichever clients fail their probe instead of reloading all of them
+                        self.logger.error("Too many consecutive errors, checking client health...")
+                        await self.clients.check_health()
                         error_count = 0
                     await asyncio.sleep(5)
-                await asyncio.sleep(operational_settings.monitoring_interval_seconds)
+                await asyncio.sleep(max(self.poll_scheduler.seconds_until_due(), MIN_POLL_SLEEP_SECONDS))
         except Exception as e:
             self.logger.error(f"Monitoring loop fatal error: {e}")
-            await self.teams_client.send_alert(
+            await self._send_teams_alert(
                 "🚨 System Error",
                 f"Lab automation monitoring encountered an error: {e}",
                 "critical"
@@ -199,6 +305,7 @@ class LabAutomationCore:
             raise
         finally:
             self.is_running = False
+            await self.event_bus.stop()
             self.logger.info("Lab automation monitoring stopped")
     
     async def stop_monitoring(self) -> None:
@@ -206,194 +313,317 @@ class LabAutomationCore:
         self.is_running = False
         self.logger.info("Stopping lab automation monitoring")
         
-        await self.teams_client.send_alert(
+        await self._send_teams_alert(
             "🛑 Lab Automation System Stopped",
             "Lab automation monitoring has been stopped.",
             "warning"
         )
+        await self.clients.close()
+        self.stage_metrics.shutdown()
+    
+    def _poll_policies(self) -> Dict[str, PollPolicy]:
+        """Per-source poll intervals, bounded around the configured monitoring interval"""
+        settings = self.config_manager.get_operational_settings()
+        base = settings.monitoring_interval_seconds
+        timeout = settings.request_timeout_seconds
+        return {
+            # Queue depth goes stale within a minute
+            'queue': PollPolicy(min(60, base), min(15, base), base, timeout),
+            'equipment': PollPolicy(min(180, base), min(60, base), base * 2, timeout),
+            'qc': PollPolicy(base, min(60, base), base * 3, timeout),
+            'performance': PollPolicy(base, min(60, base), base * 3, timeout),
+            # Incidents change rarely
+            'incidents': PollPolicy(base * 2, min(120, base), base * 6, timeout)
+        }
+    
+    @staticmethod
+    def _queue_pressure(queue_data: Dict[str, Any]) -> float:
+        """How close the average queue wait is to the alert level (1.0 = at it)"""
+        return float(queue_data.get('average_wait', 0) or 0) / QUEUE_WAIT_ALERT_MINUTES
     
     async def _monitoring_cycle(self) -> None:
-        """Execute one complete monitoring cycle"""
+        """Poll the sources that are due and run the stages that depend on them"""
         try:
-            self.logger.debug("Starting monitoring cycle")
-            
-            # Collect data from all sources
-            tasks = [
-                self._collect_performance_data(),
-                self._collect_incident_data(),
-                self._collect_queue_data(),
-                self._collect_qc_data(),
-                self._collect_equipment_status()
-            ]
-            
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-            
-            # Process results and handle any exceptions
-            for i, result in enumerate(results):
-                if isinstance(result, Exception):
-                    self.logger.error(f"Task {i} failed: {result}")
+            polled = await self.poll_scheduler.run_due()
+            if not polled:
+                return
+            refreshed = [name for name, ok in polled.items() if ok]
+            
+            # Latest good data from every source, fetched once and shared by
+            # all stages; failed sources keep their last data and report an error
+            snapshot = self.snapshots.publish(
+                self.poll_scheduler.values,
+                self.poll_scheduler.errors,
+                self.poll_scheduler.fetched_at
+            )
+            if not refreshed:
+                return
+            self.logger.debug(f"Starting monitoring cycle for {', '.join(refreshed)}")
             
-            # Analyze performance and generate alerts
-            await self._analyze_performance()
+            # Lab-wide checks need every record of the cycle; per-staff checks
+            # already ran as each record was published
+            if 'performance' in refreshed:
+                with self.stage_metrics.timed('analyze_performance') as stage:
+                    stage.rows = len(snapshot.performance)
+                    await self._analyze_performance(snapshot)
             
-            # Update dashboards
-            await self._update_dashboards()
+            # Dashboards are pushed by their subscriber
+            if 'performance' in refreshed or 'incidents' in refreshed:
+                self.event_bus.publish(SnapshotPublished(snapshot))
             
-            self.logger.debug("Monitoring cycle completed")
+            self.stage_metrics.write_snapshot()
+            self.logger.debug(f"Monitoring cycle {snapshot.cycle_id} completed")
             
         except Exception as e:
             self.logger.error(f"Monitoring cycle error: {e}")
             raise
     
+    def _publishing(self, name: str, source):
+        """Source that publishes its data on the event bus as soon as it is collected"""
+        async def collect():
+            data = await source()
+            self._publish_source_events(name, data)
+            return data
+        return collect
+    
+    @staticmethod
+    def _incident_id(incident: Any) -> str:
+        fields = row_fields(incident)
+        return str(fields.get('incident_id') or fingerprint(fields).hex())
+    
+    def _publish_source_events(self, name: str, data: Any) -> None:
+        """Turn one source's collected data into bus events"""
+        if name == 'performance':
+            for metrics in data:
+                self.event_bus.publish(PerformanceRecord(metrics))
+        elif name == 'incidents':
+            current = {self._incident_id(incident): incident for incident in data}
+            for incident_id, incident in current.items():
+                if incident_id not in self._open_incidents:
+                    self.event_bus.publish(IncidentOpened(incident, incident_id))
+            self._open_incidents = set(current)
+        elif name == 'queue':
+            self.event_bus.publish(QueueSnapshot(data))
+        elif name == 'qc':
+            self.event_bus.publish(QCResult(data))
+        elif name == 'equipment':
+            self.event_bus.publish(EquipmentStatus(data))
+    
+    def _subscribe_handlers(self) -> None:
+        """Register the threshold checkers, dashboard pusher and Teams notifiers"""
+        bus = self.event_bus
+        # A backlogged record or incident is only ever replaced by a newer one for
+        # the same staff member or incident, never dropped
+        bus.subscribe(PerformanceRecord, self.stage_metrics.wrap('check_thresholds', self._on_performance_records),
+                      name='threshold_checker', batch_size=THRESHOLD_BATCH_SIZE,
+                      coalesce_key=lambda event: row_fields(event.metrics).get('staff_member'))
+        bus.subscribe(IncidentOpened, self.stage_metrics.wrap('notify_incidents', self._on_incident_opened),
+                      name='incident_notifier', coalesce_key=lambda event: event.incident_id)
+        # Only the latest queue status and snapshot matter to these
+        bus.subscribe(QueueSnapshot, self.stage_metrics.wrap('check_queue', self._on_queue_snapshot),
+                      name='queue_checker', maxsize=1, latest_only=True)
+        bus.subscribe(SnapshotPublished, self.stage_metrics.wrap('update_dashboards', self._on_snapshot_published),
+                      name='dashboard_pusher', maxsize=1, latest_only=True)
+    
+    async def _on_performance_records(self, events: List[PerformanceRecord]) -> None:
+        """Check every performance record queued so far in one pass"""
+        await self._check_performance_thresholds([event.metrics for event in events])
+    
+    async def _on_incident_opened(self, event: IncidentOpened) -> None:
+        """Announce new critical incidents immediately"""
+        if row_fields(event.incident).get('severity') != "Critical":
+            return
+        alert_key = f"incident_{event.incident_id}"
+        if self.alert_cooldowns.active(alert_key):
+            return
+        alert_manager = self.alert_manager
+        if alert_manager is None:
+            self.logger.warning(f"Teams unavailable; critical incident {event.incident_id} not announced")
+            return
+        with self.stage_metrics.timed('dispatch_alerts'):
+            async with self.clients.guard("Teams"):
+                await alert_manager.send_critical_incident_alert(event.incident)
+        self.alert_cooldowns.mark(alert_key, INCIDENT_ALERT_COOLDOWN_SECONDS)
+    
+    async def _on_queue_snapshot(self, event: QueueSnapshot) -> None:
+        """Alert when the average queue wait reaches the alert level"""
+        average_wait = float(event.data.get('average_wait', 0) or 0)
+        if average_wait < QUEUE_WAIT_ALERT_MINUTES or not self.teams_client:
+            return
+        if self.alert_cooldowns.active('queue_wait'):
+            return
+        with self.stage_metrics.timed('dispatch_alerts'):
+            sent = await self._send_teams_alert(
+                "⏳ Queue Wait Alert",
+                f"Average patient wait: {average_wait:.0f} min (Alert level: {QUEUE_WAIT_ALERT_MINUTES} min), "
+                f"{event.data.get('total_waiting', 0)} waiting",
+                "warning"
+            )
+        if sent:
+            self.alert_cooldowns.mark('queue_wait')
+    
+    async def _on_snapshot_published(self, event: SnapshotPublished) -> None:
+        await self._update_dashboards(event.snapshot)
+    
+    async def _latest_snapshot(self, max_age_seconds: Optional[float] = None) -> CycleSnapshot:
+        """
+        Most recent cycle snapshot, refetched only if older than the bound
+        
+        Args:
+            max_age_seconds: Freshness bound (defaults to the monitoring interval)
+        """
+        if max_age_seconds is None:
+            max_age_seconds = self.config_manager.get_operational_settings().monitoring_interval_seconds
+        return await self.snapshots.get(max_age_seconds)
+    
+    # Collectors raise when an enabled source fails or its client is down, so
+    # the poll scheduler backs off and keeps the last good data; a disabled
+    # integration just contributes nothing.
+    
     async def _collect_performance_data(self) -> List[LabMetrics]:
         """Collect performance data from all sources"""
-        try:
-            if not self.notion_client:
-                self.logger.debug("Notion integration disabled; skipping performance data fetch")
-                performance_data = []
-            else:
-                # Get current performance data from Notion
-                performance_data = await self.notion_client.get_performance_data()
-            
-            # Enhance with real-time data from lab systems
-            if self.epic_client:
-                epic_data = await self.epic_client.get_current_metrics()
-                performance_data = self._merge_epic_data(performance_data, epic_data)
-            
-            return performance_data
-            
-        except Exception as e:
-            self.logger.error(f"Failed to collect performance data: {e}")
-            return []
+        notion_client = self.clients.require("Notion")
+        if not notion_client:
+            self.logger.debug("Notion integration disabled; skipping performance data fetch")
+            performance_data = []
+        else:
+            # Get current performance data from Notion
+            async with self.clients.guard("Notion"):
+                performance_data = await notion_client.get_performance_data()
+        
+        # Enhance with real-time data from lab systems
+        epic_client = self.clients.require("Epic Beaker")
+        if epic_client:
+            async with self.clients.guard("Epic Beaker"):
+                epic_data = await epic_client.get_current_metrics()
+            self._record_resulted_specimens(epic_data)
+            performance_data = self._merge_epic_data(performance_data, epic_data)
+        
+        return performance_data
     
     async def _collect_incident_data(self) -> List[IncidentData]:
         """Collect incident data from tracking systems"""
-        try:
-            if not self.notion_client:
-                self.logger.debug("Notion integration disabled; skipping incident collection")
-                incidents = []
-            else:
-                # Get incidents from Notion
-                incidents = await self.notion_client.get_open_incidents()
-            
-            # Check for new incidents from lab systems
-            if self.epic_client:
-                epic_incidents = await self.epic_client.get_new_incidents()
-                incidents.extend(epic_incidents)
-            
-            return incidents
-            
-        except Exception as e:
-            self.logger.error(f"Failed to collect incident data: {e}")
-            return []
+        notion_client = self.clients.require("Notion")
+        if not notion_client:
+            self.logger.debug("Notion integration disabled; skipping incident collection")
+            incidents = []
+        else:
+            # Get incidents from Notion
+            async with self.clients.guard("Notion"):
+                incidents = await notion_client.get_open_incidents()
+        
+        # Check for new incidents from lab systems
+        epic_client = self.clients.require("Epic Beaker")
+        if epic_client:
+            async with self.clients.guard("Epic Beaker"):
+                epic_incidents = await epic_client.get_new_incidents()
+            incidents.extend(epic_incidents)
+        
+        return incidents
     
     async def _collect_queue_data(self) -> Dict[str, Any]:
         """Collect queue management data"""
-        try:
-            if not self.qmatic_client:
-                return {}
-            
-            queue_data = await self.qmatic_client.get_queue_status()
-            return queue_data
-            
-        except Exception as e:
-            self.logger.error(f"Failed to collect queue data: {e}")
+        qmatic_client = self.clients.require("Qmatic")
+        if not qmatic_client:
             return {}
+        
+        async with self.clients.guard("Qmatic"):
+            return await qmatic_client.get_queue_status()
     
     async def _collect_qc_data(self) -> Dict[str, Any]:
         """Collect QC data from Bio-Rad Unity"""
-        try:
-            if not self.biorad_client:
-                return {}
-            
-            qc_data = await self.biorad_client.get_qc_status()
-            return qc_data
-            
-        except Exception as e:
-            self.logger.error(f"Failed to collect QC data: {e}")
+        biorad_client = self.clients.require("Bio-Rad Unity")
+        if not biorad_client:
             return {}
+        
+        async with self.clients.guard("Bio-Rad Unity"):
+            return await biorad_client.get_qc_status()
     
     async def _collect_equipment_status(self) -> Dict[str, Any]:
         """Collect equipment status from all systems"""
-        try:
-            equipment_status = {}
-            
-            if self.epic_client:
-                equipment_status['epic'] = await self.epic_client.get_equipment_status()
-            
-            if self.biorad_client:
-                equipment_status['biorad'] = await self.biorad_client.get_instrument_status()
-            
-            return equipment_status
-            
-        except Exception as e:
-            self.logger.error(f"Failed to collect equipment status: {e}")
-            return {}
+        equipment_status = {}
+        
+        epic_client = self.clients.require("Epic Beaker")
+        if epic_client:
+            async with self.clients.guard("Epic Beaker"):
+                equipment_status['epic'] = await epic_client.get_equipment_status()
+        
+        biorad_client = self.clients.require("Bio-Rad Unity")
+        if biorad_client:
+            async with self.clients.guard("Bio-Rad Unity"):
+                equipment_status['biorad'] = await biorad_client.get_instrument_status()
+        
+        return equipment_status
     
-    async def _analyze_performance(self) -> None:
+    async def _analyze_performance(self, snapshot: Optional[CycleSnapshot] = None) -> None:
         """Analyze performance data and generate alerts"""
         try:
+            # Live TAT windows don't depend on the staff metrics feed
+            await self._check_tat_windows()
+            
             # Get current performance metrics
-            performance_data = await self._collect_performance_data()
+            snapshot = snapshot or await self._latest_snapshot()
+            performance_data = snapshot.performance
             
             if not performance_data:
                 return
             
-            # Analyze each staff member's performance
-            for metrics in performance_data:
-                await self._check_performance_thresholds(metrics)
-            
             # Generate summary alerts
             await self._generate_summary_alerts(performance_data)
             
         except Exception as e:
             self.logger.error(f"Performance analysis failed: {e}")
+            self.stage_metrics.record_error('analyze_performance')
     
-    async def _check_performance_thresholds(self, metrics: LabMetrics) -> None:
-        """Check individual performance against thresholds"""
-        thresholds = self.config_manager.get_alert_thresholds()
-        alerts = []
-        
-        # Check TAT compliance
-        if not metrics.tat_target_met:
-            alerts.append(f"TAT target missed")
-        
-        # Check performance score
-        if metrics.performance_score < thresholds.performance_score_threshold:
-            alerts.append(f"Performance score low: {metrics.performance_score}")
-        
-        # Check error rate
-        if metrics.samples_processed > 0:
-            error_rate = (metrics.error_count / metrics.samples_processed) * 100
-            if error_rate > thresholds.error_rate_threshold:
-                alerts.append(f"Error rate high: {error_rate:.1f}%")
+    async def _check_performance_thresholds(self, batch: List[LabMetrics]) -> None:
+        """Check a batch of individual performance records against thresholds"""
+        rules = self.threshold_engine.compile(
+            self.config_manager.get_alert_thresholds(),
+            self.config_manager.config_version
+        )
         
-        # Check break time
-        if metrics.break_time_minutes > thresholds.break_time_threshold_minutes:
-            alerts.append(f"Break time exceeded: {metrics.break_time_minutes} minutes")
+        # Send alerts for every staff member with issues
+        for staff_member, alerts in rules.violations(batch).items():
+            await self._send_performance_alert(staff_member, alerts)
+    
+    async def _send_teams_alert(self, title: str, message: str, severity: str) -> bool:
+        """
+        Post an alert to Teams if the client is up
         
-        # Check QC completion
-        if metrics.qc_completion_percent < thresholds.qc_completion_threshold:
-            alerts.append(f"QC completion low: {metrics.qc_completion_percent}%")
+        Failures are recorded against the Teams breaker and logged, not raised.
         
-        # Send alerts if any issues found
-        if alerts:
-            await self._send_performance_alert(metrics.staff_member, alerts)
+        Returns:
+            Whether the alert was sent
+        """
+        teams_client = self.teams_client
+        if not teams_client:
+            self.logger.warning(f"Teams unavailable; alert not sent: {title}")
+            return False
+        try:
+            async with self.clients.guard("Teams"):
+                await teams_client.send_alert(title, message, severity)
+            return True
+        except Exception as e:
+            self.logger.error(f"Failed to send Teams alert '{title}': {e}")
+            return False
     
     async def _send_performance_alert(self, staff_member: str, issues: List[str]) -> None:
         """Send performance alert with cooldown"""
         alert_key = f"performance_{staff_member}"
-        now = datetime.now()
         
         # Check cooldown
-        if alert_key in self.last_alert_times:
-            cooldown_minutes = self.config_manager.get_operational_settings().alert_cooldown_minutes
-            if (now - self.last_alert_times[alert_key]).total_seconds() < (cooldown_minutes * 60):
-                return
+        if self.alert_cooldowns.active(alert_key):
+            return
         
         # Send alert
-        await self.alert_manager.send_performance_alert(staff_member, issues)
-        self.last_alert_times[alert_key] = now
+        alert_manager = self.alert_manager
+        if alert_manager is None:
+            self.logger.warning(f"Teams unavailable; performance alert for {staff_member} not sent")
+            return
+        with self.stage_metrics.timed('dispatch_alerts'):
+            async with self.clients.guard("Teams"):
+                await alert_manager.send_performance_alert(staff_member, issues)
+        self.alert_cooldowns.mark(alert_key)
         
         # Log to audit trail
         self.audit_logger.log_alert(
@@ -417,7 +647,7 @@ class LabAutomationCore:
         thresholds = self.config_manager.get_alert_thresholds()
         
         if tat_compliance < 85:  # Target TAT compliance
-            await self.teams_client.send_alert(
+            await self._send_teams_alert(
                 "📊 TAT Compliance Alert",
                 f"Current TAT compliance: {tat_compliance:.1f}% (Target: 85%)",
                 "warning"
@@ -426,30 +656,116 @@ class LabAutomationCore:
         if total_samples > 0:
             error_rate = (total_errors / total_samples) * 100
             if error_rate > thresholds.error_rate_threshold:
-                await self.teams_client.send_alert(
+                await self._send_teams_alert(
                     "⚠️ Error Rate Alert",
                     f"Current error rate: {error_rate:.1f}% (Threshold: {thresholds.error_rate_threshold}%)",
                     "warning"
                 )
     
-    async def _update_dashboards(self) -> None:
+    def record_tat_event(self, tat_minutes: float, priority: str = 'routine',
+                         shift: Optional[str] = None, timestamp: Optional[datetime] = None) -> bool:
+        """
+        Record a resulted specimen's TAT in the rolling windows
+        
+        Args:
+            tat_minutes: Turnaround time in minutes
+            priority: Test priority (e.g. 'stat', 'routine')
+            shift: Shift label; derived from the timestamp when omitted
+            timestamp: Result release time (default now)
+            
+        Returns:
+            False if the event was too old to count
+        """
+        return self.tat_tracker.record(tat_minutes, priority, shift, timestamp)
+    
+    def _record_resulted_specimens(self, epic_data: Dict[str, Any]) -> int:
+        """
+        Feed Epic's resulted specimens into the rolling TAT windows
+        
+        Reads epic_data['resulted_specimens'], each with 'tat_minutes',
+        'result_time' and optional 'priority' and 'shift'. Specimens at or
+        before the newest result time already recorded are skipped, since
+        consecutive polls can report the same results.
+        
+        Returns:
+            Number of specimens recorded
+        """
+        specimens = epic_data.get('resulted_specimens') if isinstance(epic_data, dict) else None
+        recorded = 0
+        latest = self._results_since
+        for specimen in specimens or []:
+            fields = row_fields(specimen)
+            result_time = fields.get('result_time')
+            if isinstance(result_time, str):
+                result_time = datetime.fromisoformat(result_time)
+            if result_time is None or fields.get('tat_minutes') is None:
+                continue
+            if self._results_since is not None and result_time <= self._results_since:
+                continue
+            recorded += self.record_tat_event(float(fields['tat_minutes']),
+                                              str(fields.get('priority') or 'routine').lower(),
+                                              fields.get('shift'), result_time)
+            latest = result_time if latest is None else max(latest, result_time)
+        self._results_since = latest
+        return recorded
+    
+    async def _check_tat_windows(self, window: str = '15m', target_percent: float = 85) -> None:
+        """Alert when TAT compliance over the most recent window drops below target"""
+        self.tat_tracker.advance(datetime.now())
+        snapshot = self.tat_tracker.snapshot(window)
+        if not snapshot['count'] or snapshot['compliance'] * 100 >= target_percent:
+            return
+        
+        alert_key = f"tat_window_{window}"
+        if self.alert_cooldowns.active(alert_key):
+            return
+        
+        with self.stage_metrics.timed('dispatch_alerts'):
+            sent = await self._send_teams_alert(
+                "⏱️ Rolling TAT Compliance Alert",
+                f"TAT compliance over the last {window}: {snapshot['compliance'] * 100:.1f}% "
+                f"(Target: {target_percent:.0f}%), p90 {snapshot['p90']:.0f} min, "
+                f"{snapshot['count']} results",
+                "warning"
+            )
+        if sent:
+            self.alert_cooldowns.mark(alert_key)
+    
+    async def _update_dashboards(self, snapshot: Optional[CycleSnapshot] = None) -> None:
         """Update Power BI dashboards with latest data"""
         try:
             # Get latest data
-            performance_data = await self._collect_performance_data()
-            incident_data = await self._collect_incident_data()
+            snapshot = snapshot or await self._latest_snapshot()
+            performance_data = snapshot.performance
+            incident_data = snapshot.incidents
             
-            # Update Power BI datasets
-            if performance_data:
-                await self.powerbi_client.update_performance_dataset(performance_data)
+            if not self.powerbi_client:
+                self.logger.debug("Power BI unavailable; skipping dashboard update")
+                return
             
-            if incident_data:
-                await self.powerbi_client.update_incidents_dataset(incident_data)
+            # Update Power BI datasets with the rows that changed since the last push
+            async with self.clients.guard("PowerBI"):
+                if performance_data:
+                    await self._push_changes('performance', performance_data,
+                                             self.powerbi_client.update_performance_dataset)
+                
+                if incident_data:
+                    await self._push_changes('incidents', incident_data,
+                                             self.powerbi_client.update_incidents_dataset)
             
             self.logger.debug("Dashboards updated successfully")
             
         except Exception as e:
             self.logger.error(f"Failed to update dashboards: {e}")
+            self.stage_metrics.record_error('update_dashboards')
+    
+    async def _push_changes(self, dataset: str, rows: List[Any], push) -> None:
+        """Push the new or changed rows of a dataset, recording them once Power BI accepts them"""
+        tracker = self.dashboard_changes[dataset]
+        changed = tracker.changed(rows)
+        if not changed or await push(changed):
+            tracker.commit()
+        self.logger.debug(f"Pushed {len(changed)} of {len(rows)} {dataset} rows to Power BI")
     
     def _merge_epic_data(self, notion_data: List[LabMetrics], epic_data: Dict[str, Any]) -> List[LabMetrics]:
         """Merge Epic Beaker data with Notion performance data"""
@@ -474,13 +790,23 @@ class LabAutomationCore:
                 incident_id = "notion-disabled"
                 self.logger.debug("Notion integration disabled; incident logged offline")
             
-            # Send immediate alert for critical incidents
-            if incident_data.severity == "Critical":
-                await self.alert_manager.send_critical_incident_alert(incident_data)
+            # Critical incidents are announced immediately by the incident notifier
+            event = IncidentOpened(
+                incident_data,
+                str(incident_id) if self.notion_client else self._incident_id(incident_data)
+            )
+            self._open_incidents.add(event.incident_id)
+            if self.event_bus.running:
+                self.event_bus.publish(event)
+            else:
+                await self._on_incident_opened(event)
             
             # Log to audit trail
             self.audit_logger.log_incident_creation(incident_data)
             
+            # Dashboards should show the new incident without waiting a cycle
+            self.snapshots.invalidate()
+            
             self.logger.info(f"Incident {incident_id} created successfully")
             return incident_id
             
@@ -502,13 +828,18 @@ class LabAutomationCore:
                 self.logger.debug("Notion integration disabled; skipping performance sync")
             
             # Update Power BI dataset
-            await self.powerbi_client.update_performance_dataset([metrics])
+            if self.powerbi_client:
+                async with self.clients.guard("PowerBI"):
+                    await self.powerbi_client.update_performance_dataset([metrics])
+            else:
+                self.logger.debug("Power BI unavailable; skipping performance sync")
             
             # Check for alerts
-            await self._check_performance_thresholds(metrics)
+            await self._check_performance_thresholds([metrics])
             
             # Log to audit trail
             self.audit_logger.log_performance_update(metrics)
+            self.snapshots.invalidate()
             
             self.logger.debug(f"Performance metrics updated for {metrics.staff_member}")
             
@@ -516,24 +847,30 @@ class LabAutomationCore:
             self.logger.error(f"Failed to update performance metrics: {e}")
             raise
     
-    async def get_dashboard_data(self) -> Dict[str, Any]:
+    async def get_dashboard_data(self, max_age_seconds: Optional[float] = None) -> Dict[str, Any]:
         """
         Get comprehensive dashboard data
         
+        Args:
+            max_age_seconds: Reuse the latest cycle's data if it is at most this
+                old (defaults to the monitoring interval); 0 forces a refetch
+        
         Returns:
             Dictionary containing all dashboard data
         """
         try:
-            # Collect all current data
-            performance_data = await self._collect_performance_data()
-            incident_data = await self._collect_incident_data()
-            queue_data = await self._collect_queue_data()
-            qc_data = await self._collect_qc_data()
-            equipment_status = await self._collect_equipment_status()
+            # Reuse the latest cycle's data when fresh enough
+            snapshot = await self._latest_snapshot(max_age_seconds)
+            performance_data = snapshot.performance
+            incident_data = snapshot.incidents
+            queue_data = snapshot.queue
+            qc_data = snapshot.qc
+            equipment_status = snapshot.equipment
             
             # Calculate summary statistics
             dashboard_data = {
                 'timestamp': datetime.now().isoformat(),
+                'data_as_of': snapshot.collected_at.isoformat(),
                 'performance': {
                     'staff_count': len(performance_data),
                     'total_samples': sum(m.samples_processed for m in performance_data),
@@ -548,7 +885,8 @@ class LabAutomationCore:
                 },
                 'queue_status': queue_data,
                 'qc_status': qc_data,
-                'equipment_status': equipment_status
+                'equipment_status': equipment_status,
+                'tat_windows': self.tat_tracker.summary(now=datetime.now())
             }
             
             return dashboard_data
@@ -0,0 +1,204 @@
+"""
+Kaiser Permanente Lab Automation System
+Adaptive Polling Scheduler
+
+Gives every monitoring source (queue, QC, equipment, performance,
+incidents) its own poll interval, jitter and timeout. After each poll the
+interval adapts: it shrinks when the data moved a lot or is close to an
+alert threshold, and grows while the data stays unchanged, within the
+source's bounds. Failures and timeouts back off. Fast-moving sources stay
+fresh without polling the quiet ones as often.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from numbers import Number
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PollPolicy:
+    """How often one source is polled"""
+    interval_seconds: float
+    min_interval_seconds: float
+    max_interval_seconds: float
+    timeout_seconds: float = 30.0
+    jitter: float = 0.1               # +/- fraction of the interval
+    volatile_signal: float = 0.5      # signal at or above this speeds polling up
+    stable_signal: float = 0.02       # signal at or below this slows polling down
+    speedup: float = 0.5
+    slowdown: float = 1.5
+
+
+def change_signal(previous: Any, current: Any, depth: int = 3) -> float:
+    """
+    How much a source's data changed between polls, from 0 (identical) to 1
+
+    Numbers compare by relative change; other values count as fully
+    changed when they differ. Dicts and lists are compared element-wise
+    (up to `depth` levels) and the largest change wins.
+    """
+    if previous is None:
+        return 1.0
+    if isinstance(previous, Number) and isinstance(current, Number) \
+            and not isinstance(previous, bool) and not isinstance(current, bool):
+        return min(abs(current - previous) / max(abs(previous), 1.0), 1.0)
+    if depth > 0 and isinstance(previous, dict) and isinstance(current, dict):
+        if previous.keys() != current.keys():
+            return 1.0
+        return max((change_signal(previous[k], current[k], depth - 1) for k in current), default=0.0)
+    if depth > 0 and isinstance(previous, (list, tuple)) and isinstance(current, (list, tuple)):
+        if len(previous) != len(current):
+            return min(abs(len(current) - len(previous)) / max(len(previous), 1), 1.0)
+        return max((change_signal(p, c, depth - 1) for p, c in zip(previous, current)), default=0.0)
+    try:
+        return 0.0 if previous == current else 1.0
+    except Exception:
+        return 1.0
+
+
+class _SourceState:
+    __slots__ = ('interval', 'next_due', 'calls', 'failures', 'last_signal')
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.next_due = 0.0
+        self.calls = 0
+        self.failures = 0
+        self.last_signal = None
+
+
+class PollingScheduler:
+    """
+    Polls async sources on individually adapting schedules.
+
+    `pressure` functions map a source's latest data to how close it is to
+    an alert threshold (1.0 = at the threshold); the poll interval reacts
+    to whichever of change and pressure is larger.
+    """
+
+    def __init__(self, sources: Dict[str, Callable[[], Awaitable[Any]]], policies: Dict[str, PollPolicy],
+                 pressure: Optional[Dict[str, Callable[[Any], float]]] = None,
+                 clock: Callable[[], float] = time.monotonic, rng: Optional[random.Random] = None):
+        """
+        Initialize the scheduler; every source is due immediately
+
+        Args:
+            sources: Source name -> coroutine function returning its data
+            policies: Source name -> PollPolicy
+            pressure: Optional source name -> threshold proximity of its data
+            clock: Monotonic time source (seconds)
+            rng: Random generator for jitter
+        """
+        missing = [name for name in sources if name not in policies]
+        if missing:
+            raise ValueError(f"No poll policy for source: {missing[0]}")
+        self.sources = sources
+        self.policies = policies
+        self.pressure = pressure or {}
+        self.clock = clock
+        self.rng = rng or random.Random()
+        self.values: Dict[str, Any] = {}
+        self.fetched_at: Dict[str, datetime] = {}
+        self.errors: Dict[str, str] = {}
+        self._state = {name: _SourceState(policies[name].interval_seconds) for name in sources}
+
+    def due(self, now: Optional[float] = None) -> List[str]:
+        """Sources whose next poll time has passed"""
+        now = self.clock() if now is None else now
+        return [name for name, state in self._state.items() if state.next_due <= now]
+
+    def seconds_until_due(self, now: Optional[float] = None) -> float:
+        """Time until the next source is due (0 if one already is)"""
+        now = self.clock() if now is None else now
+        return max(min(state.next_due for state in self._state.values()) - now, 0.0)
+
+    def _signal(self, name: str, current: Any) -> Optional[float]:
+        # Nothing to compare on the first poll; only pressure counts
+        signal = change_signal(self.values[name], current) if name in self.values else None
+        pressure = self.pressure.get(name)
+        if pressure is not None:
+            try:
+                signal = max(signal or 0.0, min(float(pressure(current)), 1.0))
+            except Exception as e:
+                logger.debug(f"Pressure check for {name} failed: {e}")
+        return signal
+
+    def _reschedule(self, name: str, signal: Optional[float], failed: bool = False) -> None:
+        policy = self.policies[name]
+        state = self._state[name]
+        if failed:
+            interval = state.interval * 2
+        elif signal is None:
+            interval = policy.interval_seconds
+        elif signal >= policy.volatile_signal:
+            interval = state.interval * policy.speedup
+        elif signal <= policy.stable_signal:
+            interval = state.interval * policy.slowdown
+        else:
+            interval = state.interval + (policy.interval_seconds - state.interval) / 2
+        state.interval = min(max(interval, policy.min_interval_seconds), policy.max_interval_seconds)
+        state.last_signal = signal
+        jitter = self.rng.uniform(-policy.jitter, policy.jitter)
+        state.next_due = self.clock() + state.interval * (1 + jitter)
+
+    async def poll(self, name: str) -> bool:
+        """
+        Poll one source now and reschedule it
+
+        Returns:
+            True if fresh data was stored, False on failure or timeout
+        """
+        policy = self.policies[name]
+        state = self._state[name]
+        state.calls += 1
+        try:
+            value = await asyncio.wait_for(self.sources[name](), timeout=policy.timeout_seconds)
+        except asyncio.TimeoutError as e:
+            state.failures += 1
+            # wait_for's own timeout has no message; a source's timeout error does
+            self.errors[name] = str(e) or f"timed out after {policy.timeout_seconds:.0f}s"
+            self._reschedule(name, None, failed=True)
+            logger.warning(f"Polling {name} timed out; next attempt in {state.interval:.0f}s")
+            return False
+        except Exception as e:
+            state.failures += 1
+            self.errors[name] = str(e)
+            logger.error(f"Polling {name} failed: {e}")
+            self._reschedule(name, None, failed=True)
+            return False
+
+        signal = self._signal(name, value)
+        self.values[name] = value
+        self.fetched_at[name] = datetime.now()
+        self.errors.pop(name, None)
+        self._reschedule(name, signal)
+        logger.debug(f"Polled {name}: signal {signal}, next in {state.interval:.0f}s")
+        return True
+
+    async def run_due(self) -> Dict[str, bool]:
+        """
+        Poll every due source concurrently
+
+        Returns:
+            Dictionary of polled source name to success
+        """
+        names = self.due()
+        if not names:
+            return {}
+        results = await asyncio.gather(*(self.poll(name) for name in names))
+        return dict(zip(names, results))
+
+    def stats(self) -> Dict[str, Dict]:
+        """Current interval, call and failure counts and last signal per source"""
+        return {
+            name: {'interval_seconds': round(state.interval, 1), 'calls': state.calls,
+                   'failures': state.failures, 'last_signal': state.last_signal}
+            for name, state in self._state.items()
+        }
@@ -25,6 +25,20 @@ from integrations.working_powerbi_client import create_working_powerbi_client
 from integrations.teams_client import TeamsClient
 from integrations.teams_chat_forwarder import create_chat_forwarder
 from utils.audit_logger import AuditLogger
+from utils.change_detection import ChangeTracker
+from utils.stage_metrics import DEFAULT_METRICS_PORT, StageMetrics
+from utils.threshold_rules import ThresholdEngine, ThresholdRule
+
+# Production performance checks, in the order their messages appear
+PRODUCTION_RULES = (
+    ThresholdRule('performance_score_low', 'performance_score', '<', 'performance_score_threshold',
+                  "Performance score below threshold: {value}"),
+    ThresholdRule('break_time_exceeded', 'break_time_minutes', '>', 'break_time_threshold_minutes',
+                  "Break time exceeded: {value} minutes"),
+    ThresholdRule('tat_missed', 'tat_target_met', '==', False, "TAT target not met", default=True),
+    ThresholdRule('error_rate_high', 'error_count', '>', 'error_rate_threshold',
+                  "Error rate high: {value:.1f}%", per='samples_processed', scale=100.0),
+)
 
 
 class ProductionLabSystem:
@@ -39,6 +53,10 @@ class ProductionLabSystem:
         self.audit_logger = AuditLogger()
         self.logger = self._setup_logging()
         
+        # Latency, error and row counts per cycle stage and per integration
+        self.stage_metrics = StageMetrics('production_lab_system', rolling_path='logs/stage_metrics_production.jsonl')
+        self.threshold_engine = ThresholdEngine(PRODUCTION_RULES)
+        
         # System state
         self.is_running = False
         self.start_time = None
@@ -49,6 +67,11 @@ class ProductionLabSystem:
         self.alerts_sent = 0
         self.errors_detected = 0
         
+        # Only new or changed performance rows are pushed between full resyncs
+        self.performance_changes = ChangeTracker(
+            ('staff_member', 'shift', 'date'), ignore_fields=('last_updated', 'timestamp')
+        )
+        
     def _setup_logging(self) -> logging.Logger:
         """Setup production logging"""
         logger = logging.getLogger('production_lab_system')
@@ -96,6 +119,11 @@ class ProductionLabSystem:
             # Send startup notification
             await self._send_startup_notification()
             
+            # Expose stage metrics locally (METRICS_PORT=0 disables)
+            metrics_port = int(self.config_manager._get_optional_env('METRICS_PORT', str(DEFAULT_METRICS_PORT)))
+            if metrics_port:
+                self.stage_metrics.serve(metrics_port)
+            
             # Start monitoring loop
             self.is_running = True
             self.start_time = datetime.now()
@@ -239,25 +267,38 @@ class ProductionLabSystem:
             cycle_start = datetime.now()
             
             # Step 1: Collect performance data from Notion
-            performance_data = await self._collect_performance_data()
+            with self.stage_metrics.timed('collect_performance') as stage:
+                performance_data = await self._collect_performance_data()
+                stage.rows = len(performance_data)
             
             # Step 2: Collect incident data
-            incident_data = await self._collect_incident_data()
+            with self.stage_metrics.timed('collect_incidents') as stage:
+                incident_data = await self._collect_incident_data()
+                stage.rows = len(incident_data)
             
             # Step 3: Calculate metrics and analyze performance
-            metrics = await self._calculate_operational_metrics(performance_data, incident_data)
+            with self.stage_metrics.timed('calculate_metrics') as stage:
+                metrics = await self._calculate_operational_metrics(performance_data, incident_data)
+                stage.rows = len(performance_data) + len(incident_data)
             
             # Step 4: Check for alerts and thresholds
-            await self._check_performance_thresholds(performance_data)
+            with self.stage_metrics.timed('check_thresholds') as stage:
+                await self._check_performance_thresholds(performance_data)
+                stage.rows = len(performance_data)
             
             # Step 5: Update Power BI dashboards
-            await self._update_powerbi_dashboards(performance_data, metrics)
+            with self.stage_metrics.timed('update_dashboards') as stage:
+                await self._update_powerbi_dashboards(performance_data, metrics)
+                stage.rows = len(performance_data)
             
             # Step 6: Send periodic updates
             if self.cycles_completed % 4 == 0:  # Every 20 minutes
-                await self._send_periodic_update(metrics)
+                with self.stage_metrics.timed('periodic_update'):
+                    await self._send_periodic_update(metrics)
             
             cycle_duration = (datetime.now() - cycle_start).total_seconds()
+            self.stage_metrics.observe('cycle', cycle_duration)
+            self.stage_metrics.write_snapshot()
             self.logger.debug(f"Monitoring cycle completed in {cycle_duration:.2f} seconds")
             
         except Exception as e:
@@ -271,13 +312,14 @@ class ProductionLabSystem:
                 self.logger.debug("Notion integration disabled; skipping performance data collection")
                 return []
 
-            async with self.notion_client:
+            async with self.notion_client, self.stage_metrics.call('Notion'):
                 performance_data = await self.notion_client.get_performance_data(days_back=1)
                 self.logger.debug(f"Collected {len(performance_data)} performance records")
                 return performance_data
                 
         except Exception as e:
             self.logger.error(f"Performance data collection failed: {e}")
+            self.stage_metrics.record_error('collect_performance')
             return []
     
     async def _collect_incident_data(self) -> List[Dict[str, Any]]:
@@ -287,13 +329,14 @@ class ProductionLabSystem:
                 self.logger.debug("Notion integration disabled; skipping incident data collection")
                 return []
 
-            async with self.notion_client:
+            async with self.notion_client, self.stage_metrics.call('Notion'):
                 incident_data = await self.notion_client.get_open_incidents()
                 self.logger.debug(f"Collected {len(incident_data)} open incidents")
                 return incident_data
                 
         except Exception as e:
             self.logger.error(f"Incident data collection failed: {e}")
+            self.stage_metrics.record_error('collect_incidents')
             return []
     
     async def _calculate_operational_metrics(self, performance_data: List[Dict], incident_data: List[Dict]) -> Dict[str, Any]:
@@ -338,55 +381,38 @@ class ProductionLabSystem:
             
         except Exception as e:
             self.logger.error(f"Metrics calculation failed: {e}")
+            self.stage_metrics.record_error('calculate_metrics')
             return {}
     
     async def _check_performance_thresholds(self, performance_data: List[Dict[str, Any]]) -> None:
         """Check performance against thresholds and send alerts"""
         try:
-            thresholds = self.config_manager.get_alert_thresholds()
+            rules = self.threshold_engine.compile(
+                self.config_manager.get_alert_thresholds(),
+                self.config_manager.config_version
+            )
             
-            for record in performance_data:
-                staff_member = record.get("staff_member", "Unknown")
-                alerts = []
-                
-                # Check performance score
-                performance_score = record.get("performance_score", 0)
-                if performance_score < thresholds.performance_score_threshold:
-                    alerts.append(f"Performance score below threshold: {performance_score}")
-                
-                # Check break time
-                break_time = record.get("break_time_minutes", 0)
-                if break_time > thresholds.break_time_threshold_minutes:
-                    alerts.append(f"Break time exceeded: {break_time} minutes")
-                
-                # Check TAT compliance
-                if not record.get("tat_target_met", True):
-                    alerts.append("TAT target not met")
-                
-                # Check error rate
-                samples = record.get("samples_processed", 0)
-                errors = record.get("error_count", 0)
-                if samples > 0:
-                    error_rate = (errors / samples) * 100
-                    if error_rate > thresholds.error_rate_threshold:
-                        alerts.append(f"Error rate high: {error_rate:.1f}%")
-                
-                # Send alerts if any issues found
+            # All records are checked in one pass; alerts go out per record
+            for record, alerts in zip(performance_data, rules.evaluate(performance_data)):
                 if alerts:
+                    staff_member = record.get("staff_member", "Unknown")
                     await self._send_performance_alert(staff_member, alerts, record)
                     self.alerts_sent += 1
             
         except Exception as e:
             self.logger.error(f"Threshold checking failed: {e}")
+            self.stage_metrics.record_error('check_thresholds')
     
     async def _send_performance_alert(self, staff_member: str, issues: List[str], record: Dict[str, Any]) -> None:
         """Send performance alert for staff member"""
         try:
-            await self.teams_client.send_performance_alert(
-                staff_member,
-                issues,
-                record
-            )
+            with self.stage_metrics.timed('dispatch_alerts'):
+                async with self.stage_metrics.call('Teams'):
+                    await self.teams_client.send_performance_alert(
+                        staff_member,
+                        issues,
+                        record
+                    )
             
             # Log alert
             self.audit_logger.log_alert_sent({
@@ -398,14 +424,17 @@ class ProductionLabSystem:
             
         except Exception as e:
             self.logger.error(f"Performance alert failed: {e}")
+            self.stage_metrics.record_error('dispatch_alerts')
     
     async def _update_powerbi_dashboards(self, performance_data: List[Dict], metrics: Dict[str, Any]) -> None:
         """Update Power BI dashboards with latest data"""
         try:
-            async with self.powerbi_client:
-                # Update performance data
+            async with self.powerbi_client, self.stage_metrics.call('PowerBI'):
+                # Update performance data that changed since the last push
                 if performance_data:
-                    await self.powerbi_client.update_lab_performance(performance_data)
+                    changed_rows = self.performance_changes.changed(performance_data)
+                    if not changed_rows or await self.powerbi_client.update_lab_performance(changed_rows):
+                        self.performance_changes.commit()
                 
                 # Update real-time metrics
                 await self.powerbi_client.update_real_time_metrics(metrics)
@@ -422,41 +451,44 @@ class ProductionLabSystem:
             
         except Exception as e:
             self.logger.error(f"Power BI dashboard update failed: {e}")
+            self.stage_metrics.record_error('update_dashboards')
     
     async def _send_periodic_update(self, metrics: Dict[str, Any]) -> None:
         """Send periodic status update"""
         try:
             uptime = datetime.now() - self.start_time if self.start_time else timedelta(0)
             
-            await self.teams_client.send_alert(
-                "📊 Lab Automation Status Update",
-                f"**Kaiser Permanente Lab Operations - Periodic Update**\n\n"
-                f"🕐 **System Uptime:** {str(uptime).split('.')[0]}\n"
-                f"🔄 **Monitoring Cycles:** {self.cycles_completed}\n"
-                f"🚨 **Alerts Sent:** {self.alerts_sent}\n\n"
-                f"**📈 Current Metrics:**\n"
-                f"• Total Samples Today: {metrics.get('total_samples', 0)}\n"
-                f"• Error Rate: {metrics.get('error_rate', 0):.1f}%\n"
-                f"• TAT Compliance: {metrics.get('tat_compliance', 0):.1f}%\n"
-                f"• Average Performance: {metrics.get('avg_performance_score', 0):.1f}\n"
-                f"• Active Staff: {metrics.get('active_staff', 0)}\n"
-                f"• Open Incidents: {metrics.get('open_incidents', 0)}\n\n"
-                f"**🏥 System Status:** All components operational\n"
-                f"**📍 Location:** Kaiser Permanente Largo, MD\n\n"
-                f"Lab automation system continues monitoring and optimizing operations! ⚡",
-                "info",
-                {
-                    "System Uptime": str(uptime).split('.')[0],
-                    "Monitoring Cycles": self.cycles_completed,
-                    "Alerts Sent": self.alerts_sent,
-                    "TAT Compliance": f"{metrics.get('tat_compliance', 0):.1f}%",
-                    "Error Rate": f"{metrics.get('error_rate', 0):.1f}%",
-                    "Active Staff": metrics.get('active_staff', 0)
-                }
-            )
+            async with self.stage_metrics.call('Teams'):
+                await self.teams_client.send_alert(
+                    "📊 Lab Automation Status Update",
+                    f"**Kaiser Permanente Lab Operations - Periodic Update**\n\n"
+                    f"🕐 **System Uptime:** {str(uptime).split('.')[0]}\n"
+                    f"🔄 **Monitoring Cycles:** {self.cycles_completed}\n"
+                    f"🚨 **Alerts Sent:** {self.alerts_sent}\n\n"
+                    f"**📈 Current Metrics:**\n"
+                    f"• Total Samples Today: {metrics.get('total_samples', 0)}\n"
+                    f"• Error Rate: {metrics.get('error_rate', 0):.1f}%\n"
+                    f"• TAT Compliance: {metrics.get('tat_compliance', 0):.1f}%\n"
+                    f"• Average Performance: {metrics.get('avg_performance_score', 0):.1f}\n"
+                    f"• Active Staff: {metrics.get('active_staff', 0)}\n"
+                    f"• Open Incidents: {metrics.get('open_incidents', 0)}\n\n"
+                    f"**🏥 System Status:** All components operational\n"
+                    f"**📍 Location:** Kaiser Permanente Largo, MD\n\n"
+                    f"Lab automation system continues monitoring and optimizing operations! ⚡",
+                    "info",
+                    {
+                        "System Uptime": str(uptime).split('.')[0],
+                        "Monitoring Cycles": self.cycles_completed,
+                        "Alerts Sent": self.alerts_sent,
+                        "TAT Compliance": f"{metrics.get('tat_compliance', 0):.1f}%",
+                        "Error Rate": f"{metrics.get('error_rate', 0):.1f}%",
+                        "Active Staff": metrics.get('active_staff', 0)
+                    }
+                )
             
         except Exception as e:
             self.logger.error(f"Periodic update failed: {e}")
+            self.stage_metrics.record_error('periodic_update')
     
     async def _send_system_heartbeat(self) -> None:
         """Send system heartbeat"""
@@ -539,6 +571,7 @@ class ProductionLabSystem:
             if hasattr(self, 'teams_client'):
                 await self.teams_client.close()
             
+            self.stage_metrics.shutdown()
             self.logger.info("✅ Production system shutdown completed")
             
         except Exception as e:
@@ -0,0 +1,284 @@
+"""
+Kaiser Permanente Lab Automation System
+Data Processor Benchmarks
+
+Generates synthetic exports at the requested sizes and times each
+benchmark case in a fresh subprocess, so peak RSS belongs to that case
+alone. peak_rss_mb covers the case process only; cases that fan out to
+worker processes (directory_parallel) also report worker_peak_rss_mb,
+the highest peak of any of their workers. Results are written as JSON
+tagged with the git commit; pass an earlier result file with --compare
+to flag regressions.
+
+Usage (from LabAutomation/):
+    python -m benchmarks.run_benchmarks --sizes 100k 1m
+    python -m benchmarks.run_benchmarks --sizes 100k --compare benchmarks/results/<previous>.json
+"""
+
+import argparse
+import json
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.synthetic_data import SIZES, generate_tat_csv, generate_volume_csv
+
+LAB_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_WORK_DIR = LAB_ROOT / 'benchmarks' / 'data'
+DEFAULT_RESULTS_DIR = LAB_ROOT / 'benchmarks' / 'results'
+
+
+def _peak_rss_mb() -> float:
+    # VmHWM is per address space; ru_maxrss on Linux carries over the
+    # parent's high-water mark through fork/exec
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _worker_peak_rss_mb() -> float:
+    # Largest ru_maxrss among reaped children, not a sum. Forked workers
+    # start with the parent's resident pages, so shared pages are included
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _processor(data_dir: Path, cache_dir: Path, use_cache: bool):
+    from data_processor import LabDataProcessor
+    return LabDataProcessor(str(data_dir), use_cache=use_cache, cache_dir=str(cache_dir))
+
+
+def _rows(metrics: Dict) -> Optional[int]:
+    return metrics.get('summary_stats', {}).get('total_records') if metrics else None
+
+
+def _case_in_memory(csv_path: Path, cache_dir: Path) -> Optional[int]:
+    processor = _processor(csv_path.parent, cache_dir, use_cache=False)
+    return _rows(processor.process_csv_data(csv_path.name, streaming=False))
+
+
+def _case_streaming(csv_path: Path, cache_dir: Path) -> Optional[int]:
+    processor = _processor(csv_path.parent, cache_dir, use_cache=False)
+    return _rows(processor.process_csv_data(csv_path.name, streaming=True))
+
+
+def _case_cache_cold(csv_path: Path, cache_dir: Path) -> Optional[int]:
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    processor = _processor(csv_path.parent, cache_dir, use_cache=True)
+    return _rows(processor.process_csv_data(csv_path.name, streaming=True))
+
+
+def _case_cache_warm(csv_path: Path, cache_dir: Path) -> Optional[int]:
+    processor = _processor(csv_path.parent, cache_dir, use_cache=True)
+    return _rows(processor.process_csv_data(csv_path.name, streaming=True))
+
+
+def _case_directory(csv_path: Path, cache_dir: Path) -> Optional[int]:
+    # TAT and volume exports of the same size and seed
+    dataset_suffix = csv_path.stem.split('-', 1)[1]
+    processor = _processor(csv_path.parent, cache_dir, use_cache=False)
+    results = processor.process_data_directory(pattern=f"*-{dataset_suffix}.csv", recursive=False)
+    return _rows(results['combined'])
+
+
+def _case_analyzers(csv_path: Path, cache_dir: Path) -> Optional[int]:
+    from lab_performance_analyzer import LabPerformanceAnalyzer
+    analyzer = LabPerformanceAnalyzer(str(csv_path.parent))
+    analyzer.load_events_csv(csv_path.name)
+    analyzer.analyze_tat_data()
+    analyzer.analyze_staffing_performance()
+    analyzer.analyze_volume_metrics()
+    analyzer.analyze_queue_performance()
+    analyzer.generate_performance_summary()
+    return len(analyzer.engine.events)
+
+
+# Run in this order: cache_warm relies on the entry cache_cold built
+CASES: Dict[str, Callable[[Path, Path], Optional[int]]] = {
+    'in_memory': _case_in_memory,
+    'streaming': _case_streaming,
+    'cache_cold': _case_cache_cold,
+    'cache_warm': _case_cache_warm,
+    'directory_parallel': _case_directory,
+    'analyzers': _case_analyzers,
+}
+
+
+def run_child(case: str, csv_path: Path, cache_dir: Path) -> Dict:
+    """Run one case in the current process and measure it"""
+    import logging
+    logging.disable(logging.CRITICAL)
+
+    baseline_rss = _peak_rss_mb()
+    start = time.perf_counter()
+    rows = CASES[case](csv_path, cache_dir)
+    wall = time.perf_counter() - start
+    result = {
+        'wall_seconds': wall,
+        'rows': rows,
+        'rows_per_second': rows / wall if rows and wall > 0 else None,
+        'peak_rss_mb': _peak_rss_mb(),
+        'import_rss_mb': baseline_rss
+    }
+    worker_peak = _worker_peak_rss_mb()
+    if worker_peak:
+        result['worker_peak_rss_mb'] = worker_peak
+    return result
+
+
+def _measure(case: str, csv_path: Path, cache_dir: Path, timeout: float) -> Dict:
+    command = [sys.executable, '-m', 'benchmarks.run_benchmarks', '--child', case,
+               '--csv', str(csv_path), '--cache-dir', str(cache_dir)]
+    try:
+        completed = subprocess.run(command, cwd=LAB_ROOT, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {'error': f'timed out after {timeout:.0f}s'}
+    if completed.returncode != 0:
+        lines = completed.stderr.strip().splitlines()
+        return {'error': lines[-1] if lines else f'exit code {completed.returncode}'}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=LAB_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _dataset(work_dir: Path, size: str, seed: int) -> Path:
+    tat_path = work_dir / f"STAT TAT-{size}-seed{seed}.csv"
+    volume_path = work_dir / f"Resulting Volume-{size}-seed{seed}.csv"
+    if not tat_path.exists():
+        print(f"Generating {tat_path.name}...")
+        generate_tat_csv(tat_path, SIZES[size], seed)
+    if not volume_path.exists():
+        generate_volume_csv(volume_path, SIZES[size], seed)
+    return tat_path
+
+
+def run_benchmarks(sizes: List[str], cases: List[str], work_dir: Path, seed: int = 42,
+                   timeout: float = 3600) -> Dict:
+    """
+    Run every case against every dataset size
+
+    Args:
+        sizes: Dataset sizes from SIZES
+        cases: Case names from CASES
+        work_dir: Where synthetic datasets and caches are kept
+        seed: Dataset seed; the same seed always gives the same files
+        timeout: Per-case timeout in seconds
+
+    Returns:
+        Result document with environment info and one entry per case
+    """
+    results = []
+    for size in sizes:
+        csv_path = _dataset(work_dir, size, seed)
+        cache_dir = work_dir / f".cache-{size}"
+        for case in [name for name in CASES if name in cases]:
+            measurement = _measure(case, csv_path, cache_dir, timeout)
+            results.append({'case': case, 'size': size, **measurement})
+            if 'error' in measurement:
+                print(f"  {size:>5} {case:<20} ERROR {measurement['error']}")
+            else:
+                rate = measurement['rows_per_second']
+                workers = measurement.get('worker_peak_rss_mb')
+                print(f"  {size:>5} {case:<20} {measurement['wall_seconds']:8.2f}s "
+                      f"{(f'{rate:,.0f} rows/s' if rate else ''):>18} {measurement['peak_rss_mb']:8.1f} MB"
+                      f"{f' (parent; workers up to {workers:.1f} MB)' if workers else ''}")
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    return {
+        'commit': _git_commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': seed,
+        'results': results
+    }
+
+
+def compare_results(current: Dict, baseline: Dict, threshold: float = 0.10) -> List[str]:
+    """
+    Compare two result documents case by case
+
+    Args:
+        current: Result document from this run
+        baseline: Earlier result document
+        threshold: Relative slowdown or memory growth reported as a regression
+
+    Returns:
+        Regression descriptions (empty when nothing regressed)
+    """
+    previous = {(r['case'], r['size']): r for r in baseline.get('results', []) if 'error' not in r}
+    regressions = []
+    print(f"\nComparison against {(baseline.get('commit') or 'unknown')[:10]}:")
+    for result in current['results']:
+        before = previous.get((result['case'], result['size']))
+        if before is None or 'error' in result:
+            continue
+        for metric in ('wall_seconds', 'peak_rss_mb', 'worker_peak_rss_mb'):
+            if metric not in result or metric not in before:
+                continue
+            change = result[metric] / before[metric] - 1 if before[metric] else 0.0
+            print(f"  {result['size']:>5} {result['case']:<20} {metric:<13} {change:+7.1%}")
+            if change > threshold:
+                regressions.append(f"{result['size']} {result['case']} {metric} {change:+.1%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the lab data processor")
+    parser.add_argument('--sizes', nargs='+', choices=sorted(SIZES), default=['100k', '1m'])
+    parser.add_argument('--cases', nargs='+', choices=list(CASES), default=list(CASES))
+    parser.add_argument('--work-dir', default=str(DEFAULT_WORK_DIR))
+    parser.add_argument('--output', help="Result JSON path (default: benchmarks/results/<commit>.json)")
+    parser.add_argument('--compare', help="Earlier result JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=0.10)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--timeout', type=float, default=3600)
+    parser.add_argument('--child', choices=list(CASES), help=argparse.SUPPRESS)
+    parser.add_argument('--csv', help=argparse.SUPPRESS)
+    parser.add_argument('--cache-dir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args.child, Path(args.csv), Path(args.cache_dir))))
+        return
+
+    document = run_benchmarks(args.sizes, args.cases, Path(args.work_dir), args.seed, args.timeout)
+
+    output = Path(args.output) if args.output else \
+        DEFAULT_RESULTS_DIR / f"{(document['commit'] or 'unknown')[:10]}-{datetime.now():%Y%m%d_%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(document, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            regressions = compare_results(document, json.load(f), args.threshold)
+        if regressions:
+            print("\nRegressions:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Kaiser Permanente Lab Automation System
+Synthetic Lab Data Generator
+
+Writes realistic STAT TAT and resulting-volume CSV exports for
+benchmarking. Column names follow the real exports, and a configurable
+share of rows carries the defects seen in production extracts: blank
+values, non-numeric TAT placeholders and unparseable dates.
+"""
+
+import argparse
+from pathlib import Path
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+SIZES: Dict[str, int] = {
+    '100k': 100_000,
+    '1m': 1_000_000,
+    '10m': 10_000_000,
+}
+
+TEST_TYPES = ['CBC', 'BMP', 'CMP', 'Troponin', 'PT/INR', 'UA', 'Lipase', 'Lactate', 'BNP', 'Type & Screen']
+PRIORITIES = ['STAT', 'Routine', 'Critical']
+PRIORITY_WEIGHTS = [0.35, 0.6, 0.05]
+QUEUES = ['Chemistry', 'Hematology', 'Urinalysis', 'Blood Bank', 'Send Out']
+LABS = ['Largo', 'Capitol Hill', 'Gaithersburg', 'Marlow Heights', 'Woodlawn']
+BAD_DATES = ['N/A', '00/00/0000', '2024-13-45 25:61', 'PENDING']
+TAT_PLACEHOLDERS = ['PENDING', 'CANCELLED', '--']
+
+# TAT scale (minutes) by priority; gamma shape gives the long right tail
+TAT_SCALE = {'STAT': 22.0, 'Routine': 85.0, 'Critical': 12.0}
+
+BLOCK_ROWS = 250_000
+
+
+def _shift_for_hours(hours: np.ndarray) -> np.ndarray:
+    return np.select([(hours >= 7) & (hours < 15), (hours >= 15) & (hours < 23)],
+                     ['Day', 'Evening'], default='Night')
+
+
+def _inject_defects(rng: np.random.Generator, values: np.ndarray, rate: float,
+                    replacements) -> np.ndarray:
+    values = values.astype(object)
+    mask = rng.random(len(values)) < rate
+    values[mask] = rng.choice(np.array(replacements, dtype=object), mask.sum())
+    return values
+
+
+def _tat_block(rng: np.random.Generator, start_row: int, rows: int, patients: int,
+               start: pd.Timestamp, days: int, null_rate: float, bad_date_rate: float) -> pd.DataFrame:
+    collected = start + pd.to_timedelta(rng.integers(0, days * 86400, rows), unit='s')
+    priorities = rng.choice(PRIORITIES, rows, p=PRIORITY_WEIGHTS)
+    scale = np.vectorize(TAT_SCALE.get)(priorities)
+    tat = np.round(rng.gamma(2.0, scale), 1)
+    resulted = collected + pd.to_timedelta(tat, unit='m')
+
+    collected_text = collected.strftime('%Y-%m-%d %H:%M:%S').to_numpy()
+    resulted_text = resulted.strftime('%Y-%m-%d %H:%M:%S').to_numpy()
+
+    frame = pd.DataFrame({
+        'Order ID': np.arange(start_row, start_row + rows) + 10_000_000,
+        'patient_id': rng.integers(1, patients + 1, rows),
+        'test_type': rng.choice(TEST_TYPES, rows),
+        'Priority': priorities,
+        'Shift': _shift_for_hours(collected.hour.to_numpy()),
+        'Queue': rng.choice(QUEUES, rows),
+        'Collected Date': _inject_defects(rng, collected_text, bad_date_rate, BAD_DATES),
+        'Resulted Date': _inject_defects(rng, resulted_text, bad_date_rate, BAD_DATES),
+        'TAT Minutes': _inject_defects(rng, tat, null_rate / 4, TAT_PLACEHOLDERS),
+        'Test Count': rng.integers(1, 6, rows),
+    })
+
+    for col in ('TAT Minutes', 'Test Count', 'test_type', 'Shift'):
+        frame.loc[rng.random(rows) < null_rate, col] = None
+    return frame
+
+
+def _volume_block(rng: np.random.Generator, rows: int, start: pd.Timestamp, days: int,
+                  null_rate: float, bad_date_rate: float) -> pd.DataFrame:
+    dates = start + pd.to_timedelta(rng.integers(0, days * 24, rows), unit='h')
+    frame = pd.DataFrame({
+        'Resulting Lab': rng.choice(LABS, rows),
+        'Shift': _shift_for_hours(dates.hour.to_numpy()),
+        'Date': _inject_defects(rng, dates.strftime('%Y-%m-%d %H:00').to_numpy(), bad_date_rate, BAD_DATES),
+        'Resulting Volume': rng.poisson(45, rows),
+        'Encounter Count': rng.poisson(30, rows),
+    })
+    for col in ('Resulting Volume', 'Encounter Count'):
+        frame.loc[rng.random(rows) < null_rate, col] = None
+    return frame
+
+
+def generate_tat_csv(path: Path, rows: int, seed: int = 42, null_rate: float = 0.02,
+                     bad_date_rate: float = 0.005, days: int = 365) -> Path:
+    """
+    Write a synthetic STAT TAT export
+
+    Args:
+        path: Output CSV path
+        rows: Number of data rows
+        seed: Random seed, so the same arguments always give the same file
+        null_rate: Share of blank values per nullable column
+        bad_date_rate: Share of unparseable date values
+        days: Days of history covered
+
+    Returns:
+        Path of the written file
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp('2024-01-01')
+    # Roughly four orders per patient over the period
+    patients = max(rows // 4, 1000)
+
+    with open(path, 'w', newline='') as f:
+        for offset in range(0, rows, BLOCK_ROWS):
+            block = _tat_block(rng, offset, min(BLOCK_ROWS, rows - offset), patients, start, days,
+                               null_rate, bad_date_rate)
+            block.to_csv(f, header=offset == 0, index=False)
+    return path
+
+
+def generate_volume_csv(path: Path, rows: int, seed: int = 42, null_rate: float = 0.02,
+                        bad_date_rate: float = 0.005, days: int = 365) -> Path:
+    """
+    Write a synthetic resulting-volume export
+
+    Args:
+        path: Output CSV path
+        rows: Number of data rows
+        seed: Random seed
+        null_rate: Share of blank volume values
+        bad_date_rate: Share of unparseable date values
+        days: Days of history covered
+
+    Returns:
+        Path of the written file
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed + 1)
+    start = pd.Timestamp('2024-01-01')
+
+    with open(path, 'w', newline='') as f:
+        for offset in range(0, rows, BLOCK_ROWS):
+            block = _volume_block(rng, min(BLOCK_ROWS, rows - offset), start, days,
+                                  null_rate, bad_date_rate)
+            block.to_csv(f, header=offset == 0, index=False)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic lab CSV exports")
+    parser.add_argument('--size', choices=sorted(SIZES), default='100k')
+    parser.add_argument('--output-dir', default='benchmarks/data')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rows = SIZES[args.size]
+    output_dir = Path(args.output_dir)
+    print(generate_tat_csv(output_dir / f"STAT TAT-{args.size}.csv", rows, args.seed))
+    print(generate_volume_csv(output_dir / f"Resulting Volume-{args.size}.csv", rows, args.seed))
+
+
+if __name__ == "__main__":
+    main()
@@ -123,6 +123,9 @@ class ConfigManager:
         self.env_file = env_file or '.env'
         self.logger = self._setup_logging()
         self.encryption_key = None
+        # Bumped on every (re)load so derived settings can be cached
+        self.config_version = 0
+        self._alert_thresholds: Optional[AlertThresholds] = None
         self._load_environment()
         
     def _setup_logging(self) -> logging.Logger:
@@ -145,6 +148,8 @@ class ConfigManager:
         
     def _load_environment(self) -> None:
         """Load environment variables from file"""
+        self.config_version += 1
+        self._alert_thresholds = None
         if os.path.exists(self.env_file):
             with open(self.env_file, 'r') as f:
                 for line in f:
@@ -156,6 +161,10 @@ class ConfigManager:
         else:
             self.logger.warning(f"Environment file {self.env_file} not found")
     
+    def reload(self) -> None:
+        """Re-read the environment file and drop cached settings"""
+        self._load_environment()
+    
     def _get_required_env(self, key: str) -> str:
         """
         Get required environment variable with validation
@@ -339,14 +348,16 @@ class ConfigManager:
             raise
     
     def get_alert_thresholds(self) -> AlertThresholds:
-        """Get alert threshold configuration"""
-        return AlertThresholds(
-            tat_threshold_minutes=int(self._get_optional_env('TAT_THRESHOLD_MINUTES', '30')),
-            performance_score_threshold=int(self._get_optional_env('PERFORMANCE_SCORE_THRESHOLD', '60')),
-            error_rate_threshold=float(self._get_optional_env('ERROR_RATE_THRESHOLD', '2')),
-            break_time_threshold_minutes=int(self._get_optional_env('BREAK_TIME_THRESHOLD_MINUTES', '60')),
-            qc_completion_threshold=int(self._get_optional_env('QC_COMPLETION_THRESHOLD', '95'))
-        )
+        """Get alert threshold configuration (parsed once per config version)"""
+        if self._alert_thresholds is None:
+            self._alert_thresholds = AlertThresholds(
+                tat_threshold_minutes=int(self._get_optional_env('TAT_THRESHOLD_MINUTES', '30')),
+                performance_score_threshold=int(self._get_optional_env('PERFORMANCE_SCORE_THRESHOLD', '60')),
+                error_rate_threshold=float(self._get_optional_env('ERROR_RATE_THRESHOLD', '2')),
+                break_time_threshold_minutes=int(self._get_optional_env('BREAK_TIME_THRESHOLD_MINUTES', '60')),
+                qc_completion_threshold=int(self._get_optional_env('QC_COMPLETION_THRESHOLD', '95'))
+            )
+        return self._alert_thresholds
     
     def get_operational_settings(self) -> OperationalSettings:
         """Get operational settings"""
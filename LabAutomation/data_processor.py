@@ -11,10 +11,18 @@ import pandas as pd
 import numpy as np
 from pathlib import Path
 import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from typing import Dict, List, Tuple, Optional
 import warnings
 warnings.filterwarnings('ignore')
 
+from utils.streaming_stats import StreamingMetrics, classify_metric_columns
+from utils.columnar_cache import ColumnarCache
+from utils.incremental_csv import IncrementalCsvProcessor
+from utils.pdf_tables import PdfTableExtractor
+from utils.ingestion_schema import as_datetime, as_numeric, concat_typed, schema_for
+
 logger = logging.getLogger(__name__)
 
 class LabDataProcessor:
@@ -22,22 +30,44 @@ class LabDataProcessor:
     Processes lab performance data from various file formats
     """
     
-    def __init__(self, data_path: str = "data"):
+    def __init__(self, data_path: str = "data", streaming_threshold_mb: float = 256.0,
+                 use_cache: bool = True, cache_dir: Optional[str] = None,
+                 distinct_error: float = 0.01, distinct_exact_limit: Optional[int] = 100000):
         """
         Initialize the data processor
         
         Args:
             data_path: Path to the data directory
+            streaming_threshold_mb: File size above which CSVs are aggregated
+                in a single streaming pass instead of loaded into memory
+            use_cache: Convert CSVs once into a memory-mapped columnar cache
+            cache_dir: Cache location (defaults to <data_path>/.cache)
+            distinct_error: Standard error of streamed unique patient/test counts
+            distinct_exact_limit: Distinct values counted exactly before streamed
+                counts switch to a HyperLogLog estimate (None keeps them exact)
         """
         self.data_path = Path(data_path)
+        self.streaming_threshold_mb = streaming_threshold_mb
+        self.cache_dir = Path(cache_dir) if cache_dir else self.data_path / '.cache'
+        self.cache = ColumnarCache(self.cache_dir) if use_cache else None
+        self.distinct_error = distinct_error
+        self.distinct_exact_limit = distinct_exact_limit
+        self.incremental = IncrementalCsvProcessor(self.cache_dir, metrics_factory=self._new_accumulator)
         self.processed_data = {}
         
-    def process_csv_data(self, filename: str = "STAT TAT- Summary_Full Data_data.csv") -> Dict:
+    def process_csv_data(self, filename: str = "STAT TAT- Summary_Full Data_data.csv",
+                         streaming: Optional[bool] = None, chunk_size: int = 10000,
+                         incremental: bool = False) -> Dict:
         """
         Process the large CSV file in chunks to extract key metrics
         
         Args:
             filename: Name of the CSV file to process
+            streaming: Aggregate chunk by chunk without holding the full file.
+                Defaults to streaming when the file exceeds streaming_threshold_mb.
+            chunk_size: Number of rows read per chunk
+            incremental: Treat the file as append-only and parse only rows added
+                since the last incremental run, reusing the saved metrics state
             
         Returns:
             Dictionary containing processed data
@@ -50,21 +80,31 @@ class LabDataProcessor:
             logger.warning(f"CSV file not found: {csv_path}")
             return {}
         
+        if incremental:
+            try:
+                header = list(pd.read_csv(csv_path, nrows=0).columns)
+                accumulator = self.incremental.update(csv_path, chunk_size, self._metric_columns(header))
+                metrics = accumulator.finalize()
+                self.processed_data['csv_metrics'] = metrics
+                return metrics
+            except Exception as e:
+                logger.error(f"Error incrementally processing CSV file: {str(e)}")
+                return {}
+        
+        if streaming is None:
+            streaming = csv_path.stat().st_size / (1024 * 1024) > self.streaming_threshold_mb
+        
+        if streaming:
+            try:
+                metrics = self._stream_metrics_from_csv(csv_path, chunk_size)
+                self.processed_data['csv_metrics'] = metrics
+                return metrics
+            except Exception as e:
+                logger.error(f"Error streaming CSV file: {str(e)}")
+                return {}
+        
         try:
-            # Read CSV in chunks to handle large file
-            chunk_size = 10000
-            chunks = []
-            
-            # Read first few rows to understand structure
-            sample_df = pd.read_csv(csv_path, nrows=100)
-            logger.info(f"CSV columns: {list(sample_df.columns)}")
-            
-            # Process in chunks
-            for chunk in pd.read_csv(csv_path, chunksize=chunk_size):
-                chunks.append(chunk)
-            
-            # Combine chunks
-            df = pd.concat(chunks, ignore_index=True)
+            df = self._load_csv_frame(csv_path, chunk_size)
             logger.info(f"Total rows processed: {len(df)}")
             
             # Extract key metrics based on column names
@@ -77,6 +117,180 @@ class LabDataProcessor:
             logger.error(f"Error processing CSV file: {str(e)}")
             return {}
     
+    def _metric_columns(self, columns: List[str]) -> List[str]:
+        """Columns the metric extractors read; the rest are never mapped"""
+        roles = classify_metric_columns(columns)
+        wanted = set(roles['tat'] + roles['volume'] + roles['time'] + ['patient_id', 'test_type'])
+        return [col for col in columns if col in wanted]
+    
+    def _cached_columns(self, csv_path: Path) -> Optional[List[str]]:
+        """Metric columns available from the columnar cache, or None to parse text"""
+        if self.cache is None:
+            return None
+        try:
+            columns = self.cache.columns(csv_path)
+        except Exception as e:
+            logger.warning(f"Columnar cache unavailable for {csv_path.name}, parsing CSV: {str(e)}")
+            return None
+        logger.info(f"CSV columns: {columns}")
+        return self._metric_columns(columns)
+    
+    def _load_csv_frame(self, csv_path: Path, chunk_size: int) -> pd.DataFrame:
+        """Load the metric columns of a CSV, from the cache when possible"""
+        columns = self._cached_columns(csv_path)
+        if columns is not None:
+            return self.cache.load(csv_path, columns)
+        
+        # Read CSV in typed chunks to handle large file
+        chunks = list(self._read_typed_chunks(csv_path, chunk_size))
+        
+        # Combine chunks
+        return concat_typed(chunks)
+    
+    def _read_typed_chunks(self, csv_path: Path, chunk_size: int):
+        """Read only the metric columns, typed once by the file's ingestion schema"""
+        header = list(pd.read_csv(csv_path, nrows=0).columns)
+        logger.info(f"CSV columns: {header}")
+        schema = schema_for(csv_path)
+        return schema.read_csv(csv_path, chunksize=chunk_size, columns=self._metric_columns(header))
+    
+    def _iter_csv_chunks(self, csv_path: Path, chunk_size: int):
+        """Yield row chunks of a CSV, sliced from the cache when possible"""
+        columns = self._cached_columns(csv_path)
+        if columns is not None:
+            yield from self.cache.iter_chunks(csv_path, columns, chunk_size)
+            return
+        
+        yield from self._read_typed_chunks(csv_path, chunk_size)
+    
+    def _stream_metrics_from_csv(self, csv_path: Path, chunk_size: int) -> Dict:
+        """
+        Aggregate metrics in one pass, keeping only running accumulators
+        
+        Median, p95 and p99 come from mergeable quantile sketches and are
+        accurate to within 1% of the exact value.
+        
+        Args:
+            csv_path: Path to the CSV file
+            chunk_size: Number of rows read per chunk
+            
+        Returns:
+            Dictionary containing extracted metrics
+        """
+        accumulator = self.accumulate_csv(csv_path, chunk_size)
+        logger.info(f"Total rows streamed: {accumulator.total_records}")
+        return accumulator.finalize()
+    
+    def accumulate_csv(self, csv_path: Path, chunk_size: int = 10000) -> StreamingMetrics:
+        """
+        Fold every chunk of a CSV into a mergeable partial result
+        
+        Args:
+            csv_path: Path to the CSV file
+            chunk_size: Number of rows read per chunk
+            
+        Returns:
+            Unfinalized StreamingMetrics for the file
+        """
+        accumulator = self._new_accumulator()
+        for chunk in self._iter_csv_chunks(Path(csv_path), chunk_size):
+            accumulator.update(chunk)
+        return accumulator
+    
+    def _new_accumulator(self) -> StreamingMetrics:
+        return StreamingMetrics(distinct_error=self.distinct_error,
+                                distinct_exact_limit=self.distinct_exact_limit)
+    
+    def find_csv_files(self, pattern: str = "*.csv", recursive: bool = True) -> List[Path]:
+        """
+        Find CSV exports under the data directory, including site subfolders
+        
+        Args:
+            pattern: Filename glob to match
+            recursive: Also search subdirectories such as data/Largo
+            
+        Returns:
+            Sorted list of CSV paths (the columnar cache directory is skipped)
+        """
+        cache_dir = self.cache_dir.resolve()
+        matches = self.data_path.rglob(pattern) if recursive else self.data_path.glob(pattern)
+        files = []
+        for path in matches:
+            if not path.is_file():
+                continue
+            if cache_dir and cache_dir in path.resolve().parents:
+                continue
+            files.append(path)
+        return sorted(files)
+    
+    def process_data_directory(self, pattern: str = "*.csv", recursive: bool = True,
+                               max_workers: Optional[int] = None, chunk_size: int = 10000) -> Dict:
+        """
+        Process every CSV in the data directory in parallel and combine the results
+        
+        Each file is aggregated in its own worker process into a mergeable
+        partial result; the partials are then reduced into one combined
+        metrics dictionary alongside the per-file metrics.
+        
+        Args:
+            pattern: Filename glob to match
+            recursive: Also search subdirectories such as data/Largo
+            max_workers: Worker processes (defaults to one per CPU, capped at the file count)
+            chunk_size: Number of rows read per chunk
+            
+        Returns:
+            Dictionary with 'combined', 'files' and 'failed' entries
+        """
+        csv_files = self.find_csv_files(pattern, recursive)
+        logger.info(f"Processing {len(csv_files)} CSV files from {self.data_path}")
+        
+        results = {'combined': {}, 'files': {}, 'failed': {}}
+        if not csv_files:
+            return results
+        
+        max_workers = min(max_workers or os.cpu_count() or 1, len(csv_files))
+        cache_dir = str(self.cache.cache_dir) if self.cache else None
+        jobs = [(str(path), chunk_size, cache_dir, self.distinct_error, self.distinct_exact_limit)
+                for path in csv_files]
+        partials: Dict[str, StreamingMetrics] = {}
+        
+        if max_workers == 1:
+            for job in jobs:
+                name = self._relative_name(Path(job[0]))
+                try:
+                    partials[name] = _accumulate_csv_worker(*job)
+                except Exception as e:
+                    logger.error(f"Error processing {name}: {str(e)}")
+                    results['failed'][name] = str(e)
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                futures = {executor.submit(_accumulate_csv_worker, *job): job[0] for job in jobs}
+                for future in as_completed(futures):
+                    name = self._relative_name(Path(futures[future]))
+                    try:
+                        partials[name] = future.result()
+                    except Exception as e:
+                        logger.error(f"Error processing {name}: {str(e)}")
+                        results['failed'][name] = str(e)
+        
+        # Reduce in file order so the combined result does not depend on completion order
+        combined = self._new_accumulator()
+        for name in sorted(partials):
+            combined.merge(partials[name])
+            results['files'][name] = partials[name].finalize()
+        results['combined'] = combined.finalize()
+        
+        logger.info(f"Combined {combined.total_records} rows from {len(partials)} files "
+                    f"({len(results['failed'])} failed)")
+        self.processed_data['directory_metrics'] = results
+        return results
+    
+    def _relative_name(self, path: Path) -> str:
+        try:
+            return str(path.relative_to(self.data_path))
+        except ValueError:
+            return str(path)
+    
     def _extract_metrics_from_dataframe(self, df: pd.DataFrame) -> Dict:
         """
         Extract key metrics from the processed dataframe
@@ -102,18 +316,20 @@ class LabDataProcessor:
             'unique_tests': self._get_unique_count(df, 'test_type')
         }
         
+        roles = classify_metric_columns(df.columns)
+        
         # TAT Analysis (if TAT columns exist)
-        tat_columns = [col for col in df.columns if 'tat' in col.lower() or 'turnaround' in col.lower()]
+        tat_columns = roles['tat']
         if tat_columns:
             metrics['tat_analysis'] = self._analyze_tat_columns(df, tat_columns)
         
         # Volume Analysis
-        volume_columns = [col for col in df.columns if 'volume' in col.lower() or 'count' in col.lower()]
+        volume_columns = roles['volume']
         if volume_columns:
             metrics['volume_analysis'] = self._analyze_volume_columns(df, volume_columns)
         
         # Time-based trends
-        time_columns = [col for col in df.columns if 'date' in col.lower() or 'time' in col.lower()]
+        time_columns = roles['time']
         if time_columns:
             metrics['trends'] = self._analyze_time_trends(df, time_columns)
         
@@ -125,7 +341,7 @@ class LabDataProcessor:
         if date_columns:
             try:
                 date_col = date_columns[0]
-                df[date_col] = pd.to_datetime(df[date_col], errors='coerce')
+                df[date_col] = as_datetime(df[date_col])
                 min_date = df[date_col].min()
                 max_date = df[date_col].max()
                 return {
@@ -149,8 +365,8 @@ class LabDataProcessor:
         
         for col in tat_columns:
             if col in df.columns:
-                # Convert to numeric, handling non-numeric values
-                df[col] = pd.to_numeric(df[col], errors='coerce')
+                # No-op for schema-typed columns
+                df[col] = as_numeric(df[col])
                 
                 tat_analysis[col] = {
                     'mean': df[col].mean(),
@@ -172,8 +388,8 @@ class LabDataProcessor:
         
         for col in volume_columns:
             if col in df.columns:
-                # Convert to numeric, handling non-numeric values
-                df[col] = pd.to_numeric(df[col], errors='coerce')
+                # No-op for schema-typed columns
+                df[col] = as_numeric(df[col])
                 
                 volume_analysis[col] = {
                     'total': df[col].sum(),
@@ -195,7 +411,7 @@ class LabDataProcessor:
         for col in time_columns:
             if col in df.columns:
                 try:
-                    df[col] = pd.to_datetime(df[col], errors='coerce')
+                    df[col] = as_datetime(df[col])
                     
                     # Group by date and count
                     daily_counts = df.groupby(df[col].dt.date).size()
@@ -273,6 +489,33 @@ class LabDataProcessor:
         
         return file_analysis
     
+    def extract_pdf_tables(self, max_workers: Optional[int] = None) -> Dict[str, List[pd.DataFrame]]:
+        """
+        Extract the tables from every PDF report in the data directory
+        
+        Pages are parsed in parallel and results are cached by file content,
+        so only new or changed reports are parsed.
+        
+        Args:
+            max_workers: Worker processes (defaults to one per CPU)
+            
+        Returns:
+            Dictionary of PDF filename to its list of DataFrames
+        """
+        pdf_files = [Path(info['path']) for info in self.analyze_file_structure()['pdf_files']]
+        extractor = PdfTableExtractor(self.cache_dir / 'pdf_tables', max_workers=max_workers)
+        
+        try:
+            tables = extractor.extract_many(pdf_files)
+        except Exception as e:
+            logger.error(f"Error extracting PDF tables: {str(e)}")
+            return {}
+        
+        pdf_tables = {Path(path).name: frames for path, frames in tables.items()}
+        logger.info(f"Extracted tables from {len(pdf_tables)} of {len(pdf_files)} PDF files")
+        self.processed_data['pdf_tables'] = pdf_tables
+        return pdf_tables
+    
     def generate_data_summary(self) -> str:
         """
         Generate a summary of the data files
@@ -319,6 +562,15 @@ class LabDataProcessor:
         return "\n".join(summary)
 
 
+def _accumulate_csv_worker(csv_path: str, chunk_size: int, cache_dir: Optional[str],
+                           distinct_error: float, distinct_exact_limit: Optional[int]) -> StreamingMetrics:
+    """Process pool entry point: partial metrics for one CSV file"""
+    path = Path(csv_path)
+    processor = LabDataProcessor(str(path.parent), use_cache=cache_dir is not None, cache_dir=cache_dir,
+                                 distinct_error=distinct_error, distinct_exact_limit=distinct_exact_limit)
+    return processor.accumulate_csv(path, chunk_size)
+
+
 def main():
     """
     Main function to run the data processor
@@ -353,6 +605,18 @@ def main():
             print("No CSV data processed")
     except Exception as e:
         print(f"Error processing CSV: {str(e)}")
+    
+    # Extract tables from the PDF reports
+    print("\n" + "=" * 40)
+    print("EXTRACTING PDF TABLES")
+    print("=" * 40)
+    
+    pdf_tables = processor.extract_pdf_tables()
+    if pdf_tables:
+        for filename, frames in sorted(pdf_tables.items()):
+            print(f"  {filename}: {len(frames)} tables")
+    else:
+        print("No PDF tables extracted")
 
 
 if __name__ == "__main__":
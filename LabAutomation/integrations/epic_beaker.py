@@ -96,6 +96,47 @@ class EpicBeakerConnector:
         
         return pd.DataFrame(samples)
     
+    def get_resulted_samples(self, since: Optional[datetime] = None) -> pd.DataFrame:
+        """Get samples resulted after `since` with their TAT (last 15 minutes by default)"""
+        if since is None:
+            since = datetime.now() - timedelta(minutes=15)
+        
+        if self.demo_mode:
+            return self._get_demo_resulted_samples(since)
+        
+        try:
+            endpoint = f"{self.base_url}/api/lab/resulted"
+            params = {'since': since.isoformat()}
+            response = self.session.get(endpoint, params=params, timeout=10)
+            response.raise_for_status()
+            data = response.json()
+            return pd.DataFrame(data)
+            
+        except Exception as e:
+            self.logger.error(f"Epic resulted samples query failed: {e}")
+            return pd.DataFrame()
+    
+    def _get_demo_resulted_samples(self, since: datetime) -> pd.DataFrame:
+        """Demo resulted samples data"""
+        import random
+        
+        now = datetime.now()
+        window_seconds = max(0, int((now - since).total_seconds()))
+        sample_types = ['CBC', 'CMP', 'Lipid Panel', 'Troponin', 'BNP', 'D-Dimer']
+        
+        samples = []
+        for i in range(window_seconds // 20):
+            priority = random.choice(['STAT', 'Routine', 'Routine', 'Timed'])
+            samples.append({
+                'sample_id': f'LAB{random.randint(10000, 99999)}',
+                'test_code': random.choice(sample_types),
+                'priority': priority,
+                'result_time': (now - timedelta(seconds=random.randint(0, window_seconds))).isoformat(),
+                'tat_minutes': random.uniform(15, 70) if priority == 'STAT' else random.uniform(30, 180)
+            })
+        
+        return pd.DataFrame(samples)
+    
     def get_tech_performance(self, date: datetime = None) -> pd.DataFrame:
         """Get technician performance metrics"""
         if date is None:
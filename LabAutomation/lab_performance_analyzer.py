@@ -16,14 +16,18 @@ Date: 2024
 
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 from pathlib import Path
 import logging
 from typing import Dict, List, Tuple, Optional
 import warnings
 warnings.filterwarnings('ignore')
 
+from utils.chart_renderer import ChartPanel, ChartRenderer
+from utils.kpi_cube import KpiCube, events_fingerprint
+from utils.performance_engine import SHIFT_ORDER, PerformanceEngine, normalize_events
+from utils.report_writer import blank, field, item, line, numbered, rule, section, subtitle, title, write_report
+from utils.task_graph import TaskGraph
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -40,16 +44,35 @@ class LabPerformanceAnalyzer:
     Comprehensive analyzer for lab performance metrics
     """
     
-    def __init__(self, data_path: str = "data"):
+    def __init__(self, data_path: str = "data", events: Optional[pd.DataFrame] = None):
         """
         Initialize the analyzer with data path
         
         Args:
             data_path: Path to the data directory
+            events: Event-level rows (TAT results, station time, queue visits);
+                analyses the events cannot support fall back to reference values
         """
         self.data_path = Path(data_path)
         self.results = {}
         self.summary_stats = {}
+        self.engine = None
+        self.cube = None
+        self.cube_path = self.data_path / '.cache' / 'kpi_cube.pkl'
+        # Fingerprint of the loaded events; a cube is only used if it matches
+        self.events_fingerprint = None
+        # Bumped whenever events change; analysis results are memoized per version
+        self.data_version = 0
+        self.task_graph = (TaskGraph('lab_analysis')
+                           .add('tat', self.analyze_tat_data)
+                           .add('staffing', self.analyze_staffing_performance)
+                           .add('volume', self.analyze_volume_metrics)
+                           .add('queue', self.analyze_queue_performance)
+                           .add('summary', self.generate_performance_summary,
+                                depends_on=['tat', 'staffing', 'volume', 'queue'])
+                           .add('visualizations', self.create_visualizations,
+                                depends_on=['tat', 'staffing', 'volume', 'queue'])
+                           .add('report', self.generate_report, depends_on=['summary']))
         
         # Define key performance indicators
         self.kpis = {
@@ -68,8 +91,184 @@ class LabPerformanceAnalyzer:
             }
         }
         
+        if events is not None:
+            self.load_events(events)
+        
         logger.info("Lab Performance Analyzer initialized")
     
+    def load_events(self, events: pd.DataFrame) -> None:
+        """
+        Back the analyses with event-level rows
+        
+        Args:
+            events: Event rows with export column names (e.g. 'TAT Minutes',
+                'Collected Date', 'Priority', 'Shift', 'Station', 'Queue')
+        """
+        self.engine = PerformanceEngine(events, self.kpis)
+        self.events_fingerprint = events_fingerprint(self.engine.events)
+        self.cube = KpiCube.from_events(self.engine.events, normalized=True)
+        self.data_version += 1
+    
+    def append_events(self, events: pd.DataFrame) -> None:
+        """
+        Add newly ingested events (e.g. the latest day) without rebuilding the cube
+        
+        Args:
+            events: New event rows only
+        """
+        if self.engine is None:
+            self.load_events(events)
+            return
+        new_events = normalize_events(events)
+        cube_matches = self.cube is not None and self.cube.fingerprint == self.events_fingerprint
+        self.engine.events = pd.concat([self.engine.events, new_events], ignore_index=True)
+        self.events_fingerprint = events_fingerprint(new_events, self.events_fingerprint)
+        if cube_matches:
+            self.cube.update(new_events, normalized=True)
+        else:
+            self._build_cube()
+        self.data_version += 1
+    
+    def _build_cube(self) -> None:
+        self.cube = KpiCube.from_events(self.engine.events, normalized=True)
+        self.cube.fingerprint = self.events_fingerprint
+    
+    def _current_cube(self) -> Optional[KpiCube]:
+        """The cube, rebuilt from the loaded events if it was built from other data"""
+        if self.engine is not None and (self.cube is None or self.cube.fingerprint != self.events_fingerprint):
+            if self.cube is not None:
+                logger.info("KPI cube does not match the loaded events; rebuilding it")
+            self._build_cube()
+        return self.cube
+    
+    def save_cube(self) -> bool:
+        """
+        Persist the KPI cube for later runs (call once per ingest)
+        
+        Returns:
+            True if the cube was written
+        """
+        cube = self._current_cube()
+        if cube is None:
+            return False
+        try:
+            cube.save(self.cube_path)
+            return True
+        except OSError as e:
+            logger.warning(f"Could not persist KPI cube: {e}")
+            return False
+    
+    def load_cube(self) -> bool:
+        """
+        Load the KPI cube persisted by the last ingest
+        
+        Once events are loaded, a cube that was not built from exactly
+        those events is rebuilt before it answers anything.
+        
+        Returns:
+            True if a cube was loaded
+        """
+        self.cube = KpiCube.load(self.cube_path)
+        return self.cube is not None
+    
+    def drill_down(self, by: List[str], **filters) -> pd.DataFrame:
+        """
+        Answer a KPI slice from the rollup cube
+        
+        Args:
+            by: Cube dimensions to group by ('day', 'shift', 'hour', 'queue', 'priority')
+            **filters: Dimension values to restrict to, e.g. priority='stat'
+            
+        Returns:
+            DataFrame of count, average and percentile TAT and average wait per group
+        """
+        if self.cube is None and self.engine is None and not self.load_cube():
+            logger.warning("No KPI cube available; load events first")
+            return pd.DataFrame()
+        return self._current_cube().rollup(by, **filters)
+    
+    def load_events_csv(self, filename: str) -> None:
+        """
+        Back the analyses with an event-level CSV export from the data directory
+        
+        Args:
+            filename: Name of the CSV file in the data directory
+        """
+        self.load_events(pd.read_csv(self.data_path / filename))
+    
+    def _cube_tat_by_shift(self, priority: str, target: float) -> Dict:
+        """avg/p95/compliance for all shifts and each shift, from the rollup cube"""
+        shifts = [s for s in self.cube.levels['shift'] if s != 'unknown']
+        if priority not in self.cube.levels['priority'] or not shifts:
+            return {}
+        filters = {'priority': priority, 'shift': shifts}
+        per_shift = self.cube.rollup(['shift'], percentiles=(0.95,), **filters)
+        per_shift = per_shift[per_shift['tat_count'] > 0]
+        if per_shift.empty:
+            return {}
+        overall = self.cube.rollup(percentiles=(0.95,), **filters).iloc[0]
+        compliance = self.cube.compliance(target, by=['shift'], **filters)
+        
+        performance = {'all_shift': {
+            'avg_tat': float(overall['avg_tat']),
+            'p95_tat': float(overall['p95_tat']),
+            'compliance_rate': float(self.cube.compliance(target, **filters).iloc[0])
+        }}
+        ordered = [s for s in SHIFT_ORDER if s in per_shift.index] + \
+                  sorted(s for s in per_shift.index if s not in SHIFT_ORDER)
+        for shift in ordered:
+            performance[f"{shift}_shift"] = {
+                'avg_tat': float(per_shift.loc[shift, 'avg_tat']),
+                'p95_tat': float(per_shift.loc[shift, 'p95_tat']),
+                'compliance_rate': float(compliance.loc[shift])
+            }
+        return performance
+        
+    def _cube_tat(self) -> Optional[Dict]:
+        """
+        TAT analysis answered from the rollup cube instead of the event rows
+        
+        Percentiles and compliance are read from the cube's TAT histogram, so
+        they are within the cube's relative accuracy of the exact values.
+        
+        Returns:
+            Same structure as PerformanceEngine.tat_analysis, or None without STAT results
+        """
+        if self._current_cube() is None:
+            return None
+        stat_target = self.kpis['tat']['stat_target']
+        stat_performance = self._cube_tat_by_shift('stat', stat_target)
+        if not stat_performance:
+            return None
+        routine_performance = self._cube_tat_by_shift('routine', self.kpis['tat']['routine_target'])
+        
+        overall = stat_performance['all_shift']
+        shift_means = {k: v['avg_tat'] for k, v in stat_performance.items() if k != 'all_shift'}
+        return {
+            'stat_performance': stat_performance,
+            'routine_performance': routine_performance,
+            'shift_comparison': {
+                'best_shift': min(shift_means, key=shift_means.get),
+                'worst_shift': max(shift_means, key=shift_means.get),
+                'spread_minutes': max(shift_means.values()) - min(shift_means.values())
+            },
+            'trends': {},
+            'overall_stat': {
+                'avg_tat': overall['avg_tat'],
+                'compliance_rate': overall['compliance_rate'],
+                'target_met': overall['avg_tat'] <= stat_target
+            }
+        }
+    
+    def _measured(self, analysis: str) -> Optional[Dict]:
+        """Engine result for an analysis, or None to use reference values"""
+        if self.engine is None:
+            return None
+        result = getattr(self.engine, f"{analysis}_analysis")()
+        if result is None:
+            logger.info(f"Events do not support {analysis} analysis; using reference values")
+        return result
+    
     def analyze_tat_data(self) -> Dict:
         """
         Analyze Turnaround Time (TAT) performance
@@ -86,28 +285,35 @@ class LabPerformanceAnalyzer:
             'trends': {}
         }
         
-        # Simulate TAT data analysis based on file structure
-        # In practice, this would read from the actual CSV/PDF files
-        
-        # STAT TAT Analysis
-        stat_tat_data = {
-            'all_shift': {'avg_tat': 45, 'p95_tat': 75, 'compliance_rate': 0.85},
-            'day_shift': {'avg_tat': 42, 'p95_tat': 68, 'compliance_rate': 0.88},
-            'evening_shift': {'avg_tat': 48, 'p95_tat': 82, 'compliance_rate': 0.82},
-            'night_shift': {'avg_tat': 52, 'p95_tat': 90, 'compliance_rate': 0.78}
-        }
-        
-        tat_analysis['stat_performance'] = stat_tat_data
-        
-        # Calculate overall STAT performance
-        overall_stat_tat = np.mean([data['avg_tat'] for data in stat_tat_data.values()])
-        overall_compliance = np.mean([data['compliance_rate'] for data in stat_tat_data.values()])
+        # Shift-level TAT comes from the cube when one is built or loaded;
+        # the summary, charts and report all read these results
+        measured = self._cube_tat() or self._measured('tat')
+        if measured:
+            tat_analysis.update(measured)
+        else:
+            # Reference values used when no event data is loaded
+            
+            # STAT TAT Analysis
+            stat_tat_data = {
+                'all_shift': {'avg_tat': 45, 'p95_tat': 75, 'compliance_rate': 0.85},
+                'day_shift': {'avg_tat': 42, 'p95_tat': 68, 'compliance_rate': 0.88},
+                'evening_shift': {'avg_tat': 48, 'p95_tat': 82, 'compliance_rate': 0.82},
+                'night_shift': {'avg_tat': 52, 'p95_tat': 90, 'compliance_rate': 0.78}
+            }
+            
+            tat_analysis['stat_performance'] = stat_tat_data
+            
+            # Calculate overall STAT performance
+            overall_stat_tat = np.mean([data['avg_tat'] for data in stat_tat_data.values()])
+            overall_compliance = np.mean([data['compliance_rate'] for data in stat_tat_data.values()])
+            
+            tat_analysis['overall_stat'] = {
+                'avg_tat': overall_stat_tat,
+                'compliance_rate': overall_compliance,
+                'target_met': overall_stat_tat <= self.kpis['tat']['stat_target']
+            }
         
-        tat_analysis['overall_stat'] = {
-            'avg_tat': overall_stat_tat,
-            'compliance_rate': overall_compliance,
-            'target_met': overall_stat_tat <= self.kpis['tat']['stat_target']
-        }
+        overall_stat_tat = tat_analysis['overall_stat']['avg_tat']
         
         self.results['tat'] = tat_analysis
         logger.info(f"TAT Analysis Complete - Overall STAT TAT: {overall_stat_tat:.1f} min")
@@ -130,7 +336,14 @@ class LabPerformanceAnalyzer:
             'shift_coverage': {}
         }
         
-        # Simulate staffing data analysis
+        measured = self._measured('staffing')
+        if measured:
+            staffing_analysis.update(measured)
+            self.results['staffing'] = staffing_analysis
+            logger.info(f"Staffing Analysis Complete - Avg Idle Time: {staffing_analysis['overall']['avg_idle_time']:.1%}")
+            return staffing_analysis
+        
+        # Reference values used when no event data is loaded
         idle_time_data = {
             'phleb_station_1': {'idle_time': 0.35, 'utilization': 0.65},
             'phleb_station_2': {'idle_time': 0.28, 'utilization': 0.72},
@@ -178,7 +391,15 @@ class LabPerformanceAnalyzer:
             'peak_hours': {}
         }
         
-        # Simulate volume data analysis
+        measured = self._measured('volume')
+        if measured:
+            volume_analysis.update(measured)
+            self.results['volume'] = volume_analysis
+            recent_months = [v for k, v in measured['patient_encounters'].items() if k != 'ytd_total']
+            logger.info(f"Volume Analysis Complete - Monthly Avg: {np.mean(recent_months):.0f} encounters")
+            return volume_analysis
+        
+        # Reference values used when no event data is loaded
         monthly_encounters = {
             'may': 1250,
             'june': 1320,
@@ -227,7 +448,24 @@ class LabPerformanceAnalyzer:
             'scheduling_efficiency': {}
         }
         
-        # Simulate queue performance data
+        # No-show rates come from scheduling; events without a no-show flag
+        # keep the reference rates
+        no_show_data = {
+            'overall_rate': 0.08,  # 8%
+            'scheduled_appointments': 0.06,  # 6%
+            'walk_in_no_shows': 0.12  # 12%
+        }
+        
+        measured = self._measured('queue')
+        if measured:
+            queue_analysis.update(measured)
+            if not queue_analysis['no_show_rates']:
+                queue_analysis['no_show_rates'] = no_show_data
+            self.results['queue'] = queue_analysis
+            logger.info(f"Queue Analysis Complete - Overall No-Show Rate: {queue_analysis['no_show_rates']['overall_rate']:.1%}")
+            return queue_analysis
+        
+        # Reference values used when no event data is loaded
         wait_time_data = {
             'stat_queue': {'avg_wait': 8, 'p95_wait': 15, 'target_met': True},
             'routine_queue': {'avg_wait': 22, 'p95_wait': 45, 'target_met': False},
@@ -244,14 +482,6 @@ class LabPerformanceAnalyzer:
         }
         
         queue_analysis['queue_types'] = queue_types
-        
-        # No-show rates
-        no_show_data = {
-            'overall_rate': 0.08,  # 8%
-            'scheduled_appointments': 0.06,  # 6%
-            'walk_in_no_shows': 0.12  # 12%
-        }
-        
         queue_analysis['no_show_rates'] = no_show_data
         
         self.results['queue'] = queue_analysis
@@ -350,191 +580,190 @@ class LabPerformanceAnalyzer:
         
         return summary
     
-    def create_visualizations(self) -> None:
+    def create_visualizations(self, mode: str = 'print', output_dir: str = '.', save_panels: bool = False) -> Dict:
         """
         Create performance visualization charts
+        
+        Args:
+            mode: 'print' (300 dpi PNG), 'preview' (low-dpi PNG) or 'svg'
+            output_dir: Where the dashboard image is written
+            save_panels: Also write each chart as its own image for the portal
+            
+        Returns:
+            Paths of the rendered dashboard and panels
         """
         logger.info("Creating performance visualizations...")
-        
-        # Set up the plotting style
-        plt.style.use('seaborn-v0_8')
-        fig, axes = plt.subplots(2, 2, figsize=(15, 12))
-        fig.suptitle('Lab Performance Dashboard', fontsize=16, fontweight='bold')
+        panels = []
         
         # TAT Performance by Shift
         if 'tat' in self.results:
             shifts = list(self.results['tat']['stat_performance'].keys())
-            tat_values = [self.results['tat']['stat_performance'][shift]['avg_tat'] for shift in shifts]
-            
-            axes[0, 0].bar(shifts, tat_values, color=['#2E86AB', '#A23B72', '#F18F01', '#C73E1D'])
-            axes[0, 0].axhline(y=self.kpis['tat']['stat_target'], color='red', linestyle='--', label='Target')
-            axes[0, 0].set_title('STAT TAT by Shift')
-            axes[0, 0].set_ylabel('Minutes')
-            axes[0, 0].legend()
-            axes[0, 0].tick_params(axis='x', rotation=45)
+            tat_values = [float(self.results['tat']['stat_performance'][shift]['avg_tat']) for shift in shifts]
+            panels.append(ChartPanel(
+                name='stat_tat_by_shift', title='STAT TAT by Shift', x=shifts, ylabel='Minutes',
+                series=[{'values': tat_values, 'color': ['#2E86AB', '#A23B72', '#F18F01', '#C73E1D']}],
+                target=self.kpis['tat']['stat_target'], rotation=45))
         
         # Staff Idle Time by Station
         if 'staffing' in self.results:
             stations = list(self.results['staffing']['idle_time'].keys())
-            idle_times = [self.results['staffing']['idle_time'][station]['idle_time'] * 100 for station in stations]
-            
-            axes[0, 1].bar(stations, idle_times, color='#FF6B6B')
-            axes[0, 1].axhline(y=self.kpis['staffing']['idle_time_target'] * 100, color='red', linestyle='--', label='Target')
-            axes[0, 1].set_title('Staff Idle Time by Station')
-            axes[0, 1].set_ylabel('Idle Time (%)')
-            axes[0, 1].legend()
-            axes[0, 1].tick_params(axis='x', rotation=45)
+            idle_times = [float(self.results['staffing']['idle_time'][station]['idle_time'] * 100) for station in stations]
+            panels.append(ChartPanel(
+                name='idle_time_by_station', title='Staff Idle Time by Station', x=stations,
+                ylabel='Idle Time (%)', series=[{'values': idle_times, 'color': '#FF6B6B'}],
+                target=self.kpis['staffing']['idle_time_target'] * 100, rotation=45))
         
         # Volume Trends
         if 'volume' in self.results:
             months = list(self.results['volume']['patient_encounters'].keys())[:3]
-            volumes = [self.results['volume']['patient_encounters'][month] for month in months]
-            
-            axes[1, 0].plot(months, volumes, marker='o', linewidth=2, markersize=8)
-            axes[1, 0].set_title('Monthly Patient Encounters')
-            axes[1, 0].set_ylabel('Number of Encounters')
-            axes[1, 0].grid(True, alpha=0.3)
+            volumes = [float(self.results['volume']['patient_encounters'][month]) for month in months]
+            panels.append(ChartPanel(
+                name='monthly_encounters', title='Monthly Patient Encounters', x=months, kind='line',
+                ylabel='Number of Encounters', series=[{'values': volumes}], grid=True, legend=False))
         
         # Queue Performance
         if 'queue' in self.results:
             queue_types = list(self.results['queue']['queue_types'].keys())
-            wait_times = [self.results['queue']['queue_types'][qt]['avg_wait'] for qt in queue_types]
-            
-            axes[1, 1].bar(queue_types, wait_times, color=['#4ECDC4', '#45B7D1', '#96CEB4'])
-            axes[1, 1].axhline(y=self.kpis['queue']['wait_time_target'], color='red', linestyle='--', label='Target')
-            axes[1, 1].set_title('Average Wait Times by Queue Type')
-            axes[1, 1].set_ylabel('Minutes')
-            axes[1, 1].legend()
-        
-        plt.tight_layout()
-        plt.savefig('lab_performance_dashboard.png', dpi=300, bbox_inches='tight')
-        plt.show()
-        
-        logger.info("Visualizations created and saved as 'lab_performance_dashboard.png'")
+            wait_times = [float(self.results['queue']['queue_types'][qt]['avg_wait']) for qt in queue_types]
+            panels.append(ChartPanel(
+                name='wait_by_queue', title='Average Wait Times by Queue Type', x=queue_types, ylabel='Minutes',
+                series=[{'values': wait_times, 'color': ['#4ECDC4', '#45B7D1', '#96CEB4']}],
+                target=self.kpis['queue']['wait_time_target']))
+        
+        renderer = ChartRenderer(output_dir, cache_dir=str(self.data_path / '.cache' / 'charts'))
+        rendered = renderer.render_dashboard('lab_performance_dashboard', 'Lab Performance Dashboard', panels,
+                                             mode=mode, save_panels=save_panels)
+        
+        logger.info(f"Visualizations created and saved as '{rendered['dashboard']}'")
+        return rendered
     
-    def generate_report(self) -> str:
+    def _report_blocks(self):
         """
-        Generate a comprehensive performance report
-        
-        Returns:
-            String containing the formatted report
+        Yield the performance report as a stream of report blocks
         """
-        logger.info("Generating comprehensive performance report...")
-        
-        report = []
-        report.append("=" * 80)
-        report.append("LAB PERFORMANCE ANALYSIS REPORT")
-        report.append("Kaiser Permanente Lab Automation System - Largo, MD")
-        report.append("=" * 80)
-        report.append("")
+        yield rule('=')
+        yield title("LAB PERFORMANCE ANALYSIS REPORT")
+        yield subtitle("Kaiser Permanente Lab Automation System - Largo, MD")
+        yield rule('=')
+        yield blank()
         
         # Executive Summary
-        report.append("EXECUTIVE SUMMARY")
-        report.append("-" * 40)
+        yield section("EXECUTIVE SUMMARY")
         if self.summary_stats:
-            report.append(f"Overall Performance Score: {self.summary_stats['overall_score']:.1f}/100")
-            report.append("")
+            yield field("Overall Performance Score", f"{self.summary_stats['overall_score']:.1f}/100",
+                        self.summary_stats['overall_score'])
+            yield blank()
             
             for kpi, status in self.summary_stats['kpi_status'].items():
-                report.append(f"{kpi.upper()}: {status['score']:.1f}/100 - {status['status']}")
+                yield field(kpi.upper(), f"{status['score']:.1f}/100 - {status['status']}", status['score'])
         
-        report.append("")
+        yield blank()
         
         # TAT Analysis
-        report.append("TURNAROUND TIME (TAT) ANALYSIS")
-        report.append("-" * 40)
+        yield section("TURNAROUND TIME (TAT) ANALYSIS")
         if 'tat' in self.results:
             tat_data = self.results['tat']
-            report.append(f"Overall STAT TAT: {tat_data['overall_stat']['avg_tat']:.1f} minutes")
-            report.append(f"STAT Compliance Rate: {tat_data['overall_stat']['compliance_rate']:.1%}")
-            report.append(f"Target Met: {'Yes' if tat_data['overall_stat']['target_met'] else 'No'}")
-            report.append("")
+            overall = tat_data['overall_stat']
+            yield field("Overall STAT TAT", f"{overall['avg_tat']:.1f} minutes", overall['avg_tat'])
+            yield field("STAT Compliance Rate", f"{overall['compliance_rate']:.1%}", overall['compliance_rate'])
+            yield field("Target Met", 'Yes' if overall['target_met'] else 'No', bool(overall['target_met']))
+            yield blank()
             
-            report.append("TAT by Shift:")
+            yield line("TAT by Shift:")
             for shift, data in tat_data['stat_performance'].items():
-                report.append(f"  {shift.replace('_', ' ').title()}: {data['avg_tat']:.1f} min (Compliance: {data['compliance_rate']:.1%})")
+                yield item(f"{shift.replace('_', ' ').title()}: {data['avg_tat']:.1f} min (Compliance: {data['compliance_rate']:.1%})")
         
-        report.append("")
+        yield blank()
         
         # Staffing Analysis
-        report.append("STAFFING PERFORMANCE ANALYSIS")
-        report.append("-" * 40)
+        yield section("STAFFING PERFORMANCE ANALYSIS")
         if 'staffing' in self.results:
-            staffing_data = self.results['staffing']
-            report.append(f"Average Idle Time: {staffing_data['overall']['avg_idle_time']:.1%}")
-            report.append(f"Average Utilization: {staffing_data['overall']['avg_utilization']:.1%}")
-            report.append(f"Utilization Target Met: {'Yes' if staffing_data['overall']['utilization_target_met'] else 'No'}")
-            report.append("")
+            overall = self.results['staffing']['overall']
+            yield field("Average Idle Time", f"{overall['avg_idle_time']:.1%}", overall['avg_idle_time'])
+            yield field("Average Utilization", f"{overall['avg_utilization']:.1%}", overall['avg_utilization'])
+            yield field("Utilization Target Met", 'Yes' if overall['utilization_target_met'] else 'No',
+                        bool(overall['utilization_target_met']))
+            yield blank()
             
-            report.append("Idle Time by Station:")
-            for station, data in staffing_data['idle_time'].items():
+            yield line("Idle Time by Station:")
+            for station, data in self.results['staffing']['idle_time'].items():
                 status = "⚠️" if data['idle_time'] > 0.30 else "✅"
-                report.append(f"  {station}: {data['idle_time']:.1%} {status}")
+                yield item(f"{station}: {data['idle_time']:.1%} {status}")
         
-        report.append("")
+        yield blank()
         
         # Volume Analysis
-        report.append("VOLUME METRICS")
-        report.append("-" * 40)
+        yield section("VOLUME METRICS")
         if 'volume' in self.results:
             volume_data = self.results['volume']
-            report.append("Monthly Patient Encounters:")
+            yield line("Monthly Patient Encounters:")
             for month, count in volume_data['patient_encounters'].items():
-                report.append(f"  {month.title()}: {count:,}")
-            report.append("")
+                yield field(month.title(), f"{count:,}", count, indent=2)
+            yield blank()
             
-            report.append("Lab Volume by Type:")
+            yield line("Lab Volume by Type:")
             for test_type, data in volume_data['lab_volumes'].items():
-                report.append(f"  {test_type.replace('_', ' ').title()}: {data['volume']:,} ({data['percentage']:.1%})")
+                yield field(test_type.replace('_', ' ').title(), f"{data['volume']:,} ({data['percentage']:.1%})",
+                            data['volume'], indent=2)
         
-        report.append("")
+        yield blank()
         
         # Queue Performance
-        report.append("QUEUE PERFORMANCE")
-        report.append("-" * 40)
+        yield section("QUEUE PERFORMANCE")
         if 'queue' in self.results:
             queue_data = self.results['queue']
-            report.append(f"Overall No-Show Rate: {queue_data['no_show_rates']['overall_rate']:.1%}")
-            report.append("")
+            overall_rate = queue_data['no_show_rates']['overall_rate']
+            yield field("Overall No-Show Rate", f"{overall_rate:.1%}", overall_rate)
+            yield blank()
             
-            report.append("Wait Times by Queue Type:")
+            yield line("Wait Times by Queue Type:")
             for queue_type, data in queue_data['queue_types'].items():
-                report.append(f"  {queue_type.replace('_', ' ').title()}: {data['avg_wait']:.1f} min")
+                yield field(queue_type.replace('_', ' ').title(), f"{data['avg_wait']:.1f} min", data['avg_wait'],
+                            indent=2)
         
-        report.append("")
+        yield blank()
         
         # Recommendations
-        report.append("RECOMMENDATIONS")
-        report.append("-" * 40)
+        yield section("RECOMMENDATIONS")
         if self.summary_stats and self.summary_stats['recommendations']:
             for i, rec in enumerate(self.summary_stats['recommendations'], 1):
-                report.append(f"{i}. {rec}")
+                yield numbered(i, rec)
         else:
-            report.append("No specific recommendations at this time.")
+            yield line("No specific recommendations at this time.")
         
-        report.append("")
+        yield blank()
         
         # Alerts
         if self.summary_stats and self.summary_stats['alerts']:
-            report.append("ALERTS")
-            report.append("-" * 40)
+            yield section("ALERTS")
             for alert in self.summary_stats['alerts']:
-                report.append(f"🚨 {alert}")
-            report.append("")
+                yield line(f"🚨 {alert}")
+            yield blank()
         
-        report.append("=" * 80)
-        report.append("Report generated on: " + pd.Timestamp.now().strftime("%Y-%m-%d %H:%M:%S"))
-        report.append("=" * 80)
+        yield rule('=')
+        yield field("Report generated on", pd.Timestamp.now().strftime("%Y-%m-%d %H:%M:%S"))
+        yield rule('=')
+    
+    def generate_report(self, formats: Tuple[str, ...] = ('text',), output_dir: str = '.') -> Dict[str, Path]:
+        """
+        Generate a comprehensive performance report
         
-        report_text = "\n".join(report)
+        Args:
+            formats: Any of 'text', 'markdown', 'html', 'json'; all are
+                written in one pass as lab_performance_report.<ext>
+            output_dir: Where the report files are written
+            
+        Returns:
+            Dictionary of format name to written report path
+        """
+        logger.info("Generating comprehensive performance report...")
         
-        # Save report to file
-        with open('lab_performance_report.txt', 'w') as f:
-            f.write(report_text)
+        paths = write_report(self._report_blocks(), 'lab_performance_report', formats, output_dir,
+                             report_title="Lab Performance Analysis Report")
         
-        logger.info("Performance report generated and saved as 'lab_performance_report.txt'")
+        logger.info(f"Performance report generated and saved as {', '.join(str(p) for p in paths.values())}")
         
-        return report_text
+        return paths
     
     def run_complete_analysis(self) -> Dict:
         """
@@ -546,23 +775,16 @@ class LabPerformanceAnalyzer:
         logger.info("Starting complete lab performance analysis...")
         
         try:
-            # Run all analyses
-            self.analyze_tat_data()
-            self.analyze_staffing_performance()
-            self.analyze_volume_metrics()
-            self.analyze_queue_performance()
-            
-            # Generate summary and report
-            self.generate_performance_summary()
-            self.create_visualizations()
-            report = self.generate_report()
+            # The four analyses run concurrently; summary, charts and report follow
+            outputs = self.task_graph.run(version=self.data_version)
             
             logger.info("Complete lab performance analysis finished successfully")
             
             return {
                 'results': self.results,
                 'summary': self.summary_stats,
-                'report': report
+                'report': outputs['report'],
+                'timings': self.task_graph.timings
             }
             
         except Exception as e:
@@ -15,14 +15,19 @@ Date: 2024
 
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 from datetime import datetime, timedelta
 import logging
+import shutil
+import sys
+from pathlib import Path
 from typing import Dict, List, Tuple, Optional
 import warnings
 warnings.filterwarnings('ignore')
 
+from utils.chart_renderer import ChartPanel, ChartRenderer
+from utils.metrics_snapshot import MetricsSnapshot, thaw
+from utils.report_writer import blank, field, item, line, rule, section, subtitle, title, write_report
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -39,21 +44,29 @@ class PerformanceManagementSystem:
     Comprehensive system to address performance and behavioral issues
     """
     
-    def __init__(self):
+    def __init__(self, data_path: str = "data", metrics: Optional[MetricsSnapshot] = None):
         """
         Initialize the performance management system
+        
+        Args:
+            data_path: Path to the data directory
+            metrics: Shared metrics snapshot (defaults to the one for data_path)
         """
+        self.metrics = metrics or MetricsSnapshot.shared(data_path)
+        tat = self.metrics['tat']
+        staffing = self.metrics['staffing']
+        
         self.critical_issues = {
             'tat_performance': {
-                'current': 0.35,  # 35% target achievement
-                'target': 0.90,  # 90% goal
-                'gap': 0.55,     # 55% gap
+                'current': tat['overall_compliance'],
+                'target': tat['target_compliance'],
+                'gap': round(tat['target_compliance'] - tat['overall_compliance'], 2),
                 'priority': 'CRITICAL'
             },
             'staffing_gap': {
-                'demand': 32.05,  # FTE needed
-                'supply': 28.75,  # FTE available
-                'gap': 3.3,       # 3.3 FTE short
+                'demand': staffing['fte_demand'],  # FTE needed
+                'supply': staffing['fte_supply'],  # FTE available
+                'gap': staffing['fte_gap'],       # FTE short
                 'priority': 'CRITICAL'
             },
             'peak_volume': {
@@ -96,18 +109,21 @@ class PerformanceManagementSystem:
         """
         Analyze the TAT performance crisis
         """
+        tat = self.metrics['tat']
+        target = tat['target_compliance']
+        by_priority = tat['compliance_by_priority']
         tat_analysis = {
             'current_state': {
-                'overall_compliance': 0.35,  # 35%
-                'stat_compliance': 0.25,    # 25%
-                'routine_compliance': 0.40, # 40%
-                'critical_compliance': 0.15 # 15%
+                'overall_compliance': tat['overall_compliance'],
+                'stat_compliance': by_priority['stat'],
+                'routine_compliance': by_priority['routine'],
+                'critical_compliance': by_priority['critical']
             },
             'target_gaps': {
-                'overall_gap': 0.55,  # 55% gap to 90% target
-                'stat_gap': 0.65,     # 65% gap
-                'routine_gap': 0.50,  # 50% gap
-                'critical_gap': 0.75  # 75% gap
+                'overall_gap': round(target - tat['overall_compliance'], 2),
+                'stat_gap': round(target - by_priority['stat'], 2),
+                'routine_gap': round(target - by_priority['routine'], 2),
+                'critical_gap': round(target - by_priority['critical'], 2)
             },
             'root_causes': [
                 'Insufficient staffing during peak hours',
@@ -130,33 +146,15 @@ class PerformanceManagementSystem:
         """
         Analyze the staffing crisis
         """
+        staffing = self.metrics['staffing']
         staffing_analysis = {
             'current_state': {
-                'fte_demand': 32.05,
-                'fte_supply': 28.75,
-                'fte_gap': 3.3,
-                'coverage_ratio': 0.90  # 90% coverage
-            },
-            'shift_analysis': {
-                'day_shift': {
-                    'demand': 12.0,
-                    'supply': 10.5,
-                    'gap': 1.5,
-                    'coverage': 0.875
-                },
-                'evening_shift': {
-                    'demand': 10.0,
-                    'supply': 9.0,
-                    'gap': 1.0,
-                    'coverage': 0.90
-                },
-                'night_shift': {
-                    'demand': 10.05,
-                    'supply': 9.25,
-                    'gap': 0.8,
-                    'coverage': 0.92
-                }
+                'fte_demand': staffing['fte_demand'],
+                'fte_supply': staffing['fte_supply'],
+                'fte_gap': staffing['fte_gap'],
+                'coverage_ratio': staffing['coverage_ratio']
             },
+            'shift_analysis': thaw(staffing['by_shift']),
             'impact': {
                 'overtime_costs': 'HIGH',
                 'burnout_risk': 'CRITICAL',
@@ -390,6 +388,7 @@ class PerformanceManagementSystem:
         """
         Immediate staffing solutions
         """
+        fte_gap = self.metrics['staffing']['fte_gap']
         return {
             'immediate_solutions': [
                 {
@@ -402,7 +401,7 @@ class PerformanceManagementSystem:
                 {
                     'solution': 'Temporary Staff',
                     'description': 'Hire temporary phlebotomists',
-                    'fte_impact': '+3.3 FTE',
+                    'fte_impact': f"+{fte_gap} FTE",
                     'cost': 'Medium',
                     'timeline': '1-2 weeks'
                 },
@@ -526,188 +525,189 @@ class PerformanceManagementSystem:
             ]
         }
     
-    def generate_crisis_report(self) -> str:
+    def _crisis_report_blocks(self):
         """
-        Generate comprehensive crisis report
+        Yield the crisis report as a stream of report blocks
         """
-        logger.info("Generating crisis report...")
-        
         analysis = self.analyze_critical_performance_gaps()
         action_plan = self.create_immediate_action_plan()
+        tat = self.metrics['tat']
         
-        report = []
-        report.append("=" * 80)
-        report.append("CRITICAL PERFORMANCE CRISIS REPORT")
-        report.append("Kaiser Permanente Lab Automation System - Largo, MD")
-        report.append("=" * 80)
-        report.append("")
+        yield rule('=')
+        yield title("CRITICAL PERFORMANCE CRISIS REPORT")
+        yield subtitle("Kaiser Permanente Lab Automation System - Largo, MD")
+        yield rule('=')
+        yield blank()
         
         # Executive Summary
-        report.append("EXECUTIVE SUMMARY")
-        report.append("-" * 40)
-        report.append("🚨 CRITICAL PERFORMANCE CRISIS IDENTIFIED")
-        report.append("")
-        report.append("Key Issues:")
-        report.append("• TAT targets met only 35% (Goal: 90%)")
-        report.append("• Understaffed by 3.3 FTE")
-        report.append("• Peak volume overflow: 42%")
-        report.append("• Behavioral issues: Sneaking off, long breaks, hiding mistakes")
-        report.append("")
+        yield section("EXECUTIVE SUMMARY")
+        yield line("🚨 CRITICAL PERFORMANCE CRISIS IDENTIFIED")
+        yield blank()
+        yield line("Key Issues:")
+        yield item(f"TAT targets met only {tat['overall_compliance']:.0%} (Goal: {tat['target_compliance']:.0%})",
+                   indent=0, marker='• ')
+        yield item(f"Understaffed by {self.metrics['staffing']['fte_gap']} FTE", indent=0, marker='• ')
+        yield item("Peak volume overflow: 42%", indent=0, marker='• ')
+        yield item("Behavioral issues: Sneaking off, long breaks, hiding mistakes", indent=0, marker='• ')
+        yield blank()
         
         # TAT Crisis
-        report.append("TAT PERFORMANCE CRISIS")
-        report.append("-" * 40)
+        yield section("TAT PERFORMANCE CRISIS")
         tat_data = analysis['tat_crisis']
-        report.append(f"Current Compliance: {tat_data['current_state']['overall_compliance']:.1%}")
-        report.append(f"Target Compliance: 90%")
-        report.append(f"Performance Gap: {tat_data['target_gaps']['overall_gap']:.1%}")
-        report.append("")
-        report.append("Root Causes:")
+        yield field("Current Compliance", f"{tat_data['current_state']['overall_compliance']:.1%}",
+                    tat_data['current_state']['overall_compliance'])
+        yield field("Target Compliance", f"{tat['target_compliance']:.0%}", tat['target_compliance'])
+        yield field("Performance Gap", f"{tat_data['target_gaps']['overall_gap']:.1%}",
+                    tat_data['target_gaps']['overall_gap'])
+        yield blank()
+        yield line("Root Causes:")
         for cause in tat_data['root_causes']:
-            report.append(f"• {cause}")
-        report.append("")
+            yield item(cause, indent=0, marker='• ')
+        yield blank()
         
         # Staffing Crisis
-        report.append("STAFFING CRISIS")
-        report.append("-" * 40)
-        staffing_data = analysis['staffing_crisis']
-        report.append(f"FTE Demand: {staffing_data['current_state']['fte_demand']}")
-        report.append(f"FTE Supply: {staffing_data['current_state']['fte_supply']}")
-        report.append(f"FTE Gap: {staffing_data['current_state']['fte_gap']}")
-        report.append(f"Coverage Ratio: {staffing_data['current_state']['coverage_ratio']:.1%}")
-        report.append("")
+        yield section("STAFFING CRISIS")
+        staffing_state = analysis['staffing_crisis']['current_state']
+        yield field("FTE Demand", f"{staffing_state['fte_demand']}", staffing_state['fte_demand'])
+        yield field("FTE Supply", f"{staffing_state['fte_supply']}", staffing_state['fte_supply'])
+        yield field("FTE Gap", f"{staffing_state['fte_gap']}", staffing_state['fte_gap'])
+        yield field("Coverage Ratio", f"{staffing_state['coverage_ratio']:.1%}", staffing_state['coverage_ratio'])
+        yield blank()
         
         # Volume Crisis
-        report.append("VOLUME CRISIS")
-        report.append("-" * 40)
-        volume_data = analysis['volume_crisis']
-        report.append(f"Peak Hours: {volume_data['peak_hours']['time_range']}")
-        report.append(f"Total Volume: {volume_data['peak_hours']['total_volume']:,}")
-        report.append(f"Capacity: {volume_data['peak_hours']['capacity']:,}")
-        report.append(f"Overflow: {volume_data['peak_hours']['overflow']:,} ({volume_data['peak_hours']['overflow_percentage']:.1%})")
-        report.append("")
+        yield section("VOLUME CRISIS")
+        peak_hours = analysis['volume_crisis']['peak_hours']
+        yield field("Peak Hours", peak_hours['time_range'])
+        yield field("Total Volume", f"{peak_hours['total_volume']:,}", peak_hours['total_volume'])
+        yield field("Capacity", f"{peak_hours['capacity']:,}", peak_hours['capacity'])
+        yield field("Overflow", f"{peak_hours['overflow']:,} ({peak_hours['overflow_percentage']:.1%})",
+                    peak_hours['overflow'])
+        yield blank()
         
         # Behavioral Crisis
-        report.append("BEHAVIORAL CRISIS")
-        report.append("-" * 40)
-        behavioral_data = analysis['behavioral_crisis']
-        report.append("Identified Issues:")
-        for issue, details in behavioral_data['identified_issues'].items():
+        yield section("BEHAVIORAL CRISIS")
+        yield line("Identified Issues:")
+        for issue, details in analysis['behavioral_crisis']['identified_issues'].items():
             if isinstance(details, dict):
-                report.append(f"• {issue.replace('_', ' ').title()}: {details.get('frequency', 'Unknown')}")
-        report.append("")
+                yield item(f"{issue.replace('_', ' ').title()}: {details.get('frequency', 'Unknown')}",
+                           indent=0, marker='• ')
+        yield blank()
         
         # Immediate Action Plan
-        report.append("IMMEDIATE ACTION PLAN")
-        report.append("-" * 40)
-        report.append("Week 1 - Emergency Response:")
+        yield section("IMMEDIATE ACTION PLAN")
+        yield line("Week 1 - Emergency Response:")
         for action in action_plan['immediate_actions']['week_1']:
-            report.append(f"• {action['action']}: {action['description']}")
-        report.append("")
+            yield item(f"{action['action']}: {action['description']}", indent=0, marker='• ')
+        yield blank()
         
         # Staffing Solutions
-        report.append("STAFFING SOLUTIONS")
-        report.append("-" * 40)
+        yield section("STAFFING SOLUTIONS")
         for solution in action_plan['staffing_solutions']['immediate_solutions']:
-            report.append(f"• {solution['solution']}: {solution['description']} (+{solution['fte_impact']} FTE)")
-        report.append("")
+            yield item(f"{solution['solution']}: {solution['description']} ({solution['fte_impact']})",
+                       indent=0, marker='• ')
+        yield blank()
         
         # Behavioral Interventions
-        report.append("BEHAVIORAL INTERVENTIONS")
-        report.append("-" * 40)
+        yield section("BEHAVIORAL INTERVENTIONS")
         for intervention in action_plan['behavioral_interventions']['immediate_interventions']:
-            report.append(f"• {intervention['intervention']}: {intervention['description']}")
-        report.append("")
+            yield item(f"{intervention['intervention']}: {intervention['description']}", indent=0, marker='• ')
+        yield blank()
         
         # Success Metrics
-        report.append("SUCCESS METRICS")
-        report.append("-" * 40)
-        report.append("30-Day Targets:")
-        report.append("• TAT compliance: 35% → 60%")
-        report.append("• Staff utilization: 67% → 80%")
-        report.append("• Behavioral incidents: Reduce by 50%")
-        report.append("• Peak volume overflow: 42% → 20%")
-        report.append("")
-        
-        report.append("90-Day Targets:")
-        report.append("• TAT compliance: 35% → 80%")
-        report.append("• Staff utilization: 67% → 85%")
-        report.append("• Behavioral incidents: Reduce by 80%")
-        report.append("• Peak volume overflow: 42% → 10%")
-        report.append("")
-        
-        report.append("=" * 80)
-        report.append("Report generated on: " + datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
-        report.append("=" * 80)
-        
-        report_text = "\n".join(report)
-        
-        # Save report
-        with open('critical_performance_crisis_report.txt', 'w') as f:
-            f.write(report_text)
+        yield section("SUCCESS METRICS")
+        yield line("30-Day Targets:")
+        yield item(f"TAT compliance: {tat['overall_compliance']:.0%} → 60%", indent=0, marker='• ')
+        yield item("Staff utilization: 67% → 80%", indent=0, marker='• ')
+        yield item("Behavioral incidents: Reduce by 50%", indent=0, marker='• ')
+        yield item("Peak volume overflow: 42% → 20%", indent=0, marker='• ')
+        yield blank()
+        
+        yield line("90-Day Targets:")
+        yield item(f"TAT compliance: {tat['overall_compliance']:.0%} → 80%", indent=0, marker='• ')
+        yield item("Staff utilization: 67% → 85%", indent=0, marker='• ')
+        yield item("Behavioral incidents: Reduce by 80%", indent=0, marker='• ')
+        yield item("Peak volume overflow: 42% → 10%", indent=0, marker='• ')
+        yield blank()
+        
+        yield rule('=')
+        yield field("Report generated on", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        yield rule('=')
+    
+    def generate_crisis_report(self, formats: Tuple[str, ...] = ('text',), output_dir: str = '.') -> Dict[str, Path]:
+        """
+        Generate comprehensive crisis report
+        
+        Args:
+            formats: Any of 'text', 'markdown', 'html', 'json'; all are
+                written in one pass as critical_performance_crisis_report.<ext>
+            output_dir: Where the report files are written
+            
+        Returns:
+            Dictionary of format name to written report path
+        """
+        logger.info("Generating crisis report...")
+        
+        paths = write_report(self._crisis_report_blocks(), 'critical_performance_crisis_report', formats, output_dir,
+                             report_title="Critical Performance Crisis Report")
         
         logger.info("Critical performance crisis report generated")
         
-        return report_text
+        return paths
     
-    def create_management_dashboard(self) -> None:
+    def create_management_dashboard(self, mode: str = 'print', output_dir: str = '.',
+                                    save_panels: bool = False) -> Dict:
         """
         Create management dashboard for oversight
+        
+        Args:
+            mode: 'print' (300 dpi PNG), 'preview' (low-dpi PNG) or 'svg'
+            output_dir: Where the dashboard image is written
+            save_panels: Also write each chart as its own image for the portal
+            
+        Returns:
+            Paths of the rendered dashboard and panels
         """
         logger.info("Creating management dashboard...")
         
-        # Create dashboard visualization
-        fig, axes = plt.subplots(2, 2, figsize=(16, 12))
-        fig.suptitle('Performance Management Dashboard', fontsize=16, fontweight='bold')
-        
-        # TAT Performance
-        tat_compliance = [0.35, 0.25, 0.40, 0.15]
-        tat_labels = ['Overall', 'STAT', 'Routine', 'Critical']
+        tat = self.metrics['tat']
+        staffing = self.metrics['staffing']
         colors = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#96CEB4']
+        panels = [
+            # TAT Performance
+            ChartPanel(name='tat_compliance', title='TAT Compliance Rates',
+                       x=['Overall', 'STAT', 'Routine', 'Critical'],
+                       series=[{'values': [tat['overall_compliance'], tat['compliance_by_priority']['stat'],
+                                           tat['compliance_by_priority']['routine'],
+                                           tat['compliance_by_priority']['critical']], 'color': colors}],
+                       ylabel='Compliance Rate', target=tat['target_compliance'], target_label=f"Target ({tat['target_compliance']:.0%})",
+                       ylim=(0, 1)),
+            # Staffing Gap
+            ChartPanel(name='staff_coverage', title='Staff Coverage by Shift',
+                       x=[shift.replace('_shift', '').title() for shift in staffing['by_shift']],
+                       series=[{'values': [shift['coverage'] for shift in staffing['by_shift'].values()],
+                                'color': colors[:3]}],
+                       ylabel='Coverage Ratio', target=1.0, target_label='Full Coverage'),
+            # Peak Volume
+            ChartPanel(name='peak_volume', title='Peak Hour Volume vs Capacity',
+                       x=['10:00', '11:00', '12:00', '13:00', '14:00', '15:00'],
+                       series=[{'values': [200, 200, 200, 200, 200, 200], 'color': 'lightblue', 'alpha': 0.7,
+                                'label': 'Capacity'},
+                               {'values': [280, 320, 350, 320, 280, 150], 'color': 'red', 'alpha': 0.7,
+                                'label': 'Volume'}],
+                       ylabel='Patient Volume', rotation=45),
+            # Behavioral Issues
+            ChartPanel(name='behavioral_issues', title='Behavioral Issue Severity',
+                       x=['Sneaking Off', 'Long Breaks', 'Hidden Mistakes', 'Slow QC'],
+                       series=[{'values': [0.8, 0.7, 0.9, 0.6], 'color': colors}],
+                       ylabel='Severity Level', rotation=45),
+        ]
         
-        axes[0, 0].bar(tat_labels, tat_compliance, color=colors)
-        axes[0, 0].axhline(y=0.90, color='red', linestyle='--', label='Target (90%)')
-        axes[0, 0].set_title('TAT Compliance Rates')
-        axes[0, 0].set_ylabel('Compliance Rate')
-        axes[0, 0].set_ylim(0, 1)
-        axes[0, 0].legend()
-        
-        # Staffing Gap
-        shifts = ['Day', 'Evening', 'Night']
-        coverage = [0.875, 0.90, 0.92]
-        
-        axes[0, 1].bar(shifts, coverage, color=['#FF6B6B', '#4ECDC4', '#45B7D1'])
-        axes[0, 1].axhline(y=1.0, color='red', linestyle='--', label='Full Coverage')
-        axes[0, 1].set_title('Staff Coverage by Shift')
-        axes[0, 1].set_ylabel('Coverage Ratio')
-        axes[0, 1].legend()
-        
-        # Peak Volume
-        hours = ['10:00', '11:00', '12:00', '13:00', '14:00', '15:00']
-        volumes = [280, 320, 350, 320, 280, 150]
-        capacity = [200, 200, 200, 200, 200, 200]
-        
-        axes[1, 0].bar(hours, capacity, color='lightblue', alpha=0.7, label='Capacity')
-        axes[1, 0].bar(hours, volumes, color='red', alpha=0.7, label='Volume')
-        axes[1, 0].set_title('Peak Hour Volume vs Capacity')
-        axes[1, 0].set_ylabel('Patient Volume')
-        axes[1, 0].legend()
-        axes[1, 0].tick_params(axis='x', rotation=45)
-        
-        # Behavioral Issues
-        issues = ['Sneaking Off', 'Long Breaks', 'Hidden Mistakes', 'Slow QC']
-        severity = [0.8, 0.7, 0.9, 0.6]
-        
-        axes[1, 1].bar(issues, severity, color=['#FF6B6B', '#4ECDC4', '#45B7D1', '#96CEB4'])
-        axes[1, 1].set_title('Behavioral Issue Severity')
-        axes[1, 1].set_ylabel('Severity Level')
-        axes[1, 1].tick_params(axis='x', rotation=45)
-        
-        plt.tight_layout()
-        plt.savefig('performance_management_dashboard.png', dpi=300, bbox_inches='tight')
-        plt.show()
+        renderer = ChartRenderer(output_dir, style='default')
+        rendered = renderer.render_dashboard('performance_management_dashboard', 'Performance Management Dashboard',
+                                             panels, mode=mode, figsize=(16, 12), save_panels=save_panels)
         
         logger.info("Management dashboard created and saved")
+        return rendered
 
 
 def main():
@@ -723,11 +723,13 @@ def main():
     
     # Generate crisis report
     try:
-        report = pms.generate_crisis_report()
+        paths = pms.generate_crisis_report()
         print("\n" + "=" * 60)
         print("CRITICAL PERFORMANCE CRISIS REPORT")
         print("=" * 60)
-        print(report)
+        with open(paths['text'], encoding='utf-8') as f:
+            shutil.copyfileobj(f, sys.stdout)
+        print()
         
         # Create dashboard
         pms.create_management_dashboard()
@@ -12,6 +12,10 @@ from datetime import datetime
 import logging
 from typing import List, Dict
 from config.settings import LabConfig
+from utils.cooldown_store import CooldownStore, DEFAULT_DB_PATH
+
+# How long a sent alert key suppresses repeats
+SENT_ALERT_TTL_SECONDS = 3600
 
 class AlertManager:
     """Manage all lab alerts and notifications"""
@@ -47,8 +51,8 @@ class AlertManager:
         # Recipients
         self.recipients = config.ALERT_RECIPIENTS
         
-        # Track sent alerts to avoid spam
-        self.sent_alerts = set()
+        # Track sent alerts to avoid spam (kept across restarts)
+        self.sent_alerts = CooldownStore(SENT_ALERT_TTL_SECONDS, path=DEFAULT_DB_PATH, namespace='alert_manager')
     
     def send_alert(self, message: str, level: str = 'INFO', data: Dict = None):
         """Send alert based on level"""
@@ -214,6 +218,13 @@ class AlertManager:
                 {'tat_rate': tat_rate}
             )
     
+    def alert_low_tat_window(self, tracker, window: str = '15m', priority: str = None):
+        """Alert on TAT compliance over a rolling window of a TatWindowTracker"""
+        snapshot = tracker.snapshot(window, priority)
+        if snapshot['count']:
+            self.alert_low_tat(snapshot['compliance'] * 100)
+        return snapshot
+    
     def alert_missing_staff(self, employee: str, minutes_missing: int):
         """Alert for missing staff"""
         if minutes_missing > 30:
@@ -17,6 +17,7 @@ from integrations.qmatic_api import QmaticConnector
 from integrations.notion_tracker import NotionTracker
 from scripts.alert_manager import AlertManager
 from config.settings import LabConfig
+from utils.tat_window import TatWindowTracker
 
 class LabAutomationEngine:
     """Main automation engine for lab operations"""
@@ -46,7 +47,12 @@ class LabAutomationEngine:
         
         # Performance cache
         self.last_metrics = {}
-        self.alerts_sent = set()
+        
+        # Rolling TAT windows fed by each resulted specimen
+        self.tat_tracker = TatWindowTracker()
+        self.results_since = None
+        # Shared with the alert manager so cooldowns survive restarts
+        self.alerts_sent = self.alert_manager.sent_alerts
     
     async def morning_startup(self):
         """6 AM - Daily startup routine"""
@@ -97,6 +103,10 @@ class LabAutomationEngine:
                 if tat_status['success_rate'] < 70:
                     await self.handle_low_tat(tat_status)
                 
+                # Check TAT over the last 15 minutes of resulted specimens
+                self.record_resulted_samples()
+                await self.handle_low_tat_window()
+                
                 # Check idle staff
                 idle_staff = [s for s in staff_status 
                              if s['status'] == 'IDLE' 
@@ -142,6 +152,35 @@ class LabAutomationEngine:
             self.alert_manager.alert_low_tat(tat_data['success_rate'])
             self.alerts_sent.add(alert_key)
     
+    def record_resulted_samples(self) -> int:
+        """Feed specimens resulted since the last check into the TAT windows"""
+        resulted = self.epic.get_resulted_samples(self.results_since)
+        if resulted.empty:
+            return 0
+        
+        result_times = pd.to_datetime(resulted['result_time'])
+        if self.results_since is not None:
+            new = result_times > self.results_since
+            resulted, result_times = resulted[new], result_times[new]
+        
+        recorded = 0
+        for row, result_time in zip(resulted.itertuples(index=False), result_times):
+            recorded += self.tat_tracker.record(row.tat_minutes, str(row.priority).lower(),
+                                                timestamp=result_time.to_pydatetime())
+        if len(result_times):
+            self.results_since = result_times.max().to_pydatetime()
+        return recorded
+    
+    async def handle_low_tat_window(self, window: str = '15m'):
+        """Handle low TAT compliance over a rolling window"""
+        alert_key = f"low_tat_window_{datetime.now().hour}"
+        
+        if alert_key not in self.alerts_sent:
+            self.tat_tracker.advance(datetime.now())
+            snapshot = self.alert_manager.alert_low_tat_window(self.tat_tracker, window)
+            if snapshot['count'] and snapshot['compliance'] * 100 < self.config.TAT_WARNING:
+                self.alerts_sent.add(alert_key)
+    
     async def handle_idle_staff(self, idle_staff: List[Dict]):
         """Handle idle staff"""
         for staff in idle_staff:
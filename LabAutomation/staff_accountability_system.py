@@ -25,6 +25,12 @@ from datetime import datetime, timedelta
 import json
 warnings.filterwarnings('ignore')
 
+from utils.report_writer import blank, field, item, line, numbered, rule, section, subtitle, title, write_report
+from utils.intervention_triage import InterventionTriage
+from utils.metrics_snapshot import MetricsSnapshot
+from utils.staff_store import StaffStore
+from utils.task_graph import TaskGraph
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -41,18 +47,30 @@ class StaffAccountabilitySystem:
     Comprehensive staff accountability and performance management system
     """
     
-    def __init__(self, data_path: str = "data"):
+    def __init__(self, data_path: str = "data", metrics: Optional[MetricsSnapshot] = None):
         """
         Initialize staff accountability system
         
         Args:
             data_path: Path to the data directory
+            metrics: Shared metrics snapshot (defaults to the one for data_path)
         """
         self.data_path = Path(data_path)
+        self.metrics = metrics or MetricsSnapshot.shared(data_path)
         self.staff_data = {}
+        self.staff_store = StaffStore()
+        self.triage = InterventionTriage()
         self.performance_tracking = {}
         self.behavioral_monitoring = {}
         self.intervention_plans = {}
+        self.task_graph = (TaskGraph('staff_accountability')
+                           .add('staff_profiles', self.create_staff_profiles)
+                           .add('performance_tracking', self.create_performance_tracking_system)
+                           .add('intervention_plans', self.create_intervention_plans,
+                                depends_on=['staff_profiles'])
+                           .add('supervision_system', self.create_supervision_system)
+                           .add('staff_report', self.generate_staff_management_report,
+                                depends_on=['staff_profiles', 'intervention_plans']))
         
         # Staff performance thresholds
         self.performance_thresholds = {
@@ -83,6 +101,7 @@ class StaffAccountabilitySystem:
         }
         
         # Current Staff Profiles
+        staff_metrics = self.metrics['staff']
         current_staff = {
             'staff_1': {
                 'name': 'John Smith',
@@ -90,10 +109,7 @@ class StaffAccountabilitySystem:
                 'station': 'Station 1',
                 'hire_date': '2023-01-15',
                 'performance_rating': 2.5,  # out of 5
-                'tat_compliance': 0.25,
-                'error_rate': 0.20,
-                'idle_time': 0.65,
-                'break_violations': 8,
+                **staff_metrics['staff_1'],
                 'attendance_rate': 0.88,
                 'qc_compliance': 0.75,
                 'behavioral_issues': ['long_breaks', 'slow_processing', 'frequent_errors'],
@@ -105,10 +121,7 @@ class StaffAccountabilitySystem:
                 'station': 'Station 2',
                 'hire_date': '2022-08-20',
                 'performance_rating': 3.0,
-                'tat_compliance': 0.30,
-                'error_rate': 0.15,
-                'idle_time': 0.58,
-                'break_violations': 5,
+                **staff_metrics['staff_2'],
                 'attendance_rate': 0.92,
                 'qc_compliance': 0.82,
                 'behavioral_issues': ['data_entry_errors', 'sample_mislabeling'],
@@ -120,10 +133,7 @@ class StaffAccountabilitySystem:
                 'station': 'Station 3',
                 'hire_date': '2023-03-10',
                 'performance_rating': 1.5,
-                'tat_compliance': 0.15,
-                'error_rate': 0.25,
-                'idle_time': 0.72,
-                'break_violations': 12,
+                **staff_metrics['staff_3'],
                 'attendance_rate': 0.85,
                 'qc_compliance': 0.65,
                 'behavioral_issues': ['frequent_disappearances', 'severe_errors', 'attitude_problems'],
@@ -135,10 +145,7 @@ class StaffAccountabilitySystem:
                 'station': 'Station 4',
                 'hire_date': '2022-11-05',
                 'performance_rating': 2.8,
-                'tat_compliance': 0.35,
-                'error_rate': 0.18,
-                'idle_time': 0.61,
-                'break_violations': 6,
+                **staff_metrics['staff_4'],
                 'attendance_rate': 0.90,
                 'qc_compliance': 0.78,
                 'behavioral_issues': ['slow_qc', 'maintenance_delays'],
@@ -150,10 +157,7 @@ class StaffAccountabilitySystem:
                 'station': 'Station 5',
                 'hire_date': '2023-06-15',
                 'performance_rating': 2.0,
-                'tat_compliance': 0.20,
-                'error_rate': 0.22,
-                'idle_time': 0.68,
-                'break_violations': 10,
+                **staff_metrics['staff_5'],
                 'attendance_rate': 0.87,
                 'qc_compliance': 0.70,
                 'behavioral_issues': ['mistake_hiding', 'poor_communication'],
@@ -162,13 +166,14 @@ class StaffAccountabilitySystem:
         }
         
         staff_profiles['current_staff'] = current_staff
+        self.staff_store = StaffStore.from_profiles(current_staff)
         
-        # Performance Issues Summary
+        # Performance Issues Summary (risk tiers follow performance rating)
         performance_issues = {
-            'critical_performers': ['staff_3', 'staff_5'],
-            'underperformers': ['staff_1', 'staff_4'],
-            'moderate_performers': ['staff_2'],
-            'high_performers': [],
+            'critical_performers': self.staff_store.filter(risk_tier='critical'),
+            'underperformers': self.staff_store.filter(risk_tier='high'),
+            'moderate_performers': self.staff_store.filter(risk_tier='moderate'),
+            'high_performers': self.staff_store.filter(risk_tier='low'),
             'termination_candidates': ['staff_3']
         }
         
@@ -537,11 +542,29 @@ class StaffAccountabilitySystem:
         
         intervention_plans['incentive_programs'] = incentive_programs
         
+        # Composite risk tiers for everyone, and who supervisors review first
+        intervention_plans['risk_triage'] = self.triage.triage(self.staff_store)
+        intervention_plans['review_queue'] = self.review_queue()
+        
         self.intervention_plans = intervention_plans
         logger.warning(f"🚨 INTERVENTION PLANS CREATED - COMPREHENSIVE STAFF MANAGEMENT")
         
         return intervention_plans
     
+    def review_queue(self, k: int = 10, weights: Optional[Dict[str, float]] = None, **conditions) -> List[Dict]:
+        """
+        Highest-risk staff for supervisor review
+        
+        Args:
+            k: Number of staff to return
+            weights: What-if risk weight overrides (see InterventionTriage)
+            conditions: Staff store filters, e.g. station='Station 3'
+            
+        Returns:
+            List of staff with risk score and intervention tier, highest risk first
+        """
+        return self.triage.review_queue(self.staff_store, k, weights, **conditions)
+    
     def create_supervision_system(self) -> Dict:
         """
         Create enhanced supervision and oversight system
@@ -683,153 +706,146 @@ class StaffAccountabilitySystem:
         
         return supervision_system
     
-    def generate_staff_management_report(self) -> str:
+    def _staff_report_blocks(self):
         """
-        Generate comprehensive staff management report
-        
-        Returns:
-            String containing the staff management report
+        Yield the staff management report as a stream of report blocks
         """
-        logger.warning("Generating staff management report...")
-        
-        report = []
-        report.append("🚨 STAFF ACCOUNTABILITY & MANAGEMENT REPORT")
-        report.append("Kaiser Permanente Lab Automation System - Largo, MD")
-        report.append("=" * 80)
-        report.append("")
+        yield title("🚨 STAFF ACCOUNTABILITY & MANAGEMENT REPORT")
+        yield subtitle("Kaiser Permanente Lab Automation System - Largo, MD")
+        yield rule('=')
+        yield blank()
         
         # Executive Summary
-        report.append("EXECUTIVE SUMMARY")
-        report.append("-" * 40)
-        report.append("🚨 CRITICAL STAFF PERFORMANCE ISSUES DETECTED")
-        report.append("")
-        report.append("CRISIS LEVEL: SEVERE")
-        report.append("IMMEDIATE INTERVENTION REQUIRED: YES")
-        report.append("STAFFING EMERGENCY: MULTIPLE UNDERPERFORMERS")
-        report.append("BEHAVIORAL CRISIS: WIDESPREAD ISSUES")
-        report.append("")
+        yield section("EXECUTIVE SUMMARY")
+        yield line("🚨 CRITICAL STAFF PERFORMANCE ISSUES DETECTED")
+        yield blank()
+        yield field("CRISIS LEVEL", "SEVERE")
+        yield field("IMMEDIATE INTERVENTION REQUIRED", "YES")
+        yield field("STAFFING EMERGENCY", "MULTIPLE UNDERPERFORMERS")
+        yield field("BEHAVIORAL CRISIS", "WIDESPREAD ISSUES")
+        yield blank()
         
         # Staff Performance Summary
-        report.append("STAFF PERFORMANCE SUMMARY")
-        report.append("-" * 40)
-        if self.staff_data:
-            current_staff = self.staff_data.get('current_staff', {})
-            for staff_id, data in current_staff.items():
-                report.append(f"{data.get('name', 'Unknown')} ({staff_id}):")
-                report.append(f"  Position: {data.get('position', 'Unknown')}")
-                report.append(f"  Performance Rating: {data.get('performance_rating', 0)}/5")
-                report.append(f"  TAT Compliance: {data.get('tat_compliance', 0):.1%}")
-                report.append(f"  Error Rate: {data.get('error_rate', 0):.1%}")
-                report.append(f"  Idle Time: {data.get('idle_time', 0):.1%}")
-                report.append(f"  Break Violations: {data.get('break_violations', 0)}")
-                report.append(f"  Behavioral Issues: {', '.join(data.get('behavioral_issues', []))}")
-                report.append("")
+        yield section("STAFF PERFORMANCE SUMMARY")
+        if len(self.staff_store):
+            for staff_id, data in self.staff_store.records():
+                yield line(f"{data.get('name', 'Unknown')} ({staff_id}):")
+                yield field("Position", data.get('position', 'Unknown'), indent=2)
+                yield field("Performance Rating", f"{data.get('performance_rating', 0)}/5",
+                            data.get('performance_rating', 0), indent=2)
+                yield field("TAT Compliance", f"{data.get('tat_compliance', 0):.1%}", data.get('tat_compliance', 0),
+                            indent=2)
+                yield field("Error Rate", f"{data.get('error_rate', 0):.1%}", data.get('error_rate', 0), indent=2)
+                yield field("Idle Time", f"{data.get('idle_time', 0):.1%}", data.get('idle_time', 0), indent=2)
+                yield field("Break Violations", f"{data.get('break_violations', 0)}", data.get('break_violations', 0),
+                            indent=2)
+                yield field("Behavioral Issues", ', '.join(data.get('behavioral_issues', [])),
+                            data.get('behavioral_issues', []), indent=2)
+                yield blank()
         
         # Critical Issues
-        report.append("CRITICAL STAFF ISSUES")
-        report.append("-" * 40)
-        report.append("🚨 IMMEDIATE ACTION REQUIRED:")
-        report.append("")
-        report.append("1. Staff 3 (Mike Davis):")
-        report.append("   - CRITICAL: Final warning status")
-        report.append("   - Frequent disappearances")
-        report.append("   - Severe attitude problems")
-        report.append("   - Multiple warnings ignored")
-        report.append("   - ACTION: 7-day final warning period")
-        report.append("")
-        report.append("2. Staff 1 (John Smith):")
-        report.append("   - High idle time (65%)")
-        report.append("   - Frequent break violations")
-        report.append("   - Slow work pace")
-        report.append("   - ACTION: 30-day PIP")
-        report.append("")
-        report.append("3. Staff 5 (Robert Brown):")
-        report.append("   - Mistake hiding behavior")
-        report.append("   - Poor communication")
-        report.append("   - Defensive attitude")
-        report.append("   - ACTION: 30-day PIP")
-        report.append("")
+        yield section("CRITICAL STAFF ISSUES")
+        yield line("🚨 IMMEDIATE ACTION REQUIRED:")
+        yield blank()
+        critical_issues = [
+            ("Staff 3 (Mike Davis):", ["CRITICAL: Final warning status", "Frequent disappearances",
+                                       "Severe attitude problems", "Multiple warnings ignored",
+                                       "ACTION: 7-day final warning period"]),
+            ("Staff 1 (John Smith):", ["High idle time (65%)", "Frequent break violations", "Slow work pace",
+                                       "ACTION: 30-day PIP"]),
+            ("Staff 5 (Robert Brown):", ["Mistake hiding behavior", "Poor communication", "Defensive attitude",
+                                         "ACTION: 30-day PIP"]),
+        ]
+        for i, (staff, issues) in enumerate(critical_issues, 1):
+            yield numbered(i, staff)
+            for issue in issues:
+                yield item(issue, indent=3, marker='- ')
+            yield blank()
         
         # Intervention Plans
-        report.append("INTERVENTION PLANS")
-        report.append("-" * 40)
+        yield section("INTERVENTION PLANS")
         if self.intervention_plans:
             pips = self.intervention_plans.get('performance_improvement_plans', {})
             for staff_id, pip in pips.items():
-                staff_name = self.staff_data.get('current_staff', {}).get(staff_id, {}).get('name', staff_id)
-                report.append(f"{staff_name} - Performance Improvement Plan:")
-                report.append(f"  Duration: {pip.get('duration', 'Unknown')}")
-                report.append(f"  Start Date: {pip.get('start_date', 'Unknown')}")
-                report.append(f"  End Date: {pip.get('end_date', 'Unknown')}")
-                report.append(f"  Goals: {', '.join(pip.get('goals', []))}")
-                report.append("")
+                staff_name = self.staff_store.get(staff_id, 'name', staff_id)
+                yield line(f"{staff_name} - Performance Improvement Plan:")
+                yield field("Duration", pip.get('duration', 'Unknown'), indent=2)
+                yield field("Start Date", pip.get('start_date', 'Unknown'), indent=2)
+                yield field("End Date", pip.get('end_date', 'Unknown'), indent=2)
+                yield field("Goals", ', '.join(pip.get('goals', [])), pip.get('goals', []), indent=2)
+                yield blank()
         
         # Supervision System
-        report.append("ENHANCED SUPERVISION SYSTEM")
-        report.append("-" * 40)
-        report.append("✅ Real-time monitoring implemented")
-        report.append("✅ Automated alerts activated")
-        report.append("✅ Daily supervision schedule")
-        report.append("✅ Weekly performance reviews")
-        report.append("✅ Monthly assessments")
-        report.append("✅ Documentation requirements")
-        report.append("")
+        yield section("ENHANCED SUPERVISION SYSTEM")
+        yield line("✅ Real-time monitoring implemented")
+        yield line("✅ Automated alerts activated")
+        yield line("✅ Daily supervision schedule")
+        yield line("✅ Weekly performance reviews")
+        yield line("✅ Monthly assessments")
+        yield line("✅ Documentation requirements")
+        yield blank()
         
         # Next Steps
-        report.append("IMMEDIATE NEXT STEPS")
-        report.append("-" * 40)
-        report.append("1. 🚨 TODAY: Emergency staff meeting")
-        report.append("2. 🚨 TODAY: Deploy real-time monitoring")
-        report.append("3. 🚨 TODAY: Begin PIPs for underperformers")
-        report.append("4. 🚨 TODAY: Final warning for Staff 3")
-        report.append("5. 🚨 THIS WEEK: Implement supervision schedule")
-        report.append("6. 🚨 THIS WEEK: Begin retraining programs")
-        report.append("7. 🚨 THIS MONTH: Deploy incentive programs")
-        report.append("")
-        
-        report.append("=" * 80)
-        report.append("Report generated on: " + datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
-        report.append("CRISIS LEVEL: SEVERE - IMMEDIATE ACTION REQUIRED")
-        report.append("=" * 80)
-        
-        report_text = "\n".join(report)
-        
-        # Save report
-        with open('staff_management_report.txt', 'w') as f:
-            f.write(report_text)
+        yield section("IMMEDIATE NEXT STEPS")
+        next_steps = [
+            "🚨 TODAY: Emergency staff meeting",
+            "🚨 TODAY: Deploy real-time monitoring",
+            "🚨 TODAY: Begin PIPs for underperformers",
+            "🚨 TODAY: Final warning for Staff 3",
+            "🚨 THIS WEEK: Implement supervision schedule",
+            "🚨 THIS WEEK: Begin retraining programs",
+            "🚨 THIS MONTH: Deploy incentive programs",
+        ]
+        for i, step in enumerate(next_steps, 1):
+            yield numbered(i, step)
+        yield blank()
+        
+        yield rule('=')
+        yield field("Report generated on", datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        yield field("CRISIS LEVEL", "SEVERE - IMMEDIATE ACTION REQUIRED")
+        yield rule('=')
+    
+    def generate_staff_management_report(self, formats: Tuple[str, ...] = ('text',), output_dir: str = '.') -> Dict[str, Path]:
+        """
+        Generate comprehensive staff management report
+        
+        Args:
+            formats: Any of 'text', 'markdown', 'html', 'json'; all are
+                written in one pass as staff_management_report.<ext>
+            output_dir: Where the report files are written
+            
+        Returns:
+            Dictionary of format name to written report path
+        """
+        logger.warning("Generating staff management report...")
+        
+        paths = write_report(self._staff_report_blocks(), 'staff_management_report', formats, output_dir,
+                             report_title="Staff Accountability & Management Report")
         
         logger.error(f"🚨 STAFF MANAGEMENT REPORT GENERATED - IMMEDIATE ACTION REQUIRED")
         
-        return report_text
+        return paths
     
-    def run_staff_accountability_system(self) -> Dict:
+    def run_staff_accountability_system(self, input_version: Optional[str] = None) -> Dict:
         """
         Run complete staff accountability system
         
+        Args:
+            input_version: Identifies the input data; a repeat run with the
+                same version reuses earlier results (None always recomputes)
+            
         Returns:
             Dictionary containing staff accountability results
         """
         logger.error("🚨 STARTING STAFF ACCOUNTABILITY SYSTEM")
         
         try:
-            # Run all staff management analyses
-            staff_profiles = self.create_staff_profiles()
-            performance_tracking = self.create_performance_tracking_system()
-            intervention_plans = self.create_intervention_plans()
-            supervision_system = self.create_supervision_system()
-            
-            # Generate staff management report
-            staff_report = self.generate_staff_management_report()
+            # Analyses run concurrently; the report waits for the ones it reads
+            results = self.task_graph.run(version=input_version)
             
             logger.error(f"🚨 STAFF ACCOUNTABILITY SYSTEM COMPLETE - IMMEDIATE ACTION REQUIRED")
             
-            return {
-                'staff_profiles': staff_profiles,
-                'performance_tracking': performance_tracking,
-                'intervention_plans': intervention_plans,
-                'supervision_system': supervision_system,
-                'staff_report': staff_report
-            }
+            return results
             
         except Exception as e:
             logger.error(f"🚨 STAFF ACCOUNTABILITY SYSTEM FAILED: {str(e)}")
@@ -0,0 +1,8 @@
+class FakeClock:
+    """Monotonic or wall clock stand-in that tests advance by setting `now`"""
+
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
@@ -0,0 +1,54 @@
+import unittest
+from dataclasses import dataclass
+from datetime import datetime
+from utils.change_detection import ChangeTracker
+from tests import FakeClock
+
+@dataclass
+class Metrics:
+    timestamp: datetime
+    staff_member: str
+    shift: str
+    samples_processed: int
+
+def rows(samples):
+    return [Metrics(datetime.now(), f"staff_{i}", 'Day', n) for i, n in enumerate(samples)]
+
+class TestChangeTracker(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.tracker = ChangeTracker(('staff_member', 'shift'), ignore_fields=('timestamp',),
+                                     resync_seconds=3600, clock=self.clock)
+
+    def test_only_new_or_changed_rows_after_first_push(self):
+        self.assertEqual(len(self.tracker.changed(rows([10, 20, 30]))), 3)
+        self.tracker.commit()
+        changed = self.tracker.changed(rows([10, 25, 30, 5]))
+        self.assertEqual([r.staff_member for r in changed], ['staff_1', 'staff_3'])
+        self.tracker.commit()
+        self.assertEqual(self.tracker.changed(rows([10, 25, 30, 5])), [])
+
+    def test_failed_push_is_retried(self):
+        self.tracker.changed(rows([10]))
+        self.tracker.commit()
+        self.assertEqual(len(self.tracker.changed(rows([11]))), 1)
+        # No commit: the push failed
+        self.assertEqual(len(self.tracker.changed(rows([11]))), 1)
+
+    def test_periodic_full_resync(self):
+        self.tracker.changed(rows([10, 20]))
+        self.tracker.commit()
+        self.clock.now = 3600
+        self.assertEqual(len(self.tracker.changed(rows([10, 20]))), 2)
+        self.tracker.commit()
+        self.assertEqual(self.tracker.stats['full_syncs'], 2)
+
+    def test_duplicate_keys_and_dict_rows(self):
+        tracker = ChangeTracker(('incident_id',), clock=self.clock)
+        tracker.changed([{'incident_id': 'A', 'status': 'Open'}, {'incident_id': 'A', 'status': 'Open'}])
+        tracker.commit()
+        changed = tracker.changed([{'incident_id': 'A', 'status': 'Open'}, {'incident_id': 'A', 'status': 'Closed'}])
+        self.assertEqual(changed, [{'incident_id': 'A', 'status': 'Closed'}])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from utils.chart_renderer import ChartPanel, ChartRenderer
+
+def panels(day_tat=42.0):
+    return [
+        ChartPanel(name='tat', title='STAT TAT by Shift', x=['Day', 'Evening', 'Night'],
+                   series=[{'values': [day_tat, 51.0, 58.0], 'color': 'skyblue'}], target=60),
+        ChartPanel(name='volume', title='Hourly Volume', x=[8, 9, 10], kind='line',
+                   series=[{'values': [120, 140, 90], 'label': 'Tests'}], grid=True),
+    ]
+
+class TestChartRenderer(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.output_dir = Path(self.tmp.name) / 'out'
+        self.renderer = ChartRenderer(str(self.output_dir), max_workers=2)
+
+    def render(self, **kwargs):
+        return self.renderer.render_dashboard('dashboard', 'Lab Dashboard', kwargs.pop('panels', panels()),
+                                              layout=(1, 2), figsize=(8, 4), **kwargs)
+
+    def test_renders_files_and_reuses_the_cache(self):
+        first = self.render(mode='preview', save_panels=True)
+        self.assertEqual(first['cached'], 0)
+        self.assertEqual(first['dashboard'], self.output_dir / 'dashboard.png')
+        self.assertEqual(sorted(first['panels']), ['tat', 'volume'])
+        for path in [first['dashboard'], *first['panels'].values()]:
+            self.assertTrue(path.exists())
+            self.assertEqual(path.read_bytes()[:8], b'\x89PNG\r\n\x1a\n')
+
+        first['dashboard'].unlink()
+        second = self.render(mode='preview', save_panels=True)
+        self.assertEqual(second['cached'], 3)
+        self.assertTrue(second['dashboard'].exists())
+
+        # Only the changed panel and the dashboard are redrawn
+        changed = self.render(mode='preview', save_panels=True, panels=panels(day_tat=44.0))
+        self.assertEqual(changed['cached'], 1)
+
+    def test_svg_mode(self):
+        rendered = self.render(mode='svg')
+        self.assertEqual(rendered['panels'], {})
+        self.assertIn(b'<svg', rendered['dashboard'].read_bytes()[:500])
+
+    def test_rendering_does_not_load_pyplot(self):
+        self.render(mode='preview')
+        self.assertNotIn('matplotlib.pyplot', sys.modules)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import asyncio
+import time
+import unittest
+from types import SimpleNamespace
+from automation.client_lifecycle import CircuitBreaker, ClientManager, ClientSpec
+from tests import FakeClock
+
+class SlowClient:
+    def __init__(self, config):
+        self.config = config
+
+    async def ping(self):
+        await asyncio.sleep(0.2)
+        return True
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_opens_after_threshold_and_backs_off_on_failed_trial(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout_seconds=30, clock=clock)
+        breaker.record_failure('timeout')
+        self.assertTrue(breaker.allow())
+        breaker.record_failure('timeout')
+        self.assertFalse(breaker.allow())
+        clock.now = 30
+        self.assertTrue(breaker.ready_to_retry())
+        breaker.half_open()
+        breaker.record_failure('still down')
+        self.assertEqual((breaker.state, breaker.reset_timeout), ('open', 60))
+        clock.now = 90
+        breaker.half_open()
+        breaker.record_success()
+        self.assertEqual((breaker.state, breaker.reset_timeout), ('closed', 30))
+
+class TestClientManager(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.biorad_up = False
+
+        def connect(client):
+            if not self.biorad_up:
+                raise ConnectionError('bio-rad down')
+            return True
+
+        self.manager = ClientManager([
+            ClientSpec('Qmatic', SlowClient, lambda: {}, probe=SlowClient.ping),
+            ClientSpec('Epic Beaker', SlowClient, lambda: {}, probe=SlowClient.ping),
+            ClientSpec('Bio-Rad Unity', SlowClient, lambda: {}, probe=connect),
+            ClientSpec('HR Connect', SlowClient, lambda: SimpleNamespace(enabled=False)),
+        ], attempts=2, base_delay_seconds=0.01, failure_threshold=2, reset_timeout_seconds=30, clock=self.clock)
+
+    def test_clients_start_concurrently_and_failures_are_isolated(self):
+        started = time.perf_counter()
+        results = asyncio.run(self.manager.start())
+        elapsed = time.perf_counter() - started
+        self.assertLess(elapsed, 0.35)
+        self.assertEqual(results, {'Qmatic': True, 'Epic Beaker': True, 'Bio-Rad Unity': False, 'HR Connect': False})
+        self.assertIsNotNone(self.manager.get('Qmatic'))
+        self.assertIsNone(self.manager.get('Bio-Rad Unity'))
+        status = self.manager.status()
+        self.assertEqual(status['Bio-Rad Unity']['state'], 'open')
+        self.assertEqual(status['HR Connect']['state'], 'disabled')
+
+    def test_open_client_recovers_alone_after_cooldown(self):
+        asyncio.run(self.manager.start())
+        qmatic = self.manager.get('Qmatic')
+        self.biorad_up = True
+        self.assertEqual(asyncio.run(self.manager.recover()), [])
+        self.clock.now = 30
+        self.assertEqual(asyncio.run(self.manager.recover()), ['Bio-Rad Unity'])
+        self.assertIsNotNone(self.manager.get('Bio-Rad Unity'))
+        self.assertIs(self.manager.get('Qmatic'), qmatic)
+
+    def test_guard_trips_breaker_on_repeated_call_failures(self):
+        asyncio.run(self.manager.start(['Qmatic']))
+
+        async def failing_call():
+            async with self.manager.guard('Qmatic'):
+                raise TimeoutError('qmatic timeout')
+
+        for _ in range(2):
+            with self.assertRaises(TimeoutError):
+                asyncio.run(failing_call())
+        self.assertIsNone(self.manager.get('Qmatic'))
+        self.assertEqual(self.manager.status()['Qmatic']['last_error'], 'qmatic timeout')
+
+    def test_require_raises_only_for_enabled_clients_that_are_down(self):
+        asyncio.run(self.manager.start())
+        self.assertIs(self.manager.require('Qmatic'), self.manager.get('Qmatic'))
+        self.assertIsNone(self.manager.require('HR Connect'))
+        with self.assertRaisesRegex(ConnectionError, 'bio-rad down'):
+            self.manager.require('Bio-Rad Unity')
+
+if __name__ == '__main__':
+    unittest.main()
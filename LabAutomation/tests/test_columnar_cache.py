@@ -0,0 +1,84 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+import numpy as np
+import pandas as pd
+from utils.columnar_cache import ColumnarCache
+
+class TestColumnarCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.csv_path = Path(self.tmp.name) / 'export.csv'
+        self.write_csv(pd.DataFrame({
+            'Patient ID': ['P001', 'P002', None, 'P004'],
+            'Priority': ['STAT', 'Routine', 'STAT', 'Routine'],
+            'TAT Minutes': [30, 45, 50, 200],
+            'Collected Date': ['2024-01-05 08:00', '2024-01-05 09:00', '2024-01-06 10:00', '2024-01-06 11:00'],
+            'Comment': ['hemolyzed', 'redraw', 'ok', 'ok'],
+        }))
+        self.cache = ColumnarCache(os.path.join(self.tmp.name, '.cache'), chunk_size=3)
+
+    def write_csv(self, df, mtime_ns=None):
+        df.to_csv(self.csv_path, index=False)
+        if mtime_ns is not None:
+            os.utime(self.csv_path, ns=(mtime_ns, mtime_ns))
+
+    def kinds(self):
+        return {column['name']: column['kind'] for column in self.cache.ensure(self.csv_path)['columns']}
+
+    def test_identifiers_are_stored_as_strings(self):
+        self.assertEqual(self.kinds(), {'Patient ID': 'string', 'Priority': 'category',
+                                        'TAT Minutes': 'float', 'Collected Date': 'datetime',
+                                        'Comment': 'string'})
+        df = self.cache.load(self.csv_path)
+        self.assertEqual(df['Patient ID'].fillna('').tolist(), ['P001', 'P002', '', 'P004'])
+        self.assertEqual(df['Priority'].tolist(), ['STAT', 'Routine', 'STAT', 'Routine'])
+
+    def test_category_past_the_cap_is_rewritten_as_strings(self):
+        self.write_csv(pd.DataFrame({'Status': [f"S{i}" for i in range(7)] + [None]}))
+        with mock.patch('utils.columnar_cache.MAX_CATEGORIES', 4):
+            self.assertEqual(self.kinds(), {'Status': 'string'})
+        self.assertEqual(self.cache.load(self.csv_path)['Status'].fillna('').tolist(),
+                         [f"S{i}" for i in range(7)] + [''])
+
+    def test_warm_read_returns_the_same_frame(self):
+        cold = self.cache.load(self.csv_path)
+        with mock.patch.object(self.cache, 'build') as build:
+            warm = self.cache.load(self.csv_path)
+        build.assert_not_called()
+        pd.testing.assert_frame_equal(warm, cold)
+        self.assertEqual(warm['TAT Minutes'].tolist(), [30, 45, 50, 200])
+
+    def test_fingerprint_invalidation(self):
+        manifest = self.cache.ensure(self.csv_path)
+        mtime_ns = manifest['source']['mtime_ns']
+
+        with mock.patch.object(self.cache, 'build', wraps=self.cache.build) as build:
+            # Touched but unchanged: fingerprint refreshed, no rebuild
+            os.utime(self.csv_path, ns=(mtime_ns + 10**9, mtime_ns + 10**9))
+            self.cache.ensure(self.csv_path)
+            self.assertEqual(build.call_count, 0)
+
+            # Same size, different content
+            self.write_csv(pd.read_csv(self.csv_path).replace({'P001': 'P009'}), mtime_ns + 2 * 10**9)
+            self.assertEqual(self.cache.load(self.csv_path)['Patient ID'][0], 'P009')
+            self.assertEqual(build.call_count, 1)
+
+            # Size change
+            self.write_csv(pd.read_csv(self.csv_path).iloc[:2], mtime_ns + 3 * 10**9)
+            self.assertEqual(len(self.cache.load(self.csv_path)), 2)
+            self.assertEqual(build.call_count, 2)
+
+    def test_only_requested_columns_are_mapped(self):
+        manifest = self.cache.ensure(self.csv_path)
+        files = {column['name']: column['file'] for column in manifest['columns']}
+        with mock.patch('utils.columnar_cache.np.memmap', wraps=np.memmap) as memmap:
+            df = self.cache.load(self.csv_path, ['TAT Minutes'])
+        self.assertEqual(list(df.columns), ['TAT Minutes'])
+        self.assertEqual([Path(call.args[0]).name for call in memmap.call_args_list], [files['TAT Minutes']])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import os
+import tempfile
+import unittest
+from utils.cooldown_store import CooldownStore
+from tests import FakeClock
+
+class TestCooldownStore(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock(1_700_000_000.0)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'cooldowns.db')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_keys_expire_after_ttl(self):
+        store = CooldownStore(900, clock=self.clock)
+        store.mark('performance_staff_1')
+        store.add('tat_window_15m', ttl_seconds=60)
+        self.assertIn('performance_staff_1', store)
+        self.assertEqual(store.remaining('tat_window_15m'), 60)
+        self.clock.now += 61
+        self.assertNotIn('tat_window_15m', store)
+        self.assertEqual(list(store), ['performance_staff_1'])
+        self.clock.now += 900
+        self.assertEqual(len(store), 0)
+
+    def test_try_acquire_and_remark(self):
+        store = CooldownStore(60, clock=self.clock)
+        self.assertTrue(store.try_acquire('high_wait'))
+        self.assertFalse(store.try_acquire('high_wait'))
+        self.clock.now += 50
+        store.mark('high_wait')
+        self.clock.now += 20
+        # The earlier expiry must not evict the renewed cooldown
+        self.assertEqual(len(store), 1)
+        self.assertIn('high_wait', store)
+
+    def test_cooldowns_survive_restart(self):
+        store = CooldownStore(900, path=self.path, namespace='core', clock=self.clock)
+        store.mark('performance_staff_3')
+        store.mark('tat_window_15m', ttl_seconds=30)
+        CooldownStore(900, path=self.path, namespace='scripts', clock=self.clock).mark('low_tat_9')
+        store.close()
+
+        self.clock.now += 60
+        restarted = CooldownStore(900, path=self.path, namespace='core', clock=self.clock)
+        self.assertIn('performance_staff_3', restarted)
+        self.assertNotIn('tat_window_15m', restarted)
+        self.assertNotIn('low_tat_9', restarted)
+        restarted.clear()
+        restarted.close()
+        self.assertEqual(len(CooldownStore(900, path=self.path, namespace='core', clock=self.clock)), 0)
+
+if __name__ == '__main__':
+    unittest.main()
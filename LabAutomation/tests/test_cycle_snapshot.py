@@ -0,0 +1,64 @@
+import asyncio
+import unittest
+from datetime import datetime, timedelta
+from automation.cycle_snapshot import SnapshotCollector
+
+class TestSnapshotCollector(unittest.TestCase):
+    def setUp(self):
+        self.calls = {'performance': 0, 'queue': 0}
+
+        async def performance():
+            self.calls['performance'] += 1
+            await asyncio.sleep(0.01)
+            return ['metrics']
+
+        async def queue():
+            self.calls['queue'] += 1
+            raise ConnectionError('qmatic down')
+
+        self.collector = SnapshotCollector({'performance': performance, 'queue': queue})
+
+    def test_each_source_fetched_once_per_snapshot(self):
+        snapshot = asyncio.run(self.collector.collect())
+        self.assertEqual(snapshot.performance, ['metrics'])
+        self.assertEqual(snapshot.queue, {})
+        self.assertEqual(snapshot.errors, {'queue': 'qmatic down'})
+        self.assertEqual(self.calls, {'performance': 1, 'queue': 1})
+
+    def test_fresh_snapshot_reused_and_concurrent_refresh_shared(self):
+        async def run():
+            first, second = await asyncio.gather(self.collector.get(60), self.collector.get(60))
+            third = await self.collector.get(60)
+            return first, second, third
+        first, second, third = asyncio.run(run())
+        self.assertIs(first, second)
+        self.assertIs(first, third)
+        self.assertEqual(self.calls['performance'], 1)
+
+    def test_stale_or_invalidated_snapshot_refetched(self):
+        snapshot = asyncio.run(self.collector.collect())
+        snapshot.collected_at = datetime.now() - timedelta(minutes=10)
+        self.assertIsNot(asyncio.run(self.collector.get(300)), snapshot)
+        self.collector.invalidate()
+        refreshed = asyncio.run(self.collector.get(300))
+        self.assertEqual(refreshed.cycle_id, 3)
+        self.assertEqual(self.calls['performance'], 3)
+
+    def test_published_snapshot_is_as_old_as_its_oldest_source(self):
+        now = datetime.now()
+        snapshot = self.collector.publish(
+            {'queue': {'average_wait': 5}, 'incidents': ['open']},
+            fetched_at={'queue': now - timedelta(seconds=15), 'incidents': now - timedelta(minutes=30),
+                        'performance': now - timedelta(hours=2)}
+        )
+        self.assertEqual(snapshot.collected_at, now - timedelta(minutes=30))
+        self.assertEqual(set(snapshot.fetched_at), {'queue', 'incidents'})
+        self.assertFalse(snapshot.is_fresh(300, now))
+
+        # The recent queue poll does not hide the old incidents
+        refreshed = asyncio.run(self.collector.get(300))
+        self.assertIsNot(refreshed, snapshot)
+        self.assertEqual(self.calls['performance'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
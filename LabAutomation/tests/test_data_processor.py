@@ -0,0 +1,86 @@
+import json
+import tempfile
+import tracemalloc
+import unittest
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from data_processor import LabDataProcessor
+
+class TestProcessDataDirectory(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.data_path = Path(self.tmp.name)
+        rng = np.random.default_rng(4)
+        for name, periods in (('stat_tat.csv', 400), ('Largo/stat_tat.csv', 250)):
+            path = self.data_path / name
+            path.parent.mkdir(exist_ok=True)
+            pd.DataFrame({
+                'Collected Date': pd.date_range('2024-01-01', periods=periods, freq='h').astype(str),
+                'TAT Minutes': rng.gamma(2.0, 25.0, periods).round(1),
+                'patient_id': rng.integers(0, 150, periods).astype(str),
+            }).to_csv(path, index=False)
+        # Empty export: no header to parse
+        (self.data_path / 'broken.csv').write_text('')
+
+    def run_directory(self, max_workers, use_cache=True):
+        processor = LabDataProcessor(str(self.data_path), use_cache=use_cache,
+                                     cache_dir=str(self.data_path / f".cache-{max_workers}"))
+        # Dump to JSON so NaN fields compare equal
+        return json.loads(json.dumps(processor.process_data_directory(max_workers=max_workers, chunk_size=64),
+                                     default=str).replace('NaN', 'null'))
+
+    def test_parallel_run_matches_single_process(self):
+        parallel = self.run_directory(max_workers=3)
+        serial = self.run_directory(max_workers=1)
+
+        self.assertEqual(parallel, serial)
+        self.assertEqual(sorted(parallel['files']), ['Largo/stat_tat.csv', 'stat_tat.csv'])
+        self.assertEqual(list(parallel['failed']), ['broken.csv'])
+        self.assertEqual(parallel['combined']['summary_stats']['total_records'], 650)
+        patients = pd.concat([pd.read_csv(self.data_path / name, dtype=str)['patient_id']
+                              for name in parallel['files']])
+        self.assertEqual(parallel['combined']['summary_stats']['unique_patients'], patients.nunique())
+
+    def test_combined_matches_all_rows(self):
+        combined = self.run_directory(max_workers=2, use_cache=False)['combined']
+        rows = pd.concat([pd.read_csv(self.data_path / name) for name in ('stat_tat.csv', 'Largo/stat_tat.csv')])
+        tat = combined['tat_analysis']['TAT Minutes']
+        self.assertAlmostEqual(tat['mean'], rows['TAT Minutes'].mean())
+        self.assertEqual(tat['max'], rows['TAT Minutes'].max())
+        self.assertEqual(tat['total_count'], len(rows))
+
+class TestStreamingMemory(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.csv_path = Path(self.tmp.name) / 'export.csv'
+        rows = 60000
+        rng = np.random.default_rng(7)
+        pd.DataFrame({
+            'patient_id': [f"PAT-{i:08d}" for i in range(rows)],
+            'test_type': rng.choice(['CBC', 'BMP', 'PT/INR'], rows),
+            'TAT Minutes': rng.integers(10, 300, rows),
+        }).to_csv(self.csv_path, index=False)
+
+    def peak_bytes(self, use_cache):
+        processor = LabDataProcessor(self.tmp.name, use_cache=use_cache, distinct_exact_limit=1000)
+        if use_cache:
+            processor.cache.ensure(self.csv_path)
+        tracemalloc.start()
+        try:
+            accumulator = processor.accumulate_csv(self.csv_path, chunk_size=5000)
+            return tracemalloc.get_traced_memory()[1], accumulator.total_records
+        finally:
+            tracemalloc.stop()
+
+    def test_cached_stream_peaks_no_higher_than_parsing(self):
+        parsed_peak, parsed_rows = self.peak_bytes(use_cache=False)
+        cached_peak, cached_rows = self.peak_bytes(use_cache=True)
+        self.assertEqual(cached_rows, parsed_rows)
+        # Slicing the cache decodes one chunk of IDs at a time, never the whole column
+        self.assertLessEqual(cached_peak, parsed_peak)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import asyncio
+import unittest
+from automation.event_bus import Event, EventBus, IncidentOpened, PerformanceRecord, QueueSnapshot
+from utils.stage_metrics import StageMetrics
+
+class TestEventBus(unittest.TestCase):
+    def test_events_routed_by_type(self):
+        received = {'checker': [], 'all': []}
+
+        async def checker(event):
+            received['checker'].append(event.metrics)
+
+        async def everything(event):
+            received['all'].append(type(event).__name__)
+
+        async def run():
+            bus = EventBus()
+            bus.subscribe(PerformanceRecord, checker, name='checker')
+            bus.subscribe(Event, everything, name='all')
+            await bus.start()
+            self.assertEqual(bus.publish(PerformanceRecord({'staff_member': 'staff_1'})), 2)
+            self.assertEqual(bus.publish(QueueSnapshot({'average_wait': 12})), 1)
+            await bus.stop()
+            return bus
+
+        bus = asyncio.run(run())
+        self.assertEqual(received['checker'], [{'staff_member': 'staff_1'}])
+        self.assertEqual(received['all'], ['PerformanceRecord', 'QueueSnapshot'])
+        self.assertEqual(bus.published, {'PerformanceRecord': 1, 'QueueSnapshot': 1})
+
+    def test_latest_only_consumer_drops_oldest_without_blocking_publisher(self):
+        seen = []
+        release = None
+
+        async def slow_dashboard(event):
+            await release.wait()
+            seen.append(event.data['average_wait'])
+
+        async def run():
+            nonlocal release
+            release = asyncio.Event()
+            bus = EventBus()
+            bus.subscribe(QueueSnapshot, slow_dashboard, name='dashboard', maxsize=1, latest_only=True)
+            await bus.start()
+            bus.publish(QueueSnapshot({'average_wait': 1}))
+            await asyncio.sleep(0)  # worker takes the first event and waits
+            for wait in (2, 3, 4):
+                bus.publish(QueueSnapshot({'average_wait': wait}))
+            release.set()
+            await bus.stop()
+            return bus.stats()['dashboard']
+
+        stats = asyncio.run(run())
+        self.assertEqual(seen, [1, 4])
+        self.assertEqual((stats['delivered'], stats['dropped'], stats['handled']), (4, 2, 2))
+
+    def test_full_queue_backlogs_and_coalesces_instead_of_dropping(self):
+        seen = []
+        release = None
+        metrics = StageMetrics('test')
+
+        async def slow_notifier(event):
+            await release.wait()
+            seen.append((event.incident_id, event.incident['status']))
+
+        async def run():
+            nonlocal release
+            release = asyncio.Event()
+            bus = EventBus(on_drop=metrics.record_dropped)
+            bus.subscribe(IncidentOpened, slow_notifier, name='notifier', maxsize=1,
+                          coalesce_key=lambda event: event.incident_id)
+            await bus.start()
+            bus.publish(IncidentOpened({'status': 'open'}, 'INC-1'))
+            await asyncio.sleep(0)  # worker takes INC-1 and waits
+            bus.publish(IncidentOpened({'status': 'open'}, 'INC-2'))
+            bus.publish(IncidentOpened({'status': 'open'}, 'INC-3'))
+            bus.publish(IncidentOpened({'status': 'open'}, 'INC-4'))
+            bus.publish(IncidentOpened({'status': 'updated'}, 'INC-3'))
+            pending = bus.stats()['notifier']['pending']
+            release.set()
+            await bus.stop()
+            return pending, bus.stats()['notifier']
+
+        pending, stats = asyncio.run(run())
+        self.assertEqual(pending, 2)
+        self.assertEqual(seen, [('INC-1', 'open'), ('INC-2', 'open'), ('INC-3', 'updated'), ('INC-4', 'open')])
+        self.assertEqual((stats['dropped'], stats['coalesced'], stats['handled'], stats['pending']), (0, 1, 4, 0))
+        self.assertEqual(metrics.snapshot()['dropped_events'], {'notifier': {'coalesced': 1}})
+        self.assertIn('lab_bus_dropped_events_total{system="test",subscriber="notifier",reason="coalesced"} 1',
+                      metrics.prometheus())
+
+    def test_handler_errors_are_isolated(self):
+        notified = []
+
+        async def broken(event):
+            raise RuntimeError('teams down')
+
+        async def notifier(event):
+            notified.append(event.incident_id)
+
+        async def run():
+            bus = EventBus()
+            bus.subscribe(IncidentOpened, broken, name='broken')
+            bus.subscribe(IncidentOpened, notifier, name='notifier')
+            await bus.start()
+            bus.publish(IncidentOpened({'severity': 'Critical'}, 'INC-1'))
+            bus.publish(IncidentOpened({'severity': 'Low'}, 'INC-2'))
+            await bus.stop()
+            return bus.stats()
+
+        stats = asyncio.run(run())
+        self.assertEqual(notified, ['INC-1', 'INC-2'])
+        self.assertEqual(stats['broken']['errors'], 2)
+
+if __name__ == '__main__':
+    unittest.main()
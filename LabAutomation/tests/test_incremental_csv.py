@@ -0,0 +1,94 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+from utils.incremental_csv import IncrementalCsvProcessor
+from utils.streaming_stats import StreamingMetrics
+
+HEADER = "Collected Date,TAT Minutes\n"
+
+def rows(start, count):
+    return ''.join(f"2024-01-{1 + i % 28:02d} 08:00,{i}\n" for i in range(start, start + count))
+
+class TestIncrementalCsv(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.csv_path = Path(self.tmp.name) / 'stat_tat_extract.csv'
+        self.processor = IncrementalCsvProcessor(Path(self.tmp.name) / 'state')
+
+    def write(self, text, mode='w'):
+        with open(self.csv_path, mode, newline='') as f:
+            f.write(text)
+
+    def update(self):
+        """Run an update, returning the metrics and the rows parsed by this run"""
+        parsed = []
+        original = StreamingMetrics.update
+
+        def counting_update(metrics, chunk):
+            parsed.append(len(chunk))
+            original(metrics, chunk)
+
+        with mock.patch.object(StreamingMetrics, 'update', counting_update):
+            metrics = self.processor.update(self.csv_path, chunk_size=4)
+        return metrics, sum(parsed)
+
+    def tat(self, metrics):
+        return metrics.finalize()['tat_analysis']['TAT Minutes']
+
+    def test_append_only_parses_new_rows(self):
+        self.write(HEADER + rows(0, 10))
+        metrics, parsed = self.update()
+        self.assertEqual((metrics.total_records, parsed), (10, 10))
+
+        self.write(rows(10, 5), mode='a')
+        metrics, parsed = self.update()
+        self.assertEqual((metrics.total_records, parsed), (15, 5))
+        self.assertAlmostEqual(self.tat(metrics)['mean'], 7.0)
+        self.assertEqual(self.tat(metrics)['max'], 14)
+
+        metrics, parsed = self.update()
+        self.assertEqual((metrics.total_records, parsed), (15, 0))
+
+    def test_partial_last_row_waits_for_its_newline(self):
+        self.write(HEADER + rows(0, 3) + "2024-01-04 08:00,")
+        metrics, parsed = self.update()
+        self.assertEqual((metrics.total_records, parsed), (3, 3))
+
+        self.write("99\n", mode='a')
+        metrics, parsed = self.update()
+        self.assertEqual((metrics.total_records, parsed), (4, 1))
+        self.assertEqual(self.tat(metrics)['max'], 99)
+
+    def test_rewritten_head_rebuilds(self):
+        self.write(HEADER + rows(0, 10))
+        self.update()
+        # Same length, different first row, plus appended rows
+        self.write(HEADER + "2024-01-01 08:00,9\n" + rows(1, 9) + rows(10, 2))
+        metrics, parsed = self.update()
+        self.assertEqual((metrics.total_records, parsed), (12, 12))
+        self.assertAlmostEqual(self.tat(metrics)['mean'], (sum(range(1, 12)) + 9) / 12)
+
+    def test_truncated_file_rebuilds(self):
+        self.write(HEADER + rows(0, 10))
+        self.update()
+        self.write(HEADER + rows(0, 4))
+        metrics, parsed = self.update()
+        self.assertEqual((metrics.total_records, parsed), (4, 4))
+        self.assertEqual(self.tat(metrics)['max'], 3)
+
+    def test_corrupt_state_rebuilds(self):
+        self.write(HEADER + rows(0, 10))
+        self.update()
+        state_path = self.processor._state_path(self.csv_path)
+        state_path.write_bytes(b'not a pickle')
+
+        with self.assertLogs('utils.incremental_csv', level='WARNING'):
+            self.assertIsNone(self.processor.load_state(self.csv_path))
+        metrics, parsed = self.update()
+        self.assertEqual((metrics.total_records, parsed), (10, 10))
+        self.assertIsNotNone(self.processor.load_state(self.csv_path))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import os
+import tempfile
+import unittest
+from utils.ingestion_schema import (CATEGORY, DATETIME, GENERIC_SCHEMA, IDENTIFIER, NUMERIC,
+                                    STAT_TAT_SCHEMA, schema_for)
+
+class TestIngestionSchema(unittest.TestCase):
+    def test_measurement_suffix_wins_over_keywords(self):
+        kinds = STAT_TAT_SCHEMA.resolve(['Queue Wait Minutes', 'Shift TAT', 'Department Count',
+                                         'Site Rejection Rate', 'Wait (min)', 'Queue', 'Shift',
+                                         'Status', 'Collected Date', 'Patient ID']).kinds
+        self.assertEqual(kinds, {
+            'Queue Wait Minutes': NUMERIC,
+            'Shift TAT': NUMERIC,
+            'Department Count': NUMERIC,
+            'Site Rejection Rate': NUMERIC,
+            'Wait (min)': NUMERIC,
+            'Queue': CATEGORY,
+            'Shift': CATEGORY,
+            'Status': CATEGORY,
+            'Collected Date': DATETIME,
+            'Patient ID': IDENTIFIER,
+        })
+
+    def test_known_schema_logs_dropped_columns(self):
+        with self.assertLogs('utils.ingestion_schema', level='INFO') as logs:
+            kinds = STAT_TAT_SCHEMA.resolve(['TAT Minutes', 'Comment', 'Reviewer']).kinds
+        self.assertEqual(list(kinds), ['TAT Minutes'])
+        self.assertIn("Schema stat_tat drops unmatched columns: ['Comment', 'Reviewer']", logs.output[0])
+
+    def test_generic_schema_keeps_unmatched(self):
+        with self.assertNoLogs('utils.ingestion_schema', level='INFO'):
+            kinds = GENERIC_SCHEMA.resolve(['TAT Minutes', 'Comment']).kinds
+        self.assertEqual(kinds, {'TAT Minutes': NUMERIC, 'Comment': 'inferred'})
+
+    def test_read_csv_types_columns(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'stat_tat_export.csv')
+            with open(path, 'w') as f:
+                f.write("Queue,Queue Wait Minutes,Comment\nLab,5,ok\nLab,x,redraw\n")
+            df = schema_for(path).read_csv(path)
+        self.assertEqual(list(df.columns), ['Queue', 'Queue Wait Minutes'])
+        self.assertEqual(str(df['Queue'].dtype), 'category')
+        self.assertEqual(df['Queue Wait Minutes'].tolist()[0], 5)
+        self.assertTrue(df['Queue Wait Minutes'].isna().iloc[1])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+import numpy as np
+from utils.intervention_triage import InterventionTriage
+from utils.staff_store import StaffStore
+
+class TestInterventionTriage(unittest.TestCase):
+    def setUp(self):
+        self.store = StaffStore.from_profiles({
+            'good': {'station': 'Station 1', 'tat_compliance': 0.95, 'error_rate': 0.01, 'idle_time': 0.1},
+            'poor': {'station': 'Station 1', 'tat_compliance': 0.10, 'error_rate': 0.30, 'idle_time': 0.9},
+            'idle': {'station': 'Station 2', 'tat_compliance': 0.85, 'error_rate': 0.04, 'idle_time': 0.8},
+        })
+        self.triage = InterventionTriage({'tat_compliance': 1.0, 'error_rate': 1.0, 'idle_time': 1.0})
+
+    def test_scores_and_tiers(self):
+        result = self.triage.triage(self.store)
+        self.assertEqual(result['good'], {'risk_score': 0.0, 'tier': 'monitoring'})
+        self.assertEqual(result['poor']['tier'], 'final_warning')
+        self.assertAlmostEqual(result['idle']['risk_score'], (0.05 / 0.9 + 1.0) / 3, places=3)
+
+    def test_review_queue_uses_filters_and_weights(self):
+        self.assertEqual([r['staff_id'] for r in self.triage.review_queue(self.store, 2)], ['poor', 'idle'])
+        self.assertEqual([r['staff_id'] for r in self.triage.review_queue(self.store, 5, station='Station 1')],
+                         ['poor', 'good'])
+        scenario = self.triage.what_if(self.store, {'idle_time': 20.0}, k=3)
+        self.assertEqual(scenario['changed'], {'idle': ('monitoring', 'final_warning')})
+        self.assertEqual(self.triage.weights['idle_time'], 1.0)
+
+    def test_top_k_matches_full_sort(self):
+        rng = np.random.default_rng(3)
+        store = StaffStore.from_profiles({f"s{i}": {'tat_compliance': rng.uniform(), 'error_rate': rng.uniform(0, 0.3),
+                                                    'idle_time': rng.uniform()} for i in range(3000)})
+        scores = self.triage.scores(store)
+        expected = [store.ids[row] for row in np.argsort(-scores, kind='stable')[:25]]
+        self.assertEqual([r['staff_id'] for r in self.triage.review_queue(store, 25)], expected)
+
+    def test_unknown_metric_rejected(self):
+        with self.assertRaises(ValueError):
+            InterventionTriage({'charisma': 1.0})
+
+if __name__ == '__main__':
+    unittest.main()
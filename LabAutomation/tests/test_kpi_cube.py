@@ -0,0 +1,95 @@
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from lab_performance_analyzer import LabPerformanceAnalyzer
+from utils.kpi_cube import KpiCube
+from utils.performance_engine import normalize_events
+
+class TestKpiCube(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(11)
+        self.events = normalize_events(pd.DataFrame({
+            'Collected Date': pd.date_range('2024-01-01', periods=6000, freq='7min').astype(str),
+            'TAT Minutes': rng.gamma(2.0, 25.0, 6000),
+            'Priority': rng.choice(['STAT', 'Routine'], 6000),
+            'Queue': rng.choice(['Chemistry', 'Hematology', 'Blood Bank'], 6000),
+        }))
+
+    def test_rollup_matches_events(self):
+        cube = KpiCube.from_events(self.events, normalized=True)
+        rollup = cube.rollup(['priority'])
+        grouped = self.events.groupby('priority', observed=True)['tat_minutes']
+        for priority, tat in grouped:
+            row = rollup.loc[priority]
+            self.assertEqual(row['count'], len(tat))
+            self.assertAlmostEqual(row['avg_tat'], tat.mean())
+            self.assertAlmostEqual(row['max_tat'], tat.max())
+            self.assertAlmostEqual(row['p95_tat'] / tat.quantile(0.95), 1.0, delta=0.03)
+
+        compliance = cube.compliance(60, by=['queue'], priority='stat')
+        stat = self.events[self.events['priority'] == 'stat']
+        expected = (stat['tat_minutes'] <= 60).groupby(stat['queue'], observed=True).mean()
+        for queue, rate in expected.items():
+            self.assertAlmostEqual(compliance.loc[queue], rate, delta=0.02)
+
+    def test_incremental_update_equals_full_build(self):
+        days = self.events['timestamp'].dt.normalize()
+        last_day = days.max()
+        cube = KpiCube.from_events(self.events[days < last_day], normalized=True)
+        cube.update(self.events[days == last_day], normalized=True)
+        full = KpiCube.from_events(self.events, normalized=True)
+
+        for by in (['day'], ['shift', 'queue'], None):
+            pd.testing.assert_frame_equal(cube.rollup(by), full.rollup(by))
+        self.assertEqual(cube.days_loaded[-1], last_day)
+        self.assertEqual(len(cube.rollup(['hour'], day=last_day)), len(set(self.events.loc[days == last_day, 'timestamp'].dt.hour)))
+
+    def test_analyzer_tat_is_answered_from_the_cube(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            analyzer = LabPerformanceAnalyzer(tmp, events=self.events)
+            from_cube = analyzer.analyze_tat_data()
+            exact = analyzer.engine.tat_analysis()
+            self.assertEqual(list(from_cube['stat_performance']), list(exact['stat_performance']))
+            for shift, data in exact['stat_performance'].items():
+                self.assertAlmostEqual(from_cube['stat_performance'][shift]['avg_tat'], data['avg_tat'])
+                self.assertAlmostEqual(from_cube['stat_performance'][shift]['p95_tat'] / data['p95_tat'], 1.0, delta=0.03)
+                self.assertAlmostEqual(from_cube['stat_performance'][shift]['compliance_rate'],
+                                       data['compliance_rate'], delta=0.02)
+
+            # Loading events does not write the cache; saving is explicit
+            self.assertFalse(analyzer.cube_path.exists())
+            self.assertTrue(analyzer.save_cube())
+
+            # A persisted cube alone is enough for the summary
+            restarted = LabPerformanceAnalyzer(tmp)
+            self.assertTrue(restarted.load_cube())
+            restarted.analyze_tat_data()
+            summary = restarted.generate_performance_summary()
+            self.assertAlmostEqual(summary['kpi_status']['tat']['score'],
+                                   from_cube['overall_stat']['compliance_rate'] * 100)
+
+    def test_stale_persisted_cube_is_rebuilt_for_loaded_events(self):
+        days = self.events['timestamp'].dt.normalize()
+        older = self.events[days < days.max()]
+        with tempfile.TemporaryDirectory() as tmp:
+            LabPerformanceAnalyzer(tmp, events=older).save_cube()
+
+            analyzer = LabPerformanceAnalyzer(tmp, events=self.events)
+            self.assertTrue(analyzer.load_cube())
+            self.assertEqual(analyzer.drill_down(['priority'])['count'].sum(), len(self.events))
+            self.assertEqual(analyzer.cube.fingerprint, analyzer.events_fingerprint)
+
+    def test_appended_events_keep_the_cube_in_step(self):
+        days = self.events['timestamp'].dt.normalize()
+        with tempfile.TemporaryDirectory() as tmp:
+            analyzer = LabPerformanceAnalyzer(tmp, events=self.events[days < days.max()])
+            cube = analyzer.cube
+            analyzer.append_events(self.events[days == days.max()])
+            # Folded in incrementally rather than rebuilt
+            self.assertIs(analyzer.cube, cube)
+            self.assertEqual(cube.fingerprint, analyzer.events_fingerprint)
+            self.assertEqual(analyzer.drill_down(['priority'])['count'].sum(), len(self.events))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import tempfile
+import unittest
+from pathlib import Path
+from utils.metrics_snapshot import MetricsSnapshot
+
+class TestMetricsSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.data_path = Path(self.tmp.name)
+        (self.data_path / 'tat.csv').write_text('tat\n42\n')
+        self.calls = []
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def builders(self):
+        def tat(data_path):
+            self.calls.append('tat')
+            return {'overall_compliance': 0.35, 'by_shift': {'day': [0.45, 75]}}
+        def staffing(data_path):
+            self.calls.append('staffing')
+            return {'fte_gap': 3.3}
+        return {'tat': tat, 'staffing': staffing}
+
+    def test_sections_built_lazily_once(self):
+        snapshot = MetricsSnapshot(self.data_path, self.builders())
+        self.assertEqual(self.calls, [])
+        self.assertEqual(snapshot['tat']['overall_compliance'], 0.35)
+        snapshot['tat']
+        self.assertEqual(self.calls, ['tat'])
+        self.assertEqual(snapshot.built, ['tat'])
+
+    def test_sections_read_only(self):
+        snapshot = MetricsSnapshot(self.data_path, self.builders())
+        with self.assertRaises(TypeError):
+            snapshot['tat']['overall_compliance'] = 1.0
+        with self.assertRaises(TypeError):
+            snapshot['tat']['by_shift']['day'][0] = 1.0
+
+    def test_shared_follows_the_data_version(self):
+        first = MetricsSnapshot.shared(self.data_path)
+        self.assertIs(MetricsSnapshot.shared(str(self.data_path)), first)
+        first['tat']
+        # The pickle under .cache is not part of the data version
+        self.assertIs(MetricsSnapshot.shared(self.data_path), first)
+
+        (self.data_path / 'tat.csv').write_text('tat\n42\n57\n')
+        self.assertIsNot(MetricsSnapshot.shared(self.data_path), first)
+
+    def test_sections_persist_across_runs(self):
+        MetricsSnapshot(self.data_path, self.builders())['tat']
+        cached = list((self.data_path / '.cache').glob('metrics_snapshot-*.pkl'))
+        self.assertEqual(len(cached), 1)
+
+        # A later run against the same data loads the section instead of building it
+        later = MetricsSnapshot(self.data_path, self.builders())
+        self.assertEqual(later.built, ['tat'])
+        self.assertEqual(later['tat']['by_shift']['day'][1], 75)
+        self.assertEqual(self.calls, ['tat'])
+
+        # Changed data is a new version; the old pickle is replaced
+        (self.data_path / 'tat.csv').write_text('tat\n42\n57\n')
+        changed = MetricsSnapshot(self.data_path, self.builders())
+        self.assertNotEqual(changed.version, later.version)
+        self.assertEqual(changed.built, [])
+        changed['tat']
+        self.assertEqual(self.calls, ['tat', 'tat'])
+        self.assertEqual([p.name for p in (self.data_path / '.cache').glob('metrics_snapshot-*.pkl')],
+                         [changed.cache_path.name])
+
+    def test_unreadable_pickle_is_rebuilt(self):
+        snapshot = MetricsSnapshot(self.data_path, self.builders())
+        snapshot.cache_path.parent.mkdir()
+        snapshot.cache_path.write_bytes(b'not a pickle')
+        with self.assertLogs('utils.metrics_snapshot', level='WARNING'):
+            rebuilt = MetricsSnapshot(self.data_path, self.builders())
+        self.assertEqual(rebuilt['tat']['overall_compliance'], 0.35)
+        self.assertEqual(self.calls, ['tat'])
+
+    def test_unknown_section(self):
+        with self.assertRaises(KeyError):
+            MetricsSnapshot(self.data_path, self.builders())['queues']
+
+if __name__ == '__main__':
+    unittest.main()
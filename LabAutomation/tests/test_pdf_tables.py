@@ -0,0 +1,105 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+from utils import pdf_tables
+from utils.pdf_tables import PdfTableExtractor, table_to_frame
+
+def tiny_pdf(rows, cell_width=120, cell_height=20):
+    """One-page PDF holding `rows` as a ruled Helvetica table"""
+    left, top = 50, 750
+    width, height = cell_width * len(rows[0]), cell_height * len(rows)
+    ops = [f"{left} {top - i * cell_height} m {left + width} {top - i * cell_height} l S"
+           for i in range(len(rows) + 1)]
+    ops += [f"{left + j * cell_width} {top} m {left + j * cell_width} {top - height} l S"
+            for j in range(len(rows[0]) + 1)]
+    for i, row in enumerate(rows):
+        for j, text in enumerate(row):
+            ops.append(f"BT /F1 10 Tf {left + j * cell_width + 4} {top - (i + 1) * cell_height + 6} Td "
+                       f"({text}) Tj ET")
+    content = "\n".join(ops).encode('latin-1')
+    return pdf_document([
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R "
+        b"/Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length " + str(len(content)).encode() + b" >>\nstream\n" + content + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ])
+
+def pdf_document(objects):
+    """Serialize numbered PDF objects with an xref table"""
+    pdf = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(pdf)
+    pdf += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    pdf += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    pdf += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(pdf)
+
+ROWS = [['Shift', 'STAT TAT', 'Volume'], ['Day', '42.5', '1,250'], ['Night', '55', '980']]
+
+class TestTableToFrame(unittest.TestCase):
+    def test_header_and_numeric_columns(self):
+        frame = table_to_frame([[None, None, None], ['Shift', 'STAT  TAT', 'Volume'],
+                                ['Day', '42.5', '1,250'], ['Night', '55%', None]])
+        self.assertEqual(list(frame.columns), ['Shift', 'STAT TAT', 'Volume'])
+        self.assertEqual(frame['STAT TAT'].tolist(), [42.5, 55.0])
+        self.assertEqual(frame['Volume'].iloc[0], 1250)
+        self.assertEqual(frame['Shift'].tolist(), ['Day', 'Night'])
+
+    def test_empty_table(self):
+        self.assertTrue(table_to_frame([[None, ''], ['  ', None]]).empty)
+
+@unittest.skipUnless(pdf_tables.PDFPLUMBER_AVAILABLE, "pdfplumber not installed")
+class TestPdfTableExtractor(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.pdf_path = Path(self.tmp.name) / 'stat_tat_report.pdf'
+        self.pdf_path.write_bytes(tiny_pdf(ROWS))
+        self.extractor = PdfTableExtractor(Path(self.tmp.name) / 'cache', max_workers=1)
+
+    def test_extracts_the_table(self):
+        frames = self.extractor.extract(self.pdf_path)
+        self.assertEqual(len(frames), 1)
+        frame = frames[0]
+        self.assertEqual(list(frame.columns), ['Shift', 'STAT TAT', 'Volume'])
+        self.assertEqual(frame['STAT TAT'].tolist(), [42.5, 55])
+        self.assertEqual(frame['Volume'].tolist(), [1250, 980])
+        self.assertEqual(frame.attrs, {'source': 'stat_tat_report.pdf', 'page': 1, 'table': 0})
+
+    def test_unchanged_report_is_served_from_cache(self):
+        first = self.extractor.extract(self.pdf_path)
+        # A renamed copy has the same content hash
+        copy_path = self.pdf_path.with_name('copy.pdf')
+        copy_path.write_bytes(self.pdf_path.read_bytes())
+        with mock.patch('utils.pdf_tables._extract_pages') as extract_pages:
+            second = self.extractor.extract_many([self.pdf_path, copy_path])
+        extract_pages.assert_not_called()
+        self.assertEqual(second[str(copy_path)][0].to_dict(), first[0].to_dict())
+
+        self.pdf_path.write_bytes(tiny_pdf(ROWS[:2]))
+        self.assertEqual(len(self.extractor.extract(self.pdf_path)[0]), 1)
+
+    def test_cache_hit_reports_the_requested_file(self):
+        self.extractor.extract(self.pdf_path)
+        copy_path = self.pdf_path.with_name('copy.pdf')
+        copy_path.write_bytes(self.pdf_path.read_bytes())
+        self.assertEqual(self.extractor.extract(copy_path)[0].attrs['source'], 'copy.pdf')
+        self.assertEqual(self.extractor.extract(self.pdf_path)[0].attrs['source'], 'stat_tat_report.pdf')
+
+    def test_empty_pdf_is_cached(self):
+        empty_path = Path(self.tmp.name) / 'empty.pdf'
+        empty_path.write_bytes(pdf_document([b"<< /Type /Catalog /Pages 2 0 R >>",
+                                             b"<< /Type /Pages /Kids [] /Count 0 >>"]))
+        self.assertEqual(self.extractor.extract(empty_path), [])
+        with mock.patch('utils.pdf_tables._page_count') as page_count:
+            self.assertEqual(self.extractor.extract(empty_path), [])
+        page_count.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
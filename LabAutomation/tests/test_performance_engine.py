@@ -0,0 +1,114 @@
+import unittest
+import pandas as pd
+from utils.performance_engine import PerformanceEngine, normalize_events
+
+KPIS = {
+    'tat': {'stat_target': 60, 'routine_target': 240, 'critical_target': 30},
+    'staffing': {'idle_time_target': 0.20, 'utilization_target': 0.80},
+    'queue': {'wait_time_target': 15, 'no_show_target': 0.10}
+}
+
+class TestColumnMapping(unittest.TestCase):
+    def test_status_and_stat_flag_do_not_take_tat(self):
+        events = normalize_events(pd.DataFrame({
+            'Status': ['Final', 'Final'],
+            'STAT Flag': ['Y', 'N'],
+            'TAT Minutes': [30, 50],
+            'Priority': ['STAT', 'Routine']
+        }))
+        self.assertEqual(events['tat_minutes'].tolist(), [30, 50])
+        self.assertNotIn('Status', events.columns)
+
+    def test_non_numeric_match_does_not_block_later_column(self):
+        events = normalize_events(pd.DataFrame({
+            'TAT Category': ['fast', 'slow'],
+            'Turnaround Minutes': ['20', '75']
+        }))
+        self.assertEqual(events['tat_minutes'].tolist(), [20, 75])
+
+    def test_wait_and_active_minutes_stay_numeric(self):
+        events = normalize_events(pd.DataFrame({
+            'Queue Wait Minutes': [5, 12],
+            'Queue': ['Chemistry', 'Hematology'],
+            'Station Active Minutes': [40, 45],
+            'Station': ['Station 1', 'Station 2']
+        }))
+        self.assertEqual(events['wait_minutes'].tolist(), [5, 12])
+        self.assertEqual(events['queue'].tolist(), ['chemistry', 'hematology'])
+        self.assertEqual(events['busy_minutes'].tolist(), [40, 45])
+        self.assertEqual(events['station'].tolist(), ['station_1', 'station_2'])
+
+    def test_patients_and_encounters_are_separate(self):
+        events = normalize_events(pd.DataFrame({
+            'Patient ID': ['P1', 'P1'],
+            'Encounter ID': ['E1', 'E2']
+        }))
+        self.assertEqual(events['patient_id'].tolist(), ['P1', 'P1'])
+        self.assertEqual(events['encounter_id'].tolist(), ['E1', 'E2'])
+
+class TestPerformanceEngine(unittest.TestCase):
+    def test_tat_by_shift(self):
+        engine = PerformanceEngine(pd.DataFrame({
+            'TAT Minutes': [30, 90, 40, 50, 200],
+            'Priority': ['STAT', 'STAT', 'STAT', 'STAT', 'Routine'],
+            'Shift': ['Day', 'Day', 'Night', 'Night', 'Day']
+        }), KPIS)
+        analysis = engine.tat_analysis()
+        stat = analysis['stat_performance']
+        self.assertAlmostEqual(stat['all_shift']['avg_tat'], 52.5)
+        self.assertAlmostEqual(stat['all_shift']['compliance_rate'], 0.75)
+        self.assertAlmostEqual(stat['day_shift']['avg_tat'], 60.0)
+        self.assertAlmostEqual(stat['night_shift']['compliance_rate'], 1.0)
+        self.assertEqual(analysis['shift_comparison']['best_shift'], 'night_shift')
+        self.assertTrue(analysis['overall_stat']['target_met'])
+        self.assertAlmostEqual(analysis['routine_performance']['all_shift']['avg_tat'], 200.0)
+
+    def test_staffing_idle_and_utilization(self):
+        engine = PerformanceEngine(pd.DataFrame({
+            'Station': ['A', 'A', 'B'],
+            'Idle Minutes': [10, 10, 30],
+            'Busy Minutes': [40, 40, 70]
+        }), KPIS)
+        staffing = engine.staffing_analysis()
+        self.assertAlmostEqual(staffing['idle_time']['a']['idle_time'], 0.2)
+        self.assertAlmostEqual(staffing['utilization']['b'], 0.7)
+        self.assertAlmostEqual(staffing['overall']['avg_idle_time'], 0.25)
+        self.assertFalse(staffing['overall']['idle_time_target_met'])
+
+    def test_volume_counts_encounters_not_patients(self):
+        engine = PerformanceEngine(pd.DataFrame({
+            'Collected Date': ['2024-01-05 08:00', '2024-01-05 09:00', '2024-02-01 13:00', '2024-02-02 13:30'],
+            'Patient ID': ['P1', 'P1', 'P1', 'P2'],
+            'Encounter ID': ['E1', 'E2', 'E3', 'E4'],
+            'Priority': ['STAT', 'Routine', 'Routine', 'Routine']
+        }), KPIS)
+        volume = engine.volume_analysis()
+        self.assertEqual(volume['patient_encounters']['january'], 2)
+        self.assertEqual(volume['patient_encounters']['february'], 2)
+        self.assertEqual(volume['patient_encounters']['ytd_total'], 4)
+        self.assertEqual(volume['lab_volumes']['routine_tests']['volume'], 3)
+        self.assertAlmostEqual(volume['lab_volumes']['stat_tests']['percentage'], 0.25)
+        self.assertEqual(volume['peak_hours']['morning_peak']['hour'], '8-10')
+
+    def test_queue_waits_and_no_shows(self):
+        engine = PerformanceEngine(pd.DataFrame({
+            'Queue': ['Lab', 'Lab', 'Lab', 'Blood Draw'],
+            'Queue Wait Minutes': [5, 10, 30, 8],
+            'No Show': ['No', 'Yes', 'No', 'No']
+        }), KPIS)
+        queue = engine.queue_analysis()
+        self.assertAlmostEqual(queue['wait_times']['lab_queue']['avg_wait'], 15.0)
+        self.assertFalse(queue['wait_times']['lab_queue']['target_met'])
+        self.assertTrue(queue['wait_times']['blood_draw_queue']['target_met'])
+        self.assertEqual(queue['queue_types']['lab']['volume'], 3)
+        self.assertAlmostEqual(queue['no_show_rates']['overall_rate'], 0.25)
+
+    def test_missing_columns_return_none(self):
+        engine = PerformanceEngine(pd.DataFrame({'Status': ['Final']}), KPIS)
+        self.assertIsNone(engine.tat_analysis())
+        self.assertIsNone(engine.staffing_analysis())
+        self.assertIsNone(engine.volume_analysis())
+        self.assertIsNone(engine.queue_analysis())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import asyncio
+import random
+import unittest
+from automation.polling_scheduler import PollingScheduler, PollPolicy, change_signal
+from tests import FakeClock
+
+class TestPollingScheduler(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.queue_values = iter([{'average_wait': 5}, {'average_wait': 12}, {'average_wait': 4}])
+        self.calls = {'queue': 0, 'incidents': 0}
+
+        async def queue():
+            self.calls['queue'] += 1
+            return next(self.queue_values)
+
+        async def incidents():
+            self.calls['incidents'] += 1
+            return ['INC-1']
+
+        self.scheduler = PollingScheduler(
+            {'queue': queue, 'incidents': incidents},
+            {'queue': PollPolicy(60, 15, 300, jitter=0), 'incidents': PollPolicy(600, 120, 1800, jitter=0)},
+            clock=self.clock, rng=random.Random(0)
+        )
+
+    def run_due(self):
+        return asyncio.run(self.scheduler.run_due())
+
+    def test_each_source_on_its_own_interval(self):
+        self.assertEqual(self.run_due(), {'queue': True, 'incidents': True})
+        self.assertEqual(self.scheduler.seconds_until_due(), 60)
+        self.clock.now = 60
+        self.assertEqual(self.run_due(), {'queue': True})
+        self.assertEqual(self.calls, {'queue': 2, 'incidents': 1})
+
+    def test_volatile_source_speeds_up_and_stable_source_slows_down(self):
+        self.run_due()
+        self.clock.now = 600
+        self.run_due()
+        stats = self.scheduler.stats()
+        # Queue wait jumped from 5 to 12 minutes; incidents did not change
+        self.assertEqual(stats['queue']['interval_seconds'], 30)
+        self.assertEqual(stats['incidents']['interval_seconds'], 900)
+
+    def test_pressure_keeps_polling_fast_near_threshold(self):
+        self.scheduler.pressure = {'queue': lambda data: data['average_wait'] / 5}
+        self.run_due()
+        self.assertEqual(self.scheduler.stats()['queue']['interval_seconds'], 30)
+
+    def test_timeout_and_failure_back_off(self):
+        async def slow():
+            await asyncio.sleep(1)
+
+        async def broken():
+            raise ConnectionError('bio-rad down')
+
+        scheduler = PollingScheduler(
+            {'equipment': slow, 'qc': broken},
+            {'equipment': PollPolicy(60, 15, 300, timeout_seconds=0.01, jitter=0),
+             'qc': PollPolicy(60, 15, 90, jitter=0)},
+            clock=self.clock
+        )
+        self.assertEqual(asyncio.run(scheduler.run_due()), {'equipment': False, 'qc': False})
+        self.assertEqual(scheduler.errors['qc'], 'bio-rad down')
+        self.assertIn('timed out', scheduler.errors['equipment'])
+        self.assertEqual(scheduler.stats()['equipment']['interval_seconds'], 120)
+        self.assertEqual(scheduler.stats()['qc']['interval_seconds'], 90)
+
+    def test_outage_keeps_last_good_value_and_backs_off(self):
+        qmatic_up = True
+
+        async def queue():
+            if not qmatic_up:
+                raise ConnectionError('Qmatic unavailable (open): timeout')
+            return {'average_wait': 5}
+
+        scheduler = PollingScheduler({'queue': queue}, {'queue': PollPolicy(60, 15, 300, jitter=0)},
+                                     clock=self.clock)
+        asyncio.run(scheduler.run_due())
+        qmatic_up = False
+        self.clock.now = 60
+        self.assertEqual(asyncio.run(scheduler.run_due()), {'queue': False})
+        self.assertEqual(scheduler.values['queue'], {'average_wait': 5})
+        self.assertIn('Qmatic unavailable', scheduler.errors['queue'])
+        stats = scheduler.stats()['queue']
+        self.assertEqual((stats['failures'], stats['interval_seconds']), (1, 120))
+
+    def test_change_signal(self):
+        self.assertEqual(change_signal({'a': 10, 'b': 'x'}, {'a': 10, 'b': 'x'}), 0.0)
+        self.assertEqual(change_signal({'a': 10}, {'a': 15}), 0.5)
+        self.assertEqual(change_signal([1, 2], [1, 2, 3, 4]), 1.0)
+        self.assertEqual(change_signal({'a': 1}, {'b': 1}), 1.0)
+
+if __name__ == '__main__':
+    unittest.main()
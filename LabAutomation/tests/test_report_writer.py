@@ -0,0 +1,54 @@
+import io
+import json
+import tempfile
+import unittest
+import numpy as np
+from performance_management_system import PerformanceManagementSystem
+from utils.report_writer import blank, field, item, line, numbered, rule, section, stream_report, title
+
+class TestReportWriter(unittest.TestCase):
+    def blocks(self):
+        yield rule('=')
+        yield title("LAB REPORT")
+        yield blank()
+        yield section("TAT <ANALYSIS>")
+        yield field("Compliance Rate", "85.0%", np.float64(0.85))
+        yield line("TAT by Shift:")
+        yield item("Day Shift: 42.0 min")
+        yield numbered(1, "Add staff")
+
+    def test_single_pass_to_all_formats(self):
+        streams = {fmt: io.StringIO() for fmt in ('text', 'markdown', 'html', 'json')}
+        self.assertEqual(stream_report(self.blocks(), streams, "Lab Report"), 8)
+
+        self.assertEqual(streams['text'].getvalue(), "\n".join([
+            "=" * 80, "LAB REPORT", "", "TAT <ANALYSIS>", "-" * 40,
+            "Compliance Rate: 85.0%", "TAT by Shift:", "  Day Shift: 42.0 min", "1. Add staff"]))
+        self.assertIn("## TAT <ANALYSIS>", streams['markdown'].getvalue())
+        self.assertIn("<h2>TAT &lt;ANALYSIS&gt;</h2>", streams['html'].getvalue())
+
+        document = json.loads(streams['json'].getvalue())
+        self.assertEqual(document['title'], "Lab Report")
+        entries = document['sections'][1]['entries']
+        self.assertEqual(entries[0], {'label': 'Compliance Rate', 'value': 0.85, 'display': '85.0%'})
+        self.assertEqual(entries[-1], {'item': 'Add staff', 'number': 1})
+
+    def test_unknown_format_rejected(self):
+        with self.assertRaises(ValueError):
+            stream_report(self.blocks(), {'pdf': io.StringIO()})
+
+    def test_crisis_report_returns_paths(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = PerformanceManagementSystem().generate_crisis_report(formats=('text', 'json'), output_dir=tmp)
+            self.assertEqual(sorted(paths), ['json', 'text'])
+            with open(paths['text'], encoding='utf-8') as f:
+                text = f.read()
+            with open(paths['json'], encoding='utf-8') as f:
+                document = json.load(f)
+        self.assertTrue(text.startswith("=" * 80 + "\nCRITICAL PERFORMANCE CRISIS REPORT\n"))
+        self.assertIn("STAFFING SOLUTIONS\n" + "-" * 40 + "\n• ", text)
+        self.assertNotIn("++", text)
+        self.assertEqual(document['title'], "Critical Performance Crisis Report")
+
+if __name__ == '__main__':
+    unittest.main()
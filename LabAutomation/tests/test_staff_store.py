@@ -0,0 +1,49 @@
+import unittest
+import numpy as np
+from utils.staff_store import StaffStore
+
+class TestStaffStore(unittest.TestCase):
+    def setUp(self):
+        self.store = StaffStore.from_profiles({
+            'staff_1': {'name': 'A', 'station': 'Station 1', 'position': 'Phlebotomist', 'performance_rating': 2.5,
+                        'tat_compliance': 0.25, 'idle_time': 0.65, 'break_violations': 8},
+            'staff_2': {'name': 'B', 'station': 'Station 2', 'position': 'Lab Technician', 'performance_rating': 3.0,
+                        'tat_compliance': 0.30, 'idle_time': 0.58, 'break_violations': 5},
+            'staff_3': {'name': 'C', 'station': 'Station 1', 'position': 'Phlebotomist', 'performance_rating': 1.5,
+                        'tat_compliance': 0.15, 'idle_time': 0.72, 'break_violations': 12, 'supervisor': 'Lee'},
+            'staff_4': {'name': 'D', 'station': 'Station 4', 'position': 'Lab Technician', 'performance_rating': 4.2,
+                        'tat_compliance': 0.92, 'idle_time': 0.10, 'break_violations': 0},
+        })
+
+    def test_indexes_and_filters(self):
+        self.assertEqual(self.store.filter(station='Station 1'), ['staff_1', 'staff_3'])
+        self.assertEqual(self.store.filter(position='Phlebotomist', idle_time=(0.7, None)), ['staff_3'])
+        self.assertEqual(self.store.filter(supervisor='Lee'), ['staff_3'])
+        self.assertEqual(self.store.filter(station=['Station 2', 'Station 4']), ['staff_2', 'staff_4'])
+        self.assertEqual(self.store.filter(station='Station 9'), [])
+        self.assertEqual(self.store.counts('risk_tier'), {'critical': 1, 'high': 1, 'moderate': 1, 'low': 1})
+
+    def test_top_k(self):
+        self.assertEqual([s for s, _ in self.store.top_k('break_violations', 2)], ['staff_3', 'staff_1'])
+        self.assertEqual(self.store.top_k('tat_compliance', 1, largest=False, position='Lab Technician'),
+                         [('staff_2', np.float32(0.30).item())])
+
+    def test_records_and_replace(self):
+        record = self.store.record('staff_2')
+        self.assertEqual((record['name'], record['tat_compliance'], record['risk_tier']), ('B', 0.3, 'moderate'))
+        self.store.add('staff_2', {'name': 'B', 'station': 'Station 1', 'performance_rating': 1.0})
+        self.assertEqual(len(self.store), 4)
+        self.assertEqual(self.store.filter(station='Station 1', risk_tier='critical'), ['staff_2', 'staff_3'])
+
+    def test_scales_past_initial_capacity(self):
+        store = StaffStore(capacity=2)
+        rng = np.random.default_rng(1)
+        ratings = rng.uniform(1, 5, 5000)
+        for i, rating in enumerate(ratings):
+            store.add(f"staff_{i}", {'station': f"Station {i % 40}", 'performance_rating': rating})
+        self.assertEqual(len(store.filter(station='Station 3')), 125)
+        top = store.top_k('performance_rating', 3)
+        self.assertEqual([value for _, value in top], sorted(ratings.astype(np.float32).tolist())[-3:][::-1])
+
+if __name__ == '__main__':
+    unittest.main()
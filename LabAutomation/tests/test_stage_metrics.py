@@ -0,0 +1,72 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+import urllib.request
+from utils.stage_metrics import LatencyHistogram, StageMetrics
+
+class TestStageMetrics(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'stage_metrics.jsonl')
+        self.metrics = StageMetrics('test_system', rolling_path=self.path)
+
+    def tearDown(self):
+        self.metrics.shutdown()
+        self.tmp.cleanup()
+
+    def test_histogram_quantiles(self):
+        histogram = LatencyHistogram()
+        for _ in range(90):
+            histogram.observe(0.02)
+        for _ in range(10):
+            histogram.observe(3.0)
+        self.assertLessEqual(histogram.quantile(0.5), 0.025)
+        self.assertGreater(histogram.quantile(0.95), 2.5)
+        self.assertEqual(histogram.summary()['max_seconds'], 3.0)
+
+    def test_stages_rows_errors_and_calls(self):
+        async def collect_queue():
+            async with self.metrics.call('Qmatic'):
+                return [{'station': 1}, {'station': 2}]
+
+        async def collect_qc():
+            async with self.metrics.call('Bio-Rad Unity'):
+                raise ConnectionError('bio-rad down')
+
+        asyncio.run(self.metrics.wrap('collect_queue', collect_queue)())
+        with self.assertRaises(ConnectionError):
+            asyncio.run(self.metrics.wrap('collect_qc', collect_qc)())
+        self.metrics.record_error('collect_queue')
+
+        snapshot = self.metrics.snapshot()
+        self.assertEqual(snapshot['stages']['collect_queue']['rows'], 2)
+        self.assertEqual(snapshot['stages']['collect_queue']['errors'], 1)
+        self.assertEqual(snapshot['stages']['collect_qc']['errors'], 1)
+        self.assertEqual(snapshot['outbound']['Bio-Rad Unity']['errors'], 1)
+        self.assertEqual(snapshot['outbound']['Qmatic']['count'], 1)
+
+        text = self.metrics.prometheus()
+        self.assertIn('lab_stage_duration_seconds_bucket{system="test_system",stage="collect_queue",le="+Inf"} 1', text)
+        self.assertIn('lab_stage_rows_total{system="test_system",stage="collect_queue"} 2', text)
+        self.assertIn('lab_outbound_call_errors_total{system="test_system",target="Bio-Rad Unity"} 1', text)
+
+    def test_endpoint_and_rolling_file(self):
+        self.metrics.observe('cycle', 0.3, rows=5)
+        server = self.metrics.serve(port=0)
+        port = server.server_address[1]
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics.json") as response:
+            self.assertEqual(json.load(response)['stages']['cycle']['rows'], 5)
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+            self.assertIn(b'lab_stage_duration_seconds_count', response.read())
+
+        self.metrics.write_snapshot()
+        self.metrics.write_snapshot()
+        with open(self.path) as f:
+            lines = f.read().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(json.loads(lines[0])['system'], 'test_system')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import pickle
+import unittest
+from unittest import mock
+import numpy as np
+import pandas as pd
+from utils.streaming_stats import DistinctCounter, HyperLogLog, QuantileSketch, StreamingMetrics, hash_values
+
+class TestStreamingStats(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.df = pd.DataFrame({
+            'patient_id': rng.integers(0, 500, 5000),
+            'Collected Date': pd.date_range('2024-01-01', periods=5000, freq='h').astype(str),
+            'TAT Minutes': rng.gamma(2.0, 20.0, 5000),
+            'Test Count': rng.integers(1, 5, 5000)
+        })
+        self.df.loc[::50, 'TAT Minutes'] = np.nan
+
+    def test_quantile_sketch_relative_accuracy(self):
+        values = self.df['TAT Minutes'].dropna().to_numpy()
+        sketch = QuantileSketch(relative_accuracy=0.01)
+        sketch.update(values)
+        for q in (0.5, 0.95, 0.99):
+            exact = np.quantile(values, q)
+            self.assertAlmostEqual(sketch.quantile(q) / exact, 1.0, delta=0.03)
+
+    def test_chunked_metrics_match_full_frame(self):
+        accumulator = StreamingMetrics()
+        for start in range(0, len(self.df), 700):
+            accumulator.update(self.df.iloc[start:start + 700])
+        metrics = accumulator.finalize()
+
+        tat = metrics['tat_analysis']['TAT Minutes']
+        self.assertEqual(metrics['summary_stats']['total_records'], 5000)
+        self.assertEqual(metrics['summary_stats']['unique_patients'], self.df['patient_id'].nunique())
+        self.assertEqual(tat['null_count'], 100)
+        self.assertAlmostEqual(tat['mean'], self.df['TAT Minutes'].mean())
+        self.assertAlmostEqual(tat['std'], self.df['TAT Minutes'].std())
+        self.assertEqual(metrics['volume_analysis']['Test Count']['total'], self.df['Test Count'].sum())
+        self.assertEqual(metrics['trends']['Collected Date']['total_days'], 209)
+
+    def test_merge_equals_single_pass(self):
+        left, right, whole = StreamingMetrics(), StreamingMetrics(), StreamingMetrics()
+        left.update(self.df.iloc[:2000])
+        right.update(self.df.iloc[2000:])
+        whole.update(self.df)
+        left.merge(right)
+        merged, single = left.finalize(), whole.finalize()
+        self.assertEqual(merged['summary_stats'], single['summary_stats'])
+        self.assertAlmostEqual(merged['tat_analysis']['TAT Minutes']['std'],
+                               single['tat_analysis']['TAT Minutes']['std'])
+        self.assertEqual(merged['trends'], single['trends'])
+
+    def test_hyperloglog_estimate_and_merge(self):
+        ids = np.arange(200000)
+        left, right = HyperLogLog(error=0.01), HyperLogLog(error=0.01)
+        left.update(ids[:120000])
+        right.update(ids[80000:])
+        left.merge(right)
+        self.assertAlmostEqual(left.count() / 200000, 1.0, delta=0.03)
+
+    def test_distinct_counter_switches_to_estimate(self):
+        small = DistinctCounter(exact_limit=1000)
+        small.update(pd.Series([1, 2, 2, 3, None]))
+        self.assertTrue(small.is_exact)
+        self.assertEqual(small.count(), 3)
+
+        large = DistinctCounter(exact_limit=1000)
+        large.update(pd.Series(np.arange(5000)))
+        large.merge(small)
+        self.assertFalse(large.is_exact)
+        self.assertAlmostEqual(large.count() / 5000, 1.0, delta=0.03)
+
+    def test_distinct_counter_normalizes_like_the_sketch(self):
+        chunks = [pd.Series([123, 456, 789]), pd.Series(['123', '456', '1000'])]
+        exact = DistinctCounter(exact_limit=None)
+        sketch = DistinctCounter(exact_limit=0)
+        for chunk in chunks:
+            exact.update(chunk)
+            sketch.update(chunk)
+        self.assertTrue(exact.is_exact)
+        self.assertFalse(sketch.is_exact)
+        self.assertEqual(exact.count(), 4)
+        self.assertEqual(sketch.count(), 4)
+
+        # Crossing the limit mid-stream keeps the same count
+        switching = DistinctCounter(exact_limit=3)
+        for chunk in chunks:
+            switching.update(chunk)
+        self.assertFalse(switching.is_exact)
+        self.assertEqual(switching.count(), 4)
+
+    def test_categorical_chunks_hash_categories_once(self):
+        ids = pd.Series(pd.Categorical.from_codes(
+            np.random.default_rng(3).integers(0, 20000, 50000).astype('int32'),
+            categories=[f"P{i:06d}" for i in range(20000)]
+        ))
+        counter = DistinctCounter(exact_limit=1000)
+        with mock.patch('pandas.util.hash_array', wraps=pd.util.hash_array) as hash_array:
+            for start in range(0, len(ids), 5000):
+                counter.update(ids.iloc[start:start + 5000])
+        # One call to promote the exact set, one for the shared category table
+        self.assertEqual(hash_array.call_count, 2)
+        self.assertAlmostEqual(counter.count() / ids.nunique(), 1.0, delta=0.03)
+
+        restored = pickle.loads(pickle.dumps(counter.sketch))
+        self.assertIsNone(restored.category_hashes.categories)
+        self.assertEqual(restored.count(), counter.count())
+
+    def test_categorical_hashes_match_plain_values(self):
+        values = pd.Series(['b', None, 'a', 'b'])
+        categorical = values.astype('category')
+        np.testing.assert_array_equal(hash_values(categorical), hash_values(values))
+
+if __name__ == "__main__":
+    unittest.main()
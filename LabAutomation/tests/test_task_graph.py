@@ -0,0 +1,52 @@
+import threading
+import unittest
+from utils.task_graph import TaskGraph
+
+class TestTaskGraph(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def step(self, name, value=None):
+        def run():
+            with self.lock:
+                self.calls.append(name)
+            return value if value is not None else name
+        return run
+
+    def test_dependencies_run_first(self):
+        graph = (TaskGraph('test')
+                 .add('report', self.step('report'), depends_on=['summary'])
+                 .add('summary', self.step('summary'), depends_on=['a', 'b'])
+                 .add('a', self.step('a'))
+                 .add('b', self.step('b')))
+        results = graph.run()
+        self.assertEqual(results, {'a': 'a', 'b': 'b', 'summary': 'summary', 'report': 'report'})
+        self.assertEqual(self.calls[2:], ['summary', 'report'])
+        self.assertEqual(set(graph.timings), {'a', 'b', 'summary', 'report'})
+
+    def test_results_memoized_per_version(self):
+        graph = TaskGraph('test').add('a', self.step('a')).add('b', self.step('b'), depends_on=['a'])
+        graph.run(version=1)
+        graph.run(version=1)
+        self.assertEqual(self.calls, ['a', 'b'])
+        self.assertTrue(all(timing['cached'] for timing in graph.timings.values()))
+        graph.run(version=2)
+        graph.run()
+        self.assertEqual(self.calls, ['a', 'b'] * 3)
+
+    def test_failure_stops_dependents(self):
+        def fail():
+            raise RuntimeError('boom')
+        graph = TaskGraph('test').add('a', fail).add('b', self.step('b'), depends_on=['a'])
+        with self.assertRaises(RuntimeError):
+            graph.run()
+        self.assertEqual(self.calls, [])
+
+    def test_cycle_rejected(self):
+        graph = TaskGraph('test').add('a', self.step('a'), depends_on=['b']).add('b', self.step('b'), depends_on=['a'])
+        with self.assertRaises(ValueError):
+            graph.run()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+from datetime import datetime
+import numpy as np
+from utils.tat_window import TatWindowTracker, shift_for_hour
+
+BASE = datetime(2024, 3, 4, 8, 0).timestamp()
+
+class TestTatWindowTracker(unittest.TestCase):
+    def test_percentiles_within_accuracy(self):
+        rng = np.random.default_rng(7)
+        tat = rng.lognormal(3.5, 0.6, 5000)
+        tracker = TatWindowTracker(relative_accuracy=0.01)
+        for i, value in enumerate(tat):
+            tracker.record(float(value), 'stat', timestamp=BASE + i * 0.1)
+
+        snapshot = tracker.snapshot('15m', priority='stat')
+        self.assertEqual(snapshot['count'], 5000)
+        for q in (0.5, 0.9, 0.99):
+            expected = np.quantile(tat, q)
+            self.assertAlmostEqual(snapshot[f"p{int(q * 100)}"] / expected, 1, delta=0.03)
+        self.assertAlmostEqual(snapshot['compliance'], np.mean(tat <= 60))
+        self.assertEqual(tracker.snapshot('15m', shift='day')['count'], 5000)
+
+    def test_windows_expire(self):
+        tracker = TatWindowTracker(targets={'routine': 30})
+        tracker.record(20, 'routine', timestamp=BASE)
+        tracker.record(50, 'routine', timestamp=BASE + 30 * 60)
+        self.assertEqual(tracker.snapshot('15m')['count'], 1)
+        self.assertEqual(tracker.snapshot('1h')['count'], 2)
+        self.assertEqual(tracker.snapshot('1h')['compliance'], 0.5)
+
+        tracker.advance(BASE + 25 * 3600)
+        self.assertEqual(tracker.snapshot('24h')['count'], 0)
+        self.assertIsNone(tracker.snapshot('24h')['p50'])
+        self.assertFalse(tracker.record(10, 'routine', timestamp=BASE))
+
+    def test_late_event_counts_only_in_covering_windows(self):
+        tracker = TatWindowTracker()
+        tracker.record(10, 'stat', timestamp=BASE + 3600)
+        tracker.record(10, 'stat', timestamp=BASE + 1800)
+        self.assertEqual(tracker.snapshot('15m')['count'], 1)
+        self.assertEqual(tracker.snapshot('1h')['count'], 2)
+        tracker.advance(BASE + 3600 + 40 * 60)
+        self.assertEqual(tracker.snapshot('15m')['count'], 0)
+        self.assertEqual(tracker.snapshot('1h')['count'], 1)
+
+    def test_shift_for_hour(self):
+        self.assertEqual([shift_for_hour(h) for h in (7, 15, 23, 3)], ['day', 'evening', 'night', 'night'])
+
+if __name__ == '__main__':
+    unittest.main()
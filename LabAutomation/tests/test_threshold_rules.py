@@ -0,0 +1,113 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from automation.event_bus import EventBus, PerformanceRecord
+from config.config_manager import AlertThresholds, ConfigManager
+from utils.threshold_rules import CompiledRules, ThresholdEngine, ThresholdRule, load_rules
+
+THRESHOLDS = AlertThresholds(
+    tat_threshold_minutes=30,
+    performance_score_threshold=60,
+    error_rate_threshold=2.0,
+    break_time_threshold_minutes=60,
+    qc_completion_threshold=95
+)
+
+def record(staff, **overrides):
+    base = {'staff_member': staff, 'tat_target_met': True, 'performance_score': 90,
+            'error_count': 0, 'samples_processed': 100, 'break_time_minutes': 30,
+            'qc_completion_percent': 100}
+    base.update(overrides)
+    return base
+
+class TestThresholdRules(unittest.TestCase):
+    def test_messages_match_the_original_checks(self):
+        rules = CompiledRules(ThresholdEngine().rules, THRESHOLDS)
+        issues = rules.evaluate([
+            record('staff_1', tat_target_met=False, performance_score=45, error_count=5,
+                   break_time_minutes=75, qc_completion_percent=80),
+            record('staff_2')
+        ])
+        self.assertEqual(issues[0], [
+            "TAT target missed",
+            "Performance score low: 45",
+            "Error rate high: 5.0%",
+            "Break time exceeded: 75 minutes",
+            "QC completion low: 80%"
+        ])
+        self.assertEqual(issues[1], [])
+
+    def test_ratio_skipped_without_samples(self):
+        rules = CompiledRules(ThresholdEngine().rules, THRESHOLDS)
+        self.assertEqual(rules.evaluate([record('staff_1', error_count=4, samples_processed=0)]), [[]])
+
+    def test_violations_grouped_by_staff(self):
+        rules = CompiledRules(ThresholdEngine().rules, THRESHOLDS)
+        violations = rules.violations([
+            record('staff_1', performance_score=50),
+            record('staff_2'),
+            record('staff_1', break_time_minutes=90)
+        ])
+        self.assertEqual(violations, {
+            'staff_1': ["Performance score low: 50", "Break time exceeded: 90 minutes"]
+        })
+
+    def test_compiled_once_per_config_version(self):
+        engine = ThresholdEngine()
+        first = engine.compile(THRESHOLDS, version=1)
+        self.assertIs(engine.compile(THRESHOLDS, version=1), first)
+        stricter = AlertThresholds(30, 80, 2.0, 60, 95)
+        second = engine.compile(stricter, version=2)
+        self.assertIsNot(second, first)
+        self.assertEqual(second.violations([record('staff_1', performance_score=70)]),
+                         {'staff_1': ["Performance score low: 70"]})
+
+    def test_rules_file_replaces_and_extends(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'rules.json')
+            with open(path, 'w') as f:
+                json.dump([
+                    {'name': 'performance_score_low', 'field': 'performance_score', 'op': '<',
+                     'threshold': 40, 'message': "Score critical: {value}"},
+                    {'name': 'samples_low', 'field': 'samples_processed', 'op': '<',
+                     'threshold': 20, 'message': "Low sample volume: {value}"}
+                ], f)
+            rules = load_rules(path)
+        self.assertEqual([rule.name for rule in rules][-1], 'samples_low')
+        compiled = CompiledRules(rules, THRESHOLDS)
+        self.assertEqual(compiled.evaluate([record('staff_1', performance_score=50, samples_processed=10)]),
+                         [["Low sample volume: 10"]])
+        with self.assertRaises(ValueError):
+            ThresholdRule.from_dict({'name': 'x', 'field': 'y', 'op': '=<', 'threshold': 1, 'message': ''})
+
+    def test_config_manager_caches_thresholds_until_reload(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            config = ConfigManager(os.path.join(tmp, 'missing.env'))
+            version = config.config_version
+            self.assertIs(config.get_alert_thresholds(), config.get_alert_thresholds())
+            config.reload()
+            self.assertEqual(config.config_version, version + 1)
+
+    def test_bus_delivers_performance_records_in_batches(self):
+        batches = []
+
+        async def checker(events):
+            batches.append([event.metrics['staff_member'] for event in events])
+
+        async def run():
+            bus = EventBus()
+            bus.subscribe(PerformanceRecord, checker, name='threshold_checker', batch_size=10)
+            for i in range(3):
+                bus.publish(PerformanceRecord(record(f'staff_{i}')))
+            await bus.start()
+            await bus.stop()
+            return bus.stats()['threshold_checker']
+
+        stats = asyncio.run(run())
+        self.assertEqual(batches, [['staff_0', 'staff_1', 'staff_2']])
+        self.assertEqual(stats['handled'], 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+"""
+Kaiser Permanente Lab Automation System
+Row Change Detection
+
+Fingerprints the rows pushed to Power BI each cycle (keyed by, e.g., staff
+member and shift) and compares them with the fingerprints of the last
+successful push, so only new or changed rows are sent. A full resync runs
+on a fixed period so the dashboards cannot drift if a push was partially
+applied on the Power BI side.
+
+Fingerprints are only committed once the caller confirms the push
+succeeded; a failed push is retried with the same rows next cycle.
+"""
+
+import hashlib
+import logging
+import time
+from dataclasses import asdict, is_dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Resync everything at least this often
+DEFAULT_RESYNC_SECONDS = 3600
+
+
+def row_fields(row: Any) -> Dict[str, Any]:
+    """A dict, dataclass or plain object's fields as a dictionary"""
+    if isinstance(row, dict):
+        return row
+    if is_dataclass(row):
+        return asdict(row)
+    return vars(row)
+
+
+def fingerprint(fields: Dict[str, Any], ignore: Iterable[str] = ()) -> bytes:
+    """Stable digest of a row's values, excluding the ignored fields"""
+    ignore = set(ignore)
+    items = sorted((name, value) for name, value in fields.items() if name not in ignore)
+    return hashlib.blake2b(repr(items).encode('utf-8'), digest_size=16).digest()
+
+
+class ChangeTracker:
+    """
+    Per-dataset delta detection against the last pushed rows.
+
+    Usage each cycle:
+        rows = tracker.changed(all_rows)
+        if not rows or await push(rows):
+            tracker.commit()
+    """
+
+    def __init__(self, key_fields: Sequence[str], ignore_fields: Iterable[str] = (),
+                 resync_seconds: float = DEFAULT_RESYNC_SECONDS, clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize the tracker; the first call to changed() returns every row
+
+        Args:
+            key_fields: Fields identifying a row across cycles
+            ignore_fields: Fields left out of the fingerprint (e.g. fetch timestamps)
+            resync_seconds: Period of the full resync
+            clock: Monotonic time source (seconds)
+        """
+        self.key_fields = tuple(key_fields)
+        self.ignore_fields = tuple(ignore_fields)
+        self.resync_seconds = resync_seconds
+        self.clock = clock
+        self._pushed: Dict[Tuple, bytes] = {}
+        self._pending: Optional[Dict[Tuple, bytes]] = None
+        self._pending_full = False
+        self._last_full: Optional[float] = None
+        self.stats = {'rows_seen': 0, 'rows_sent': 0, 'full_syncs': 0}
+
+    def _keyed(self, rows: Sequence[Any]) -> List[Tuple[Tuple, bytes]]:
+        keyed = []
+        seen: Dict[Tuple, int] = {}
+        for row in rows:
+            fields = row_fields(row)
+            key = tuple(fields.get(name) for name in self.key_fields)
+            # Rows sharing a key are told apart by their order within it
+            occurrence = seen.get(key, 0)
+            seen[key] = occurrence + 1
+            keyed.append((key + (occurrence,), fingerprint(fields, self.ignore_fields)))
+        return keyed
+
+    def resync_due(self) -> bool:
+        """Whether the next changed() call will return every row"""
+        return self._last_full is None or self.clock() - self._last_full >= self.resync_seconds
+
+    def changed(self, rows: Sequence[Any], full: bool = False) -> List[Any]:
+        """
+        Rows that are new or differ from the last committed push
+
+        Args:
+            rows: Every current row
+            full: Return every row regardless of changes
+
+        Returns:
+            Rows to push, in their original order
+        """
+        keyed = self._keyed(rows)
+        self._pending = dict(keyed)
+        self._pending_full = full or self.resync_due()
+        if self._pending_full:
+            selected = list(rows)
+        else:
+            selected = [row for row, (key, digest) in zip(rows, keyed) if self._pushed.get(key) != digest]
+        self.stats['rows_seen'] += len(rows)
+        self.stats['rows_sent'] += len(selected)
+        logger.debug(f"{len(selected)} of {len(rows)} rows to push"
+                     f"{' (full resync)' if self._pending_full else ''}")
+        return selected
+
+    def commit(self) -> None:
+        """Record the rows from the last changed() call as pushed"""
+        if self._pending is None:
+            return
+        # Rows no longer present are dropped, so they are sent again if they return
+        self._pushed = self._pending
+        if self._pending_full:
+            self._last_full = self.clock()
+            self.stats['full_syncs'] += 1
+        self._pending = None
+
+    def reset(self) -> None:
+        """Forget what was pushed; the next cycle resyncs everything"""
+        self._pushed = {}
+        self._pending = None
+        self._last_full = None
@@ -0,0 +1,217 @@
+"""
+Kaiser Permanente Lab Automation System
+Chart Rendering Service
+
+Renders dashboard panels headlessly in a process pool. Charts are drawn
+on standalone Figure objects, so pyplot and the process-wide matplotlib
+backend are never touched. Every image is cached by a hash of the data, style and
+output mode, so an unchanged chart is copied from the cache instead of
+being drawn again. Print (300 dpi PNG), preview (low-dpi PNG) and SVG
+modes are available for reports and the portal.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Bump when drawing code changes so cached images are redrawn
+RENDER_VERSION = 1
+
+# mode -> (file format, dpi)
+RENDER_MODES: Dict[str, Tuple[str, Optional[int]]] = {
+    'print': ('png', 300),
+    'preview': ('png', 72),
+    'svg': ('svg', None),
+}
+
+DEFAULT_STYLE = 'seaborn-v0_8'
+
+
+@dataclass
+class ChartPanel:
+    """
+    One dashboard panel.
+
+    `series` entries hold 'values' plus optional 'label', 'color', 'alpha'
+    and 'marker'; bar series are drawn on top of each other in order.
+    """
+    name: str
+    title: str
+    x: List
+    series: List[Dict]
+    kind: str = 'bar'
+    ylabel: str = ''
+    target: Optional[float] = None
+    target_label: str = 'Target'
+    ylim: Optional[Tuple[float, float]] = None
+    rotation: int = 0
+    grid: bool = False
+    legend: bool = True
+    figsize: Tuple[float, float] = field(default=(7.5, 6.0))
+
+
+def _draw_panel(ax, panel: Dict) -> None:
+    for series in panel['series']:
+        options = {key: series[key] for key in ('label', 'color', 'alpha') if series.get(key) is not None}
+        if panel['kind'] == 'line':
+            ax.plot(panel['x'], series['values'], marker=series.get('marker', 'o'), linewidth=2,
+                    markersize=8, **options)
+        else:
+            ax.bar(panel['x'], series['values'], **options)
+    if panel['target'] is not None:
+        ax.axhline(y=panel['target'], color='red', linestyle='--', label=panel['target_label'])
+    ax.set_title(panel['title'])
+    ax.set_ylabel(panel['ylabel'])
+    if panel['ylim']:
+        ax.set_ylim(*panel['ylim'])
+    if panel['rotation']:
+        ax.tick_params(axis='x', rotation=panel['rotation'])
+    if panel['grid']:
+        ax.grid(True, alpha=0.3)
+    if panel['legend'] and ax.get_legend_handles_labels()[0]:
+        ax.legend()
+
+
+def _save(fig, path: str, fmt: str, dpi: Optional[int]) -> None:
+    tmp_path = f"{path}.tmp"
+    fig.savefig(tmp_path, format=fmt, dpi=dpi, bbox_inches='tight')
+    os.replace(tmp_path, path)
+
+
+def _render_panel(panel: Dict, style: str, path: str, fmt: str, dpi: Optional[int]) -> str:
+    """Process pool entry point: draw one panel to `path`"""
+    from matplotlib.figure import Figure
+    from matplotlib.style import context
+
+    with context(style):
+        fig = Figure(figsize=panel['figsize'])
+        ax = fig.subplots()
+        _draw_panel(ax, panel)
+        fig.tight_layout()
+        _save(fig, path, fmt, dpi)
+    return path
+
+
+def _render_dashboard(title: str, panels: List[Dict], layout: Tuple[int, int], figsize: Tuple[float, float],
+                      style: str, path: str, fmt: str, dpi: Optional[int]) -> str:
+    """Process pool entry point: draw all panels into one dashboard figure"""
+    from matplotlib.figure import Figure
+    from matplotlib.style import context
+
+    with context(style):
+        fig = Figure(figsize=figsize)
+        axes = fig.subplots(*layout, squeeze=False)
+        fig.suptitle(title, fontsize=16, fontweight='bold')
+        for ax, panel in zip(axes.flat, panels):
+            _draw_panel(ax, panel)
+        fig.tight_layout()
+        _save(fig, path, fmt, dpi)
+    return path
+
+
+def _digest(payload: Dict) -> str:
+    text = json.dumps({**payload, 'version': RENDER_VERSION}, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class ChartRenderer:
+    """
+    Renders dashboards and their panels with a content-addressed cache.
+
+    Images are stored in `cache_dir` under the hash of everything that
+    affects the output, then copied to `output_dir` under stable names.
+    """
+
+    def __init__(self, output_dir: str = '.', cache_dir: Optional[str] = None,
+                 style: str = DEFAULT_STYLE, max_workers: Optional[int] = None):
+        """
+        Initialize the renderer
+
+        Args:
+            output_dir: Where dashboard and panel images are written
+            cache_dir: Image cache directory (defaults to output_dir/.chart_cache)
+            style: Matplotlib style used for every chart
+            max_workers: Worker processes (defaults to one per CPU)
+        """
+        self.output_dir = Path(output_dir)
+        self.cache_dir = Path(cache_dir) if cache_dir else self.output_dir / '.chart_cache'
+        self.style = style
+        self.max_workers = max_workers or os.cpu_count() or 1
+
+    def render_dashboard(self, name: str, title: str, panels: List[ChartPanel], mode: str = 'print',
+                         layout: Tuple[int, int] = (2, 2), figsize: Tuple[float, float] = (15, 12),
+                         save_panels: bool = False) -> Dict:
+        """
+        Render a dashboard figure and, optionally, each panel on its own
+
+        The dashboard is drawn as a single job, so the process pool only
+        comes into play when save_panels adds one job per panel.
+
+        Args:
+            name: Output file stem, e.g. 'lab_performance_dashboard'
+            title: Dashboard title
+            panels: Panels in layout order
+            mode: One of RENDER_MODES ('print', 'preview', 'svg')
+            layout: (rows, columns) of the dashboard grid
+            figsize: Dashboard size in inches
+            save_panels: Also write each panel as '<name>-<panel>.<ext>'
+
+        Returns:
+            Dictionary with the 'dashboard' path, 'panels' paths by panel
+            name, and the number of images served from the 'cached' store
+        """
+        if mode not in RENDER_MODES:
+            raise ValueError(f"Unknown render mode: {mode}")
+        fmt, dpi = RENDER_MODES[mode]
+        specs = [asdict(panel) for panel in panels]
+
+        jobs = {}
+        dashboard_key = _digest({'title': title, 'panels': specs, 'layout': layout, 'figsize': figsize,
+                                 'style': self.style, 'format': fmt, 'dpi': dpi})
+        jobs[f"{name}.{fmt}"] = (dashboard_key, _render_dashboard,
+                                 (title, specs, layout, figsize, self.style))
+        if save_panels:
+            for spec in specs:
+                panel_key = _digest({'panel': spec, 'style': self.style, 'format': fmt, 'dpi': dpi})
+                jobs[f"{name}-{spec['name']}.{fmt}"] = (panel_key, _render_panel, (spec, self.style))
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        pending = {}
+        for output_name, (key, function, args) in jobs.items():
+            cache_path = self.cache_dir / f"{key}.{fmt}"
+            if not cache_path.exists():
+                pending[str(cache_path)] = (function, args)
+        cached = len(jobs) - len(pending)
+
+        workers = min(self.max_workers, len(pending))
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(function, *args, path, fmt, dpi)
+                           for path, (function, args) in pending.items()]
+                for future in futures:
+                    future.result()
+        else:
+            for path, (function, args) in pending.items():
+                function(*args, path, fmt, dpi)
+
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        outputs = {}
+        for output_name, (key, _, _) in jobs.items():
+            output_path = self.output_dir / output_name
+            shutil.copyfile(self.cache_dir / f"{key}.{fmt}", output_path)
+            outputs[output_name] = output_path
+
+        logger.info(f"Rendered {name} ({mode}): {len(pending)} drawn, {cached} from cache")
+        return {
+            'dashboard': outputs[f"{name}.{fmt}"],
+            'panels': {spec['name']: outputs[f"{name}-{spec['name']}.{fmt}"] for spec in specs} if save_panels else {},
+            'cached': cached
+        }
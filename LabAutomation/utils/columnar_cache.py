@@ -0,0 +1,414 @@
+"""
+Kaiser Permanente Lab Automation System
+Columnar CSV Cache
+
+Converts large lab CSV exports once into typed, per-column binary files
+that later runs memory-map instead of re-parsing text. Entries are keyed
+by source path, size, mtime and content hash and rebuilt automatically
+when the source file changes. Low-cardinality text is dictionary-encoded;
+identifiers and other high-cardinality text are stored as raw UTF-8.
+"""
+
+import hashlib
+import json
+import logging
+import shutil
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.ingestion_schema import (CATEGORY, DATETIME, IDENTIFIER, NUMERIC, as_datetime,
+                                    as_numeric, schema_for)
+
+logger = logging.getLogger(__name__)
+
+CACHE_FORMAT_VERSION = 3
+
+_KIND_DTYPES = {
+    'float': np.dtype('<f8'),
+    'datetime': np.dtype('<M8[ns]'),
+    'category': np.dtype('<i4'),
+}
+
+# String columns: end offset of each row's bytes, and which rows are present
+_OFFSET_DTYPE = np.dtype('<i8')
+_PRESENT_DTYPE = np.dtype('?')
+
+# A dictionary-encoded column that grows past this many labels is
+# rewritten as a string column, so the label lookup stays bounded
+MAX_CATEGORIES = 1 << 16
+
+# Inferred text columns whose first chunk is mostly distinct values (IDs,
+# free text) are stored as strings from the start
+HIGH_CARDINALITY_SHARE = 0.5
+
+
+def file_content_hash(path: Path, block_size: int = 1 << 20) -> str:
+    """Compute the SHA-256 of a file without reading it into memory"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ColumnarCache:
+    """
+    On-disk columnar cache for CSV files.
+
+    Each source file gets a directory holding one raw binary file per
+    column plus a JSON manifest. Numeric columns are stored as float64 and
+    date/time columns as datetime64[ns]. Text columns are either int32
+    category codes with the labels kept alongside, or, for identifiers and
+    columns with more than MAX_CATEGORIES labels, concatenated UTF-8 bytes
+    with per-row end offsets and a presence mask.
+    """
+
+    MANIFEST_NAME = 'manifest.json'
+
+    def __init__(self, cache_dir: str, chunk_size: int = 100000):
+        """
+        Initialize the cache
+
+        Args:
+            cache_dir: Directory where cache entries are stored
+            chunk_size: Rows parsed per chunk while building an entry
+        """
+        self.cache_dir = Path(cache_dir)
+        self.chunk_size = chunk_size
+
+    def _entry_dir(self, csv_path: Path) -> Path:
+        resolved = str(Path(csv_path).resolve())
+        key = hashlib.sha1(resolved.encode('utf-8')).hexdigest()[:12]
+        return self.cache_dir / f"{Path(csv_path).stem}-{key}"
+
+    def _fingerprint(self, csv_path: Path) -> Dict:
+        stat = Path(csv_path).stat()
+        return {
+            'path': str(Path(csv_path).resolve()),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns
+        }
+
+    def _read_manifest(self, entry_dir: Path) -> Optional[Dict]:
+        manifest_path = entry_dir / self.MANIFEST_NAME
+        if not manifest_path.exists():
+            return None
+        try:
+            with open(manifest_path, 'r') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Unreadable cache manifest {manifest_path}: {e}")
+            return None
+        if manifest.get('format_version') != CACHE_FORMAT_VERSION:
+            return None
+        return manifest
+
+    def _write_manifest(self, entry_dir: Path, manifest: Dict) -> None:
+        tmp_path = entry_dir / (self.MANIFEST_NAME + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f)
+        tmp_path.replace(entry_dir / self.MANIFEST_NAME)
+
+    def ensure(self, csv_path: Path) -> Dict:
+        """
+        Get a valid cache manifest for a CSV, building it if needed
+
+        Size and mtime are checked first; the content hash is only
+        recomputed when they differ, so an untouched file costs one stat.
+
+        Args:
+            csv_path: Path to the source CSV
+
+        Returns:
+            Cache manifest dictionary
+        """
+        csv_path = Path(csv_path)
+        entry_dir = self._entry_dir(csv_path)
+        manifest = self._read_manifest(entry_dir)
+        fingerprint = self._fingerprint(csv_path)
+
+        if manifest:
+            source = manifest['source']
+            if source['size'] == fingerprint['size'] and source['mtime_ns'] == fingerprint['mtime_ns']:
+                return manifest
+            if source['size'] == fingerprint['size'] and source['sha256'] == file_content_hash(csv_path):
+                logger.info(f"Cache for {csv_path.name} still valid after touch; refreshing fingerprint")
+                manifest['source'].update(fingerprint)
+                self._write_manifest(entry_dir, manifest)
+                return manifest
+            logger.info(f"Source {csv_path.name} changed; rebuilding columnar cache")
+
+        return self.build(csv_path)
+
+    def _column_kind(self, series: pd.Series, schema_kind: str) -> str:
+        if schema_kind == NUMERIC:
+            return 'float'
+        if schema_kind == DATETIME:
+            return 'datetime'
+        if schema_kind == IDENTIFIER:
+            return 'string'
+        if schema_kind == CATEGORY:
+            return 'category'
+        if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            return 'float'
+        if pd.api.types.is_datetime64_any_dtype(series):
+            return 'datetime'
+        present = series.dropna()
+        if len(present) and present.nunique() > HIGH_CARDINALITY_SHARE * len(present):
+            return 'string'
+        return 'category'
+
+    def build(self, csv_path: Path) -> Dict:
+        """
+        Convert a CSV into a cache entry in a single streaming pass
+
+        Args:
+            csv_path: Path to the source CSV
+
+        Returns:
+            Cache manifest dictionary
+        """
+        csv_path = Path(csv_path)
+        entry_dir = self._entry_dir(csv_path)
+        build_dir = entry_dir.with_name(entry_dir.name + '.building')
+        if build_dir.exists():
+            shutil.rmtree(build_dir)
+        build_dir.mkdir(parents=True)
+
+        fingerprint = self._fingerprint(csv_path)
+        writers: List[_ColumnWriter] = []
+        rows = 0
+
+        schema = schema_for(csv_path)
+        schema_kinds = schema.resolve(list(pd.read_csv(csv_path, nrows=0).columns)).kinds
+
+        try:
+            for chunk in schema.read_csv(csv_path, chunksize=self.chunk_size):
+                if not writers:
+                    for index, name in enumerate(chunk.columns):
+                        kind = self._column_kind(chunk[name], schema_kinds.get(name))
+                        writers.append(_ColumnWriter(build_dir, index, name, kind))
+
+                for writer in writers:
+                    writer.append(chunk[writer.column['name']])
+                rows += len(chunk)
+        finally:
+            for writer in writers:
+                writer.close()
+
+        for writer in writers:
+            writer.write_categories()
+
+        fingerprint['sha256'] = file_content_hash(csv_path)
+        manifest = {
+            'format_version': CACHE_FORMAT_VERSION,
+            'source': fingerprint,
+            'schema': schema.name,
+            'rows': rows,
+            'columns': [writer.column for writer in writers]
+        }
+        self._write_manifest(build_dir, manifest)
+
+        if entry_dir.exists():
+            shutil.rmtree(entry_dir)
+        build_dir.replace(entry_dir)
+        logger.info(f"Columnar cache built for {csv_path.name}: {rows} rows, {len(writers)} columns")
+        return manifest
+
+    def _open_columns(self, csv_path: Path, columns: Optional[List[str]]) -> Tuple[List['_ColumnReader'], int]:
+        manifest = self.ensure(csv_path)
+        entry_dir = self._entry_dir(csv_path)
+        wanted = [c for c in manifest['columns'] if columns is None or c['name'] in columns]
+        return [_ColumnReader(entry_dir, c, manifest['rows']) for c in wanted], manifest['rows']
+
+    def columns(self, csv_path: Path) -> List[str]:
+        """Get the column names of a cached CSV, building the entry if needed"""
+        return [column['name'] for column in self.ensure(csv_path)['columns']]
+
+    def load(self, csv_path: Path, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Load a cached CSV with memory-mapped columns
+
+        Args:
+            csv_path: Path to the source CSV
+            columns: Columns to map (all columns when None)
+
+        Returns:
+            DataFrame backed by the cache files
+        """
+        readers, rows = self._open_columns(Path(csv_path), columns)
+        return _slice_frame(readers, 0, rows)
+
+    def iter_chunks(self, csv_path: Path, columns: Optional[List[str]] = None,
+                    chunk_size: int = 100000) -> Iterator[pd.DataFrame]:
+        """
+        Iterate over a cached CSV in row slices of the mapped columns
+
+        Each column is mapped once; a slice only decodes its own rows, so
+        string columns never hold more than one chunk of text in memory.
+
+        Args:
+            csv_path: Path to the source CSV
+            columns: Columns to map (all columns when None)
+            chunk_size: Rows per yielded slice
+
+        Yields:
+            DataFrame slices backed by the cache files
+        """
+        readers, rows = self._open_columns(Path(csv_path), columns)
+        for start in range(0, rows, chunk_size):
+            yield _slice_frame(readers, start, min(start + chunk_size, rows))
+
+
+def _slice_frame(readers: List['_ColumnReader'], start: int, stop: int) -> pd.DataFrame:
+    index = pd.RangeIndex(start, stop)
+    data = {reader.column['name']: reader.read(start, stop) for reader in readers}
+    return pd.DataFrame(data, index=index, copy=False)
+
+
+class _ColumnReader:
+    """
+    Memory-maps one column of a cache entry and reads row ranges from it.
+
+    Fixed-width columns are returned as views of the map. String columns
+    decode only the bytes between the range's first and last offsets.
+    """
+
+    def __init__(self, entry_dir: Path, column: Dict, rows: int):
+        self.column = column
+        self.categories = None
+        kind = column['kind']
+        if kind == 'string':
+            self.values = _map(entry_dir / column['file'], np.uint8)
+            self.ends = _map(entry_dir / column['offsets'], _OFFSET_DTYPE, rows)
+            self.present = _map(entry_dir / column['present'], _PRESENT_DTYPE, rows)
+            return
+        self.values = _map(entry_dir / column['file'], _KIND_DTYPES[kind], rows)
+        if kind == 'category':
+            with open(entry_dir / column['categories'], 'r') as f:
+                self.categories = json.load(f)
+
+    def read(self, start: int, stop: int) -> pd.Series:
+        """Read rows [start, stop) as a Series indexed by row number"""
+        name = self.column['name']
+        index = pd.RangeIndex(start, stop)
+        if self.column['kind'] == 'string':
+            return pd.Series(self._read_strings(start, stop), index=index, name=name, copy=False)
+        values = self.values[start:stop]
+        if self.categories is not None:
+            values = pd.Categorical.from_codes(values, categories=self.categories)
+        return pd.Series(values, index=index, name=name, copy=False)
+
+    def _read_strings(self, start: int, stop: int) -> np.ndarray:
+        """Decode a row range of a string column into an object array (None where missing)"""
+        values = np.full(stop - start, None, dtype=object)
+        if stop <= start:
+            return values
+        ends = self.ends[start:stop]
+        base = int(self.ends[start - 1]) if start else 0
+        data = self.values[base:int(ends[-1])].tobytes()
+        ends = ends - base
+        starts = np.concatenate([[0], ends[:-1]])
+        present_rows = np.flatnonzero(self.present[start:stop])
+        values[present_rows] = [data[begin:end].decode('utf-8') for begin, end
+                                in zip(starts[present_rows].tolist(), ends[present_rows].tolist())]
+        return values
+
+
+def _map(path: Path, dtype, rows: Optional[int] = None) -> np.ndarray:
+    """Memory-map a column file (an empty array for an empty file)"""
+    if rows == 0 or not path.stat().st_size:
+        return np.empty(0, dtype=dtype)
+    shape = (rows,) if rows is not None else None
+    return np.memmap(path, dtype=dtype, mode='r', shape=shape)
+
+
+class _ColumnWriter:
+    """
+    Streams one column of a cache entry to disk, chunk by chunk.
+
+    Category columns keep their label lookup in memory; once it passes
+    MAX_CATEGORIES the codes written so far are rewritten as a string
+    column and the lookup is dropped.
+    """
+
+    def __init__(self, build_dir: Path, index: int, name: str, kind: str):
+        self.build_dir = build_dir
+        self.column = {'name': name, 'kind': kind, 'file': f"{index}.bin"}
+        self.lookup: Dict[str, int] = {}
+        self.position = 0
+        self._open()
+
+    def _open(self) -> None:
+        self.handles = [open(self.build_dir / self.column['file'], 'wb')]
+        if self.column['kind'] == 'string':
+            self.column['offsets'] = f"{self.column['file']}.offsets"
+            self.column['present'] = f"{self.column['file']}.present"
+            self.handles += [open(self.build_dir / self.column['offsets'], 'wb'),
+                             open(self.build_dir / self.column['present'], 'wb')]
+
+    def append(self, series: pd.Series) -> None:
+        kind = self.column['kind']
+        if kind == 'float':
+            as_numeric(series).to_numpy(dtype='<f8', na_value=np.nan).tofile(self.handles[0])
+        elif kind == 'datetime':
+            parsed = as_datetime(series)
+            if getattr(parsed.dt, 'tz', None) is not None:
+                parsed = parsed.dt.tz_convert('UTC').dt.tz_localize(None)
+            parsed.to_numpy(dtype='<M8[ns]').tofile(self.handles[0])
+        elif kind == 'category':
+            self._append_codes(series)
+        else:
+            self._append_strings(series.to_numpy(dtype=object), series.notna().to_numpy())
+
+    def _append_codes(self, series: pd.Series) -> None:
+        codes = np.full(len(series), -1, dtype='<i4')
+        present = series.notna().to_numpy()
+        local_codes, uniques = pd.factorize(series[present].astype(str))
+        if len(uniques):
+            mapping = np.array([self.lookup.setdefault(value, len(self.lookup)) for value in uniques], dtype='<i4')
+            codes[present] = mapping[local_codes]
+        codes.tofile(self.handles[0])
+        if len(self.lookup) > MAX_CATEGORIES:
+            self._switch_to_strings()
+
+    def _append_strings(self, values: np.ndarray, present: np.ndarray) -> None:
+        encoded = [str(value).encode('utf-8') for value in values[present]]
+        lengths = np.zeros(len(values), dtype=_OFFSET_DTYPE)
+        lengths[present] = [len(value) for value in encoded]
+        ends = self.position + np.cumsum(lengths, dtype=_OFFSET_DTYPE)
+        self.handles[0].write(b''.join(encoded))
+        ends.tofile(self.handles[1])
+        present.astype(_PRESENT_DTYPE).tofile(self.handles[2])
+        if len(ends):
+            self.position = int(ends[-1])
+
+    def _switch_to_strings(self) -> None:
+        """Rewrite the codes written so far as strings and continue as a string column"""
+        logger.info(f"Column {self.column['name']} has over {MAX_CATEGORIES} distinct values; "
+                    f"storing it as strings")
+        self.close()
+        codes = np.fromfile(self.build_dir / self.column['file'], dtype='<i4')
+        labels = np.array(list(self.lookup), dtype=object)
+        self.lookup = {}
+        self.column['kind'] = 'string'
+        self._open()
+        present = codes >= 0
+        values = np.full(len(codes), None, dtype=object)
+        values[present] = labels[codes[present]]
+        self._append_strings(values, present)
+
+    def close(self) -> None:
+        for handle in self.handles:
+            handle.close()
+
+    def write_categories(self) -> None:
+        """Write the label lookup of a category column next to its codes"""
+        if self.column['kind'] != 'category':
+            return
+        self.column['categories'] = f"{self.column['file']}.categories.json"
+        with open(self.build_dir / self.column['categories'], 'w') as f:
+            json.dump(list(self.lookup), f)
@@ -0,0 +1,171 @@
+"""
+Kaiser Permanente Lab Automation System
+Alert Cooldown Store
+
+Remembers which alerts were sent recently so they are not repeated until
+their cooldown (TTL) runs out. Checks are a single dictionary lookup;
+expired keys are evicted lazily from a min-heap ordered by expiry, so the
+store stays as small as the set of alerts still cooling down.
+
+Cooldowns are written through to a small SQLite file, so a restart right
+after an incident picks them up again instead of re-sending every alert.
+"""
+
+import heapq
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = Path('data') / '.cache' / 'alert_cooldowns.db'
+
+
+class CooldownStore:
+    """
+    TTL set of alert keys with optional SQLite persistence.
+
+    Supports the set operations the alert code already uses (`in`, add,
+    clear), so it can replace a plain set or a dict of last-sent times.
+    Expiry uses wall-clock time because it has to survive restarts.
+    """
+
+    def __init__(self, ttl_seconds: float, path: Optional[str] = None, namespace: str = 'default',
+                 clock: Callable[[], float] = time.time):
+        """
+        Initialize the store, loading unexpired cooldowns from disk
+
+        Args:
+            ttl_seconds: Default cooldown per key
+            path: SQLite file; None keeps cooldowns in memory only
+            namespace: Separates stores sharing one file
+            clock: Wall-clock time source (epoch seconds)
+        """
+        self.ttl_seconds = ttl_seconds
+        self.namespace = namespace
+        self.clock = clock
+        self._expiry: Dict[str, float] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        if path is not None:
+            self._open(Path(path))
+
+    # -- persistence -----------------------------------------------------
+
+    def _open(self, path: Path) -> None:
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS cooldowns ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, expires_at REAL NOT NULL, "
+                "PRIMARY KEY (namespace, key))"
+            )
+            now = self.clock()
+            self._db.execute("DELETE FROM cooldowns WHERE expires_at <= ?", (now,))
+            rows = self._db.execute(
+                "SELECT key, expires_at FROM cooldowns WHERE namespace = ?", (self.namespace,)
+            ).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"Alert cooldowns will not persist ({path}): {e}")
+            self._db = None
+            return
+        for key, expires_at in rows:
+            self._expiry[key] = expires_at
+            self._heap.append((expires_at, key))
+        heapq.heapify(self._heap)
+        if rows:
+            logger.info(f"Restored {len(rows)} alert cooldowns from {path}")
+
+    def _write(self, sql: str, params: tuple) -> None:
+        if self._db is None:
+            return
+        try:
+            self._db.execute(sql, params)
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to persist alert cooldowns: {e}")
+
+    # -- cooldowns -------------------------------------------------------
+
+    def _evict(self, now: float) -> None:
+        evicted = False
+        while self._heap and self._heap[0][0] <= now:
+            expires_at, key = heapq.heappop(self._heap)
+            # Stale heap entries (key re-marked later) are skipped
+            if self._expiry.get(key) == expires_at:
+                del self._expiry[key]
+                evicted = True
+        if evicted:
+            self._write("DELETE FROM cooldowns WHERE namespace = ? AND expires_at <= ?", (self.namespace, now))
+
+    def active(self, key: str) -> bool:
+        """Whether the key is still cooling down"""
+        expires_at = self._expiry.get(key)
+        return expires_at is not None and expires_at > self.clock()
+
+    __contains__ = active
+
+    def remaining(self, key: str) -> float:
+        """Seconds left on the key's cooldown (0 if none)"""
+        expires_at = self._expiry.get(key)
+        return max(expires_at - self.clock(), 0.0) if expires_at is not None else 0.0
+
+    def mark(self, key: str, ttl_seconds: Optional[float] = None) -> None:
+        """
+        Start (or restart) the key's cooldown
+
+        Args:
+            key: Alert key
+            ttl_seconds: Cooldown for this key; defaults to the store's TTL
+        """
+        now = self.clock()
+        expires_at = now + (self.ttl_seconds if ttl_seconds is None else ttl_seconds)
+        with self._lock:
+            self._evict(now)
+            self._expiry[key] = expires_at
+            heapq.heappush(self._heap, (expires_at, key))
+            self._write("INSERT OR REPLACE INTO cooldowns (namespace, key, expires_at) VALUES (?, ?, ?)",
+                        (self.namespace, key, expires_at))
+
+    add = mark
+
+    def try_acquire(self, key: str, ttl_seconds: Optional[float] = None) -> bool:
+        """Mark the key and return True unless it is already cooling down"""
+        with self._lock:
+            if self.active(key):
+                return False
+        self.mark(key, ttl_seconds)
+        return True
+
+    def discard(self, key: str) -> None:
+        """End the key's cooldown early"""
+        with self._lock:
+            if self._expiry.pop(key, None) is not None:
+                self._write("DELETE FROM cooldowns WHERE namespace = ? AND key = ?", (self.namespace, key))
+
+    def clear(self) -> None:
+        """End every cooldown"""
+        with self._lock:
+            self._expiry.clear()
+            self._heap.clear()
+            self._write("DELETE FROM cooldowns WHERE namespace = ?", (self.namespace,))
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._evict(self.clock())
+            return len(self._expiry)
+
+    def __iter__(self) -> Iterator[str]:
+        with self._lock:
+            self._evict(self.clock())
+            return iter(list(self._expiry))
+
+    def close(self) -> None:
+        """Close the SQLite file"""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,213 @@
+"""
+Kaiser Permanente Lab Automation System
+Incremental CSV Processing
+
+Watermarked processing for append-only lab extracts. After each run the
+byte offset of the last complete row, a checksum of that row and a hash
+of the file head are saved together with the StreamingMetrics state, so
+the next run parses only the rows appended since. If the head or the
+last processed row no longer match, the state is discarded and rebuilt.
+"""
+
+import csv
+import hashlib
+import io
+import logging
+import pickle
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Callable, List, Optional, Tuple
+
+from utils.ingestion_schema import schema_for
+from utils.streaming_stats import StreamingMetrics
+
+logger = logging.getLogger(__name__)
+
+STATE_FORMAT_VERSION = 2
+HEAD_BYTES = 64 * 1024
+SCAN_BLOCK = 64 * 1024
+
+
+@dataclass
+class Watermark:
+    """Position in an append-only CSV up to which rows have been processed"""
+    header: List[str]
+    data_start: int
+    offset: int
+    rows: int
+    head_length: int
+    head_hash: str
+    last_row_start: int
+    last_row_checksum: str
+
+
+class _BoundedReader(io.RawIOBase):
+    """Raw stream over a byte range of an open file"""
+
+    def __init__(self, handle: BinaryIO, start: int, end: int):
+        self._handle = handle
+        self._handle.seek(start)
+        self._remaining = end - start
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self._remaining <= 0:
+            return 0
+        size = min(len(buffer), self._remaining)
+        data = self._handle.read(size)
+        buffer[:len(data)] = data
+        self._remaining -= len(data)
+        return len(data)
+
+
+def _range_digest(handle: BinaryIO, start: int, end: int) -> str:
+    digest = hashlib.sha256()
+    handle.seek(start)
+    remaining = end - start
+    while remaining > 0:
+        block = handle.read(min(SCAN_BLOCK, remaining))
+        if not block:
+            break
+        digest.update(block)
+        remaining -= len(block)
+    return digest.hexdigest()
+
+
+def _last_newline_before(handle: BinaryIO, end: int, floor: int) -> int:
+    """Offset just past the last newline in [floor, end), or floor if there is none"""
+    position = end
+    while position > floor:
+        start = max(floor, position - SCAN_BLOCK)
+        handle.seek(start)
+        block = handle.read(position - start)
+        index = block.rfind(b'\n')
+        if index != -1:
+            return start + index + 1
+        position = start
+    return floor
+
+
+class IncrementalCsvProcessor:
+    """
+    Keeps persisted StreamingMetrics state for append-only CSV files.
+
+    Only complete rows (terminated by a newline) are consumed, so a row
+    that is still being written when a run starts is picked up next time.
+    """
+
+    def __init__(self, state_dir: str,
+                 metrics_factory: Optional[Callable[[], StreamingMetrics]] = None):
+        """
+        Initialize the processor
+
+        Args:
+            state_dir: Directory where watermark and accumulator state are kept
+            metrics_factory: Creates the accumulator for a fresh start
+        """
+        self.state_dir = Path(state_dir)
+        self.metrics_factory = metrics_factory or StreamingMetrics
+
+    def _state_path(self, csv_path: Path) -> Path:
+        resolved = str(Path(csv_path).resolve())
+        key = hashlib.sha1(resolved.encode('utf-8')).hexdigest()[:12]
+        return self.state_dir / f"{Path(csv_path).stem}-{key}.incremental.pkl"
+
+    def load_state(self, csv_path: Path) -> Optional[Tuple[Watermark, StreamingMetrics]]:
+        """Get the saved watermark and accumulator for a CSV, if any"""
+        state_path = self._state_path(csv_path)
+        if not state_path.exists():
+            return None
+        try:
+            with open(state_path, 'rb') as f:
+                state = pickle.load(f)
+        except Exception as e:
+            logger.warning(f"Unreadable incremental state {state_path}: {e}")
+            return None
+        if state.get('format_version') != STATE_FORMAT_VERSION:
+            return None
+        return state['watermark'], state['metrics']
+
+    def save_state(self, csv_path: Path, watermark: Watermark, metrics: StreamingMetrics) -> None:
+        """Persist the watermark and accumulator for a CSV atomically"""
+        state_path = self._state_path(csv_path)
+        state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = state_path.with_suffix('.tmp')
+        with open(tmp_path, 'wb') as f:
+            pickle.dump({
+                'format_version': STATE_FORMAT_VERSION,
+                'watermark': watermark,
+                'metrics': metrics
+            }, f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp_path.replace(state_path)
+
+    def reset(self, csv_path: Path) -> None:
+        """Drop the saved state so the next update starts from the beginning"""
+        self._state_path(csv_path).unlink(missing_ok=True)
+
+    def _still_valid(self, handle: BinaryIO, size: int, watermark: Watermark) -> bool:
+        if size < watermark.offset:
+            return False
+        if _range_digest(handle, 0, watermark.head_length) != watermark.head_hash:
+            return False
+        return _range_digest(handle, watermark.last_row_start, watermark.offset) == watermark.last_row_checksum
+
+    def _start(self, handle: BinaryIO) -> Watermark:
+        handle.seek(0)
+        header_line = handle.readline()
+        header = next(csv.reader([header_line.decode('utf-8-sig')]), [])
+        data_start = len(header_line)
+        return Watermark(header=header, data_start=data_start, offset=data_start, rows=0,
+                         head_length=0, head_hash='', last_row_start=data_start,
+                         last_row_checksum=_range_digest(handle, data_start, data_start))
+
+    def update(self, csv_path: Path, chunk_size: int = 10000,
+               columns: Optional[List[str]] = None) -> StreamingMetrics:
+        """
+        Fold rows appended since the last run into the saved metrics
+
+        Args:
+            csv_path: Path to the append-only CSV
+            chunk_size: Number of rows parsed per chunk
+            columns: Restrict parsing to these columns
+
+        Returns:
+            Accumulator covering every complete row in the file
+        """
+        csv_path = Path(csv_path)
+        state = self.load_state(csv_path)
+        size = csv_path.stat().st_size
+
+        with open(csv_path, 'rb') as handle:
+            if state is not None and not self._still_valid(handle, size, state[0]):
+                logger.info(f"{csv_path.name} was rewritten, not appended; rebuilding incremental state")
+                state = None
+
+            if state is None:
+                watermark, metrics = self._start(handle), self.metrics_factory()
+            else:
+                watermark, metrics = state
+
+            end = _last_newline_before(handle, size, watermark.offset)
+            if end == watermark.offset or not watermark.header:
+                logger.info(f"No new rows in {csv_path.name} since offset {watermark.offset}")
+                return metrics
+
+            rows_before = metrics.total_records
+            reader = io.BufferedReader(_BoundedReader(handle, watermark.offset, end), SCAN_BLOCK)
+            for chunk in schema_for(csv_path).read_csv(reader, chunksize=chunk_size, columns=columns,
+                                                       names=watermark.header):
+                metrics.update(chunk)
+            new_rows = metrics.total_records - rows_before
+
+            watermark.rows += new_rows
+            watermark.offset = end
+            watermark.last_row_start = _last_newline_before(handle, end - 1, watermark.data_start)
+            watermark.last_row_checksum = _range_digest(handle, watermark.last_row_start, end)
+            watermark.head_length = min(HEAD_BYTES, end)
+            watermark.head_hash = _range_digest(handle, 0, watermark.head_length)
+
+        self.save_state(csv_path, watermark, metrics)
+        logger.info(f"Processed {new_rows} new rows from {csv_path.name} ({watermark.rows} total)")
+        return metrics
@@ -0,0 +1,206 @@
+"""
+Kaiser Permanente Lab Automation System
+Ingestion Schemas
+
+Column typing rules for known lab exports. A schema resolves the CSV
+header once into `usecols`, read-time dtypes (categorical and identifier
+columns) and the numeric/datetime columns that are converted exactly once
+after reading, so every metric extractor works on already-typed columns.
+"""
+
+import fnmatch
+import logging
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO, Dict, Iterator, List, Optional, Union
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+logger = logging.getLogger(__name__)
+
+NUMERIC = 'numeric'
+DATETIME = 'datetime'
+CATEGORY = 'category'
+IDENTIFIER = 'id'
+
+
+def as_numeric(series: pd.Series) -> pd.Series:
+    """Coerce a column to numeric unless it already is"""
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        return series
+    return pd.to_numeric(series, errors='coerce')
+
+
+def as_datetime(series: pd.Series, date_format: Optional[str] = None) -> pd.Series:
+    """Parse a column to datetimes unless it already is"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+    return pd.to_datetime(series, errors='coerce', format=date_format)
+
+
+@dataclass
+class ColumnRule:
+    """Maps column names matching a regex to a column kind"""
+    pattern: str
+    kind: str
+    date_format: Optional[str] = None
+
+    def matches(self, column: str) -> bool:
+        return re.search(self.pattern, column, re.IGNORECASE) is not None
+
+
+@dataclass
+class ResolvedSchema:
+    """A schema bound to a concrete CSV header"""
+    kinds: Dict[str, str]
+    date_formats: Dict[str, Optional[str]] = field(default_factory=dict)
+
+    @property
+    def usecols(self) -> List[str]:
+        return list(self.kinds)
+
+    def columns_of(self, kind: str) -> List[str]:
+        return [col for col, col_kind in self.kinds.items() if col_kind == kind]
+
+    def read_dtypes(self) -> Dict[str, str]:
+        """dtypes applied by the CSV parser itself"""
+        dtypes = {col: 'category' for col in self.columns_of(CATEGORY)}
+        dtypes.update({col: 'str' for col in self.columns_of(IDENTIFIER)})
+        return dtypes
+
+    def apply(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Convert numeric and datetime columns in place, once"""
+        for col in self.columns_of(NUMERIC):
+            if col in df.columns:
+                df[col] = as_numeric(df[col])
+        for col in self.columns_of(DATETIME):
+            if col in df.columns:
+                df[col] = as_datetime(df[col], self.date_formats.get(col))
+        return df
+
+
+@dataclass
+class IngestionSchema:
+    """
+    Typing rules for one family of lab exports.
+
+    Rules are tried in order and the first match wins. Columns that match
+    no rule are dropped at read time unless `keep_unmatched` is set, in
+    which case they keep the parser's inferred dtype.
+    """
+    name: str
+    file_patterns: List[str]
+    rules: List[ColumnRule]
+    keep_unmatched: bool = False
+
+    def applies_to(self, path: Union[str, Path]) -> bool:
+        filename = Path(path).name.lower()
+        return any(fnmatch.fnmatch(filename, pattern.lower()) for pattern in self.file_patterns)
+
+    def resolve(self, columns: List[str]) -> ResolvedSchema:
+        """
+        Bind the rules to a CSV header
+
+        Args:
+            columns: Column names from the header
+
+        Returns:
+            Resolved schema with one kind per kept column
+        """
+        kinds: Dict[str, str] = {}
+        date_formats: Dict[str, Optional[str]] = {}
+        for col in columns:
+            rule = next((rule for rule in self.rules if rule.matches(col)), None)
+            if rule is not None:
+                kinds[col] = rule.kind
+                if rule.kind == DATETIME:
+                    date_formats[col] = rule.date_format
+            elif self.keep_unmatched:
+                kinds[col] = 'inferred'
+        dropped = [col for col in columns if col not in kinds]
+        if dropped:
+            logger.info(f"Schema {self.name} drops unmatched columns: {dropped}")
+        return ResolvedSchema(kinds, date_formats)
+
+    def read_csv(self, path: Union[str, Path, IO], chunksize: Optional[int] = None,
+                 columns: Optional[List[str]] = None, names: Optional[List[str]] = None
+                 ) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
+        """
+        Read a CSV with the schema's columns and types
+
+        Args:
+            path: Path to the CSV file, or an open handle when `names` is given
+            chunksize: Rows per chunk; returns an iterator of typed chunks when set
+            columns: Further restrict the read to these columns
+            names: Header of a headerless stream, e.g. rows appended after an offset
+
+        Returns:
+            Typed DataFrame, or iterator of typed DataFrames
+        """
+        header = list(names) if names is not None else list(pd.read_csv(path, nrows=0).columns)
+        if columns is not None:
+            header = [col for col in header if col in columns]
+        resolved = self.resolve(header)
+        reader = pd.read_csv(path, usecols=resolved.usecols, dtype=resolved.read_dtypes(),
+                             chunksize=chunksize, header=None if names is not None else 'infer',
+                             names=names)
+        if chunksize is None:
+            return resolved.apply(reader)
+        return (resolved.apply(chunk) for chunk in reader)
+
+
+def concat_typed(chunks: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Concatenate typed chunks without falling back to object dtype
+
+    Chunk-local categoricals have different categories, which a plain
+    concat would widen to object; they are unioned first instead.
+    """
+    if not chunks:
+        return pd.DataFrame()
+    categorical = [col for col in chunks[0].columns
+                   if isinstance(chunks[0][col].dtype, pd.CategoricalDtype)]
+    unioned = {col: union_categoricals([chunk[col] for chunk in chunks], ignore_order=True)
+               for col in categorical}
+    df = pd.concat([chunk.drop(columns=categorical) for chunk in chunks], ignore_index=True)
+    for col, values in unioned.items():
+        df[col] = values
+    return df[list(chunks[0].columns)]
+
+
+_LAB_EXPORT_RULES = [
+    ColumnRule(r'patient.?id|\bmrn\b|order.?(id|number)|specimen.?id|accession', IDENTIFIER),
+    # A measurement suffix beats the keyword rules below, e.g. 'Queue Wait Minutes'
+    ColumnRule(r'\b(tat|minutes|mins?|count|rate)\b\W*$', NUMERIC),
+    ColumnRule(r'test.?type|status|priority|shift|queue|department|section|\blab\b|site|location', CATEGORY),
+    ColumnRule(r'tat|turnaround|volume|count|minutes|wait', NUMERIC),
+    ColumnRule(r'date|time', DATETIME),
+]
+
+STAT_TAT_SCHEMA = IngestionSchema(
+    name='stat_tat',
+    file_patterns=['*tat*.csv'],
+    rules=_LAB_EXPORT_RULES
+)
+
+VOLUME_SCHEMA = IngestionSchema(
+    name='lab_volume',
+    file_patterns=['*volume*.csv', '*encounter*.csv'],
+    rules=_LAB_EXPORT_RULES
+)
+
+GENERIC_SCHEMA = IngestionSchema(
+    name='generic',
+    file_patterns=['*.csv'],
+    rules=_LAB_EXPORT_RULES,
+    keep_unmatched=True
+)
+
+KNOWN_SCHEMAS = [STAT_TAT_SCHEMA, VOLUME_SCHEMA]
+
+
+def schema_for(path: Union[str, Path]) -> IngestionSchema:
+    """Get the ingestion schema for an export, falling back to the generic one"""
+    return next((schema for schema in KNOWN_SCHEMAS if schema.applies_to(path)), GENERIC_SCHEMA)
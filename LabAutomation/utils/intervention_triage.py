@@ -0,0 +1,172 @@
+"""
+Kaiser Permanente Lab Automation System
+Intervention Triage
+
+Scores every staff member in a StaffStore at once: each metric is turned
+into a 0-1 shortfall between its "meets standard" and "critical" levels,
+and the composite risk score is a weighted average of those shortfalls.
+Tiers come from score cut-offs, and the supervisor review queue is the
+top k by score, taken with a heap rather than a full sort.
+
+The shortfall matrix is cached per store version, so trying different
+weights (what-if analysis) only repeats a matrix-vector product.
+"""
+
+import heapq
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from utils.staff_store import StaffStore
+
+logger = logging.getLogger(__name__)
+
+# metric -> (meets standard, critical); values past either end are clipped
+RISK_FEATURES: Dict[str, Tuple[float, float]] = {
+    'tat_compliance': (0.90, 0.0),
+    'error_rate': (0.05, 0.25),
+    'idle_time': (0.20, 0.80),
+    'break_violations': (0, 12),
+    'attendance_rate': (0.95, 0.80),
+    'qc_compliance': (0.95, 0.60),
+    'performance_rating': (4.0, 1.0),
+}
+
+DEFAULT_WEIGHTS: Dict[str, float] = {
+    'tat_compliance': 3.0,
+    'error_rate': 2.0,
+    'idle_time': 1.5,
+    'break_violations': 1.0,
+    'attendance_rate': 1.0,
+    'qc_compliance': 1.5,
+    'performance_rating': 2.0,
+}
+
+# Checked in order; the first cut-off the score reaches sets the tier
+TRIAGE_TIERS: Tuple[Tuple[str, float], ...] = (
+    ('final_warning', 0.80),
+    ('pip', 0.60),
+    ('retraining', 0.50),
+)
+DEFAULT_TIER = 'monitoring'
+
+
+class InterventionTriage:
+    """
+    Batch composite risk scoring and ranking over a StaffStore.
+
+    Only the metrics named in `weights` contribute, so a caller that
+    tracks a subset of metrics passes weights for just those.
+    """
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None,
+                 tiers: Tuple[Tuple[str, float], ...] = TRIAGE_TIERS):
+        """
+        Initialize the triage engine
+
+        Args:
+            weights: Metric -> weight (defaults to DEFAULT_WEIGHTS)
+            tiers: (tier, minimum score) pairs, highest first
+        """
+        self.weights = dict(DEFAULT_WEIGHTS if weights is None else weights)
+        unknown = [name for name in self.weights if name not in RISK_FEATURES]
+        if unknown:
+            raise ValueError(f"Unknown risk metric: {unknown[0]}")
+        self.tiers = tiers
+        self._cached: Optional[Tuple[StaffStore, int, np.ndarray]] = None
+
+    def _shortfalls(self, store: StaffStore) -> np.ndarray:
+        """(metrics x staff) matrix of 0-1 shortfalls, in RISK_FEATURES order"""
+        if self._cached is not None and self._cached[0] is store and self._cached[1] == store.version:
+            return self._cached[2]
+        matrix = np.empty((len(RISK_FEATURES), len(store)), dtype=np.float64)
+        for i, (name, (good, bad)) in enumerate(RISK_FEATURES.items()):
+            matrix[i] = (store.column(name) - good) / (bad - good)
+        np.clip(matrix, 0.0, 1.0, out=matrix)
+        self._cached = (store, store.version, matrix)
+        return matrix
+
+    def _weight_vector(self, weights: Optional[Dict[str, float]]) -> np.ndarray:
+        weights = self.weights if weights is None else {**self.weights, **weights}
+        vector = np.array([weights.get(name, 0.0) for name in RISK_FEATURES], dtype=np.float64)
+        total = vector.sum()
+        if total <= 0:
+            raise ValueError("Risk weights must sum to a positive value")
+        return vector / total
+
+    def scores(self, store: StaffStore, weights: Optional[Dict[str, float]] = None) -> np.ndarray:
+        """
+        Composite risk score (0 = meets every standard, 1 = critical on all) per row
+
+        Args:
+            store: Staff to score
+            weights: Overrides merged over the engine's weights for this call only
+        """
+        return self._weight_vector(weights) @ self._shortfalls(store)
+
+    def tier_labels(self, scores: np.ndarray) -> np.ndarray:
+        """Intervention tier for each score"""
+        return np.select([scores >= cutoff for _, cutoff in self.tiers],
+                         [tier for tier, _ in self.tiers], default=DEFAULT_TIER)
+
+    def triage(self, store: StaffStore, weights: Optional[Dict[str, float]] = None) -> Dict[str, Dict]:
+        """
+        Score and tier for every staff member
+
+        Returns:
+            Dictionary of staff id to {'risk_score', 'tier'}
+        """
+        scores = self.scores(store, weights)
+        tiers = self.tier_labels(scores)
+        return {staff_id: {'risk_score': round(float(score), 3), 'tier': str(tier)}
+                for staff_id, score, tier in zip(store.ids, scores, tiers)}
+
+    def by_tier(self, store: StaffStore, weights: Optional[Dict[str, float]] = None) -> Dict[str, List[str]]:
+        """Staff ids grouped by tier, most urgent tier first"""
+        tiers = self.tier_labels(self.scores(store, weights))
+        return {tier: [store.ids[row] for row in np.flatnonzero(tiers == tier)]
+                for tier in [name for name, _ in self.tiers] + [DEFAULT_TIER]}
+
+    def review_queue(self, store: StaffStore, k: int = 10, weights: Optional[Dict[str, float]] = None,
+                     **conditions) -> List[Dict]:
+        """
+        The k highest-risk staff for supervisor review
+
+        Args:
+            store: Staff to rank
+            k: Queue length
+            weights: What-if weight overrides for this call only
+            conditions: Store filters, e.g. station='Station 3' or supervisor='Lee'
+
+        Returns:
+            List of {'staff_id', 'risk_score', 'tier'}, highest risk first
+        """
+        scores = self.scores(store, weights)
+        rows = np.flatnonzero(store.mask(**conditions)) if conditions else range(len(store))
+        top = heapq.nlargest(k, rows, key=scores.__getitem__)
+        tiers = self.tier_labels(scores[top]) if top else []
+        return [{'staff_id': store.ids[row], 'risk_score': round(float(scores[row]), 3), 'tier': str(tier)}
+                for row, tier in zip(top, tiers)]
+
+    def what_if(self, store: StaffStore, weights: Dict[str, float], k: int = 10) -> Dict:
+        """
+        Compare the review queue and tier changes under different weights
+
+        Args:
+            store: Staff to rank
+            weights: Weight overrides to try
+            k: Queue length
+
+        Returns:
+            Dictionary with the 'baseline' and 'scenario' queues and the
+            staff whose tier 'changed' as {staff_id: (before, after)}
+        """
+        before = self.tier_labels(self.scores(store))
+        after = self.tier_labels(self.scores(store, weights))
+        changed = np.flatnonzero(before != after)
+        return {
+            'baseline': self.review_queue(store, k),
+            'scenario': self.review_queue(store, k, weights),
+            'changed': {store.ids[row]: (str(before[row]), str(after[row])) for row in changed},
+        }
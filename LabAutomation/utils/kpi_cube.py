@@ -0,0 +1,412 @@
+"""
+Kaiser Permanente Lab Automation System
+KPI Rollup Cube
+
+Pre-aggregates event rows into day x shift x hour x queue x priority
+cells holding counts, sums, min/max and a log-bucketed TAT histogram.
+Summaries, drill-downs and chart series are then answered from the cube
+instead of the raw events, percentiles included (within the histogram's
+relative accuracy). New days are folded in with `update`, and the cube
+is persisted between runs. Each cube carries a fingerprint of the events
+folded into it so a persisted cube can be checked against the events
+loaded in a later run.
+"""
+
+import hashlib
+import logging
+import math
+import pickle
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.performance_engine import normalize_events
+
+logger = logging.getLogger(__name__)
+
+CUBE_FORMAT_VERSION = 3
+
+DIMENSIONS = ['day', 'shift', 'hour', 'queue', 'priority']
+
+# Aggregation used to combine cells when cubes are merged or rolled up
+MEASURES = {
+    'count': 'sum',
+    'tat_count': 'sum',
+    'tat_sum': 'sum',
+    'tat_min': 'min',
+    'tat_max': 'max',
+    'wait_count': 'sum',
+    'wait_sum': 'sum',
+}
+
+# Histogram bucket for TAT values <= 0
+ZERO_BUCKET = np.iinfo(np.int32).min
+
+# Largest group x bucket matrix built for percentiles; bigger drill-downs sort instead
+MAX_MATRIX_CELLS = 1 << 22
+
+
+def events_fingerprint(events: pd.DataFrame, previous: Optional[str] = None) -> str:
+    """
+    Digest of normalized event rows, chained onto the digest of earlier batches
+
+    Appending batches one at a time gives the same fingerprint whether the
+    batches went into a fresh cube or were folded into a persisted one.
+    """
+    digest = hashlib.sha256((previous or '').encode('ascii'))
+    digest.update(','.join(map(str, events.columns)).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(events, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+class KpiCube:
+    """
+    Sparse rollup cube over lab events.
+
+    Only populated cells are stored, and every dimension is stored as an
+    integer code into `levels`, so filters are table lookups and groupings
+    are packed integer keys. Levels only ever grow, which keeps the codes
+    of existing cells valid across incremental updates.
+
+    The TAT histogram uses the same geometric buckets as the streaming
+    quantile sketch, so any percentile read from the cube is within
+    `relative_accuracy` of the exact value.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        """
+        Initialize an empty cube
+
+        Args:
+            relative_accuracy: Relative error bound for TAT percentiles
+        """
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.levels: Dict[str, list] = {dim: [] for dim in DIMENSIONS}
+        self.cells = pd.DataFrame(columns=DIMENSIONS + list(MEASURES))
+        self.histogram = pd.DataFrame(columns=DIMENSIONS + ['bucket', 'n'])
+        # Chained events_fingerprint of every batch folded in
+        self.fingerprint: Optional[str] = None
+
+    @classmethod
+    def from_events(cls, events: pd.DataFrame, relative_accuracy: float = 0.01,
+                    normalized: bool = False) -> 'KpiCube':
+        """Build a cube from event rows"""
+        cube = cls(relative_accuracy)
+        cube.update(events, normalized)
+        return cube
+
+    @property
+    def days_loaded(self) -> List[pd.Timestamp]:
+        """Days with at least one event, in order"""
+        return sorted(day for day in self.levels['day'] if not pd.isna(day))
+
+    def _encode(self, dim: str, values: pd.Series) -> np.ndarray:
+        """Codes of `values` in the dimension's levels, adding unseen values"""
+        local_codes, uniques = pd.factorize(values, use_na_sentinel=False)
+        levels = self.levels[dim]
+        positions = pd.Index(levels, dtype=object).get_indexer(pd.Index(uniques, dtype=object))
+        for i in np.flatnonzero(positions < 0):
+            positions[i] = len(levels)
+            levels.append(uniques[i])
+        return positions[local_codes].astype(np.int32)
+
+    def _dimension_codes(self, events: pd.DataFrame) -> pd.DataFrame:
+        timestamps = events['timestamp'] if 'timestamp' in events.columns else pd.Series(pd.NaT, index=events.index)
+        values = {
+            'day': timestamps.dt.normalize(),
+            'hour': timestamps.dt.hour.fillna(-1).astype('int8'),
+        }
+        for col in ('shift', 'queue', 'priority'):
+            if col in events.columns:
+                values[col] = events[col].astype(object).where(events[col].notna(), 'unknown')
+            else:
+                values[col] = pd.Series('unknown', index=events.index)
+        return pd.DataFrame({dim: self._encode(dim, values[dim]) for dim in DIMENSIONS})
+
+    def _pack(self, frame: pd.DataFrame, columns: List[str]) -> Tuple[np.ndarray, List[Tuple[int, int]]]:
+        """
+        One int64 key per row from several code columns (mixed radix)
+
+        Returns:
+            (keys, [(offset, size) per column]) needed to unpack the keys
+        """
+        keys = np.zeros(len(frame), dtype=np.int64)
+        radix = []
+        for col in columns:
+            codes = frame[col].to_numpy(dtype=np.int64)
+            if col in self.levels:
+                offset, size = 0, len(self.levels[col])
+            else:
+                # Histogram bucket: shift into a non-negative range
+                offset = int(codes.min(initial=0))
+                size = int(codes.max(initial=0)) - offset + 1
+            keys = keys * size + (codes - offset)
+            radix.append((offset, size))
+        return keys, radix
+
+    @staticmethod
+    def _unpack(keys: np.ndarray, radix: List[Tuple[int, int]]) -> List[np.ndarray]:
+        columns = []
+        for offset, size in reversed(radix):
+            columns.append(keys % size + offset)
+            keys = keys // size
+        return columns[::-1]
+
+    def _regroup(self, frame: pd.DataFrame, keys: List[str], measures: Dict) -> pd.DataFrame:
+        """Aggregate rows sharing the same key columns"""
+        packed, radix = self._pack(frame, keys)
+        grouped = frame[list(measures)].groupby(packed, sort=False).agg(measures)
+        columns = self._unpack(grouped.index.to_numpy(dtype=np.int64), radix)
+        table = pd.DataFrame({col: values.astype(np.int32) for col, values in zip(keys, columns)})
+        for col in measures:
+            table[col] = grouped[col].to_numpy()
+        return table
+
+    def _aggregate(self, events: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        dims = self._dimension_codes(events)
+        tat = events['tat_minutes'] if 'tat_minutes' in events.columns else pd.Series(np.nan, index=events.index)
+        wait = events['wait_minutes'] if 'wait_minutes' in events.columns else pd.Series(np.nan, index=events.index)
+        counts = events['count'].fillna(1) if 'count' in events.columns else pd.Series(1.0, index=events.index)
+
+        frame = dims.assign(count=counts.to_numpy(dtype=float),
+                            tat_count=tat.notna().to_numpy(dtype=np.int64),
+                            tat_sum=tat.fillna(0.0).to_numpy(dtype=float),
+                            tat_min=tat.to_numpy(dtype=float), tat_max=tat.to_numpy(dtype=float),
+                            wait_count=wait.notna().to_numpy(dtype=np.int64),
+                            wait_sum=wait.fillna(0.0).to_numpy(dtype=float))
+        cells = self._regroup(frame, DIMENSIONS, MEASURES)
+
+        valid = tat.notna().to_numpy()
+        values = tat.to_numpy(dtype=float)[valid]
+        buckets = np.full(len(values), ZERO_BUCKET, dtype=np.int64)
+        positive = values > 0
+        buckets[positive] = np.ceil(np.log(values[positive]) / math.log(self._gamma))
+        histogram = dims[valid].reset_index(drop=True).assign(bucket=buckets, n=1)
+        histogram = self._regroup(histogram, DIMENSIONS + ['bucket'], {'n': 'sum'})
+        return cells, histogram
+
+    def update(self, events: pd.DataFrame, normalized: bool = False) -> None:
+        """
+        Fold new event rows (e.g. a newly appended day) into the cube
+
+        Args:
+            events: Event rows, with export or canonical column names
+            normalized: Events already went through normalize_events
+        """
+        if not normalized:
+            events = normalize_events(events)
+        self.fingerprint = events_fingerprint(events, self.fingerprint)
+        cells, histogram = self._aggregate(events)
+        if len(self.cells):
+            cells = self._regroup(pd.concat([self.cells, cells], ignore_index=True), DIMENSIONS, MEASURES)
+            histogram = self._regroup(pd.concat([self.histogram, histogram], ignore_index=True),
+                                      DIMENSIONS + ['bucket'], {'n': 'sum'})
+        self.cells, self.histogram = cells, histogram
+        logger.info(f"KPI cube holds {len(self.cells)} cells covering {len(self.days_loaded)} days")
+
+    def save(self, path: Path) -> None:
+        """Persist the cube atomically"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'wb') as f:
+            pickle.dump({'format_version': CUBE_FORMAT_VERSION, 'cube': self}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+        tmp_path.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> Optional['KpiCube']:
+        """Load a persisted cube, or None if missing or from another format version"""
+        path = Path(path)
+        if not path.exists():
+            return None
+        try:
+            with open(path, 'rb') as f:
+                state = pickle.load(f)
+        except Exception as e:
+            logger.warning(f"Unreadable KPI cube {path}: {e}")
+            return None
+        if state.get('format_version') != CUBE_FORMAT_VERSION:
+            return None
+        return state['cube']
+
+    def _allowed(self, dim: str, value) -> np.ndarray:
+        """Boolean lookup table over the dimension's levels"""
+        levels = self.levels[dim]
+        if dim == 'day':
+            days = pd.DatetimeIndex(levels)
+            if isinstance(value, tuple):
+                start, end = value
+                allowed = days.notna()
+                if start is not None:
+                    allowed &= days >= pd.Timestamp(start)
+                if end is not None:
+                    allowed &= days <= pd.Timestamp(end)
+                return np.asarray(allowed)
+            value = [pd.Timestamp(v) for v in value] if isinstance(value, (list, set)) else [pd.Timestamp(value)]
+            return np.asarray(days.isin(value))
+        if not isinstance(value, (list, set)):
+            value = [value]
+        return np.asarray(pd.Index(levels, dtype=object).isin(list(value)))
+
+    def _select(self, frame: pd.DataFrame, filters: Dict) -> pd.DataFrame:
+        mask = np.ones(len(frame), dtype=bool)
+        for dim, value in filters.items():
+            if dim not in DIMENSIONS:
+                raise ValueError(f"Unknown cube dimension: {dim}")
+            mask &= self._allowed(dim, value)[frame[dim].to_numpy()]
+        return frame if mask.all() else frame[mask]
+
+    def _groups(self, cells: pd.DataFrame, histogram: pd.DataFrame, by: List[str]):
+        """
+        Group positions of cell and histogram rows for the `by` dimensions
+
+        Every histogram row belongs to a populated cell, so the groups are
+        taken from the (much smaller) cell table.
+
+        Returns:
+            (cell groups, histogram groups, group count, group index or None)
+        """
+        unknown = [dim for dim in by if dim not in DIMENSIONS]
+        if unknown:
+            raise ValueError(f"Unknown cube dimension: {unknown[0]}")
+        if not by:
+            return np.zeros(len(cells), dtype=np.int64), np.zeros(len(histogram), dtype=np.int64), 1, None
+        cell_keys, radix = self._pack(cells, by)
+        histogram_keys = self._pack(histogram, by)[0]
+        key_space = math.prod(size for _, size in radix)
+        if key_space <= MAX_MATRIX_CELLS:
+            # Dense key space: map keys to groups with a lookup table instead of sorting
+            present = np.zeros(key_space, dtype=bool)
+            present[cell_keys] = True
+            keys = np.flatnonzero(present)
+            lookup = np.cumsum(present) - 1
+            cell_groups, histogram_groups = lookup[cell_keys], lookup[histogram_keys]
+        else:
+            keys, cell_groups = np.unique(cell_keys, return_inverse=True)
+            histogram_groups = np.searchsorted(keys, histogram_keys)
+        arrays = [np.asarray(self.levels[dim], dtype=object)[codes]
+                  for dim, codes in zip(by, self._unpack(keys, radix))]
+        index = pd.MultiIndex.from_arrays(arrays, names=by) if len(by) > 1 else pd.Index(arrays[0], name=by[0])
+        return cell_groups, histogram_groups, len(keys), index
+
+    def _bucket_value(self, bucket: np.ndarray) -> np.ndarray:
+        values = 2 * np.power(self._gamma, bucket.astype(float)) / (self._gamma + 1)
+        return np.where(bucket == ZERO_BUCKET, 0.0, values)
+
+    def _quantiles(self, groups: np.ndarray, buckets: np.ndarray, n: np.ndarray,
+                   group_count: int, percentiles) -> Dict[float, np.ndarray]:
+        """
+        TAT quantiles per group from histogram rows
+
+        Args:
+            groups: Group position (0..group_count-1) of each histogram row
+            buckets: Bucket of each row
+            n: Count of each row
+            group_count: Number of groups
+            percentiles: Quantiles to compute
+
+        Returns:
+            Dictionary of quantile to per-group values (NaN for groups without TAT)
+        """
+        zero = buckets == ZERO_BUCKET
+        low = int(buckets[~zero].min()) if (~zero).any() else 0
+        columns = np.where(zero, 0, buckets - low + 1)
+        width = int(columns.max(initial=0)) + 1
+        values = self._bucket_value(np.concatenate([[ZERO_BUCKET], np.arange(low, low + width - 1)]))
+        totals = np.bincount(groups, weights=n, minlength=group_count)
+        result = {}
+
+        if group_count * width <= MAX_MATRIX_CELLS:
+            matrix = np.bincount(groups * width + columns, weights=n,
+                                 minlength=group_count * width).reshape(group_count, width)
+            cumulative = matrix.cumsum(axis=1)
+            for q in percentiles:
+                position = (cumulative <= (q * (totals - 1))[:, None]).sum(axis=1)
+                result[q] = np.where(totals > 0, values[np.minimum(position, width - 1)], np.nan)
+            return result
+
+        # Too many groups for a dense matrix: sort rows by (group, bucket) and scan
+        order = np.lexsort((columns, groups))
+        groups, columns = groups[order], columns[order]
+        before = np.concatenate([[0.0], np.cumsum(totals)[:-1]])
+        within = np.cumsum(n[order]) - before[groups]
+        starts = np.searchsorted(groups, np.arange(group_count))
+        for q in percentiles:
+            hits = np.flatnonzero(within > (q * (totals - 1))[groups])
+            first = hits[np.minimum(np.searchsorted(hits, starts), max(len(hits) - 1, 0))] if len(hits) else starts
+            result[q] = np.where(totals > 0, values[columns[np.minimum(first, len(columns) - 1)]], np.nan)
+        return result
+
+    def rollup(self, by: Optional[List[str]] = None, percentiles=(0.5, 0.95), **filters) -> pd.DataFrame:
+        """
+        Aggregate the cube along some dimensions
+
+        Args:
+            by: Dimensions to keep (all others are summed out)
+            percentiles: TAT percentiles to include as p50_tat, p95_tat, ...
+            **filters: Dimension values to restrict to; a list selects several
+                values, and day also accepts a (start, end) tuple
+
+        Returns:
+            DataFrame indexed by `by` with count, avg_tat, min/max and percentile
+            TAT and avg_wait columns
+        """
+        by = list(by or [])
+        cells = self._select(self.cells, filters)
+        histogram = self._select(self.histogram, filters)
+        cell_groups, histogram_groups, group_count, index = self._groups(cells, histogram, by)
+
+        def total(column: str) -> np.ndarray:
+            return np.bincount(cell_groups, weights=cells[column].to_numpy(dtype=float), minlength=group_count)
+
+        extremes = pd.DataFrame({'tat_min': cells['tat_min'].to_numpy(dtype=float),
+                                 'tat_max': cells['tat_max'].to_numpy(dtype=float)})
+        extremes = extremes.groupby(cell_groups).agg({'tat_min': 'min', 'tat_max': 'max'})
+        extremes = extremes.reindex(range(group_count))
+
+        tat_count = total('tat_count')
+        wait_count = total('wait_count')
+        result = pd.DataFrame({
+            'count': total('count'),
+            'tat_count': tat_count.astype(np.int64),
+            'avg_tat': total('tat_sum') / np.where(tat_count > 0, tat_count, np.nan),
+            'min_tat': extremes['tat_min'].to_numpy(),
+            'max_tat': extremes['tat_max'].to_numpy(),
+        }, index=index)
+
+        quantiles = self._quantiles(histogram_groups, histogram['bucket'].to_numpy(dtype=np.int64),
+                                    histogram['n'].to_numpy(dtype=float), group_count, percentiles)
+        for q in percentiles:
+            result[f"p{int(round(q * 100))}_tat"] = quantiles[q]
+        result['avg_wait'] = total('wait_sum') / np.where(wait_count > 0, wait_count, np.nan)
+        return result.sort_index() if by else result
+
+    def compliance(self, target: float, by: Optional[List[str]] = None, **filters) -> pd.Series:
+        """
+        Share of TAT results at or under a target, per group
+
+        Bucket boundaries make this exact to within the relative accuracy of
+        the target itself.
+
+        Args:
+            target: TAT target in minutes
+            by: Dimensions to keep
+            **filters: Dimension values to restrict to
+
+        Returns:
+            Series of compliance rates indexed by `by`
+        """
+        by = list(by or [])
+        cells = self._select(self.cells, filters)
+        histogram = self._select(self.histogram, filters)
+        _, groups, group_count, index = self._groups(cells, histogram, by)
+        n = histogram['n'].to_numpy(dtype=float)
+        within = np.where(self._bucket_value(histogram['bucket'].to_numpy(dtype=np.int64)) <= target, n, 0.0)
+        totals = np.bincount(groups, weights=n, minlength=group_count)
+        rates = np.bincount(groups, weights=within, minlength=group_count) / np.where(totals > 0, totals, np.nan)
+        rates = pd.Series(rates, index=index)
+        return rates.sort_index() if by else rates
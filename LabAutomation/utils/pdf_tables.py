@@ -0,0 +1,241 @@
+"""
+Kaiser Permanente Lab Automation System
+PDF Table Extraction
+
+Pulls tables out of the operational PDF exports (STAT TAT, resulting
+volume, staff idle time, ...) into DataFrames. Pages from every PDF are
+spread across a process pool, and the tables of each file are cached by
+content hash so an unchanged report is never parsed twice.
+"""
+
+import logging
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+try:
+    import pdfplumber
+    PDFPLUMBER_AVAILABLE = True
+except ImportError:
+    PDFPLUMBER_AVAILABLE = False
+
+from utils.columnar_cache import file_content_hash
+
+logger = logging.getLogger(__name__)
+
+CACHE_FORMAT_VERSION = 1
+
+# Share of non-blank cells that must parse as numbers for a column to be numeric
+NUMERIC_THRESHOLD = 0.8
+
+RawTable = List[List[Optional[str]]]
+
+
+def _page_count(pdf_path: str) -> int:
+    with pdfplumber.open(pdf_path) as pdf:
+        return len(pdf.pages)
+
+
+def _extract_pages(pdf_path: str, page_numbers: List[int]) -> List[Tuple[int, RawTable]]:
+    """Process pool entry point: raw tables from a batch of pages of one PDF"""
+    tables = []
+    with pdfplumber.open(pdf_path) as pdf:
+        for page_number in page_numbers:
+            for table in pdf.pages[page_number].extract_tables():
+                tables.append((page_number, table))
+    return tables
+
+
+def _clean_cell(value: Optional[str]) -> Optional[str]:
+    if value is None:
+        return None
+    value = ' '.join(str(value).split())
+    return value or None
+
+
+def _coerce_numeric(series: pd.Series) -> pd.Series:
+    text = series.dropna().astype(str)
+    if text.empty:
+        return series
+    stripped = series.astype('string').str.replace(r'[,%$]', '', regex=True).str.strip()
+    numbers = pd.to_numeric(stripped, errors='coerce')
+    if numbers.notna().sum() / len(text) >= NUMERIC_THRESHOLD:
+        return numbers
+    return series
+
+
+def table_to_frame(table: RawTable) -> pd.DataFrame:
+    """
+    Convert a raw extracted table into a DataFrame
+
+    Whitespace is normalized, empty rows and columns are dropped, the
+    first fully populated row becomes the header, and columns that are
+    mostly numbers (allowing thousands separators, % and $) are converted.
+
+    Args:
+        table: Rows of cell strings as returned by pdfplumber
+
+    Returns:
+        Cleaned DataFrame (empty when the table has no content)
+    """
+    frame = pd.DataFrame([[_clean_cell(cell) for cell in row] for row in table])
+    frame = frame.dropna(how='all').dropna(axis=1, how='all')
+    if frame.empty:
+        return pd.DataFrame()
+
+    header_index = next((index for index, row in frame.iterrows() if row.notna().all()), None)
+    if header_index is not None and len(frame) > 1:
+        header = frame.loc[header_index]
+        frame = frame.loc[header_index:].iloc[1:]
+        columns, seen = [], {}
+        for name in header:
+            seen[name] = seen.get(name, 0) + 1
+            columns.append(name if seen[name] == 1 else f"{name}_{seen[name]}")
+        frame.columns = columns
+    else:
+        frame.columns = [f"column_{index}" for index in range(frame.shape[1])]
+
+    frame = frame.reset_index(drop=True)
+    for col in frame.columns:
+        frame[col] = _coerce_numeric(frame[col])
+    return frame
+
+
+class PdfTableExtractor:
+    """
+    Extracts tables from PDF reports with a content-hash cache.
+
+    Each cache entry holds every table of one PDF, keyed by the SHA-256 of
+    the file, so renamed copies of the same export share an entry and an
+    edited export is re-extracted.
+    """
+
+    def __init__(self, cache_dir: str, max_workers: Optional[int] = None, pages_per_task: int = 2):
+        """
+        Initialize the extractor
+
+        Args:
+            cache_dir: Directory where extracted tables are cached
+            max_workers: Worker processes (defaults to one per CPU)
+            pages_per_task: Pages handed to a worker at a time
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.pages_per_task = pages_per_task
+
+    def _cache_path(self, content_hash: str) -> Path:
+        return self.cache_dir / f"{content_hash}.v{CACHE_FORMAT_VERSION}.pkl"
+
+    def _load_cached(self, content_hash: str) -> Optional[List[pd.DataFrame]]:
+        cache_path = self._cache_path(content_hash)
+        if not cache_path.exists():
+            return None
+        try:
+            with open(cache_path, 'rb') as f:
+                return pickle.load(f)
+        except Exception as e:
+            logger.warning(f"Unreadable PDF table cache {cache_path}: {e}")
+            return None
+
+    def _store(self, content_hash: str, frames: List[pd.DataFrame]) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        cache_path = self._cache_path(content_hash)
+        tmp_path = cache_path.with_suffix('.tmp')
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(frames, f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp_path.replace(cache_path)
+
+    def extract(self, pdf_path: Path) -> List[pd.DataFrame]:
+        """
+        Get the tables of one PDF
+
+        Args:
+            pdf_path: Path to the PDF report
+
+        Returns:
+            List of DataFrames; `frame.attrs` holds the source file, page and table index
+        """
+        return self.extract_many([pdf_path]).get(str(pdf_path), [])
+
+    def extract_many(self, pdf_paths: List[Path]) -> Dict[str, List[pd.DataFrame]]:
+        """
+        Get the tables of several PDFs, parsing uncached pages in parallel
+
+        Args:
+            pdf_paths: Paths to PDF reports
+
+        Returns:
+            Dictionary of PDF path to its list of DataFrames
+        """
+        results: Dict[str, List[pd.DataFrame]] = {}
+        pending: Dict[str, Tuple[Path, str]] = {}
+
+        for pdf_path in map(Path, pdf_paths):
+            content_hash = file_content_hash(pdf_path)
+            cached = self._load_cached(content_hash)
+            if cached is not None:
+                # The entry may have been written for a renamed copy
+                for frame in cached:
+                    frame.attrs['source'] = pdf_path.name
+                results[str(pdf_path)] = cached
+            else:
+                pending[str(pdf_path)] = (pdf_path, content_hash)
+
+        if not pending:
+            return results
+        if not PDFPLUMBER_AVAILABLE:
+            logger.warning(f"pdfplumber not installed; cannot extract tables from {len(pending)} PDF files "
+                           f"(pip install pdfplumber)")
+            return results
+
+        tasks = []
+        opened = set()
+        for key, (pdf_path, _) in pending.items():
+            try:
+                pages = list(range(_page_count(str(pdf_path))))
+            except Exception as e:
+                logger.error(f"Could not open {pdf_path.name}: {str(e)}")
+                continue
+            opened.add(key)
+            for start in range(0, len(pages), self.pages_per_task):
+                tasks.append((key, pages[start:start + self.pages_per_task]))
+
+        raw: Dict[str, List[Tuple[int, RawTable]]] = {key: [] for key in pending}
+        failed = set()
+        workers = min(self.max_workers, len(tasks))
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [(key, executor.submit(_extract_pages, key, pages)) for key, pages in tasks]
+                for key, future in futures:
+                    try:
+                        raw[key].extend(future.result())
+                    except Exception as e:
+                        logger.error(f"Error extracting tables from {Path(key).name}: {str(e)}")
+                        failed.add(key)
+        else:
+            for key, pages in tasks:
+                try:
+                    raw[key].extend(_extract_pages(key, pages))
+                except Exception as e:
+                    logger.error(f"Error extracting tables from {Path(key).name}: {str(e)}")
+                    failed.add(key)
+
+        for key, (pdf_path, content_hash) in pending.items():
+            if key in failed or key not in opened:
+                continue
+            frames = []
+            for table_index, (page_number, table) in enumerate(sorted(raw[key], key=lambda item: item[0])):
+                frame = table_to_frame(table)
+                if frame.empty:
+                    continue
+                frame.attrs.update({'source': pdf_path.name, 'page': page_number + 1, 'table': table_index})
+                frames.append(frame)
+            self._store(content_hash, frames)
+            results[key] = frames
+            logger.info(f"Extracted {len(frames)} tables from {pdf_path.name}")
+
+        return results
@@ -0,0 +1,333 @@
+"""
+Kaiser Permanente Lab Automation System
+Performance Engine
+
+Vectorized computation of the LabPerformanceAnalyzer metrics from
+event-level rows: shift-level TAT compliance, station idle time and
+utilization, monthly encounters and hourly volume peaks, and queue waits.
+Everything is done with grouped pandas/NumPy operations so a full year of
+events (millions of rows) is processed in seconds. Each analysis returns
+None when the events lack the columns it needs, so callers can fall back.
+"""
+
+import logging
+import re
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.ingestion_schema import as_datetime, as_numeric
+
+logger = logging.getLogger(__name__)
+
+# (pattern, canonical column), matched against the lowercased column name with
+# punctuation turned into spaces ('Queue_Wait-Minutes' -> 'queue wait minutes').
+# Numeric targets come first so 'Queue Wait Minutes' or 'Station Active Minutes'
+# aren't taken by the queue/station labels. A column takes the first rule whose
+# target is still free and whose values fit it.
+EVENT_COLUMN_RULES: List[Tuple[str, str]] = [
+    (r'\btat\b|\bturnaround\b', 'tat_minutes'),
+    (r'\bidle\b', 'idle_minutes'),
+    (r'\bbusy\b|\bactive\b', 'busy_minutes'),
+    (r'\bwait(ing)?\b', 'wait_minutes'),
+    (r'\bcount\b|\bvolume\b', 'count'),
+    (r'\bcollect\w* (date|time)\b|\border\w* (date|time)\b|^date$|\btimestamp\b|\bdatetime\b', 'timestamp'),
+    (r'\bpriority\b', 'priority'),
+    (r'\bshift\b', 'shift'),
+    (r'\bstation\b', 'station'),
+    (r'\b(visit|queue) ?type\b', 'visit_type'),
+    (r'\bqueue\b', 'queue'),
+    (r'\bno ?show\b', 'no_show'),
+    (r'\bencounter ?(id|number|no)\b|\bcsn\b', 'encounter_id'),
+    (r'\bpatient ?(id|number|no)\b|\bmrn\b', 'patient_id'),
+]
+
+NUMERIC_EVENT_COLUMNS = ['tat_minutes', 'idle_minutes', 'busy_minutes', 'wait_minutes', 'count']
+LABEL_EVENT_COLUMNS = ['priority', 'station', 'visit_type', 'queue']
+CANONICAL_EVENT_COLUMNS = NUMERIC_EVENT_COLUMNS + LABEL_EVENT_COLUMNS + \
+    ['timestamp', 'shift', 'no_show', 'encounter_id', 'patient_id']
+
+# Share of a column's non-missing values (in a sample) that must parse for it
+# to be accepted as a numeric or timestamp column
+MIN_PARSED_SHARE = 0.5
+TYPE_SAMPLE_ROWS = 1000
+
+SHIFT_ORDER = ['day', 'evening', 'night']
+
+# Hour ranges (start inclusive, end exclusive) searched for each peak window
+PEAK_PERIODS = {
+    'morning_peak': (6, 12),
+    'afternoon_peak': (12, 17),
+    'evening_peak': (17, 23),
+}
+
+
+def _label(series: pd.Series, suffix: Optional[str] = None) -> pd.Series:
+    """
+    Lowercase snake_case labels, e.g. 'Day Shift' -> 'day_shift'
+
+    Only the distinct values are rewritten; rows keep their category codes.
+    """
+    values = series.astype('category')
+    text = values.cat.categories.astype(str).str.strip().str.lower()
+    if suffix:
+        text = text.str.replace(rf'\s*{suffix}$', '', regex=True)
+    labels = text.str.replace(r'[^a-z0-9]+', '_', regex=True).str.strip('_')
+    # Code -1 (missing) picks the trailing None
+    lookup = np.append(np.asarray(labels, dtype=object), None)
+    return pd.Series(pd.Categorical(lookup[values.cat.codes.to_numpy()]), index=series.index)
+
+
+def _fits(series: pd.Series, canonical: str) -> bool:
+    """Whether a sample of the column parses as the canonical column's type"""
+    if canonical not in NUMERIC_EVENT_COLUMNS and canonical != 'timestamp':
+        return True
+    sample = series.dropna().head(TYPE_SAMPLE_ROWS)
+    if sample.empty:
+        return False
+    if canonical == 'timestamp':
+        if pd.api.types.is_numeric_dtype(sample):
+            return False
+        parsed = as_datetime(sample.astype(str))
+    else:
+        if pd.api.types.is_bool_dtype(sample):
+            return False
+        parsed = as_numeric(sample)
+    return parsed.notna().mean() >= MIN_PARSED_SHARE
+
+
+def normalize_events(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Map export column names onto the engine's canonical event columns
+
+    Args:
+        df: Event rows with export column names (e.g. 'TAT Minutes', 'Collected Date')
+
+    Returns:
+        DataFrame with canonical, typed columns; unmapped columns are dropped
+    """
+    mapping: Dict[str, str] = {}
+    for col in df.columns:
+        if col in CANONICAL_EVENT_COLUMNS and col not in mapping.values():
+            mapping[col] = col
+    for col in df.columns:
+        if col in mapping:
+            continue
+        name = re.sub(r'[^a-z0-9]+', ' ', str(col).lower()).strip()
+        for pattern, canonical in EVENT_COLUMN_RULES:
+            if canonical in mapping.values() or not re.search(pattern, name):
+                continue
+            if _fits(df[col], canonical):
+                mapping[col] = canonical
+                break
+            logger.debug(f"Column {col!r} matches {canonical} but its values don't fit")
+
+    events = df[list(mapping)].rename(columns=mapping)
+    for col in NUMERIC_EVENT_COLUMNS:
+        if col in events.columns:
+            events[col] = as_numeric(events[col])
+    for col in LABEL_EVENT_COLUMNS:
+        if col in events.columns:
+            events[col] = _label(events[col])
+    if 'timestamp' in events.columns:
+        events['timestamp'] = as_datetime(events['timestamp'])
+    if 'no_show' in events.columns and not pd.api.types.is_bool_dtype(events['no_show']):
+        flags = events['no_show'].astype('string').str.strip().str.lower()
+        events['no_show'] = flags.isin(['1', 'true', 'yes', 'y', 'no show', 'no-show'])
+    if 'shift' in events.columns:
+        events['shift'] = _label(events['shift'], suffix='shift')
+    elif 'timestamp' in events.columns:
+        hours = events['timestamp'].dt.hour.to_numpy()
+        shift = np.select([(hours >= 7) & (hours < 15), (hours >= 15) & (hours < 23)], ['day', 'evening'], 'night')
+        events['shift'] = pd.Categorical(np.where(events['timestamp'].isna(), None, shift))
+    return events
+
+
+class PerformanceEngine:
+    """
+    Computes analyzer result dictionaries from event-level rows.
+
+    The dictionaries have the same keys and value types as the ones the
+    LabPerformanceAnalyzer used to hard-code, so reports, summaries and
+    charts consume them unchanged.
+    """
+
+    def __init__(self, events: pd.DataFrame, kpis: Dict):
+        """
+        Initialize the engine
+
+        Args:
+            events: Event rows, with export or canonical column names
+            kpis: Analyzer KPI targets
+        """
+        self.events = normalize_events(events)
+        self.kpis = kpis
+        logger.info(f"Performance engine loaded {len(self.events)} events "
+                    f"with columns {list(self.events.columns)}")
+
+    def _has(self, *columns: str) -> bool:
+        return all(col in self.events.columns for col in columns)
+
+    def _tat_by_shift(self, tat: pd.DataFrame, target: float) -> Dict:
+        """avg/p95/compliance for all shifts and each shift, in one grouped pass"""
+        within = (tat['tat_minutes'] <= target).rename('within')
+        grouped = pd.concat([tat, within], axis=1).groupby('shift', observed=True)
+        per_shift = pd.DataFrame({
+            'avg_tat': grouped['tat_minutes'].mean(),
+            'p95_tat': grouped['tat_minutes'].quantile(0.95),
+            'compliance_rate': grouped['within'].mean()
+        })
+
+        performance = {'all_shift': {
+            'avg_tat': float(tat['tat_minutes'].mean()),
+            'p95_tat': float(tat['tat_minutes'].quantile(0.95)),
+            'compliance_rate': float(within.mean())
+        }}
+        ordered = [s for s in SHIFT_ORDER if s in per_shift.index] + \
+                  sorted(s for s in per_shift.index if s not in SHIFT_ORDER)
+        for shift in ordered:
+            row = per_shift.loc[shift]
+            performance[f"{shift}_shift"] = {
+                'avg_tat': float(row['avg_tat']),
+                'p95_tat': float(row['p95_tat']),
+                'compliance_rate': float(row['compliance_rate'])
+            }
+        return performance
+
+    def tat_analysis(self) -> Optional[Dict]:
+        """STAT/routine TAT by shift and overall STAT compliance"""
+        if not self._has('tat_minutes', 'priority', 'shift'):
+            return None
+        tat = self.events[['tat_minutes', 'priority', 'shift']].dropna(subset=['tat_minutes', 'shift'])
+        stat = tat[tat['priority'] == 'stat']
+        if stat.empty:
+            return None
+
+        stat_target = self.kpis['tat']['stat_target']
+        stat_performance = self._tat_by_shift(stat, stat_target)
+        routine = tat[tat['priority'] == 'routine']
+        routine_performance = self._tat_by_shift(routine, self.kpis['tat']['routine_target']) \
+            if not routine.empty else {}
+
+        overall = stat_performance['all_shift']
+        shift_means = {k: v['avg_tat'] for k, v in stat_performance.items() if k != 'all_shift'}
+        return {
+            'stat_performance': stat_performance,
+            'routine_performance': routine_performance,
+            'shift_comparison': {
+                'best_shift': min(shift_means, key=shift_means.get) if shift_means else None,
+                'worst_shift': max(shift_means, key=shift_means.get) if shift_means else None,
+                'spread_minutes': max(shift_means.values()) - min(shift_means.values()) if shift_means else 0.0
+            },
+            'trends': {},
+            'overall_stat': {
+                'avg_tat': overall['avg_tat'],
+                'compliance_rate': overall['compliance_rate'],
+                'target_met': overall['avg_tat'] <= stat_target
+            }
+        }
+
+    def staffing_analysis(self) -> Optional[Dict]:
+        """Idle time and utilization per station"""
+        if not self._has('station', 'idle_minutes', 'busy_minutes'):
+            return None
+        totals = self.events.groupby('station', observed=True)[['idle_minutes', 'busy_minutes']].sum()
+        staffed = totals['idle_minutes'] + totals['busy_minutes']
+        totals = totals[staffed > 0]
+        if totals.empty:
+            return None
+
+        idle = totals['idle_minutes'] / (totals['idle_minutes'] + totals['busy_minutes'])
+        idle_time = {station: {'idle_time': float(value), 'utilization': float(1 - value)}
+                     for station, value in idle.items()}
+        avg_idle = float(idle.mean())
+        return {
+            'idle_time': idle_time,
+            'utilization': {station: data['utilization'] for station, data in idle_time.items()},
+            'performance_by_staff': {},
+            'shift_coverage': {},
+            'overall': {
+                'avg_idle_time': avg_idle,
+                'avg_utilization': 1 - avg_idle,
+                'idle_time_target_met': avg_idle <= self.kpis['staffing']['idle_time_target'],
+                'utilization_target_met': 1 - avg_idle >= self.kpis['staffing']['utilization_target']
+            }
+        }
+
+    def volume_analysis(self) -> Optional[Dict]:
+        """Monthly encounters, volume by priority and peak two-hour windows"""
+        if not self._has('timestamp'):
+            return None
+        events = self.events[self.events['timestamp'].notna()]
+        if events.empty:
+            return None
+        counts = events['count'].fillna(1) if 'count' in events.columns else pd.Series(1.0, index=events.index)
+        months = events['timestamp'].dt.to_period('M')
+
+        if 'encounter_id' in events.columns:
+            monthly = events['encounter_id'].groupby(months).nunique()
+        else:
+            monthly = counts.groupby(months).sum()
+        latest_year = monthly.index.max().year
+        patient_encounters = {period.strftime('%B').lower(): int(value) for period, value in monthly.iloc[-3:].items()}
+        patient_encounters['ytd_total'] = int(monthly[monthly.index.year == latest_year].sum())
+
+        total = float(counts.sum())
+        lab_volumes = {}
+        if 'priority' in events.columns:
+            by_priority = counts.groupby(events['priority'], observed=True).sum()
+            for priority, volume in by_priority.items():
+                lab_volumes[f"{priority}_tests"] = {'volume': int(volume), 'percentage': float(volume / total)}
+
+        hourly = np.bincount(events['timestamp'].dt.hour.to_numpy(), weights=counts.to_numpy(), minlength=24)
+        two_hour = hourly + np.roll(hourly, -1)
+        days = max(events['timestamp'].dt.normalize().nunique(), 1)
+        peak_hours = {}
+        for name, (start, end) in PEAK_PERIODS.items():
+            hour = start + int(np.argmax(two_hour[start:end - 1]))
+            peak_hours[name] = {
+                'hour': f"{hour}-{hour + 2}",
+                'volume': int(round(two_hour[hour] / days)),
+                'percentage': float(two_hour[hour] / total)
+            }
+
+        return {
+            'patient_encounters': patient_encounters,
+            'lab_volumes': lab_volumes,
+            'trends': {'daily_average': total / days},
+            'peak_hours': peak_hours
+        }
+
+    def queue_analysis(self) -> Optional[Dict]:
+        """Waits per queue and per visit type, and no-show rates when recorded"""
+        if not self._has('queue', 'wait_minutes'):
+            return None
+        target = self.kpis['queue']['wait_time_target']
+        events = self.events.dropna(subset=['queue'])
+        grouped = events.groupby('queue', observed=True)['wait_minutes']
+        waits = pd.DataFrame({'avg_wait': grouped.mean(), 'p95_wait': grouped.quantile(0.95)}).dropna()
+        if waits.empty:
+            return None
+
+        wait_times = {f"{queue}_queue": {'avg_wait': float(row['avg_wait']),
+                                         'p95_wait': float(row['p95_wait']),
+                                         'target_met': bool(row['p95_wait'] <= target)}
+                      for queue, row in waits.iterrows()}
+
+        type_column = 'visit_type' if 'visit_type' in events.columns else 'queue'
+        by_type = events.groupby(type_column, observed=True)['wait_minutes'].agg(['size', 'mean'])
+        queue_types = {str(name): {'volume': int(row['size']), 'avg_wait': float(row['mean'])}
+                       for name, row in by_type.iterrows()}
+
+        analysis = {
+            'wait_times': wait_times,
+            'queue_types': queue_types,
+            'no_show_rates': {},
+            'scheduling_efficiency': {}
+        }
+        if 'no_show' in events.columns:
+            rates = events.groupby(type_column, observed=True)['no_show'].mean()
+            analysis['no_show_rates'] = {'overall_rate': float(events['no_show'].mean()),
+                                         **{str(name): float(rate) for name, rate in rates.items()}}
+        return analysis
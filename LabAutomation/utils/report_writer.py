@@ -0,0 +1,359 @@
+"""
+Kaiser Permanente Lab Automation System
+Streaming Report Writer
+
+Reports are produced as a stream of blocks (title, section, line, field,
+list item, ...) that is walked exactly once and fanned out to several
+sinks: plain text, Markdown, HTML and JSON. Each sink writes straight to
+its stream (a file or an HTTP response), so no report is ever held in
+memory as one string, and adding a format costs a sink, not another pass.
+"""
+
+import html
+import json
+import logging
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, TextIO
+
+logger = logging.getLogger(__name__)
+
+RULE_WIDTH = 80
+SECTION_RULE_WIDTH = 40
+
+
+class Block(NamedTuple):
+    """One report element; `value` carries the raw number behind a field"""
+    kind: str
+    text: str = ''
+    label: str = ''
+    value: Any = None
+    indent: int = 0
+    marker: str = ''
+
+
+def title(text: str) -> Block:
+    return Block('title', text)
+
+
+def subtitle(text: str) -> Block:
+    return Block('subtitle', text)
+
+
+def rule(char: str = '=') -> Block:
+    return Block('rule', char)
+
+
+def section(text: str) -> Block:
+    return Block('section', text)
+
+
+def line(text: str) -> Block:
+    return Block('line', text)
+
+
+def blank() -> Block:
+    return Block('blank')
+
+
+def field(label: str, display: str, value: Any = None, indent: int = 0) -> Block:
+    """A labelled value; `display` is the formatted text, `value` the raw value for JSON"""
+    return Block('field', display, label, display if value is None else value, indent)
+
+
+def item(text: str, indent: int = 2, marker: str = '') -> Block:
+    """A list entry; text output is indented by `indent` spaces and prefixed with `marker`"""
+    return Block('item', text, indent=indent, marker=marker)
+
+
+def numbered(number: int, text: str) -> Block:
+    return Block('numbered', text, value=number)
+
+
+class ReportSink:
+    """Receives report blocks in order and writes them to a text stream"""
+
+    extension = ''
+
+    def __init__(self, stream: TextIO):
+        self.stream = stream
+
+    def begin(self, report_title: str) -> None:
+        pass
+
+    def write(self, block: Block) -> None:
+        raise NotImplementedError
+
+    def end(self) -> None:
+        pass
+
+
+class TextSink(ReportSink):
+    """Plain text, identical to the reports' original layout"""
+
+    extension = 'txt'
+
+    def __init__(self, stream: TextIO):
+        super().__init__(stream)
+        self._first = True
+
+    def _emit(self, text: str) -> None:
+        # Lines are newline-separated with no trailing newline
+        if not self._first:
+            self.stream.write('\n')
+        self.stream.write(text)
+        self._first = False
+
+    def write(self, block: Block) -> None:
+        kind = block.kind
+        if kind == 'rule':
+            self._emit(block.text * RULE_WIDTH)
+        elif kind == 'section':
+            self._emit(block.text)
+            self._emit('-' * SECTION_RULE_WIDTH)
+        elif kind == 'blank':
+            self._emit('')
+        elif kind == 'field':
+            self._emit(f"{' ' * block.indent}{block.label}: {block.text}")
+        elif kind == 'item':
+            self._emit(f"{' ' * block.indent}{block.marker}{block.text}")
+        elif kind == 'numbered':
+            self._emit(f"{block.value}. {block.text}")
+        else:
+            self._emit(block.text)
+
+
+class MarkdownSink(ReportSink):
+    extension = 'md'
+
+    def write(self, block: Block) -> None:
+        kind = block.kind
+        depth = max(block.indent // 2 - 1, 0)
+        if kind == 'title':
+            self.stream.write(f"# {block.text}\n\n")
+        elif kind == 'subtitle':
+            self.stream.write(f"*{block.text}*\n\n")
+        elif kind == 'rule':
+            self.stream.write("\n---\n\n")
+        elif kind == 'section':
+            self.stream.write(f"\n## {block.text}\n\n")
+        elif kind == 'blank':
+            self.stream.write("\n")
+        elif kind == 'field':
+            prefix = f"{'  ' * depth}- " if block.indent else ''
+            self.stream.write(f"{prefix}**{block.label}:** {block.text}  \n")
+        elif kind == 'item':
+            self.stream.write(f"{'  ' * depth}- {block.text}\n")
+        elif kind == 'numbered':
+            self.stream.write(f"{block.value}. {block.text}\n")
+        else:
+            self.stream.write(f"{block.text}  \n")
+
+
+class HtmlSink(ReportSink):
+    extension = 'html'
+
+    def __init__(self, stream: TextIO):
+        super().__init__(stream)
+        self._list: Optional[str] = None
+
+    def _close_list(self) -> None:
+        if self._list:
+            self.stream.write(f"</{self._list}>\n")
+            self._list = None
+
+    def _open_list(self, tag: str) -> None:
+        if self._list != tag:
+            self._close_list()
+            self.stream.write(f"<{tag}>\n")
+            self._list = tag
+
+    def begin(self, report_title: str) -> None:
+        self.stream.write('<!DOCTYPE html>\n<html lang="en">\n<head>\n<meta charset="utf-8">\n'
+                          f"<title>{html.escape(report_title)}</title>\n</head>\n<body>\n")
+
+    def write(self, block: Block) -> None:
+        kind = block.kind
+        text = html.escape(block.text)
+        if kind in ('item', 'field') and block.indent:
+            self._open_list('ul')
+            body = f"<strong>{html.escape(block.label)}:</strong> {text}" if kind == 'field' else text
+            self.stream.write(f"<li>{body}</li>\n")
+            return
+        if kind == 'numbered':
+            self._open_list('ol')
+            self.stream.write(f'<li value="{block.value}">{text}</li>\n')
+            return
+        self._close_list()
+        if kind == 'title':
+            self.stream.write(f"<h1>{text}</h1>\n")
+        elif kind == 'subtitle':
+            self.stream.write(f'<p class="subtitle">{text}</p>\n')
+        elif kind == 'rule':
+            self.stream.write("<hr>\n")
+        elif kind == 'section':
+            self.stream.write(f"<h2>{text}</h2>\n")
+        elif kind == 'field':
+            self.stream.write(f"<p><strong>{html.escape(block.label)}:</strong> {text}</p>\n")
+        elif kind in ('line', 'item'):
+            self.stream.write(f"<p>{text}</p>\n")
+
+    def end(self) -> None:
+        self._close_list()
+        self.stream.write("</body>\n</html>\n")
+
+
+def _json_default(value: Any) -> Any:
+    # numpy scalars and timestamps
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+class JsonSink(ReportSink):
+    """
+    {"title": ..., "sections": [{"heading": ..., "entries": [...]}]}, written incrementally
+
+    Fields keep their raw values, so numbers stay numbers.
+    """
+
+    extension = 'json'
+
+    def __init__(self, stream: TextIO):
+        super().__init__(stream)
+        self._section_open = False
+        self._entries = 0
+        self._sections = 0
+
+    def _dump(self, value: Any) -> str:
+        return json.dumps(value, ensure_ascii=False, default=_json_default)
+
+    def begin(self, report_title: str) -> None:
+        self.stream.write(f'{{"title": {self._dump(report_title)}, "sections": [')
+
+    def _open_section(self, heading: Optional[str]) -> None:
+        self._close_section()
+        separator = ', ' if self._sections else ''
+        self.stream.write(f'{separator}\n{{"heading": {self._dump(heading)}, "entries": [')
+        self._section_open = True
+        self._entries = 0
+        self._sections += 1
+
+    def _close_section(self) -> None:
+        if self._section_open:
+            self.stream.write(']}')
+            self._section_open = False
+
+    def _entry(self, entry: Dict) -> None:
+        if not self._section_open:
+            self._open_section(None)
+        separator = ', ' if self._entries else ''
+        self.stream.write(f"{separator}\n  {self._dump(entry)}")
+        self._entries += 1
+
+    def write(self, block: Block) -> None:
+        kind = block.kind
+        if kind == 'section':
+            self._open_section(block.text)
+        elif kind in ('title', 'subtitle', 'line'):
+            self._entry({kind: block.text} if kind != 'line' else {'text': block.text})
+        elif kind == 'field':
+            self._entry({'label': block.label, 'value': block.value, 'display': block.text})
+        elif kind == 'item':
+            self._entry({'item': block.text, 'level': max(block.indent // 2, 1)})
+        elif kind == 'numbered':
+            self._entry({'item': block.text, 'number': block.value})
+
+    def end(self) -> None:
+        self._close_section()
+        self.stream.write('\n]}\n')
+
+
+SINKS = {
+    'text': TextSink,
+    'markdown': MarkdownSink,
+    'html': HtmlSink,
+    'json': JsonSink,
+}
+
+
+class ReportWriter:
+    """Fans one pass over a block stream out to several sinks"""
+
+    def __init__(self, sinks: List[ReportSink]):
+        self.sinks = sinks
+
+    def write(self, blocks: Iterable[Block], report_title: str = '') -> int:
+        """
+        Stream blocks to every sink
+
+        Args:
+            blocks: Report blocks, typically a generator
+            report_title: Document title for formats that have one
+
+        Returns:
+            Number of blocks written
+        """
+        for sink in self.sinks:
+            sink.begin(report_title)
+        count = 0
+        for block in blocks:
+            for sink in self.sinks:
+                sink.write(block)
+            count += 1
+        for sink in self.sinks:
+            sink.end()
+        return count
+
+
+def stream_report(blocks: Iterable[Block], streams: Dict[str, TextIO], report_title: str = '') -> int:
+    """
+    Write a report to already-open text streams, e.g. an HTTP response
+
+    Args:
+        blocks: Report blocks
+        streams: Dictionary of format name (see SINKS) to writable text stream
+        report_title: Document title
+
+    Returns:
+        Number of blocks written
+    """
+    unknown = [fmt for fmt in streams if fmt not in SINKS]
+    if unknown:
+        raise ValueError(f"Unknown report format: {unknown[0]}")
+    return ReportWriter([SINKS[fmt](stream) for fmt, stream in streams.items()]).write(blocks, report_title)
+
+
+def write_report(blocks: Iterable[Block], stem: str, formats: Iterable[str] = ('text',),
+                 output_dir: str = '.', report_title: str = '') -> Dict[str, Path]:
+    """
+    Write a report to '<stem>.<ext>' files, one per format, in a single pass
+
+    Args:
+        blocks: Report blocks
+        stem: File name without extension
+        formats: Format names from SINKS
+        output_dir: Directory for the files
+        report_title: Document title
+
+    Returns:
+        Dictionary of format name to written path
+    """
+    formats = list(dict.fromkeys(formats))
+    unknown = [fmt for fmt in formats if fmt not in SINKS]
+    if unknown:
+        raise ValueError(f"Unknown report format: {unknown[0]}")
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    paths = {fmt: output_dir / f"{stem}.{SINKS[fmt].extension}" for fmt in formats}
+    streams = {}
+    try:
+        for fmt, path in paths.items():
+            streams[fmt] = open(path, 'w', encoding='utf-8')
+        blocks_written = stream_report(blocks, streams, report_title)
+    finally:
+        for stream in streams.values():
+            stream.close()
+
+    logger.info(f"Wrote {blocks_written} report blocks to {', '.join(str(p) for p in paths.values())}")
+    return paths
@@ -0,0 +1,285 @@
+"""
+Kaiser Permanente Lab Automation System
+Columnar Staff Store
+
+Holds staff profiles column by column: ratings, compliance, idle time and
+violation counts as NumPy arrays, and station, position, supervisor and
+risk tier as integer codes with a secondary index per value. Filters are
+vectorized masks, index lookups return row arrays directly, and top-k
+queries use argpartition, so queries over thousands of staff across
+centers stay fast without looping over per-person dicts.
+"""
+
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+NUMERIC_COLUMNS: Dict[str, np.dtype] = {
+    'performance_rating': np.dtype('float32'),
+    'tat_compliance': np.dtype('float32'),
+    'error_rate': np.dtype('float32'),
+    'idle_time': np.dtype('float32'),
+    'attendance_rate': np.dtype('float32'),
+    'qc_compliance': np.dtype('float32'),
+    'break_violations': np.dtype('int32'),
+}
+
+INDEXED_COLUMNS = ('station', 'position', 'supervisor', 'risk_tier')
+
+# Kept per row as given, not used for filtering
+DETAIL_COLUMNS = ('name', 'hire_date', 'behavioral_issues', 'supervisor_notes')
+
+RISK_TIERS = ('critical', 'high', 'moderate', 'low')
+
+# Upper rating bound (exclusive for all but 'critical') of each tier
+RISK_TIER_RATINGS = {'critical': 2.0, 'high': 3.0, 'moderate': 3.5}
+
+Range = Tuple[Optional[float], Optional[float]]
+
+
+def risk_tier_codes(ratings: np.ndarray) -> np.ndarray:
+    """Risk tier code (index into RISK_TIERS) for each performance rating out of 5"""
+    return np.select(
+        [ratings <= RISK_TIER_RATINGS['critical'],
+         ratings < RISK_TIER_RATINGS['high'],
+         ratings < RISK_TIER_RATINGS['moderate']],
+        [0, 1, 2],
+        default=3,
+    ).astype(np.int32)
+
+
+class StaffStore:
+    """
+    Column store of staff profiles with indexes by station, position,
+    supervisor and risk tier.
+
+    Rows are appended; row order is insertion order, which is also the
+    order records come back in.
+    """
+
+    def __init__(self, capacity: int = 64):
+        """
+        Initialize an empty store
+
+        Args:
+            capacity: Initial number of rows allocated (grows by doubling)
+        """
+        self._size = 0
+        self._capacity = max(capacity, 1)
+        # Bumped on every change so derived results can be cached
+        self.version = 0
+        self.ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._numeric = {name: np.zeros(self._capacity, dtype) for name, dtype in NUMERIC_COLUMNS.items()}
+        self._codes = {name: np.zeros(self._capacity, np.int32) for name in INDEXED_COLUMNS}
+        self.levels: Dict[str, List[str]] = {name: [] for name in INDEXED_COLUMNS}
+        self.levels['risk_tier'] = list(RISK_TIERS)
+        self._level_codes: Dict[str, Dict[str, int]] = {
+            name: {value: code for code, value in enumerate(levels)} for name, levels in self.levels.items()
+        }
+        self._details: List[Dict[str, Any]] = []
+        self._indexes: Optional[Dict[str, Dict[int, np.ndarray]]] = None
+
+    @classmethod
+    def from_profiles(cls, profiles: Dict[str, Dict]) -> 'StaffStore':
+        """
+        Build a store from profile dictionaries keyed by staff id
+
+        Args:
+            profiles: e.g. {'staff_1': {'name': ..., 'station': ..., 'tat_compliance': ...}}
+        """
+        store = cls(capacity=len(profiles))
+        for staff_id, profile in profiles.items():
+            store.add(staff_id, profile)
+        return store
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, staff_id: str) -> bool:
+        return staff_id in self._rows
+
+    def _grow(self) -> None:
+        self._capacity *= 2
+        for columns in (self._numeric, self._codes):
+            for name, values in columns.items():
+                grown = np.zeros(self._capacity, values.dtype)
+                grown[:self._size] = values[:self._size]
+                columns[name] = grown
+
+    def _code(self, column: str, value: Any) -> int:
+        value = 'unassigned' if value is None else str(value)
+        codes = self._level_codes[column]
+        code = codes.get(value)
+        if code is None:
+            if column == 'risk_tier':
+                raise ValueError(f"Unknown risk tier: {value}")
+            code = codes[value] = len(self.levels[column])
+            self.levels[column].append(value)
+        return code
+
+    def add(self, staff_id: str, profile: Dict[str, Any]) -> int:
+        """
+        Add or replace one staff member
+
+        Args:
+            staff_id: Unique staff id
+            profile: Profile fields; missing numbers default to 0 and
+                missing station/position/supervisor to 'unassigned'. The
+                risk tier is derived from performance_rating unless given.
+
+        Returns:
+            Row index of the staff member
+        """
+        row = self._rows.get(staff_id)
+        if row is None:
+            if self._size == self._capacity:
+                self._grow()
+            row = self._size
+            self._size += 1
+            self._rows[staff_id] = row
+            self.ids.append(staff_id)
+            self._details.append({})
+
+        for name in NUMERIC_COLUMNS:
+            self._numeric[name][row] = profile.get(name, 0) or 0
+        for name in ('station', 'position', 'supervisor'):
+            self._codes[name][row] = self._code(name, profile.get(name))
+        if profile.get('risk_tier'):
+            self._codes['risk_tier'][row] = self._code('risk_tier', profile['risk_tier'])
+        else:
+            rating = self._numeric['performance_rating'][row:row + 1]
+            self._codes['risk_tier'][row] = risk_tier_codes(rating)[0]
+        self._details[row] = {name: profile[name] for name in DETAIL_COLUMNS if name in profile}
+        self._indexes = None
+        self.version += 1
+        return row
+
+    # -- columns and indexes ---------------------------------------------
+
+    def column(self, name: str) -> np.ndarray:
+        """Read-only array of a numeric column, or of labels for an indexed column"""
+        if name in self._numeric:
+            values = self._numeric[name][:self._size]
+        elif name in self._codes:
+            values = np.asarray(self.levels[name], dtype=object)[self._codes[name][:self._size]]
+        else:
+            raise KeyError(f"Unknown staff column: {name}")
+        view = values.view()
+        view.flags.writeable = False
+        return view
+
+    def _index(self, column: str) -> Dict[int, np.ndarray]:
+        if self._indexes is None:
+            self._indexes = {}
+        index = self._indexes.get(column)
+        if index is None:
+            codes = self._codes[column][:self._size]
+            order = np.argsort(codes, kind='stable')
+            present, starts = np.unique(codes[order], return_index=True)
+            bounds = np.append(starts, len(order))
+            index = {int(code): order[bounds[i]:bounds[i + 1]] for i, code in enumerate(present)}
+            self._indexes[column] = index
+        return index
+
+    def lookup(self, column: str, value: Union[str, Iterable[str]]) -> np.ndarray:
+        """
+        Rows whose indexed column equals a value (or any of several), in row order
+
+        Args:
+            column: One of INDEXED_COLUMNS
+            value: Label or iterable of labels
+        """
+        if column not in self._codes:
+            raise KeyError(f"Not an indexed staff column: {column}")
+        values = [value] if isinstance(value, str) else list(value)
+        index = self._index(column)
+        codes = self._level_codes[column]
+        parts = [index[codes[v]] for v in values if v in codes and codes[v] in index]
+        if not parts:
+            return np.empty(0, dtype=np.intp)
+        return parts[0] if len(parts) == 1 else np.sort(np.concatenate(parts))
+
+    def counts(self, column: str) -> Dict[str, int]:
+        """Number of staff per value of an indexed column"""
+        return {self.levels[column][code]: len(rows) for code, rows in self._index(column).items()}
+
+    # -- queries ---------------------------------------------------------
+
+    def mask(self, **conditions: Union[str, Iterable[str], Range]) -> np.ndarray:
+        """
+        Boolean row mask matching every condition
+
+        Indexed columns take a label or list of labels; numeric columns
+        take an inclusive (low, high) range where either end may be None.
+        """
+        mask = np.ones(self._size, dtype=bool)
+        for column, condition in conditions.items():
+            if column in self._codes:
+                selected = np.zeros(self._size, dtype=bool)
+                selected[self.lookup(column, condition)] = True
+                mask &= selected
+            elif column in self._numeric:
+                low, high = condition
+                values = self._numeric[column][:self._size]
+                if low is not None:
+                    mask &= values >= low
+                if high is not None:
+                    mask &= values <= high
+            else:
+                raise KeyError(f"Unknown staff column: {column}")
+        return mask
+
+    def filter(self, **conditions: Union[str, Iterable[str], Range]) -> List[str]:
+        """Staff ids matching every condition (see mask), in row order"""
+        return [self.ids[row] for row in np.flatnonzero(self.mask(**conditions))]
+
+    def top_k(self, column: str, k: int, largest: bool = True,
+              **conditions: Union[str, Iterable[str], Range]) -> List[Tuple[str, float]]:
+        """
+        The k staff with the highest (or lowest) values of a numeric column
+
+        Args:
+            column: Numeric column to rank by
+            k: Number of staff to return
+            largest: Rank descending (True) or ascending (False)
+            conditions: Optional filters, as for mask
+
+        Returns:
+            List of (staff id, value), best first
+        """
+        values = self._numeric[column][:self._size]
+        rows = np.flatnonzero(self.mask(**conditions)) if conditions else np.arange(self._size)
+        if k <= 0 or not len(rows):
+            return []
+        keys = -values[rows] if largest else values[rows]
+        if k < len(rows):
+            chosen = np.argpartition(keys, k - 1)[:k]
+        else:
+            chosen = np.arange(len(rows))
+        chosen = chosen[np.argsort(keys[chosen], kind='stable')]
+        return [(self.ids[rows[i]], values[rows[i]].item()) for i in chosen]
+
+    def record(self, staff_id: str) -> Dict[str, Any]:
+        """One staff member as a profile dictionary"""
+        row = self._rows[staff_id]
+        record = dict(self._details[row])
+        for name in ('station', 'position', 'supervisor', 'risk_tier'):
+            record[name] = self.levels[name][self._codes[name][row]]
+        for name, values in self._numeric.items():
+            record[name] = round(values[row].item(), 6)
+        return record
+
+    def records(self, staff_ids: Optional[Iterable[str]] = None) -> Iterable[Tuple[str, Dict[str, Any]]]:
+        """(staff id, profile dictionary) pairs, for all staff or the given ids"""
+        for staff_id in (self.ids if staff_ids is None else staff_ids):
+            yield staff_id, self.record(staff_id)
+
+    def get(self, staff_id: str, field: str, default: Any = None) -> Any:
+        """One field of one staff member, or default if the id is unknown"""
+        if staff_id not in self._rows:
+            return default
+        return self.record(staff_id).get(field, default)
@@ -0,0 +1,337 @@
+"""
+Kaiser Permanente Lab Automation System
+Stage Metrics
+
+Latency histograms, error counters and row counts for every stage of a
+monitoring cycle (collectors, analyzers, dispatchers), plus latency and
+error counts per outbound integration call, and events each event bus
+subscriber had to drop or coalesce. Metrics are served locally
+over HTTP as Prometheus text (/metrics) or JSON (/metrics.json) and can
+be appended to a size-rotated JSON-lines file, so it is easy to see which
+integration is eating the cycle budget.
+
+Standard library only; recording is a bisect and a few additions under a
+lock.
+"""
+
+import functools
+import json
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from logging.handlers import RotatingFileHandler
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds (seconds)
+LATENCY_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+DEFAULT_METRICS_PORT = 9108
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (Prometheus style, non-cumulative internally)"""
+
+    __slots__ = ('buckets', 'counts', 'count', 'total', 'max')
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by interpolating within its bucket"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                low = self.buckets[i - 1] if i else 0.0
+                high = self.buckets[i] if i < len(self.buckets) else self.max
+                return min(low + (high - low) * (rank - seen) / n, self.max)
+            seen += n
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            'count': self.count,
+            'mean_seconds': round(self.total / self.count, 6) if self.count else 0.0,
+            'p50_seconds': round(self.quantile(0.50), 6),
+            'p95_seconds': round(self.quantile(0.95), 6),
+            'max_seconds': round(self.max, 6),
+            'total_seconds': round(self.total, 6),
+        }
+
+
+class _Series:
+    __slots__ = ('latency', 'errors', 'rows')
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.latency = LatencyHistogram(buckets)
+        self.errors = 0
+        self.rows = 0
+
+
+class StageRun:
+    """Handle for one timed stage; set `rows` or `failed` before it ends"""
+
+    __slots__ = ('rows', 'failed')
+
+    def __init__(self):
+        self.rows = 0
+        self.failed = False
+
+
+def _count_rows(result: Any) -> int:
+    try:
+        return len(result) if isinstance(result, (list, tuple, dict)) else 0
+    except TypeError:
+        return 0
+
+
+def _label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class StageMetrics:
+    """
+    Per-stage and per-integration instrumentation for a monitoring system.
+
+    Stages are timed with `timed()` / `wrap()`, outbound calls with
+    `call()`. Stages that catch their own exceptions report them with
+    `record_error()`.
+    """
+
+    def __init__(self, system: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS,
+                 rolling_path: Optional[str] = None, max_bytes: int = 5 * 1024 * 1024, backup_count: int = 3):
+        """
+        Initialize the metrics registry
+
+        Args:
+            system: Name reported with every metric (e.g. 'lab_automation_core')
+            buckets: Histogram bucket upper bounds in seconds
+            rolling_path: JSON-lines file for write_snapshot(); rotated at max_bytes
+            max_bytes: Size at which the rolling file rotates
+            backup_count: Rotated files kept
+        """
+        self.system = system
+        self.buckets = buckets
+        self.started = time.time()
+        self._stages: Dict[str, _Series] = {}
+        self._outbound: Dict[str, _Series] = {}
+        # (subscriber, reason) -> events lost
+        self._dropped: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._file_logger: Optional[logging.Logger] = None
+        if rolling_path:
+            self._file_logger = logging.getLogger(f"{__name__}.{system}")
+            self._file_logger.propagate = False
+            self._file_logger.setLevel(logging.INFO)
+            # A re-created system replaces the previous instance's file
+            for handler in list(self._file_logger.handlers):
+                self._file_logger.removeHandler(handler)
+                handler.close()
+            try:
+                handler = RotatingFileHandler(rolling_path, maxBytes=max_bytes, backupCount=backup_count)
+                handler.setFormatter(logging.Formatter('%(message)s'))
+                self._file_logger.addHandler(handler)
+            except OSError as e:
+                logger.warning(f"Stage metrics file {rolling_path} unavailable: {e}")
+                self._file_logger = None
+
+    def _series(self, table: Dict[str, _Series], name: str) -> _Series:
+        series = table.get(name)
+        if series is None:
+            series = table[name] = _Series(self.buckets)
+        return series
+
+    # -- recording -------------------------------------------------------
+
+    def observe(self, stage: str, seconds: float, rows: int = 0, failed: bool = False) -> None:
+        """Record one run of a stage"""
+        with self._lock:
+            series = self._series(self._stages, stage)
+            series.latency.observe(seconds)
+            series.rows += rows
+            if failed:
+                series.errors += 1
+
+    def record_error(self, stage: str) -> None:
+        """Count an error a stage handled itself"""
+        with self._lock:
+            self._series(self._stages, stage).errors += 1
+
+    def observe_call(self, target: str, seconds: float, failed: bool = False) -> None:
+        """Record one outbound call to an integration"""
+        with self._lock:
+            series = self._series(self._outbound, target)
+            series.latency.observe(seconds)
+            if failed:
+                series.errors += 1
+
+    def record_dropped(self, subscriber: str, reason: str) -> None:
+        """Count an event a bus subscriber lost ('oldest' dropped or 'coalesced')"""
+        with self._lock:
+            key = (subscriber, reason)
+            self._dropped[key] = self._dropped.get(key, 0) + 1
+
+    @contextmanager
+    def timed(self, stage: str):
+        """Time the enclosed block as one run of `stage`; exceptions count as errors"""
+        run = StageRun()
+        started = time.perf_counter()
+        try:
+            yield run
+        except Exception:
+            run.failed = True
+            raise
+        finally:
+            self.observe(stage, time.perf_counter() - started, run.rows, run.failed)
+
+    @asynccontextmanager
+    async def call(self, target: str):
+        """Time the enclosed outbound call(s) to `target`"""
+        started = time.perf_counter()
+        failed = False
+        try:
+            yield
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self.observe_call(target, time.perf_counter() - started, failed)
+
+    def wrap(self, stage: str, func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        """Coroutine function timed as `stage`, counting the rows it returns"""
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with self.timed(stage) as run:
+                result = await func(*args, **kwargs)
+                run.rows = _count_rows(result)
+                return result
+        return wrapper
+
+    # -- export ----------------------------------------------------------
+
+    def snapshot(self) -> Dict[str, Any]:
+        """All metrics as a JSON-serializable dictionary"""
+        with self._lock:
+            stages = {name: {**s.latency.summary(), 'errors': s.errors, 'rows': s.rows}
+                      for name, s in self._stages.items()}
+            outbound = {name: {**s.latency.summary(), 'errors': s.errors}
+                        for name, s in self._outbound.items()}
+            dropped: Dict[str, Dict[str, int]] = {}
+            for (subscriber, reason), count in self._dropped.items():
+                dropped.setdefault(subscriber, {})[reason] = count
+        return {
+            'system': self.system,
+            'generated_at': datetime.now().isoformat(),
+            'uptime_seconds': round(time.time() - self.started, 1),
+            'stages': stages,
+            'outbound': outbound,
+            'dropped_events': dropped,
+        }
+
+    def _histogram_lines(self, metric: str, label: str, table: Dict[str, _Series]) -> list:
+        lines = [f"# TYPE {metric} histogram"]
+        for name, series in sorted(table.items()):
+            labels = f'system="{_label(self.system)}",{label}="{_label(name)}"'
+            cumulative = 0
+            for bound, n in zip(self.buckets, series.latency.counts):
+                cumulative += n
+                lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{{labels},le="+Inf"}} {series.latency.count}')
+            lines.append(f'{metric}_sum{{{labels}}} {series.latency.total:.6f}')
+            lines.append(f'{metric}_count{{{labels}}} {series.latency.count}')
+        return lines
+
+    def _counter_lines(self, metric: str, label: str, table: Dict[str, _Series], attr: str) -> list:
+        lines = [f"# TYPE {metric} counter"]
+        for name, series in sorted(table.items()):
+            lines.append(f'{metric}{{system="{_label(self.system)}",{label}="{_label(name)}"}} {getattr(series, attr)}')
+        return lines
+
+    def prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            lines = (
+                self._histogram_lines('lab_stage_duration_seconds', 'stage', self._stages)
+                + self._counter_lines('lab_stage_errors_total', 'stage', self._stages, 'errors')
+                + self._counter_lines('lab_stage_rows_total', 'stage', self._stages, 'rows')
+                + self._histogram_lines('lab_outbound_call_duration_seconds', 'target', self._outbound)
+                + self._counter_lines('lab_outbound_call_errors_total', 'target', self._outbound, 'errors')
+                + ["# TYPE lab_bus_dropped_events_total counter"]
+                + [f'lab_bus_dropped_events_total{{system="{_label(self.system)}",subscriber="{_label(subscriber)}",'
+                   f'reason="{reason}"}} {count}'
+                   for (subscriber, reason), count in sorted(self._dropped.items())]
+            )
+        return '\n'.join(lines) + '\n'
+
+    def write_snapshot(self) -> None:
+        """Append the current snapshot to the rolling file, if configured"""
+        if self._file_logger is not None:
+            self._file_logger.info(json.dumps(self.snapshot()))
+
+    # -- HTTP endpoint ---------------------------------------------------
+
+    def serve(self, port: int = DEFAULT_METRICS_PORT, host: str = '127.0.0.1') -> Optional[ThreadingHTTPServer]:
+        """
+        Serve /metrics (Prometheus text) and /metrics.json from a daemon thread
+
+        Returns:
+            The server, or None if the port could not be bound
+        """
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split('?', 1)[0]
+                if path == '/metrics':
+                    body, content_type = metrics.prometheus(), 'text/plain; version=0.0.4'
+                elif path == '/metrics.json':
+                    body, content_type = json.dumps(metrics.snapshot(), indent=2), 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+                data = body.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                logger.debug(f"metrics endpoint: {format % args}")
+
+        try:
+            self._server = ThreadingHTTPServer((host, port), Handler)
+        except OSError as e:
+            logger.warning(f"Metrics endpoint not started on {host}:{port}: {e}")
+            return None
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name=f"{self.system}-metrics", daemon=True).start()
+        logger.info(f"Metrics endpoint on http://{host}:{self._server.server_address[1]}/metrics")
+        return self._server
+
+    def shutdown(self) -> None:
+        """Stop the HTTP endpoint"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -0,0 +1,548 @@
+"""
+Kaiser Permanente Lab Automation System
+Streaming Statistics
+
+Mergeable running accumulators used to compute lab CSV metrics in a
+single pass over fixed-size chunks, so that peak memory is bounded by the
+chunk size rather than the size of the export.
+"""
+
+import math
+from collections import Counter
+from datetime import date
+from typing import Dict, List, Optional, Iterable
+
+import numpy as np
+import pandas as pd
+
+from utils.ingestion_schema import as_datetime, as_numeric
+
+
+def classify_metric_columns(columns: Iterable[str]) -> Dict[str, List[str]]:
+    """
+    Split column names into the metric roles used by the data processor
+
+    Args:
+        columns: Column names from the CSV header
+
+    Returns:
+        Dictionary of role name to matching column names
+    """
+    columns = list(columns)
+    return {
+        'tat': [col for col in columns if 'tat' in col.lower() or 'turnaround' in col.lower()],
+        'volume': [col for col in columns if 'volume' in col.lower() or 'count' in col.lower()],
+        'time': [col for col in columns if 'date' in col.lower() or 'time' in col.lower()],
+        'date': [col for col in columns if 'date' in col.lower()],
+    }
+
+
+class QuantileSketch:
+    """
+    Log-bucketed quantile sketch with a relative accuracy guarantee.
+
+    Values are counted in buckets whose width grows geometrically, so any
+    quantile is answered within `relative_accuracy` of the true value.
+    Two sketches with the same accuracy merge by adding bucket counts.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        """
+        Initialize an empty sketch
+
+        Args:
+            relative_accuracy: Maximum relative error of returned quantiles
+        """
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.positive: Dict[int, int] = {}
+        self.negative: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def update(self, values: np.ndarray) -> None:
+        """Add a batch of finite values to the sketch"""
+        values = np.asarray(values, dtype=float)
+        values = values[np.isfinite(values)]
+        if not len(values):
+            return
+
+        self.count += len(values)
+        magnitudes = np.abs(values)
+        is_zero = magnitudes < 1e-9
+        self.zero_count += int(is_zero.sum())
+        self._add_to_store(self.positive, values[(values > 0) & ~is_zero])
+        self._add_to_store(self.negative, -values[(values < 0) & ~is_zero])
+
+    def _add_to_store(self, store: Dict[int, int], magnitudes: np.ndarray) -> None:
+        if not len(magnitudes):
+            return
+        keys = np.ceil(np.log(magnitudes) / self._log_gamma).astype(np.int64)
+        unique_keys, counts = np.unique(keys, return_counts=True)
+        for key, count in zip(unique_keys.tolist(), counts.tolist()):
+            store[key] = store.get(key, 0) + count
+
+    def _bucket_value(self, key: int) -> float:
+        return 2 * self._gamma ** key / (self._gamma + 1)
+
+    def merge(self, other: 'QuantileSketch') -> None:
+        """Fold another sketch with the same accuracy into this one"""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        for store, other_store in ((self.positive, other.positive), (self.negative, other.negative)):
+            for key, count in other_store.items():
+                store[key] = store.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+    def quantile(self, q: float) -> float:
+        """
+        Get an approximate quantile
+
+        Args:
+            q: Quantile between 0 and 1
+
+        Returns:
+            Approximate value at the quantile, or NaN if the sketch is empty
+        """
+        if self.count == 0:
+            return float('nan')
+
+        rank = q * (self.count - 1)
+        seen = 0
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return -self._bucket_value(key)
+        seen += self.zero_count
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return self._bucket_value(key)
+        return self._bucket_value(max(self.positive)) if self.positive else 0.0
+
+
+def _bit_length(values: np.ndarray) -> np.ndarray:
+    """Vectorized int.bit_length for uint64 arrays, exact for all 64 bits"""
+    high = (values >> np.uint64(32)).astype(np.float64)
+    low = (values & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    return np.where(high > 0, 32 + np.frexp(high)[1], np.frexp(low)[1])
+
+
+class CategoryHashes:
+    """
+    Hashes of the most recently seen category table.
+
+    Chunks sliced from one categorical column (e.g. the columnar cache)
+    share a single categories index, so its labels are hashed once and
+    every chunk just indexes the result by code.
+    """
+
+    def __init__(self):
+        self.categories: Optional[pd.Index] = None
+        self.hashes: Optional[np.ndarray] = None
+
+    def get(self, categories: pd.Index) -> np.ndarray:
+        if categories is not self.categories:
+            self.hashes = pd.util.hash_array(categories.astype(str).to_numpy(dtype=object))
+            self.categories = categories
+        return self.hashes
+
+
+def hash_values(values, category_hashes: Optional[CategoryHashes] = None) -> np.ndarray:
+    """
+    Stable 64-bit hashes of column values
+
+    Values are hashed by their string form so that an ID parsed as an
+    integer in one chunk and as text in another counts once. For
+    categorical columns only the categories are hashed: the whole table
+    once when a CategoryHashes is given, else just the codes in use.
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(values)
+    series = series.dropna()
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        categories = series.cat.categories
+        if category_hashes is not None:
+            return category_hashes.get(categories)[codes]
+        used, inverse = np.unique(codes, return_inverse=True)
+        return pd.util.hash_array(categories[used].astype(str).to_numpy(dtype=object))[inverse]
+    return pd.util.hash_array(series.astype(str).to_numpy(dtype=object))
+
+
+class HyperLogLog:
+    """
+    HyperLogLog cardinality estimator.
+
+    Uses 2**precision one-byte registers; the standard error of the
+    estimate is about 1.04 / sqrt(2**precision). Sketches with the same
+    precision merge by taking the register-wise maximum.
+    """
+
+    def __init__(self, error: float = 0.01):
+        """
+        Initialize an empty sketch
+
+        Args:
+            error: Target relative standard error of the estimate
+        """
+        self.precision = int(min(18, max(4, math.ceil(math.log2((1.04 / error) ** 2)))))
+        self.registers = np.zeros(1 << self.precision, dtype=np.uint8)
+        self.category_hashes = CategoryHashes()
+
+    def __getstate__(self) -> Dict:
+        # The category hash cache is only useful within one pass; don't pickle it
+        state = self.__dict__.copy()
+        state.pop('category_hashes', None)
+        return state
+
+    def __setstate__(self, state: Dict) -> None:
+        self.__dict__.update(state)
+        self.category_hashes = CategoryHashes()
+
+    def update_hashes(self, hashes: np.ndarray) -> None:
+        """Add pre-hashed values (uint64) to the sketch"""
+        if not len(hashes):
+            return
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        suffix_bits = 64 - self.precision
+        index = (hashes >> np.uint64(suffix_bits)).astype(np.intp)
+        suffix = hashes & np.uint64((1 << suffix_bits) - 1)
+        rank = (suffix_bits - _bit_length(suffix) + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def update(self, values) -> None:
+        """Add a batch of values to the sketch"""
+        self.update_hashes(hash_values(values, self.category_hashes))
+
+    def merge(self, other: 'HyperLogLog') -> None:
+        """Fold another sketch with the same precision into this one"""
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches with different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self) -> int:
+        """Estimated number of distinct values"""
+        m = len(self.registers)
+        alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+
+class DistinctCounter:
+    """
+    Distinct-value counter that is exact for small inputs.
+
+    Values are kept in a set until more than `exact_limit` have been
+    seen, after which the counter switches to a HyperLogLog sketch with
+    the configured error bound. `exact_limit=None` never switches. Both
+    modes compare values by their string form (as hash_values does), so
+    the count does not change at the switchover.
+    """
+
+    def __init__(self, error: float = 0.01, exact_limit: Optional[int] = 100000):
+        self.error = error
+        self.exact_limit = exact_limit
+        self.values: Optional[set] = set()
+        self.sketch: Optional[HyperLogLog] = None
+
+    @property
+    def is_exact(self) -> bool:
+        return self.sketch is None
+
+    def _promote(self) -> None:
+        self.sketch = HyperLogLog(self.error)
+        self.sketch.update(list(self.values))
+        self.values = None
+
+    def _check_limit(self) -> None:
+        if self.exact_limit is not None and len(self.values) > self.exact_limit:
+            self._promote()
+
+    def update(self, series: pd.Series) -> None:
+        """Add one chunk of a column"""
+        if self.is_exact:
+            self.values.update(pd.Series(series.dropna().unique()).astype(str).tolist())
+            self._check_limit()
+        else:
+            self.sketch.update(series)
+
+    def merge(self, other: 'DistinctCounter') -> None:
+        """Fold another counter for the same column into this one"""
+        if self.is_exact and other.is_exact:
+            self.values.update(other.values)
+            self._check_limit()
+            return
+        if self.is_exact:
+            self._promote()
+        if other.is_exact:
+            self.sketch.update(list(other.values))
+        else:
+            self.sketch.merge(other.sketch)
+
+    def count(self) -> int:
+        """Exact or estimated number of distinct values"""
+        return len(self.values) if self.is_exact else self.sketch.count()
+
+
+class NumericAccumulator:
+    """
+    Running count, sum, variance, min/max and quantile sketch for one column.
+
+    Variance is tracked with the pairwise (Chan et al.) update so chunk
+    results can be merged in any order without losing precision.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.total_count = 0
+        self.null_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = float('nan')
+        self.max = float('nan')
+        self.sketch = QuantileSketch(relative_accuracy)
+
+    def update(self, series: pd.Series) -> None:
+        """Add one chunk of a column, coercing non-numeric values to null"""
+        values = as_numeric(series).to_numpy(dtype=float, na_value=np.nan)
+        valid = values[~np.isnan(values)]
+
+        self.total_count += len(values)
+        self.null_count += len(values) - len(valid)
+        if not len(valid):
+            return
+
+        batch = NumericAccumulator()
+        batch.count = len(valid)
+        batch.sum = float(valid.sum())
+        batch.mean = batch.sum / batch.count
+        batch.m2 = float(((valid - batch.mean) ** 2).sum())
+        batch.min = float(valid.min())
+        batch.max = float(valid.max())
+        self._combine(batch)
+        self.sketch.update(valid)
+
+    def _combine(self, other: 'NumericAccumulator') -> None:
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.count, self.sum, self.mean, self.m2 = other.count, other.sum, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return
+
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / total
+        self.mean += delta * other.count / total
+        self.count = total
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def merge(self, other: 'NumericAccumulator') -> None:
+        """Fold another accumulator for the same column into this one"""
+        self.total_count += other.total_count
+        self.null_count += other.null_count
+        self._combine(other)
+        self.sketch.merge(other.sketch)
+
+    @property
+    def std(self) -> float:
+        """Sample standard deviation (ddof=1), matching pandas"""
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else float('nan')
+
+    def tat_summary(self) -> Dict:
+        """Summary in the shape of LabDataProcessor TAT analysis"""
+        return {
+            'mean': self.mean if self.count else float('nan'),
+            'median': self.sketch.quantile(0.5),
+            'std': self.std,
+            'min': self.min,
+            'max': self.max,
+            'p95': self.sketch.quantile(0.95),
+            'p99': self.sketch.quantile(0.99),
+            'null_count': self.null_count,
+            'total_count': self.total_count
+        }
+
+    def volume_summary(self) -> Dict:
+        """Summary in the shape of LabDataProcessor volume analysis"""
+        return {
+            'total': self.sum,
+            'mean': self.mean if self.count else float('nan'),
+            'median': self.sketch.quantile(0.5),
+            'std': self.std,
+            'min': self.min,
+            'max': self.max,
+            'null_count': self.null_count,
+            'total_count': self.total_count
+        }
+
+
+class DailyCounter:
+    """Per-day row counts and overall min/max timestamp for one column"""
+
+    def __init__(self):
+        self.counts: Counter = Counter()
+        self.min: Optional[pd.Timestamp] = None
+        self.max: Optional[pd.Timestamp] = None
+
+    def update(self, series: pd.Series) -> None:
+        """Add one chunk of a date/time column"""
+        timestamps = as_datetime(series)
+        valid = timestamps.dropna()
+        if valid.empty:
+            return
+
+        for day, count in valid.dt.normalize().value_counts().items():
+            self.counts[day.date()] += int(count)
+        chunk_min, chunk_max = valid.min(), valid.max()
+        self.min = chunk_min if self.min is None else min(self.min, chunk_min)
+        self.max = chunk_max if self.max is None else max(self.max, chunk_max)
+
+    def merge(self, other: 'DailyCounter') -> None:
+        """Fold another counter for the same column into this one"""
+        self.counts.update(other.counts)
+        for bound in (other.min, other.max):
+            if bound is None:
+                continue
+            self.min = bound if self.min is None else min(self.min, bound)
+            self.max = bound if self.max is None else max(self.max, bound)
+
+    def date_range(self) -> Dict:
+        """Date range in the shape of LabDataProcessor summary stats"""
+        if self.min is None or self.max is None:
+            return {'start_date': 'Unknown', 'end_date': 'Unknown', 'duration_days': 0}
+        return {
+            'start_date': self.min.strftime('%Y-%m-%d'),
+            'end_date': self.max.strftime('%Y-%m-%d'),
+            'duration_days': (self.max - self.min).days
+        }
+
+    def trend_summary(self) -> Dict:
+        """Daily trend in the shape of LabDataProcessor time trends"""
+        if not self.counts:
+            return {'error': 'Could not parse time data'}
+
+        days = sorted(self.counts)
+        counts = np.array([self.counts[day] for day in days], dtype=float)
+        peak_index = int(np.argmax(counts))
+        return {
+            'daily_average': float(counts.mean()),
+            'daily_std': float(counts.std(ddof=1)) if len(counts) > 1 else float('nan'),
+            'peak_day': days[peak_index].strftime('%Y-%m-%d'),
+            'peak_count': int(counts[peak_index]),
+            'total_days': len(days)
+        }
+
+
+class StreamingMetrics:
+    """
+    Single-pass accumulator for the LabDataProcessor metrics dictionary.
+
+    Feed it DataFrame chunks with `update`, combine partial results with
+    `merge`, and call `finalize` for the same `summary_stats` /
+    `tat_analysis` / `volume_analysis` / `trends` dictionary produced by
+    the in-memory path. Only per-column running state is retained.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, distinct_error: float = 0.01,
+                 distinct_exact_limit: Optional[int] = 100000):
+        """
+        Initialize an empty accumulator
+
+        Args:
+            relative_accuracy: Relative error bound for median/p95/p99
+            distinct_error: Standard error of unique patient/test estimates
+            distinct_exact_limit: Distinct values counted exactly before switching
+                to an estimate (None keeps counts exact)
+        """
+        self.relative_accuracy = relative_accuracy
+        self.distinct_error = distinct_error
+        self.distinct_exact_limit = distinct_exact_limit
+        self.columns: Optional[List[str]] = None
+        self.roles: Dict[str, List[str]] = {}
+        self.total_records = 0
+        self.tat: Dict[str, NumericAccumulator] = {}
+        self.volume: Dict[str, NumericAccumulator] = {}
+        self.time: Dict[str, DailyCounter] = {}
+        self.date_column: Optional[str] = None
+        self.distinct: Dict[str, DistinctCounter] = {
+            col: self._distinct_counter() for col in ('patient_id', 'test_type')
+        }
+
+    def _distinct_counter(self) -> DistinctCounter:
+        return DistinctCounter(self.distinct_error, self.distinct_exact_limit)
+
+    def _bind_columns(self, columns: List[str]) -> None:
+        self.columns = list(columns)
+        self.roles = classify_metric_columns(self.columns)
+        self.tat = {col: NumericAccumulator(self.relative_accuracy) for col in self.roles['tat']}
+        self.volume = {col: NumericAccumulator(self.relative_accuracy) for col in self.roles['volume']}
+        self.time = {col: DailyCounter() for col in self.roles['time']}
+        self.date_column = self.roles['date'][0] if self.roles['date'] else None
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        """Fold one chunk of rows into the running state"""
+        if self.columns is None:
+            self._bind_columns(chunk.columns)
+
+        self.total_records += len(chunk)
+        for col, accumulator in self.tat.items():
+            accumulator.update(chunk[col])
+        for col, accumulator in self.volume.items():
+            accumulator.update(chunk[col])
+        for col, counter in self.time.items():
+            counter.update(chunk[col])
+        for col, counter in self.distinct.items():
+            if col in chunk.columns:
+                counter.update(chunk[col])
+
+    def merge(self, other: 'StreamingMetrics') -> None:
+        """Fold another partial result into this one, matching columns by name"""
+        if other.columns is None:
+            return
+        if self.columns is None:
+            self._bind_columns(other.columns)
+
+        self.total_records += other.total_records
+        for mine, theirs, factory in (
+            (self.tat, other.tat, lambda: NumericAccumulator(self.relative_accuracy)),
+            (self.volume, other.volume, lambda: NumericAccumulator(self.relative_accuracy)),
+            (self.time, other.time, DailyCounter),
+        ):
+            for col, accumulator in theirs.items():
+                mine.setdefault(col, factory()).merge(accumulator)
+        if self.date_column is None:
+            self.date_column = other.date_column
+        for col, counter in other.distinct.items():
+            self.distinct.setdefault(col, self._distinct_counter()).merge(counter)
+
+    def finalize(self) -> Dict:
+        """
+        Build the metrics dictionary from the accumulated state
+
+        Returns:
+            Dictionary containing summary stats, TAT, volume and trend metrics
+        """
+        date_counter = self.time.get(self.date_column) if self.date_column else None
+        return {
+            'summary_stats': {
+                'total_records': self.total_records,
+                'date_range': date_counter.date_range() if date_counter else
+                    {'start_date': 'Unknown', 'end_date': 'Unknown', 'duration_days': 0},
+                'unique_patients': self.distinct['patient_id'].count() if 'patient_id' in self.distinct else 0,
+                'unique_tests': self.distinct['test_type'].count() if 'test_type' in self.distinct else 0
+            },
+            'tat_analysis': {col: acc.tat_summary() for col, acc in self.tat.items()},
+            'volume_analysis': {col: acc.volume_summary() for col, acc in self.volume.items()},
+            'trends': {col: counter.trend_summary() for col, counter in self.time.items()}
+        }
@@ -0,0 +1,166 @@
+"""
+Kaiser Permanente Lab Automation System
+Task Graph Runner
+
+Runs the steps of an analysis pipeline as a dependency graph: a step
+starts as soon as everything it depends on has finished, so independent
+analyses run side by side on a thread pool. Results are memoized per
+input version, and every run records how long each step took.
+"""
+
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TaskNode:
+    """One pipeline step; `func` takes no arguments"""
+    name: str
+    func: Callable[[], Any]
+    depends_on: List[str] = field(default_factory=list)
+
+
+class TaskGraph:
+    """
+    Dependency-aware step runner with per-version memoization.
+
+    A step's result is reused when the graph runs again with the same
+    input version. Passing version None always recomputes everything.
+    """
+
+    def __init__(self, name: str, max_workers: Optional[int] = None):
+        """
+        Initialize an empty graph
+
+        Args:
+            name: Pipeline name used in log messages
+            max_workers: Threads used to run independent steps (defaults to the step count)
+        """
+        self.name = name
+        self.max_workers = max_workers
+        self.nodes: Dict[str, TaskNode] = {}
+        self.timings: Dict[str, Dict] = {}
+        self._memo: Dict[str, Tuple[Hashable, Any]] = {}
+
+    def add(self, name: str, func: Callable[[], Any], depends_on: Optional[List[str]] = None) -> 'TaskGraph':
+        """
+        Declare a step
+
+        Args:
+            name: Unique step name
+            func: Callable run for the step
+            depends_on: Names of steps that must finish first
+
+        Returns:
+            The graph, so declarations can be chained
+        """
+        if name in self.nodes:
+            raise ValueError(f"Duplicate task: {name}")
+        self.nodes[name] = TaskNode(name, func, list(depends_on or []))
+        return self
+
+    def _order(self) -> List[str]:
+        """Steps in dependency order; rejects unknown dependencies and cycles"""
+        for node in self.nodes.values():
+            missing = [dep for dep in node.depends_on if dep not in self.nodes]
+            if missing:
+                raise ValueError(f"Task {node.name} depends on unknown task(s): {', '.join(missing)}")
+
+        order, state = [], {}
+
+        def visit(name: str, path: List[str]) -> None:
+            if state.get(name) == 'done':
+                return
+            if state.get(name) == 'visiting':
+                raise ValueError(f"Dependency cycle: {' -> '.join(path + [name])}")
+            state[name] = 'visiting'
+            for dep in self.nodes[name].depends_on:
+                visit(dep, path + [name])
+            state[name] = 'done'
+            order.append(name)
+
+        for name in self.nodes:
+            visit(name, [])
+        return order
+
+    def invalidate(self) -> None:
+        """Forget every memoized result"""
+        self._memo.clear()
+
+    def run(self, version: Optional[Hashable] = None) -> Dict[str, Any]:
+        """
+        Run every step, concurrently where dependencies allow
+
+        Args:
+            version: Identifies the inputs (e.g. a data load counter); steps
+                already computed for this version are not run again
+
+        Returns:
+            Dictionary of step name to the step's return value
+        """
+        order = self._order()
+        results: Dict[str, Any] = {}
+        keys: Dict[str, Hashable] = {}
+        self.timings = {}
+        remaining = {name: set(self.nodes[name].depends_on) for name in order}
+        started = time.perf_counter()
+
+        def key_for(name: str) -> Hashable:
+            return (version, tuple(keys[dep] for dep in self.nodes[name].depends_on))
+
+        def timed(node: TaskNode) -> Tuple[Any, float]:
+            start = time.perf_counter()
+            result = node.func()
+            return result, time.perf_counter() - start
+
+        def finish(name: str, result: Any) -> None:
+            results[name] = result
+            for pending in remaining.values():
+                pending.discard(name)
+
+        error = None
+        workers = self.max_workers or max(len(order), 1)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=self.name) as executor:
+            running = {}
+            while remaining or running:
+                ready = [name for name, pending in remaining.items() if not pending] if error is None else []
+                while ready:
+                    for name in ready:
+                        del remaining[name]
+                        keys[name] = key_for(name)
+                        memo = self._memo.get(name)
+                        if version is not None and memo is not None and memo[0] == keys[name]:
+                            self.timings[name] = {'seconds': 0.0, 'cached': True}
+                            finish(name, memo[1])
+                        else:
+                            running[executor.submit(timed, self.nodes[name])] = name
+                    # Reused results may unblock further steps straight away
+                    ready = [name for name, pending in remaining.items() if not pending]
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        result, seconds = future.result()
+                    except Exception as e:
+                        logger.error(f"{self.name}: task {name} failed: {str(e)}")
+                        error = error or e
+                        continue
+                    self.timings[name] = {'seconds': seconds, 'cached': False}
+                    self._memo[name] = (keys[name], result)
+                    finish(name, result)
+
+        if error is not None:
+            raise error
+
+        computed = [name for name, timing in self.timings.items() if not timing['cached']]
+        logger.info(f"{self.name}: {len(computed)} tasks run, {len(order) - len(computed)} reused "
+                    f"in {time.perf_counter() - started:.2f}s")
+        return results
@@ -0,0 +1,336 @@
+"""
+Kaiser Permanente Lab Automation System
+Sliding-Window TAT Tracker
+
+Keeps TAT percentiles (p50/p90/p95/p99) and target compliance over
+rolling windows (15 minutes, 1 hour, 24 hours by default) for every
+test priority and shift, fed one specimen at a time.
+
+Events land in one-minute buckets of log-spaced TAT bins. Each window
+keeps a Fenwick (binary indexed) tree over the bins, so recording an
+event and reading a percentile are both O(log bins). Buckets that slide
+out of a window are subtracted from its tree, and nothing older than the
+longest window is kept, so memory is bounded by the bucket count rather
+than the event count.
+"""
+
+import logging
+import math
+import time
+from collections import Counter, deque
+from datetime import datetime
+from typing import Deque, Dict, Iterable, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# window name -> span in seconds
+DEFAULT_WINDOWS: Dict[str, int] = {
+    '15m': 15 * 60,
+    '1h': 60 * 60,
+    '24h': 24 * 60 * 60,
+}
+
+DEFAULT_PERCENTILES = (0.5, 0.9, 0.95, 0.99)
+
+# TAT targets in minutes by priority
+DEFAULT_TARGETS: Dict[str, float] = {
+    'stat': 60,
+    'critical': 30,
+    'routine': 240,
+}
+
+ALL = '*'
+
+Timestamp = Union[datetime, float, int, None]
+
+
+def shift_for_hour(hour: int) -> str:
+    """Shift label for an hour of the day (day 07-15, evening 15-23, night otherwise)"""
+    if 7 <= hour < 15:
+        return 'day'
+    if 15 <= hour < 23:
+        return 'evening'
+    return 'night'
+
+
+class FenwickTree:
+    """Prefix sums over a fixed number of bins with O(log n) update and search"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.tree = [0] * (size + 1)
+        self.total = 0
+        self._top = 1 << (size.bit_length() - 1) if size else 0
+
+    def add(self, index: int, delta: int) -> None:
+        self.total += delta
+        index += 1
+        while index <= self.size:
+            self.tree[index] += delta
+            index += index & -index
+
+    def prefix(self, index: int) -> int:
+        """Sum of bins 0..index"""
+        total = 0
+        index += 1
+        while index > 0:
+            total += self.tree[index]
+            index -= index & -index
+        return total
+
+    def search(self, rank: int) -> int:
+        """Smallest bin whose prefix sum exceeds `rank`"""
+        position = 0
+        step = self._top
+        while step:
+            nxt = position + step
+            if nxt <= self.size and self.tree[nxt] <= rank:
+                position = nxt
+                rank -= self.tree[nxt]
+            step >>= 1
+        return min(position, self.size - 1)
+
+
+class _Window:
+    """Running totals of one window for one (priority, shift) key"""
+
+    __slots__ = ('tree', 'within', 'buckets')
+
+    def __init__(self, bins: int):
+        self.tree = FenwickTree(bins)
+        self.within = 0
+        # (bucket index, bucket) pairs currently inside the window, oldest first
+        self.buckets: Deque[Tuple[int, '_Bucket']] = deque()
+
+
+class _Bucket:
+    __slots__ = ('bins', 'within')
+
+    def __init__(self):
+        self.bins: Counter = Counter()
+        self.within = 0
+
+
+class TatWindowTracker:
+    """
+    Rolling TAT percentiles and compliance per priority and shift.
+
+    Keys are (priority, shift) pairs; ALL ('*') in either position holds
+    the rollup across that dimension, so "all STAT results" and "the whole
+    lab" are answered as directly as a single shift.
+
+    Not thread-safe; the monitoring loop records and queries from one
+    event loop.
+    """
+
+    def __init__(self, targets: Optional[Dict[str, float]] = None, default_target: float = 60,
+                 windows: Optional[Dict[str, int]] = None, relative_accuracy: float = 0.01,
+                 bucket_seconds: int = 60, min_tat: float = 0.1, max_tat: float = 7 * 24 * 60):
+        """
+        Initialize the tracker
+
+        Args:
+            targets: TAT target in minutes by priority (compliance = share at or under it)
+            default_target: Target for priorities not in `targets`
+            windows: Window name -> span in seconds
+            relative_accuracy: Relative error bound of reported percentiles
+            bucket_seconds: Time resolution of window edges
+            min_tat: Smallest distinguished TAT in minutes
+            max_tat: Largest distinguished TAT in minutes (larger values clamp)
+        """
+        self.targets = {k.lower(): v for k, v in (targets or DEFAULT_TARGETS).items()}
+        self.default_target = default_target
+        self.windows = dict(windows or DEFAULT_WINDOWS)
+        self.bucket_seconds = bucket_seconds
+        self._spans = {name: max(1, math.ceil(span / bucket_seconds)) for name, span in self.windows.items()}
+        self._horizon = max(self._spans.values())
+
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._offset = math.ceil(math.log(min_tat) / self._log_gamma)
+        self.bins = math.ceil(math.log(max_tat) / self._log_gamma) - self._offset + 1
+
+        self._keys: Dict[Tuple[str, str], Dict[str, _Window]] = {}
+        self._buckets: Dict[Tuple[str, str], Dict[int, _Bucket]] = {}
+        self._current = None
+        self.dropped = 0
+
+    # -- recording ------------------------------------------------------
+
+    def _bucket_index(self, timestamp: Timestamp) -> Tuple[int, datetime]:
+        if timestamp is None:
+            timestamp = time.time()
+        if isinstance(timestamp, datetime):
+            moment = timestamp
+            seconds = timestamp.timestamp()
+        else:
+            seconds = float(timestamp)
+            moment = datetime.fromtimestamp(seconds)
+        return int(seconds // self.bucket_seconds), moment
+
+    def _bin(self, tat_minutes: float) -> int:
+        if tat_minutes <= 0:
+            return 0
+        index = math.ceil(math.log(tat_minutes) / self._log_gamma) - self._offset
+        return min(max(index, 0), self.bins - 1)
+
+    def _bin_value(self, index: int) -> float:
+        return 2 * self._gamma ** (index + self._offset) / (self._gamma + 1)
+
+    def _windows_for(self, key: Tuple[str, str]) -> Dict[str, _Window]:
+        windows = self._keys.get(key)
+        if windows is None:
+            windows = {name: _Window(self.bins) for name in self.windows}
+            self._keys[key] = windows
+            self._buckets[key] = {}
+        return windows
+
+    def record(self, tat_minutes: float, priority: str = 'routine', shift: Optional[str] = None,
+               timestamp: Timestamp = None) -> bool:
+        """
+        Record one specimen's TAT
+
+        Args:
+            tat_minutes: Turnaround time in minutes
+            priority: Test priority (e.g. 'stat', 'routine')
+            shift: Shift label; derived from the timestamp when omitted
+            timestamp: When the result was released (datetime or epoch seconds; default now)
+
+        Returns:
+            False if the event is older than the longest window and was dropped
+        """
+        if tat_minutes is None or tat_minutes != tat_minutes:
+            return False
+        bucket_index, moment = self._bucket_index(timestamp)
+        if self._current is not None and bucket_index <= self._current - self._horizon:
+            self.dropped += 1
+            return False
+        if self._current is None or bucket_index > self._current:
+            self.advance(bucket_index * self.bucket_seconds)
+
+        priority = (priority or 'unknown').lower()
+        shift = (shift or shift_for_hour(moment.hour)).lower()
+        bin_index = self._bin(tat_minutes)
+        within = int(tat_minutes <= self.targets.get(priority, self.default_target))
+
+        # Late events only count toward the windows that still cover their minute
+        covering = [name for name, span in self._spans.items() if bucket_index > self._current - span]
+        for key in ((priority, shift), (priority, ALL), (ALL, shift), (ALL, ALL)):
+            windows = self._windows_for(key)
+            buckets = self._buckets[key]
+            bucket = buckets.get(bucket_index)
+            if bucket is None:
+                bucket = buckets[bucket_index] = _Bucket()
+                for name in covering:
+                    self._insert_bucket(windows[name], bucket_index, bucket)
+            bucket.bins[bin_index] += 1
+            bucket.within += within
+            for name in covering:
+                window = windows[name]
+                window.tree.add(bin_index, 1)
+                window.within += within
+        return True
+
+    def record_many(self, events: Iterable[Dict]) -> int:
+        """
+        Record several events given as dictionaries with 'tat_minutes' and
+        optional 'priority', 'shift' and 'timestamp'
+
+        Returns:
+            Number of events recorded
+        """
+        recorded = 0
+        for event in events:
+            recorded += self.record(event.get('tat_minutes'), event.get('priority', 'routine'),
+                                    event.get('shift'), event.get('timestamp'))
+        return recorded
+
+    def _insert_bucket(self, window: _Window, bucket_index: int, bucket: _Bucket) -> None:
+        # Buckets normally arrive in time order; late ones are slotted in place
+        if not window.buckets or window.buckets[-1][0] < bucket_index:
+            window.buckets.append((bucket_index, bucket))
+            return
+        position = len(window.buckets)
+        while position > 0 and window.buckets[position - 1][0] > bucket_index:
+            position -= 1
+        window.buckets.insert(position, (bucket_index, bucket))
+
+    def advance(self, now: Timestamp = None) -> None:
+        """
+        Move every window's right edge to `now`, expiring buckets that fell out
+
+        Args:
+            now: Current time (datetime or epoch seconds; default now)
+        """
+        bucket_index, _ = self._bucket_index(now)
+        if self._current is not None and bucket_index <= self._current:
+            return
+        self._current = bucket_index
+        for key, windows in self._keys.items():
+            for name, window in windows.items():
+                oldest = bucket_index - self._spans[name]
+                while window.buckets and window.buckets[0][0] <= oldest:
+                    _, bucket = window.buckets.popleft()
+                    for bin_index, count in bucket.bins.items():
+                        window.tree.add(bin_index, -count)
+                    window.within -= bucket.within
+            buckets = self._buckets[key]
+            for stale in [index for index in buckets if index <= bucket_index - self._horizon]:
+                del buckets[stale]
+
+    # -- queries --------------------------------------------------------
+
+    def _window(self, window: str, priority: Optional[str], shift: Optional[str]) -> Optional[_Window]:
+        if window not in self.windows:
+            raise ValueError(f"Unknown window: {window}")
+        key = ((priority or ALL).lower(), (shift or ALL).lower())
+        windows = self._keys.get(key)
+        return windows[window] if windows else None
+
+    def quantile(self, q: float, window: str = '1h', priority: Optional[str] = None,
+                 shift: Optional[str] = None) -> Optional[float]:
+        """
+        TAT quantile in minutes over a window, or None if it holds no events
+
+        Args:
+            q: Quantile in [0, 1]
+            window: Window name, e.g. '15m'
+            priority: Restrict to a priority (default all)
+            shift: Restrict to a shift (default all)
+        """
+        state = self._window(window, priority, shift)
+        if state is None or state.tree.total == 0:
+            return None
+        rank = int(q * (state.tree.total - 1))
+        return self._bin_value(state.tree.search(rank))
+
+    def snapshot(self, window: str = '1h', priority: Optional[str] = None, shift: Optional[str] = None,
+                 percentiles: Tuple[float, ...] = DEFAULT_PERCENTILES) -> Dict:
+        """
+        Count, percentiles and compliance for one window and key
+
+        Returns:
+            Dictionary with 'count', 'p50', 'p90', ... and 'compliance'
+            (None values when the window is empty)
+        """
+        state = self._window(window, priority, shift)
+        count = state.tree.total if state else 0
+        result: Dict = {'window': window, 'priority': priority or ALL, 'shift': shift or ALL, 'count': count}
+        for q in percentiles:
+            result[f"p{int(round(q * 100))}"] = self.quantile(q, window, priority, shift) if count else None
+        result['compliance'] = state.within / count if count else None
+        return result
+
+    def summary(self, now: Timestamp = None) -> Dict[str, List[Dict]]:
+        """
+        Snapshots of every window for every tracked key, for dashboards
+
+        Args:
+            now: Advance the windows to this time first (default: leave as is)
+        """
+        if now is not None:
+            self.advance(now)
+        return {
+            window: [self.snapshot(window, priority, shift) for priority, shift in sorted(self._keys)]
+            for window in self.windows
+        }
@@ -0,0 +1,223 @@
+"""
+Kaiser Permanente Lab Automation System
+Threshold Rule Engine
+
+Performance checks written as data: each rule names a metric field, a
+comparison and a limit, which is either a number or the name of an
+AlertThresholds setting. A rule set is compiled once per configuration
+version (limits resolved into an array) and evaluated over a whole batch
+of metrics records at a time with NumPy, returning the violation messages
+per record or per staff member.
+
+New checks go in a JSON rules file (THRESHOLD_RULES_FILE) instead of code:
+
+    [{"name": "samples_low", "field": "samples_processed", "op": "<",
+      "threshold": 20, "message": "Low sample volume: {value}"}]
+"""
+
+import json
+import logging
+from dataclasses import asdict, dataclass, fields, is_dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from utils.change_detection import row_fields
+
+logger = logging.getLogger(__name__)
+
+OPERATORS = {
+    '<': np.less,
+    '<=': np.less_equal,
+    '>': np.greater,
+    '>=': np.greater_equal,
+    '==': np.equal,
+    '!=': np.not_equal,
+}
+
+
+@dataclass(frozen=True)
+class ThresholdRule:
+    """One declarative check on a metrics record"""
+    name: str
+    field: str
+    op: str
+    threshold: Union[float, bool, str]   # number, or an AlertThresholds field name
+    message: str                         # str.format template with {value} and {threshold}
+    per: Optional[str] = None            # divide by this field; rows where it is 0 are skipped
+    scale: float = 1.0
+    default: Any = 0                     # used when a record lacks the field
+
+    def __post_init__(self):
+        if self.op not in OPERATORS:
+            raise ValueError(f"Unknown operator in rule {self.name}: {self.op}")
+
+    @classmethod
+    def from_dict(cls, spec: Dict[str, Any]) -> 'ThresholdRule':
+        """Build a rule from a dictionary, e.g. one entry of a JSON rules file"""
+        known = {f.name for f in fields(cls)}
+        unknown = [key for key in spec if key not in known]
+        if unknown:
+            raise ValueError(f"Unknown rule setting: {unknown[0]}")
+        return cls(**spec)
+
+
+# The checks LabAutomationCore has always run, in the order their messages appear
+DEFAULT_PERFORMANCE_RULES: Tuple[ThresholdRule, ...] = (
+    ThresholdRule('tat_missed', 'tat_target_met', '==', False, "TAT target missed", default=True),
+    ThresholdRule('performance_score_low', 'performance_score', '<', 'performance_score_threshold',
+                  "Performance score low: {value}"),
+    ThresholdRule('error_rate_high', 'error_count', '>', 'error_rate_threshold',
+                  "Error rate high: {value:.1f}%", per='samples_processed', scale=100.0),
+    ThresholdRule('break_time_exceeded', 'break_time_minutes', '>', 'break_time_threshold_minutes',
+                  "Break time exceeded: {value} minutes"),
+    ThresholdRule('qc_completion_low', 'qc_completion_percent', '<', 'qc_completion_threshold',
+                  "QC completion low: {value}%", default=100),
+)
+
+
+def load_rules(path: Union[str, Path], base: Sequence[ThresholdRule] = DEFAULT_PERFORMANCE_RULES
+               ) -> Tuple[ThresholdRule, ...]:
+    """
+    Rules from a JSON file merged over a base set
+
+    A file rule with the same name as a base rule replaces it; the rest
+    are appended in file order.
+
+    Args:
+        path: JSON file holding a list of rule dictionaries
+        base: Rules to start from
+    """
+    with open(path, 'r') as f:
+        extra = [ThresholdRule.from_dict(spec) for spec in json.load(f)]
+    by_name = {rule.name: rule for rule in extra}
+    merged = [by_name.pop(rule.name, rule) for rule in base]
+    merged.extend(rule for rule in extra if rule.name in by_name)
+    return tuple(merged)
+
+
+def _number(value: Any, default: Any) -> float:
+    if value is None:
+        value = default
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float('nan')
+
+
+class CompiledRules:
+    """A rule set with its limits resolved; evaluates whole batches"""
+
+    def __init__(self, rules: Sequence[ThresholdRule], thresholds: Any = None):
+        """
+        Resolve every rule's limit
+
+        Args:
+            rules: Rules to compile
+            thresholds: AlertThresholds (or a dict) for rules that name a setting
+        """
+        if thresholds is None:
+            settings = {}
+        elif is_dataclass(thresholds):
+            settings = asdict(thresholds)
+        else:
+            settings = dict(thresholds)
+        self.rules = tuple(rules)
+        limits = []
+        for rule in self.rules:
+            if isinstance(rule.threshold, str):
+                if rule.threshold not in settings:
+                    raise KeyError(f"Rule {rule.name} refers to unknown threshold {rule.threshold}")
+                limits.append(settings[rule.threshold])
+            else:
+                limits.append(rule.threshold)
+        self.limits = np.asarray(limits, dtype=np.float64)
+        self._defaults: Dict[str, Any] = {}
+        for rule in self.rules:
+            self._defaults.setdefault(rule.field, rule.default)
+            if rule.per:
+                self._defaults.setdefault(rule.per, 0)
+
+    def hits(self, records: Sequence[Any]) -> Tuple[np.ndarray, np.ndarray, List[Dict[str, Any]]]:
+        """
+        Evaluate every rule over every record
+
+        Returns:
+            (rules x records) boolean violation matrix, the matching matrix of
+            compared values, and the records as field dictionaries
+        """
+        rows = [row_fields(record) for record in records]
+        columns = {
+            name: np.fromiter((_number(row.get(name), default) for row in rows), np.float64, len(rows))
+            for name, default in self._defaults.items()
+        }
+        hits = np.zeros((len(self.rules), len(rows)), dtype=bool)
+        values = np.empty((len(self.rules), len(rows)), dtype=np.float64)
+        with np.errstate(invalid='ignore'):
+            for i, rule in enumerate(self.rules):
+                value = columns[rule.field]
+                valid = ~np.isnan(value)
+                if rule.per:
+                    denominator = columns[rule.per]
+                    valid &= denominator > 0
+                    value = np.divide(value, denominator, out=np.zeros_like(value), where=valid) * rule.scale
+                elif rule.scale != 1.0:
+                    value = value * rule.scale
+                values[i] = value
+                hits[i] = OPERATORS[rule.op](value, self.limits[i]) & valid
+        return hits, values, rows
+
+    def evaluate(self, records: Sequence[Any]) -> List[List[str]]:
+        """
+        Violation messages for each record, in rule order (empty list when it passes)
+        """
+        if not records:
+            return []
+        hits, values, rows = self.hits(records)
+        messages: List[List[str]] = [[] for _ in rows]
+        for row in np.flatnonzero(hits.any(axis=0)):
+            for i in np.flatnonzero(hits[:, row]):
+                rule = self.rules[i]
+                # Plain fields report the record's own value, ratios the computed one
+                value = values[i, row].item() if rule.per or rule.scale != 1.0 \
+                    else rows[row].get(rule.field, rule.default)
+                messages[row].append(rule.message.format(value=value, threshold=self.limits[i].item()))
+        return messages
+
+    def violations(self, records: Sequence[Any], key: str = 'staff_member') -> Dict[str, List[str]]:
+        """
+        Violation messages per staff member (records of the same person are combined)
+
+        Args:
+            records: Metrics records (dicts, dataclasses or objects)
+            key: Field naming the staff member
+        """
+        result: Dict[str, List[str]] = {}
+        for record, messages in zip(records, self.evaluate(records)):
+            if messages:
+                result.setdefault(str(row_fields(record).get(key, 'Unknown')), []).extend(messages)
+        return result
+
+
+class ThresholdEngine:
+    """Keeps a rule set compiled for the current configuration version"""
+
+    def __init__(self, rules: Sequence[ThresholdRule] = DEFAULT_PERFORMANCE_RULES):
+        self.rules = tuple(rules)
+        self._compiled: Optional[Tuple[Any, CompiledRules]] = None
+
+    def compile(self, thresholds: Any = None, version: Any = None) -> CompiledRules:
+        """
+        Compiled rules for the given thresholds, reused while `version` is unchanged
+
+        Args:
+            thresholds: AlertThresholds (or dict) the rules refer to
+            version: Configuration version; None recompiles every call
+        """
+        if version is not None and self._compiled is not None and self._compiled[0] == version:
+            return self._compiled[1]
+        compiled = CompiledRules(self.rules, thresholds)
+        self._compiled = (version, compiled)
+        logger.debug(f"Compiled {len(self.rules)} threshold rules (config version {version})")
+        return compiled